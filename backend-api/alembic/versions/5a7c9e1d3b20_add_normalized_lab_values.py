@@ -0,0 +1,133 @@
+"""add value_normalized/unit_normalized to lab_results
+
+Revision ID: 5a7c9e1d3b20
+Revises: 3e1b2c7f5a10
+Create Date: 2025-09-20 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7c9e1d3b20'
+down_revision = '3e1b2c7f5a10'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+# Frozen copy of utils.unit_conversion.UNIT_CONVERSIONS (and of the test name
+# aliases in analyzers.panel) as of this revision, so the backfill does not
+# change when the live tables do.
+_UREA = 6.006
+_GLUCOSE = 18.016
+_CALCIUM = 4.008
+_MAGNESIUM = 2.431
+_PHOSPHATE = 3.097
+_URIC_ACID = 16.81
+_CHOLESTEROL = 38.67
+_TRIGLYCERIDES = 88.57
+_LACTATE = 9.008
+_CELL_COUNTS = {'/µL': 1.0, 'x10³/µL': 1000.0, '10³/µL': 1000.0, 'x10^9/L': 1000.0, '10^9/L': 1000.0,
+                'mil/mm³': 1000.0}
+
+# canonical test -> (stored test names, canonical unit, {unit: factor into the canonical unit})
+UNIT_CONVERSIONS = {
+    'Creat': (('cr', 'creat', 'creatinina', 'creatinine'), 'mg/dL', {'µmol/L': 1 / 88.4, 'mmol/L': 1000 / 88.4}),
+    'Ur': (('bun', 'ur', 'urea', 'ureia', 'uréia'), 'mg/dL', {'mmol/L': _UREA}),
+    'Glicose': (('glicemia', 'glicose', 'glucose'), 'mg/dL', {'mmol/L': _GLUCOSE}),
+    'Ca+': (('ca', 'ca+', 'calcio', 'calcium', 'cálcio'), 'mg/dL', {'mmol/L': _CALCIUM, 'mEq/L': _CALCIUM / 2}),
+    'iCa': (('ca_ionico', 'calcio ionico', 'cálcio iônico', 'ica'), 'mmol/L', {'mg/dL': 1 / _CALCIUM, 'mEq/L': 0.5}),
+    'Mg+': (('magnesio', 'magnesium', 'magnésio', 'mg', 'mg+'), 'mg/dL',
+            {'mmol/L': _MAGNESIUM, 'mEq/L': _MAGNESIUM / 2}),
+    'P': (('fosforo', 'fósforo', 'p', 'phosphorus'), 'mg/dL', {'mmol/L': _PHOSPHATE}),
+    'BT': (('bilirrubina', 'bilirrubina total', 'bt'), 'mg/dL', {'µmol/L': 1 / 17.1}),
+    'BD': (('bd', 'bilirrubina direta'), 'mg/dL', {'µmol/L': 1 / 17.1}),
+    'BI': (('bi', 'bilirrubina indireta'), 'mg/dL', {'µmol/L': 1 / 17.1}),
+    'AcidoUrico': (('acido urico', 'acidourico', 'ácido úrico'), 'mg/dL', {'µmol/L': 1 / 59.48, 'mmol/L': _URIC_ACID}),
+    'CT': (('colesterol total', 'ct'), 'mg/dL', {'mmol/L': _CHOLESTEROL}),
+    'LDL': (('ldl',), 'mg/dL', {'mmol/L': _CHOLESTEROL}),
+    'HDL': (('hdl',), 'mg/dL', {'mmol/L': _CHOLESTEROL}),
+    'TG': (('tg', 'triglicerides', 'triglicerídeos'), 'mg/dL', {'mmol/L': _TRIGLYCERIDES}),
+    'Lactato': (('lactate', 'lactato', 'lactato arterial'), 'mmol/L', {'mg/dL': 1 / _LACTATE}),
+    'Albumina': (('albumin', 'albumina'), 'g/dL', {'g/L': 0.1}),
+    'Hb': (('hb', 'hemoglobin', 'hemoglobina', 'hgb'), 'g/dL', {'g/L': 0.1, 'mmol/L': 1.611}),
+    'Na+': (('na', 'na+', 'sodio', 'sodium', 'sódio'), 'mEq/L', {'mmol/L': 1.0}),
+    'K+': (('k', 'k+', 'potassio', 'potassium', 'potássio'), 'mEq/L', {'mmol/L': 1.0}),
+    'Cl-': (('chloride', 'cl', 'cl-', 'cloreto', 'cloro'), 'mEq/L', {'mmol/L': 1.0}),
+    'HCO3-': (('bicarbonate', 'bicarbonato', 'hco3', 'hco3-'), 'mEq/L', {'mmol/L': 1.0}),
+    'pO2': (('pao2', 'po2'), 'mmHg', {'kPa': 7.50062}),
+    'pCO2': (('paco2', 'pco2'), 'mmHg', {'kPa': 7.50062}),
+    'Leuco': (('leuco', 'leucocitos', 'leucócitos', 'leukocytes', 'wbc'), '/mm³', _CELL_COUNTS),
+    'Plaq': (('plaq', 'plaquetas', 'platelets', 'plt'), '/mm³', _CELL_COUNTS),
+    'PCR': (('crp', 'pcr'), 'mg/dL', {'mg/L': 0.1}),
+}
+
+
+def _unit_key(unit):
+    key = str(unit).strip().lower().replace(' ', '')
+    for src, dst in (('μ', 'u'), ('µ', 'u'), ('mc', 'u'), ('³', '3'), ('^', ''), ('*', 'x'), ('×', 'x')):
+        key = key.replace(src, dst)
+    return key
+
+
+_TESTS = {name: test for test, (names, _unit, _factors) in UNIT_CONVERSIONS.items() for name in names}
+_CANONICAL_UNITS = {test: unit for test, (_names, unit, _factors) in UNIT_CONVERSIONS.items()}
+_FACTORS = {}
+for _test, (_names, _canonical_unit, _factors) in UNIT_CONVERSIONS.items():
+    _FACTORS[(_test, _unit_key(_canonical_unit))] = 1.0
+    for _unit, _factor in _factors.items():
+        _FACTORS[(_test, _unit_key(_unit))] = float(_factor)
+
+
+def normalize(test_name, value, unit):
+    """(value, unit) in the canonical unit of the test; unitless values are taken as canonical, unknown units kept."""
+    test = _TESTS.get(test_name.strip().lower()) if isinstance(test_name, str) else None
+    if test is None:
+        return value, unit
+    if not unit:
+        return value, _CANONICAL_UNITS[test]
+    factor = _FACTORS.get((test, _unit_key(unit)))
+    if factor is None:
+        return value, unit
+    return value * factor, _CANONICAL_UNITS[test]
+
+
+def upgrade():
+    op.add_column('lab_results', sa.Column('value_normalized', sa.Float(), nullable=True))
+    op.add_column('lab_results', sa.Column('unit_normalized', sa.String(length=50), nullable=True))
+
+    # Backfill existing numeric results with the conversions frozen above
+    bind = op.get_bind()
+    lab_results = sa.table(
+        'lab_results',
+        sa.column('result_id', sa.Integer), sa.column('test_name', sa.String), sa.column('value_numeric', sa.Float),
+        sa.column('unit', sa.String), sa.column('value_normalized', sa.Float), sa.column('unit_normalized', sa.String),
+    )
+    update = (
+        lab_results.update()
+        .where(lab_results.c.result_id == sa.bindparam('rid'))
+        .values(value_normalized=sa.bindparam('vn'), unit_normalized=sa.bindparam('un'))
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(lab_results.c.result_id, lab_results.c.test_name, lab_results.c.value_numeric, lab_results.c.unit)
+            .where(lab_results.c.result_id > last_id, lab_results.c.value_numeric.isnot(None))
+            .order_by(lab_results.c.result_id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        params = []
+        for result_id, test_name, value, unit in rows:
+            normalized, normalized_unit = normalize(test_name, value, unit)
+            params.append({'rid': result_id, 'vn': normalized, 'un': normalized_unit})
+        bind.execute(update, params)
+        last_id = rows[-1][0]
+
+
+def downgrade():
+    op.drop_column('lab_results', 'unit_normalized')
+    op.drop_column('lab_results', 'value_normalized')
@@ -0,0 +1,28 @@
+"""add (patient_id, lower(test_name), timestamp) index to lab_results
+
+Revision ID: 8b2d4f6a1c37
+Revises: 5a7c9e1d3b20
+Create Date: 2025-09-22 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2d4f6a1c37'
+down_revision = '5a7c9e1d3b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_lab_results_patient_test_time',
+        'lab_results',
+        ['patient_id', sa.text('lower(test_name)'), 'timestamp'],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_lab_results_patient_test_time', table_name='lab_results')
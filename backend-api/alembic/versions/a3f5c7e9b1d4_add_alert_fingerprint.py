@@ -0,0 +1,90 @@
+"""add fingerprint/occurrence_count to alerts
+
+Revision ID: a3f5c7e9b1d4
+Revises: e7a1c3d5f9b2
+Create Date: 2025-09-28 00:00:00.000000
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f5c7e9b1d4'
+down_revision = 'e7a1c3d5f9b2'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+# Frozen copy of utils.alert_fingerprint as of this revision
+SEVERITY_BUCKETS = {
+    'critical': 'critical',
+    'severe': 'critical',
+    'high': 'high',
+    'moderate': 'high',
+    'medium': 'high',
+    'warning': 'warning',
+    'mild': 'warning',
+    'low': 'warning',
+    'info': 'info',
+    'normal': 'info',
+}
+
+
+def alert_fingerprint(patient_id, parameter, alert_type, severity, user_id=None, category=None, message=None):
+    subject = (parameter or '').strip().lower() or f"{category or ''}:{message or ''}"
+    severity = (severity or '').strip().lower()
+    key = "\x1f".join((
+        '' if patient_id is None else str(patient_id),
+        '' if user_id is None else str(user_id),
+        subject,
+        alert_type or '',
+        SEVERITY_BUCKETS.get(severity, severity),
+    ))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    op.add_column('alerts', sa.Column('fingerprint', sa.String(length=40), nullable=True))
+    op.add_column('alerts', sa.Column('occurrence_count', sa.Integer(), server_default='1', nullable=False))
+
+    # Backfill with the fingerprint frozen above
+    bind = op.get_bind()
+    alerts = sa.table(
+        'alerts',
+        sa.column('alert_id', sa.Integer), sa.column('patient_id', sa.Integer), sa.column('user_id', sa.Integer),
+        sa.column('parameter', sa.String), sa.column('alert_type', sa.String), sa.column('severity', sa.String),
+        sa.column('category', sa.String), sa.column('message', sa.String), sa.column('fingerprint', sa.String),
+    )
+    update = alerts.update().where(alerts.c.alert_id == sa.bindparam('aid')).values(fingerprint=sa.bindparam('fp'))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(
+                alerts.c.alert_id, alerts.c.patient_id, alerts.c.user_id, alerts.c.parameter,
+                alerts.c.alert_type, alerts.c.severity, alerts.c.category, alerts.c.message,
+            )
+            .where(alerts.c.alert_id > last_id)
+            .order_by(alerts.c.alert_id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        params = [
+            {'aid': alert_id, 'fp': alert_fingerprint(patient_id, parameter, alert_type, severity,
+                                                      user_id=user_id, category=category, message=message)}
+            for alert_id, patient_id, user_id, parameter, alert_type, severity, category, message in rows
+        ]
+        bind.execute(update, params)
+        last_id = rows[-1][0]
+
+    op.create_index('ix_alerts_fingerprint', 'alerts', ['fingerprint'])
+
+
+def downgrade():
+    op.drop_index('ix_alerts_fingerprint', table_name='alerts')
+    op.drop_column('alerts', 'occurrence_count')
+    op.drop_column('alerts', 'fingerprint')
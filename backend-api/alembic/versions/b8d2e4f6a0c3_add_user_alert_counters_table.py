@@ -0,0 +1,60 @@
+"""add user_alert_counters table
+
+Revision ID: b8d2e4f6a0c3
+Revises: a3f5c7e9b1d4
+Create Date: 2025-09-30 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d2e4f6a0c3'
+down_revision = 'a3f5c7e9b1d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_alert_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('severity', sa.String(length=50), nullable=False),
+        sa.Column('total', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('unread', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'severity'),
+    )
+
+    # Backfill from the existing alerts (same derivation as rebuild_user_alert_counters)
+    alerts = sa.table(
+        'alerts',
+        sa.column('alert_id', sa.Integer), sa.column('user_id', sa.Integer),
+        sa.column('severity', sa.String), sa.column('is_read', sa.Boolean),
+    )
+    counters = sa.table(
+        'user_alert_counters',
+        sa.column('user_id', sa.Integer), sa.column('severity', sa.String),
+        sa.column('total', sa.Integer), sa.column('unread', sa.Integer), sa.column('updated_at', sa.DateTime),
+    )
+    severity = sa.func.coalesce(alerts.c.severity, '')
+    op.execute(
+        counters.insert().from_select(
+            ['user_id', 'severity', 'total', 'unread', 'updated_at'],
+            sa.select(
+                alerts.c.user_id,
+                severity,
+                sa.func.count(alerts.c.alert_id),
+                sa.func.sum(sa.case((alerts.c.is_read == sa.true(), 0), else_=1)),
+                sa.func.current_timestamp(),
+            )
+            .where(alerts.c.user_id.isnot(None))
+            .group_by(alerts.c.user_id, severity),
+        )
+    )
+
+
+def downgrade():
+    op.drop_table('user_alert_counters')
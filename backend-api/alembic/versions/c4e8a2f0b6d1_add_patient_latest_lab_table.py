@@ -0,0 +1,131 @@
+"""add patient_latest_lab snapshot table
+
+Revision ID: c4e8a2f0b6d1
+Revises: 8b2d4f6a1c37
+Create Date: 2025-09-24 00:00:00.000000
+
+The table is populated from lab_results during the upgrade. Rebuild it
+later (e.g. after a bulk import that bypassed the CRUD layer) with:
+
+    python -m scripts.rebuild_patient_latest_lab
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a2f0b6d1'
+down_revision = '8b2d4f6a1c37'
+branch_labels = None
+depends_on = None
+
+BACKFILL_PATIENT_BATCH_SIZE = 500
+
+# Frozen copy of the canonical test ids and aliases of analyzers.panel as of
+# this revision: canonical id -> lower-cased names that resolve to it.
+TEST_NAMES = {
+    'Hb': ('hb', 'hemoglobin', 'hemoglobina', 'hgb'),
+    'Ht': ('hct', 'hematocrit', 'hematocrito', 'hematócrito', 'ht'),
+    'RBC': ('eritrocitos', 'hemacias', 'hemácias', 'rbc'), 'VCM': ('vcm',), 'HCM': ('hcm',), 'CHCM': ('chcm',),
+    'RDW': ('rdw',), 'Leuco': ('leuco', 'leucocitos', 'leucócitos', 'leukocytes', 'wbc'),
+    'Plaq': ('plaq', 'plaquetas', 'platelets', 'plt'), 'Retic': ('retic', 'reticulocitos', 'reticulócitos'),
+    'Na+': ('na', 'na+', 'sodio', 'sodium', 'sódio'), 'K+': ('k', 'k+', 'potassio', 'potassium', 'potássio'),
+    'Cl-': ('chloride', 'cl', 'cl-', 'cloreto', 'cloro'), 'Ca+': ('ca', 'ca+', 'calcio', 'calcium', 'cálcio'),
+    'iCa': ('ca_ionico', 'calcio ionico', 'cálcio iônico', 'ica'),
+    'Mg+': ('magnesio', 'magnesium', 'magnésio', 'mg', 'mg+'), 'P': ('fosforo', 'fósforo', 'p', 'phosphorus'),
+    'Albumina': ('albumin', 'albumina'), 'pH': ('ph',), 'pCO2': ('paco2', 'pco2'), 'pO2': ('pao2', 'po2'),
+    'HCO3-': ('bicarbonate', 'bicarbonato', 'hco3', 'hco3-'), 'BE': ('be',), 'SpO2': ('spo2',), 'FiO2': ('fio2',),
+    'Lactato': ('lactate', 'lactato', 'lactato arterial'), 'Creat': ('cr', 'creat', 'creatinina', 'creatinine'),
+    'Ur': ('bun', 'ur', 'urea', 'ureia', 'uréia'), 'TFG': ('tfg',),
+    'AcidoUrico': ('acido urico', 'acidourico', 'ácido úrico'), 'TGO': ('ast', 'tgo'), 'TGP': ('alt', 'tgp'),
+    'GGT': ('ggt',), 'FA': ('alp', 'fa', 'fosfatase alcalina'), 'BT': ('bilirrubina', 'bilirrubina total', 'bt'),
+    'BD': ('bd', 'bilirrubina direta'), 'BI': ('bi', 'bilirrubina indireta'), 'Amilase': ('amilase',),
+    'Lipase': ('lipase',), 'Glicose': ('glicemia', 'glicose', 'glucose'), 'HbA1c': ('hba1c',),
+    'CT': ('colesterol total', 'ct'), 'LDL': ('ldl',), 'HDL': ('hdl',),
+    'TG': ('tg', 'triglicerides', 'triglicerídeos'), 'TSH': ('tsh',), 'T4L': ('t4l',), 'T3L': ('t3l',),
+    'TropoI': ('tropoi', 'troponina', 'troponina i'), 'TropoT': ('troponina t', 'tropot'), 'CK': ('ck', 'cpk'),
+    'CKMB': ('ck-mb', 'ckmb'), 'BNP': ('bnp',), 'NTproBNP': ('nt-probnp', 'ntprobnp'), 'LDH': ('ldh',),
+    'RNI': ('inr', 'rni'), 'TTPA': ('aptt', 'tpa', 'ttpa'), 'TP': ('tp',),
+    'Fibrinogenio': ('fibrinogen', 'fibrinogenio', 'fibrinogênio'),
+    'DDimero': ('d-dimer', 'd-dimero', 'd-dímero', 'ddimer', 'ddimero'), 'PCR': ('crp', 'pcr'),
+    'VHS': ('esr', 'vhs'), 'Procalcitonina': ('pct', 'procalcitonin', 'procalcitonina'), 'Ferritina': ('ferritina',),
+    'IL6': ('il-6', 'il6'),
+}
+_TEST_KEYS = {name: test for test, names in TEST_NAMES.items() for name in names}
+
+
+def lab_test_key(test_name):
+    """Snapshot key of a test, as crud.crud_patient_latest_lab.lab_test_key computed it at this revision."""
+    name = test_name.strip().lower()
+    return _TEST_KEYS.get(name) or name[:100]
+
+
+def upgrade():
+    op.create_table(
+        'patient_latest_lab',
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('test_key', sa.String(length=100), nullable=False),
+        sa.Column('result_id', sa.Integer(), nullable=True),
+        sa.Column('test_name', sa.String(length=100), nullable=False),
+        sa.Column('value', sa.Float(), nullable=True),
+        sa.Column('value_text', sa.String(length=255), nullable=True),
+        sa.Column('unit', sa.String(length=50), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.patient_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['result_id'], ['lab_results.result_id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('patient_id', 'test_key'),
+    )
+
+    # Backfill with the test keys frozen above, a batch of patients at a time
+    bind = op.get_bind()
+    lab_results = sa.table(
+        'lab_results',
+        sa.column('result_id', sa.Integer), sa.column('patient_id', sa.Integer), sa.column('test_name', sa.String),
+        sa.column('value_normalized', sa.Float), sa.column('value_text', sa.String),
+        sa.column('unit_normalized', sa.String), sa.column('timestamp', sa.DateTime),
+    )
+    snapshot = sa.table(
+        'patient_latest_lab',
+        sa.column('patient_id', sa.Integer), sa.column('test_key', sa.String), sa.column('result_id', sa.Integer),
+        sa.column('test_name', sa.String), sa.column('value', sa.Float), sa.column('value_text', sa.String),
+        sa.column('unit', sa.String), sa.column('timestamp', sa.DateTime), sa.column('updated_at', sa.DateTime),
+    )
+    has_value = sa.or_(lab_results.c.value_normalized.isnot(None), lab_results.c.value_text.isnot(None))
+    now = datetime.utcnow()
+    last_patient = None
+    while True:
+        patients = sa.select(lab_results.c.patient_id).where(has_value).distinct()
+        if last_patient is not None:
+            patients = patients.where(lab_results.c.patient_id > last_patient)
+        patient_ids = bind.execute(
+            patients.order_by(lab_results.c.patient_id).limit(BACKFILL_PATIENT_BATCH_SIZE)
+        ).scalars().all()
+        if not patient_ids:
+            break
+        rows = bind.execute(
+            sa.select(
+                lab_results.c.result_id, lab_results.c.patient_id, lab_results.c.test_name,
+                lab_results.c.value_normalized, lab_results.c.value_text, lab_results.c.unit_normalized,
+                lab_results.c.timestamp,
+            )
+            .where(has_value, lab_results.c.patient_id.in_(patient_ids))
+            .order_by(lab_results.c.patient_id, lab_results.c.timestamp, lab_results.c.result_id)
+        )
+        latest = {}
+        for result_id, patient_id, test_name, value, value_text, unit, timestamp in rows:
+            key = lab_test_key(test_name)
+            latest[(patient_id, key)] = {
+                'patient_id': patient_id, 'test_key': key, 'result_id': result_id,
+                'test_name': test_name, 'value': value, 'value_text': value_text, 'unit': unit,
+                'timestamp': timestamp, 'updated_at': now,
+            }
+        if latest:
+            bind.execute(snapshot.insert(), list(latest.values()))
+        last_patient = patient_ids[-1]
+
+
+def downgrade():
+    op.drop_table('patient_latest_lab')
@@ -0,0 +1,27 @@
+"""add (patient_id, score_type, timestamp) index to clinical_scores
+
+Revision ID: e7a1c3d5f9b2
+Revises: c4e8a2f0b6d1
+Create Date: 2025-09-26 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a1c3d5f9b2'
+down_revision = 'c4e8a2f0b6d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_clinical_scores_patient_type_time',
+        'clinical_scores',
+        ['patient_id', 'score_type', 'timestamp'],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_clinical_scores_patient_type_time', table_name='clinical_scores')
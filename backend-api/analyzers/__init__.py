@@ -19,23 +19,74 @@ This package contains modules for analyzing different types of laboratory result
 - Drug level monitoring analysis
 """
 
-from .blood_gases import analisar_gasometria
-from .electrolytes import analisar_eletrolitos, analisar_eletrólitos
-from .hematology import analisar_hemograma
-from .renal import analisar_funcao_renal
-from .hepatic import analisar_funcao_hepatica
-from .cardiac import analisar_marcadores_cardiacos
-from .metabolic import analisar_metabolismo
-from .microbiology import analisar_microbiologia
-from .thyroid import analisar_funcao_tireoidiana
-from .bone_metabolism import analisar_metabolismo_osseo
-from .tumor_markers import analisar_marcadores_tumorais
-from .autoimmune import analisar_marcadores_autoimunes
-from .infectious_disease import analisar_marcadores_doencas_infecciosas
-from .hormones import analisar_hormonios
-from .drug_monitoring import analisar_monitoramento_medicamentos
+import importlib
+from typing import Any, Dict, List
+
+# Public name -> submodule that defines it. Analyzer modules (and NumPy, used by
+# the batch entry points) are imported on first attribute access rather than
+# with the package, which keeps API workers and test processes quick to start.
+_LAZY_EXPORTS: Dict[str, str] = {
+    'LabPanel': 'panel',
+    'PanelNormalizer': 'panel',
+    'normalize_panel': 'panel',
+    'analisar_gasometria': 'blood_gases',
+    'analisar_eletrolitos': 'electrolytes',
+    'analisar_eletrólitos': 'electrolytes',
+    'analisar_hemograma': 'hematology',
+    'analisar_funcao_renal': 'renal',
+    'analisar_funcao_hepatica': 'hepatic',
+    'analisar_marcadores_cardiacos': 'cardiac',
+    'analisar_metabolismo': 'metabolic',
+    'analisar_microbiologia': 'microbiology',
+    'analisar_funcao_tireoidiana': 'thyroid',
+    'analisar_metabolismo_osseo': 'bone_metabolism',
+    'analisar_marcadores_tumorais': 'tumor_markers',
+    'analisar_marcadores_autoimunes': 'autoimmune',
+    'analisar_marcadores_doencas_infecciosas': 'infectious_disease',
+    'analisar_hormonios': 'hormones',
+    'analisar_monitoramento_medicamentos': 'drug_monitoring',
+    'analisar_eletrolitos_batch': 'batch',
+    'analisar_hemograma_batch': 'batch',
+    'analisar_funcao_renal_batch': 'batch',
+    'analisar_gasometria_batch': 'batch',
+    'analisar_funcao_hepatica_batch': 'batch',
+    'analisar_coagulacao_batch': 'batch',
+    'AnalyzerRegistry': 'registry',
+    'AnalyzerSpec': 'registry',
+    'analyzer_registry': 'registry',
+    'run_all_analyzers': 'registry',
+    'AnalysisDelta': 'incremental',
+    'IncrementalAnalyzer': 'incremental',
+    'incremental_analyzer': 'incremental',
+    'Finding': 'findings',
+    'FindingSet': 'findings',
+    'extract_findings': 'findings',
+    'findings_from_batch': 'findings',
+    'AKIStage': 'aki',
+    'AKIStager': 'aki',
+    'aki_stager': 'aki',
+    'analisar_gasometria_serie': 'blood_gas_trends',
+    'analisar_gasometrias_pacientes': 'blood_gas_trends',
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value  # Later lookups bypass __getattr__
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
 
 __all__ = [
+    'LabPanel',
+    'PanelNormalizer',
+    'normalize_panel',
     'analisar_gasometria',
     'analisar_eletrolitos',
     'analisar_eletrólitos',
@@ -51,5 +102,27 @@ __all__ = [
     'analisar_marcadores_autoimunes',
     'analisar_marcadores_doencas_infecciosas',
     'analisar_hormonios',
-    'analisar_monitoramento_medicamentos'
+    'analisar_monitoramento_medicamentos',
+    'analisar_eletrolitos_batch',
+    'analisar_hemograma_batch',
+    'analisar_funcao_renal_batch',
+    'analisar_gasometria_batch',
+    'analisar_funcao_hepatica_batch',
+    'analisar_coagulacao_batch',
+    'AnalyzerRegistry',
+    'AnalyzerSpec',
+    'analyzer_registry',
+    'run_all_analyzers',
+    'AnalysisDelta',
+    'IncrementalAnalyzer',
+    'incremental_analyzer',
+    'Finding',
+    'FindingSet',
+    'extract_findings',
+    'findings_from_batch',
+    'AKIStage',
+    'AKIStager',
+    'aki_stager',
+    'analisar_gasometria_serie',
+    'analisar_gasometrias_pacientes'
 ]
\ No newline at end of file
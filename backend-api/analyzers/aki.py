@@ -0,0 +1,300 @@
+"""
+Streaming KDIGO acute kidney injury (AKI) staging over creatinine history.
+
+``analisar_funcao_renal`` judges a single creatinine value. KDIGO staging
+needs history: the baseline (lowest creatinine of the previous 7 days) and
+the rise within 48 hours. ``AKIStager`` keeps, per patient, two monotonic
+deques of (timestamp, creatinine) whose fronts are the minima of the 7-day
+and 48-hour windows, so each new result is staged in O(1) amortized time
+without re-reading the patient's history. ``replay`` stages a whole history
+in a single pass with the same machinery.
+
+KDIGO 2012 criteria applied to serum creatinine (mg/dL):
+
+- Stage 1: >= 1.5x baseline, or a rise >= 0.3 mg/dL within 48 h.
+- Stage 2: >= 2.0x baseline.
+- Stage 3: >= 3.0x baseline, or creatinine >= 4.0 mg/dL with an acute rise
+  (>= 0.3 mg/dL in 48 h or >= 1.5x baseline).
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Callable, Deque, Dict, Hashable, Iterable, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+AKI_MAX_PATIENTS = int(os.getenv("AKI_MAX_PATIENTS", "4096"))
+
+BASELINE_WINDOW = timedelta(days=7)
+DELTA_WINDOW = timedelta(hours=48)
+
+# KDIGO thresholds
+ABSOLUTE_RISE_MG_DL = 0.3
+STAGE_RATIOS: Tuple[Tuple[int, float], ...] = ((3, 3.0), (2, 2.0), (1, 1.5))
+STAGE_3_ABSOLUTE_MG_DL = 4.0
+
+Reading = Tuple[datetime, float]
+
+
+class AKIStage:
+    """
+    KDIGO stage of one creatinine result.
+
+    Attributes:
+        timestamp: When the result was collected.
+        creatinine: Value in mg/dL.
+        baseline: Lowest creatinine of the previous 7 days (None without history).
+        min_48h: Lowest creatinine of the previous 48 hours (None without history).
+        stage: 0 (no AKI) to 3.
+        criteria: KDIGO criteria met ('ratio', 'delta_48h', 'absolute').
+    """
+
+    __slots__ = ('timestamp', 'creatinine', 'baseline', 'min_48h', 'stage', 'criteria')
+
+    def __init__(self, timestamp: datetime, creatinine: float, baseline: Optional[float], min_48h: Optional[float]):
+        self.timestamp = timestamp
+        self.creatinine = creatinine
+        self.baseline = baseline
+        self.min_48h = min_48h
+        self.stage, self.criteria = kdigo_stage(creatinine, baseline, min_48h)
+
+    @property
+    def ratio(self) -> Optional[float]:
+        return self.creatinine / self.baseline if self.baseline else None
+
+    @property
+    def delta_48h(self) -> Optional[float]:
+        return self.creatinine - self.min_48h if self.min_48h is not None else None
+
+    @property
+    def interpretation(self) -> str:
+        """Portuguese summary, built only when read."""
+        if self.baseline is None:
+            return f"Creatinina {self.creatinine:g} mg/dL sem valores prévios em 7 dias para estadiamento KDIGO"
+        if not self.stage:
+            return f"Sem critérios KDIGO para LRA (creatinina {self.creatinine:g} mg/dL, basal {self.baseline:g} mg/dL)"
+        parts = []
+        if 'ratio' in self.criteria:
+            parts.append(f"{self.ratio:.1f}x o basal de {self.baseline:g} mg/dL")
+        if 'delta_48h' in self.criteria:
+            parts.append(f"aumento de {self.delta_48h:.2f} mg/dL em 48h")
+        if 'absolute' in self.criteria:
+            parts.append(f"creatinina >= {STAGE_3_ABSOLUTE_MG_DL:g} mg/dL")
+        return f"Lesão renal aguda KDIGO estágio {self.stage} ({'; '.join(parts)})"
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "timestamp": self.timestamp.isoformat(),
+            "creatinine": self.creatinine,
+            "baseline": self.baseline,
+            "min_48h": self.min_48h,
+            "stage": self.stage,
+            "criteria": list(self.criteria),
+        }
+
+    def __repr__(self) -> str:
+        return f"AKIStage(stage={self.stage}, creatinine={self.creatinine!r}, baseline={self.baseline!r})"
+
+
+def kdigo_stage(creatinine: float, baseline: Optional[float], min_48h: Optional[float]) -> Tuple[int, Tuple[str, ...]]:
+    """
+    KDIGO stage from the current value, the 7-day baseline and the 48-hour minimum.
+
+    Returns:
+        tuple: (stage 0-3, criteria met)
+    """
+    criteria = []
+    stage = 0
+    rise = creatinine - min_48h if min_48h is not None else 0.0
+    for ratio_stage, threshold in STAGE_RATIOS:
+        # Multiplied out with a tolerance, like the 48h rise, so exact
+        # boundaries (0.8 -> 1.2 is 1.5x) are not lost to float rounding
+        if baseline and creatinine >= threshold * baseline - 1e-9:
+            stage = ratio_stage
+            criteria.append('ratio')
+            break
+    if rise >= ABSOLUTE_RISE_MG_DL - 1e-9:
+        criteria.append('delta_48h')
+        stage = max(stage, 1)
+    if creatinine >= STAGE_3_ABSOLUTE_MG_DL and criteria:  # >= 4.0 mg/dL with an acute rise
+        criteria.append('absolute')
+        stage = 3
+    return stage, tuple(criteria)
+
+
+class _SlidingMinimum:
+    """Minimum over a time window, as a deque of increasing values (oldest first)."""
+
+    __slots__ = ('window', '_items')
+
+    def __init__(self, window: timedelta):
+        self.window = window
+        self._items: Deque[Reading] = deque()
+
+    def expire(self, now: datetime) -> None:
+        items = self._items
+        while items and now - items[0][0] > self.window:
+            items.popleft()
+
+    def push(self, timestamp: datetime, value: float) -> None:
+        items = self._items
+        while items and items[-1][1] >= value:
+            items.pop()
+        items.append((timestamp, value))
+
+    def minimum(self) -> Optional[float]:
+        return self._items[0][1] if self._items else None
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+class CreatinineWindow:
+    """
+    Rolling creatinine state of one patient.
+
+    Results must arrive in collection order for the O(1) path; an older result
+    triggers a rebuild from the raw readings still inside the 7-day window.
+    """
+
+    __slots__ = ('baseline', 'recent', 'readings', 'last')
+
+    def __init__(self):
+        self.baseline = _SlidingMinimum(BASELINE_WINDOW)
+        self.recent = _SlidingMinimum(DELTA_WINDOW)
+        self.readings: Deque[Reading] = deque()
+        self.last: Optional[AKIStage] = None
+
+    def add(self, timestamp: datetime, creatinine: float) -> AKIStage:
+        if self.readings and timestamp < self.readings[-1][0]:
+            return self._insert_late(timestamp, creatinine)
+        return self._append(timestamp, creatinine)
+
+    def _append(self, timestamp: datetime, creatinine: float) -> AKIStage:
+        # Stage against the previous values only, then admit the new one
+        self.baseline.expire(timestamp)
+        self.recent.expire(timestamp)
+        readings = self.readings
+        while readings and timestamp - readings[0][0] > BASELINE_WINDOW:
+            readings.popleft()
+        stage = AKIStage(timestamp, creatinine, self.baseline.minimum(), self.recent.minimum())
+        self.baseline.push(timestamp, creatinine)
+        self.recent.push(timestamp, creatinine)
+        readings.append((timestamp, creatinine))
+        self.last = stage
+        return stage
+
+    def _insert_late(self, timestamp: datetime, creatinine: float) -> AKIStage:
+        logger.debug(f"Out-of-order creatinine at {timestamp}; rebuilding the AKI window")
+        readings = sorted(list(self.readings) + [(timestamp, creatinine)], key=lambda r: r[0])
+        self.baseline.clear()
+        self.recent.clear()
+        self.readings.clear()
+        staged = None
+        for reading_time, value in readings:
+            stage = self._append(reading_time, value)
+            if staged is None and reading_time == timestamp and value == creatinine:
+                staged = stage
+        # ``last`` ends up as the stage of the newest reading again
+        return staged
+
+
+class AKIStager:
+    """
+    Per-patient streaming KDIGO staging.
+
+    Args:
+        max_patients: Number of patient windows kept in memory (least recently
+            updated patients are evicted and re-seeded on their next result).
+    """
+
+    def __init__(self, max_patients: int = AKI_MAX_PATIENTS):
+        self.max_patients = max_patients
+        self._windows: "OrderedDict[Hashable, CreatinineWindow]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, patient_id: Hashable) -> bool:
+        with self._lock:
+            return patient_id in self._windows
+
+    def update(self, patient_id: Hashable, creatinine: float, timestamp: datetime,
+               seed: Optional[Callable[[], Iterable[Reading]]] = None) -> AKIStage:
+        """
+        Stage a new creatinine result.
+
+        Args:
+            patient_id: Patient key.
+            creatinine: Value in mg/dL.
+            timestamp: Collection time of the result.
+            seed: Zero-argument callable returning earlier (timestamp,
+                creatinine) readings (e.g. the last 7 days from the database).
+                Called only when the patient has no window yet.
+
+        Returns:
+            AKIStage: Stage of the new result.
+        """
+        with self._lock:
+            window = self._windows.get(patient_id)
+            if window is not None:
+                self._windows.move_to_end(patient_id)
+                return window.add(timestamp, float(creatinine))
+
+        # Load the history outside the lock so other patients are not blocked on it
+        readings = sorted(seed(), key=lambda r: r[0]) if seed is not None else []
+        with self._lock:
+            window = self._windows.get(patient_id)
+            if window is None:
+                window = CreatinineWindow()
+                for reading_time, value in readings:
+                    window.add(reading_time, float(value))
+                self._windows[patient_id] = window
+                while len(self._windows) > self.max_patients:
+                    self._windows.popitem(last=False)
+            else:  # Seeded concurrently by another result
+                self._windows.move_to_end(patient_id)
+            return window.add(timestamp, float(creatinine))
+
+    def current(self, patient_id: Hashable) -> Optional[AKIStage]:
+        """Stage of the patient's newest result, if known."""
+        with self._lock:
+            window = self._windows.get(patient_id)
+            return window.last if window is not None else None
+
+    def forget(self, patient_id: Hashable) -> None:
+        with self._lock:
+            self._windows.pop(patient_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._windows.clear()
+
+
+def replay(history: Iterable[Reading]) -> List[AKIStage]:
+    """
+    Stage every result of a creatinine history in one pass.
+
+    Args:
+        history: (timestamp, creatinine mg/dL) readings, in any order.
+
+    Returns:
+        list: One ``AKIStage`` per reading, in chronological order.
+    """
+    window = CreatinineWindow()
+    return [window.add(timestamp, float(value)) for timestamp, value in sorted(history, key=lambda r: r[0])]
+
+
+def replay_many(histories: Mapping[Hashable, Iterable[Reading]]) -> Dict[Hashable, List[AKIStage]]:
+    """``replay`` for several patients; returns {patient_id: stages}."""
+    return {patient_id: replay(history) for patient_id, history in histories.items()}
+
+
+def peak_stage(stages: Iterable[AKIStage]) -> int:
+    """Highest stage reached in a staged history (0 if empty)."""
+    return max((stage.stage for stage in stages), default=0)
+
+
+# Process-wide staging state used by crud_lab_result
+aki_stager = AKIStager()
@@ -0,0 +1,497 @@
+"""
+Column-wise (batch) entry points for ward-wide analyzer sweeps.
+
+The per-patient analyzers take one dict and build a full Portuguese narrative
+for it. For overnight sweeps over thousands of patients that narrative is
+wasted on the large majority of rows with normal results. The batch functions
+here take a panel as columns (``{test: array}``, one element per patient),
+compute reference-range flags, criticality codes and derived values
+(anion gap, corrected calcium, P/F ratio, hepatic R value) with NumPy, and
+only call the per-patient analyzer for the rows that came out abnormal.
+
+Every batch function returns a dict with the same layout::
+
+    {
+        "n_rows": int,
+        "flags": {test: int8 array},        # -1 below, 0 within/missing, +1 above range
+        "criticality": {test: int8 array},  # analyzers.criticality codes, -1 if missing
+        "derived": {name: float array},     # NaN where not computable
+        "values": {test: float array},      # parsed inputs, NaN where missing
+        "abnormal": bool array,
+        "critical": bool array,
+        "results": {row_index: dict},       # per-patient analysis, abnormal rows only
+    }
+"""
+
+import logging
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from utils.reference_ranges import REFERENCE_RANGES, get_reference_index
+from .criticality import CRITICAL, SIGNIFICANT, CriticalityThresholds
+from .panel import canonical_test_id, parse_lab_value
+
+logger = logging.getLogger(__name__)
+
+Columns = Mapping[str, Any]
+
+# Oxygenation thresholds only the batch path needs; the per-patient blood gas
+# analyzer applies the same cut-offs inline.
+PH_CRITICALITY = CriticalityThresholds("pH", {
+    'critical': [-7.20, 7.60],
+    'significant': [(7.20, 7.35), (7.45, 7.60)]
+})
+
+PCO2_CRITICALITY = CriticalityThresholds("pCO2", {
+    'critical': [80, -20],
+    'significant': [(60, 80), (20, 35)]
+})
+
+PF_RATIO_CRITICALITY = CriticalityThresholds("P/F", {
+    'critical': [-200], # Moderate/severe ARDS range
+    'significant': [(200, 300)]
+})
+
+
+def _to_float_array(values: Any) -> np.ndarray:
+    arr = np.asarray(values)
+    if arr.dtype.kind in 'fiub':
+        return arr.astype(float)
+    parsed = [parse_lab_value(v) for v in arr.ravel()]
+    return np.array([np.nan if v is None else v for v in parsed], dtype=float).reshape(arr.shape)
+
+
+def as_columns(columns: Columns, tests: Sequence[str],
+               aliases: Optional[Mapping[str, str]] = None) -> Tuple[int, Dict[str, np.ndarray]]:
+    """
+    Coerce input columns into float arrays keyed by canonical test id.
+
+    Column names may use any spelling known to ``analyzers.panel``
+    (e.g. 'sodio', 'Na', 'Na+'); string cells are parsed with
+    ``parse_lab_value``. Tests without a column are returned as all-NaN.
+
+    Args:
+        columns: Mapping of test name to a 1-D array-like.
+        tests: Canonical ids the caller needs.
+        aliases: Extra {name: canonical id} for spellings an analyzer
+            accepts but ``analyzers.panel`` does not know.
+
+    Returns:
+        tuple: (number of rows, {canonical id: float array})
+
+    Raises:
+        ValueError: If the columns have different lengths or are not 1-D.
+    """
+    resolved: Dict[str, np.ndarray] = {}
+    n_rows: Optional[int] = None
+    for name, values in columns.items():
+        arr = _to_float_array(values)
+        if arr.ndim != 1:
+            raise ValueError(f"Column {name!r} must be one-dimensional")
+        if n_rows is None:
+            n_rows = len(arr)
+        elif len(arr) != n_rows:
+            raise ValueError(f"Column {name!r} has {len(arr)} rows, expected {n_rows}")
+        resolved[canonical_test_id(name) or (aliases or {}).get(name, name)] = arr
+
+    n_rows = n_rows or 0
+    for test in tests:
+        if test not in resolved:
+            resolved[test] = np.full(n_rows, np.nan)
+    return n_rows, resolved
+
+
+def range_flags(values: np.ndarray, reference: Optional[Tuple[float, float]]) -> np.ndarray:
+    """-1/0/+1 per value relative to a (low, high) reference; missing values are 0."""
+    flags = np.zeros(values.shape, dtype=np.int8)
+    if reference is None:
+        return flags
+    low, high = reference
+    with np.errstate(invalid='ignore'):
+        if low is not None:
+            flags[values < low] = -1
+        if high is not None:
+            flags[values > high] = 1
+    return flags
+
+
+def _finalize(
+    n_rows: int,
+    flags: Dict[str, np.ndarray],
+    criticality: Dict[str, np.ndarray],
+    derived: Dict[str, np.ndarray],
+    narrate: Callable[[int], Dict[str, Any]],
+    materialize: bool,
+    values: Dict[str, np.ndarray],
+    reported: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    # ``reported``: rows the per-patient analyzer reports on even with every
+    # flag at 0 (e.g. a pattern it derives from in-range values)
+    abnormal = np.zeros(n_rows, dtype=bool) if reported is None else reported.copy()
+    for flag in flags.values():
+        abnormal |= flag != 0
+    critical = np.zeros(n_rows, dtype=bool)
+    for codes in criticality.values():
+        critical |= codes == CRITICAL
+    abnormal |= critical
+
+    results: Dict[int, Dict[str, Any]] = {}
+    if materialize:
+        for row in np.flatnonzero(abnormal).tolist():
+            results[row] = narrate(row)
+    return {
+        "n_rows": n_rows,
+        "flags": flags,
+        "criticality": criticality,
+        "derived": derived,
+        "values": values,
+        "abnormal": abnormal,
+        "critical": critical,
+        "results": results,
+    }
+
+
+def _per_row(name: str, value: Any, n_rows: int) -> Any:
+    """A per-row patient attribute as a list checked against ``n_rows``; None or one scalar is returned as is."""
+    if value is None or np.isscalar(value):
+        return value
+    value = list(value)
+    if len(value) != n_rows:
+        raise ValueError(f"{name} has {len(value)} rows, expected {n_rows}")
+    return value
+
+
+def _at_row(value: Any, row: int) -> Any:
+    return value[row] if isinstance(value, list) else value
+
+
+def _row_value(values: Dict[str, np.ndarray], test: str, row: int) -> Optional[float]:
+    value = values[test][row]
+    return None if np.isnan(value) else float(value)
+
+
+def _row_dict(values: Dict[str, np.ndarray], tests: Sequence[str], row: int,
+              keys: Optional[Mapping[str, str]] = None) -> Dict[str, float]:
+    row_values = {}
+    for test in tests:
+        value = _row_value(values, test, row)
+        if value is not None:
+            row_values[(keys or {}).get(test, test)] = value
+    return row_values
+
+
+def anion_gap(na: np.ndarray, cl: np.ndarray, hco3: np.ndarray) -> np.ndarray:
+    """Anion gap Na - (Cl + HCO3); NaN where any input is missing."""
+    return na - (cl + hco3)
+
+
+def corrected_calcium(ca: np.ndarray, albumina: np.ndarray) -> np.ndarray:
+    """
+    Albumin-corrected calcium: Ca + 0.8 * (4.0 - Albumina).
+
+    NaN where albumin is missing or outside the 0-8 g/dL range accepted by
+    the per-patient electrolyte analyzer.
+    """
+    with np.errstate(invalid='ignore'):
+        valid = (albumina > 0) & (albumina < 8.0)
+    return np.where(valid, ca + 0.8 * (4.0 - albumina), np.nan)
+
+
+def pf_ratio(po2: np.ndarray, fio2: np.ndarray) -> np.ndarray:
+    """
+    PaO2/FiO2 ratio. FiO2 above 1.0 is read as a percentage; NaN where FiO2
+    is missing or outside 0.21-1.0 after conversion.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fio2_decimal = np.where(fio2 > 1.0, fio2 / 100.0, fio2)
+        valid = (fio2_decimal >= 0.21) & (fio2_decimal <= 1.0)
+        return np.where(valid, po2 / fio2_decimal, np.nan)
+
+
+ELECTROLYTE_TESTS = ('Na+', 'K+', 'Cl-', 'Ca+', 'iCa', 'Mg+', 'P', 'Albumina', 'HCO3-')
+
+
+def analisar_eletrolitos_batch(columns: Columns, materialize: bool = True) -> Dict[str, Any]:
+    """
+    Column-wise electrolyte analysis.
+
+    Args:
+        columns: {test: array} with any of Na+, K+, Cl-, Ca+, iCa, Mg+, P,
+            Albumina and (for the anion gap) HCO3-.
+        materialize: Build the per-patient narrative for abnormal rows.
+
+    Returns:
+        dict: Batch result (see module docstring). ``derived`` holds
+            'anion_gap' and 'ca_corrigido'.
+    """
+    from .electrolytes import (
+        CA_CRITICALITY, CL_CRITICALITY, FOSFORO_CRITICALITY, ICA_CRITICALITY,
+        K_CRITICALITY, MG_CRITICALITY, NA_CRITICALITY, _analisar_eletrolitos_cached,
+    )
+
+    n_rows, values = as_columns(columns, ELECTROLYTE_TESTS)
+    derived = {
+        "anion_gap": anion_gap(values['Na+'], values['Cl-'], values['HCO3-']),
+        "ca_corrigido": corrected_calcium(values['Ca+'], values['Albumina']),
+    }
+    # Calcium is judged on the corrected value when it can be computed
+    ca_eval = np.where(np.isnan(derived["ca_corrigido"]), values['Ca+'], derived["ca_corrigido"])
+
+    compiled = {
+        'Na+': NA_CRITICALITY, 'K+': K_CRITICALITY, 'Cl-': CL_CRITICALITY, 'iCa': ICA_CRITICALITY,
+        'Mg+': MG_CRITICALITY, 'P': FOSFORO_CRITICALITY,
+    }
+    flags = {test: range_flags(values[test], REFERENCE_RANGES.get(test)) for test in compiled}
+    flags['Ca+'] = range_flags(ca_eval, REFERENCE_RANGES.get('Ca+'))
+    flags['AnionGap'] = range_flags(derived["anion_gap"], REFERENCE_RANGES.get('AnionGap'))
+    criticality = {test: thresholds.codes(values[test]) for test, thresholds in compiled.items()}
+    criticality['Ca+'] = CA_CRITICALITY.codes(ca_eval)
+
+    def narrate(row: int) -> Dict[str, Any]:
+        return _analisar_eletrolitos_cached(
+            *(_row_value(values, test, row) for test in ('Na+', 'K+', 'Cl-', 'Ca+', 'iCa', 'Mg+', 'P', 'Albumina'))
+        )
+
+    return _finalize(n_rows, flags, criticality, derived, narrate, materialize, values)
+
+
+HEMATOLOGY_TESTS = ('Hb', 'Ht', 'RBC', 'Leuco', 'Plaq', 'VCM', 'HCM', 'CHCM', 'RDW', 'Retic')
+
+
+def analisar_hemograma_batch(columns: Columns, sexo: Union[None, str, Sequence[Optional[str]]] = None,
+                             materialize: bool = True) -> Dict[str, Any]:
+    """
+    Column-wise complete blood count analysis.
+
+    Args:
+        columns: {test: array} with any of Hb, Ht, RBC, Leuco, Plaq, VCM, HCM,
+            CHCM, RDW, Retic.
+        sexo: One sex code for every row, or one per row ('M'/'F'/None);
+            selects sex-specific reference ranges.
+        materialize: Build the per-patient narrative for abnormal rows.
+
+    Returns:
+        dict: Batch result (see module docstring).
+    """
+    from .hematology import (
+        CHCM_CRITICALITY, HB_CRITICALITY, HCM_CRITICALITY, LEUCO_CRITICALITY,
+        PLAQ_CRITICALITY, RDW_CRITICALITY, VCM_CRITICALITY, analisar_hemograma,
+    )
+
+    n_rows, values = as_columns(columns, HEMATOLOGY_TESTS)
+    sexo = _per_row("sexo", sexo, n_rows)
+    index = get_reference_index()
+    flags = {test: index.check_many(test, values[test], sexo)["flags"] for test in HEMATOLOGY_TESTS}
+
+    compiled = {
+        'Hb': HB_CRITICALITY, 'Leuco': LEUCO_CRITICALITY, 'Plaq': PLAQ_CRITICALITY, 'VCM': VCM_CRITICALITY,
+        'HCM': HCM_CRITICALITY, 'CHCM': CHCM_CRITICALITY, 'RDW': RDW_CRITICALITY,
+    }
+    criticality = {test: thresholds.codes(values[test]) for test, thresholds in compiled.items()}
+
+    def narrate(row: int) -> Dict[str, Any]:
+        return analisar_hemograma(_row_dict(values, HEMATOLOGY_TESTS, row), sexo=_at_row(sexo, row))
+
+    return _finalize(n_rows, flags, criticality, {}, narrate, materialize, values)
+
+
+RENAL_TESTS = ('Creat', 'Ur', 'K+')
+
+
+def analisar_funcao_renal_batch(columns: Columns, idade: Any = None,
+                                sexo: Union[None, str, Sequence[Optional[str]]] = None,
+                                materialize: bool = True, **patient_kwargs) -> Dict[str, Any]:
+    """
+    Column-wise renal function analysis.
+
+    Args:
+        columns: {test: array} with any of Creat, Ur and K+.
+        idade: One age for every row, or one per row (None where unknown).
+        sexo: One sex code for every row, or one per row ('M'/'F'/None).
+        materialize: Build the per-patient narrative for abnormal rows.
+        **patient_kwargs: Passed to ``analisar_funcao_renal`` for each
+            materialized row (e.g. etnia).
+
+    Returns:
+        dict: Batch result (see module docstring). ``derived`` holds 'bun'
+            (urea / 2.14), 'bun_creat_ratio' (flagged outside 10-20) and
+            'tfg' (CKD-EPI 2021, NaN without creatinine, age or sex; flagged
+            below 60). Rows with eGFR below 90
+            are narrated too, since the per-patient analyzer reports G2.
+    """
+    from utils.egfr import calcular_tfg_ckd_epi_array
+    from .renal import BUN_CRITICALITY, CREAT_CRITICALITY, analisar_funcao_renal
+
+    n_rows, values = as_columns(columns, RENAL_TESTS)
+    idade = _per_row("idade", idade, n_rows)
+    sexo = _per_row("sexo", sexo, n_rows)
+    ages = np.full(n_rows, np.nan) if idade is None else np.broadcast_to(
+        np.array([np.nan if age is None else age for age in np.atleast_1d(np.asarray(idade, dtype=object))],
+                 dtype=float), (n_rows,))
+    bun = values['Ur'] / 2.14
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bun_creat = np.where(values['Creat'] > 0, bun / values['Creat'], np.nan)
+    derived = {
+        "bun": bun,
+        "bun_creat_ratio": bun_creat,
+        "tfg": calcular_tfg_ckd_epi_array(values['Creat'], ages, sexo) if n_rows else np.full(0, np.nan),
+    }
+    flags = {test: range_flags(values[test], REFERENCE_RANGES.get(test)) for test in RENAL_TESTS}
+    flags['BUN/Creat'] = range_flags(bun_creat, (10, 20))
+    flags['TFG'] = range_flags(derived["tfg"], (60, None))
+    criticality = {
+        'Creat': CREAT_CRITICALITY.codes(values['Creat']),
+        'Ur': BUN_CRITICALITY.codes(derived["bun"]),
+    }
+    with np.errstate(invalid='ignore'):
+        reduced = derived["tfg"] < 90
+
+    def narrate(row: int) -> Dict[str, Any]:
+        row_kwargs = dict(patient_kwargs)
+        for name, value in (("idade", _at_row(idade, row)), ("sexo", _at_row(sexo, row))):
+            if value is not None:
+                row_kwargs[name] = value
+        return analisar_funcao_renal(_row_dict(values, RENAL_TESTS, row), **row_kwargs)
+
+    return _finalize(n_rows, flags, criticality, derived, narrate, materialize, values, reported=reduced)
+
+
+BLOOD_GAS_TESTS = ('pH', 'pCO2', 'pO2', 'HCO3-', 'BE', 'SpO2', 'FiO2', 'Lactato', 'Hb', 'Na+', 'K+', 'Cl-')
+
+
+def analisar_gasometria_batch(columns: Columns, materialize: bool = True) -> Dict[str, Any]:
+    """
+    Column-wise arterial blood gas analysis.
+
+    Args:
+        columns: {test: array} with pH and pCO2 plus any of pO2, HCO3-, BE,
+            SpO2, FiO2, Lactato, Hb, Na+, K+, Cl-.
+        materialize: Build the per-patient narrative for abnormal rows.
+
+    Returns:
+        dict: Batch result (see module docstring). ``derived`` holds
+            'pf_ratio' and 'anion_gap'.
+    """
+    from .blood_gases import _analisar_gasometria_cached
+
+    n_rows, values = as_columns(columns, BLOOD_GAS_TESTS)
+    derived = {
+        "pf_ratio": pf_ratio(values['pO2'], values['FiO2']),
+        "anion_gap": anion_gap(values['Na+'], values['Cl-'], values['HCO3-']),
+    }
+    flags = {test: range_flags(values[test], REFERENCE_RANGES.get(test)) for test in ('pH', 'pCO2', 'HCO3-', 'Lactato')}
+    flags['AnionGap'] = range_flags(derived["anion_gap"], REFERENCE_RANGES.get('AnionGap'))
+    flags['PF_Ratio'] = range_flags(derived["pf_ratio"], (300, None))
+    criticality = {
+        'pH': PH_CRITICALITY.codes(values['pH']),
+        'pCO2': PCO2_CRITICALITY.codes(values['pCO2']),
+        'PF_Ratio': PF_RATIO_CRITICALITY.codes(derived["pf_ratio"]),
+    }
+    # The per-patient analyzer needs both pH and pCO2
+    analysable = ~(np.isnan(values['pH']) | np.isnan(values['pCO2']))
+
+    def narrate(row: int) -> Dict[str, Any]:
+        if not analysable[row]:
+            return {}  # Same as analisar_gasometria without pH/pCO2
+        return _analisar_gasometria_cached(*(_row_value(values, test, row) for test in BLOOD_GAS_TESTS))
+
+    return _finalize(n_rows, flags, criticality, derived, narrate, materialize, values)
+
+
+HEPATIC_TESTS = ('TGO', 'TGP', 'GGT', 'FA', 'BT', 'BD', 'Albumina', 'RNI')
+
+# Canonical id -> the key analisar_funcao_hepatica and REFERENCE_RANGES use
+HEPATIC_KEYS = {'GGT': 'GamaGT', 'FA': 'FosfAlc'}
+
+
+def analisar_funcao_hepatica_batch(columns: Columns, materialize: bool = True) -> Dict[str, Any]:
+    """
+    Column-wise liver function analysis.
+
+    Args:
+        columns: {test: array} with any of TGO, TGP, GGT (GamaGT), FA
+            (FosfAlc), BT, BD, Albumina and RNI.
+        materialize: Build the per-patient narrative for abnormal rows.
+
+    Returns:
+        dict: Batch result (see module docstring). ``derived`` holds
+            'r_value' ((TGP / ULN) / (FA / ULN)); the per-patient analyzer
+            names an injury pattern for every row where it is computable, so
+            those rows are narrated too.
+    """
+    from .hepatic import BT_CRITICALITY, TGO_CRITICALITY, TGP_CRITICALITY, analisar_funcao_hepatica
+
+    n_rows, values = as_columns(columns, HEPATIC_TESTS, {key: test for test, key in HEPATIC_KEYS.items()})
+    flags = {
+        test: range_flags(values[test], REFERENCE_RANGES.get(HEPATIC_KEYS.get(test, test)))
+        for test in HEPATIC_TESTS
+    }
+    r_value = np.full(n_rows, np.nan)
+    if REFERENCE_RANGES.get('TGO') and REFERENCE_RANGES.get('TGP') and REFERENCE_RANGES.get('FosfAlc'):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            computable = (values['TGO'] > 0) & (values['TGP'] > 0) & (values['FA'] > 0)
+            r_value = np.where(
+                computable,
+                (values['TGP'] / REFERENCE_RANGES['TGP'][1]) / (values['FA'] / REFERENCE_RANGES['FosfAlc'][1]),
+                np.nan,
+            )
+    criticality = {
+        'TGO': TGO_CRITICALITY.codes(values['TGO']),
+        'TGP': TGP_CRITICALITY.codes(values['TGP']),
+        'BT': BT_CRITICALITY.codes(values['BT']),
+    }
+
+    def narrate(row: int) -> Dict[str, Any]:
+        return analisar_funcao_hepatica(_row_dict(values, HEPATIC_TESTS, row, HEPATIC_KEYS))
+
+    return _finalize(n_rows, flags, criticality, {"r_value": r_value}, narrate, materialize, values,
+                     reported=~np.isnan(r_value))
+
+
+COAGULATION_TESTS = ('RNI', 'TTPA', 'Fibrinogenio', 'DDimero', 'Plaq')
+
+# Canonical id -> the key analisar_coagulacao reads
+COAGULATION_KEYS = {'RNI': 'INR', 'Fibrinogenio': 'Fibrinogeno', 'DDimero': 'D-dimer', 'Plaq': 'Plaquetas'}
+
+# Canonical id -> the REFERENCE_RANGES entry analisar_coagulacao compares against
+COAGULATION_REFERENCES = {'Fibrinogenio': 'Fibrinogeno', 'DDimero': 'D-dimer'}
+
+
+def analisar_coagulacao_batch(columns: Columns, materialize: bool = True) -> Dict[str, Any]:
+    """
+    Column-wise coagulation analysis.
+
+    Args:
+        columns: {test: array} with any of RNI (INR), TTPA, Fibrinogenio
+            (Fibrinogeno), DDimero (D-dimer) and Plaq (Plaquetas).
+        materialize: Build the per-patient narrative for abnormal rows.
+
+    Returns:
+        dict: Batch result (see module docstring). Rows with a significant
+            code are narrated even inside the reference range, since the
+            per-patient analyzer marks them critical.
+    """
+    from .coagulation import (
+        D_DIMER_CRITICALITY, FIBRINOGENIO_CRITICALITY, INR_CRITICALITY, PLAQ_CRITICALITY,
+        TTPA_CRITICALITY, analisar_coagulacao,
+    )
+
+    n_rows, values = as_columns(columns, COAGULATION_TESTS, {'Fibrinogeno': 'Fibrinogenio'})
+    flags = {
+        test: range_flags(values[test], REFERENCE_RANGES.get(COAGULATION_REFERENCES.get(test, test)))
+        for test in COAGULATION_TESTS
+    }
+    compiled = {
+        'RNI': INR_CRITICALITY, 'TTPA': TTPA_CRITICALITY, 'Fibrinogenio': FIBRINOGENIO_CRITICALITY,
+        'DDimero': D_DIMER_CRITICALITY, 'Plaq': PLAQ_CRITICALITY,
+    }
+    criticality = {test: thresholds.codes(values[test]) for test, thresholds in compiled.items()}
+    significant = np.zeros(n_rows, dtype=bool)
+    for codes in criticality.values():
+        significant |= codes >= SIGNIFICANT
+
+    def narrate(row: int) -> Dict[str, Any]:
+        return analisar_coagulacao(_row_dict(values, COAGULATION_TESTS, row, COAGULATION_KEYS))
+
+    return _finalize(n_rows, flags, criticality, {}, narrate, materialize, values, reported=significant)
@@ -0,0 +1,221 @@
+"""
+Serial arterial blood gas (ABG) trend analysis.
+
+``analisar_gasometria`` interprets one ABG. Ventilated patients accumulate
+dozens of samples a day, and what matters clinically is the trajectory of the
+derived indices. ``analisar_gasometria_serie`` takes one patient's ABGs as
+columns (``{test: array}``, one element per sample, plus the collection
+times) and computes, vectorized over the whole series:
+
+- P/F ratio, anion gap (and albumin-corrected anion gap) and the delta ratio
+  (delta-delta), with the same formulas and reference limits as the
+  per-sample analyzer;
+- the change of each index versus the previous sample that has it, and the
+  P/F slope per hour;
+- lactate clearance versus the previous lactate.
+
+Trend events are derived from those arrays without calling the scalar
+analyzer: P/F falling below 200 and lactate clearance below 10% after an
+elevated lactate (the ">10% every 2 hours" resuscitation target).
+"""
+
+import logging
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from utils.reference_ranges import REFERENCE_RANGES
+from .batch import Columns, anion_gap, as_columns, pf_ratio
+
+logger = logging.getLogger(__name__)
+
+SERIES_TESTS = ('pH', 'pCO2', 'pO2', 'HCO3-', 'BE', 'SpO2', 'FiO2', 'Lactato', 'Na+', 'Cl-', 'K+', 'Albumina')
+
+PF_RATIO_EVENT_THRESHOLD = 200.0
+LACTATE_ELEVATED = 2.0        # mmol/L; clearance is only judged after an elevated lactate
+LACTATE_CLEARANCE_TARGET = 10.0  # %
+
+
+def _hours_since_start(timestamps: Any) -> np.ndarray:
+    """Collection times as float hours since the earliest sample (input order is kept)."""
+    arr = np.asarray(timestamps)
+    if arr.dtype.kind in 'fiu':
+        hours = arr.astype(float)
+    else:
+        seconds = arr.astype('datetime64[s]').astype(np.int64).astype(float)
+        hours = seconds / 3600.0
+    if hours.ndim != 1:
+        raise ValueError("timestamps must be one-dimensional")
+    return hours - hours.min() if len(hours) else hours
+
+
+def previous_valid_index(values: np.ndarray) -> np.ndarray:
+    """
+    Index of the closest earlier non-NaN element for each position (-1 if none).
+    """
+    n = len(values)
+    positions = np.where(np.isnan(values), -1, np.arange(n))
+    last_valid = np.maximum.accumulate(positions) if n else positions
+    previous = np.empty(n, dtype=np.int64)
+    if n:
+        previous[0] = -1
+        previous[1:] = last_valid[:-1]
+    return previous
+
+
+def change_from_previous(values: np.ndarray) -> np.ndarray:
+    """``values - previous non-NaN value``; NaN where either is missing."""
+    previous = previous_valid_index(values)
+    prior = np.where(previous >= 0, values[np.maximum(previous, 0)], np.nan)
+    return values - prior
+
+
+def corrected_anion_gap(ag: np.ndarray, albumina: np.ndarray) -> np.ndarray:
+    """Albumin-corrected anion gap AG + 2.5 * (4.0 - albumin); AG where albumin is missing."""
+    return np.where(np.isnan(albumina), ag, ag + 2.5 * (4.0 - albumina))
+
+
+def delta_ratio(ag: np.ndarray, hco3: np.ndarray) -> np.ndarray:
+    """
+    Delta ratio (delta AG / delta HCO3), as in the per-sample analyzer: only
+    defined when the anion gap is above its reference range and HCO3 differs
+    from the upper HCO3 limit.
+    """
+    ag_low, ag_high = REFERENCE_RANGES.get('AnionGap', (8, 16))
+    hco3_high = REFERENCE_RANGES.get('HCO3-', (22, 26))[1]
+    delta_ag = ag - (ag_low + ag_high) / 2
+    delta_hco3 = hco3_high - hco3
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = delta_ag / delta_hco3
+    return np.where((ag > ag_high) & (delta_hco3 != 0), ratio, np.nan)
+
+
+def lactate_clearance(lactate: np.ndarray) -> np.ndarray:
+    """Percent fall of lactate versus the previous lactate; NaN without a previous value."""
+    previous = previous_valid_index(lactate)
+    prior = np.where(previous >= 0, lactate[np.maximum(previous, 0)], np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(prior > 0, (prior - lactate) / prior * 100.0, np.nan)
+
+
+def pf_slope_per_hour(pf: np.ndarray, hours: np.ndarray) -> np.ndarray:
+    """P/F change per hour versus the previous sample with a P/F ratio."""
+    previous = previous_valid_index(pf)
+    safe = np.maximum(previous, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (pf - pf[safe]) / (hours - hours[safe])
+    return np.where((previous >= 0) & (hours > hours[safe]), slope, np.nan)
+
+
+def _events(code: str, mask: np.ndarray, values: np.ndarray, hours: np.ndarray,
+            timestamps: Optional[Sequence[Any]]) -> List[Dict[str, Any]]:
+    events = []
+    for i in np.flatnonzero(mask).tolist():
+        event = {"code": code, "index": i, "hours": float(hours[i]), "value": float(values[i])}
+        if timestamps is not None:
+            event["timestamp"] = timestamps[i]
+        events.append(event)
+    return events
+
+
+def analisar_gasometria_serie(timestamps: Sequence[Any], columns: Columns) -> Dict[str, Any]:
+    """
+    Vectorized trend analysis of one patient's serial ABGs.
+
+    Args:
+        timestamps: Collection time of each sample (datetimes, numpy
+            datetime64 or numeric hours). Samples are put in chronological
+            order if they are not already.
+        columns: {test: array} with any of pH, pCO2, pO2, HCO3-, BE, SpO2,
+            FiO2, Lactato, Na+, Cl-, K+ and Albumina (any spelling known to
+            ``analyzers.panel``); NaN/None marks a test missing from a sample.
+
+    Returns:
+        dict: {
+            "n_samples": int,
+            "order": int array mapping output rows to input rows,
+            "hours": float array, hours since the first sample,
+            "values": {test: float array},
+            "derived": {pf_ratio, anion_gap, anion_gap_corrigido, delta_ratio,
+                        pf_change, pf_slope_per_hour, lactate_clearance_pct},
+            "flags": {"pf_below_200": bool array, "pf_drop_below_200": bool array,
+                      "lactate_nonclearance": bool array},
+            "events": list of {"code", "index", "hours", "value"[, "timestamp"]},
+        }
+
+    Raises:
+        ValueError: If timestamps and columns have different lengths.
+    """
+    n_samples, values = as_columns(columns, SERIES_TESTS)
+    hours = _hours_since_start(timestamps)
+    if columns and len(hours) != n_samples:
+        raise ValueError(f"Got {len(hours)} timestamps for {n_samples} samples")
+    n_samples = len(hours)
+    if not columns:
+        values = {test: np.full(n_samples, np.nan) for test in SERIES_TESTS}
+
+    order = np.argsort(hours, kind='stable')
+    if np.any(order != np.arange(n_samples)):
+        hours = hours[order]
+        values = {test: arr[order] for test, arr in values.items()}
+        timestamps = [timestamps[i] for i in order.tolist()]
+
+    pf = pf_ratio(values['pO2'], values['FiO2'])
+    ag = anion_gap(values['Na+'], values['Cl-'], values['HCO3-'])
+    clearance = lactate_clearance(values['Lactato'])
+    derived = {
+        "pf_ratio": pf,
+        "anion_gap": ag,
+        "anion_gap_corrigido": corrected_anion_gap(ag, values['Albumina']),
+        "delta_ratio": delta_ratio(ag, values['HCO3-']),
+        "pf_change": change_from_previous(pf),
+        "pf_slope_per_hour": pf_slope_per_hour(pf, hours),
+        "lactate_clearance_pct": clearance,
+    }
+
+    pf_previous = previous_valid_index(pf)
+    lactate = values['Lactato']
+    lactate_previous = previous_valid_index(lactate)
+    with np.errstate(invalid='ignore'):
+        pf_below = pf < PF_RATIO_EVENT_THRESHOLD
+        pf_drop = pf_below & (pf_previous >= 0) & (pf[np.maximum(pf_previous, 0)] >= PF_RATIO_EVENT_THRESHOLD)
+        lactate_nonclearance = (
+            (lactate_previous >= 0)
+            & (lactate[np.maximum(lactate_previous, 0)] > LACTATE_ELEVATED)
+            & (clearance < LACTATE_CLEARANCE_TARGET)
+        )
+
+    # Numeric hours are already in ``hours``; only echo real timestamps back
+    ts = None if np.asarray(timestamps).dtype.kind in 'fiu' else list(timestamps)
+    events = (
+        _events("PF_BELOW_200", pf_drop, pf, hours, ts)
+        + _events("LACTATE_CLEARANCE_BELOW_10", lactate_nonclearance, clearance, hours, ts)
+    )
+    events.sort(key=lambda e: (e["index"], e["code"]))
+
+    return {
+        "n_samples": n_samples,
+        "order": order,
+        "hours": hours,
+        "values": values,
+        "derived": derived,
+        "flags": {
+            "pf_below_200": pf_below,
+            "pf_drop_below_200": pf_drop,
+            "lactate_nonclearance": lactate_nonclearance,
+        },
+        "events": events,
+    }
+
+
+def analisar_gasometrias_pacientes(series: Mapping[Any, Mapping[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+    """
+    ``analisar_gasometria_serie`` for several patients.
+
+    Args:
+        series: {patient_id: {"timestamps": [...], "columns": {test: array}}}
+    """
+    return {
+        patient_id: analisar_gasometria_serie(item["timestamps"], item["columns"])
+        for patient_id, item in series.items()
+    }
@@ -7,69 +7,11 @@ from typing import Dict, List, Optional, Any
 import logging
 
 from utils.reference_ranges import REFERENCE_RANGES
-from functools import lru_cache
+from .result_cache import analyzer_cache
+from .panel import normalize_panel
 
 logger = logging.getLogger(__name__)
 
-def _safe_convert_to_float(value_str: Optional[str]) -> Optional[float]:
-    if value_str is None:
-        return None
-    
-    cleaned_value_str = str(value_str).strip() # Ensure input is string
-
-    if ',' in cleaned_value_str:
-        cleaned_value_str = cleaned_value_str.replace('.', '').replace(',', '.')
-
-    try:
-        return float(cleaned_value_str)
-    except ValueError:
-        logger.warning(f"Could not convert '{value_str}' (cleaned: '{cleaned_value_str}') to float.")
-        if cleaned_value_str.startswith('<'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        if cleaned_value_str.startswith('>'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        return None
-
-def _get_criticality_level(param_name, value, thresholds):
-    """
-    Determine the criticality level of a parameter based on stratified thresholds.
-    
-    Args:
-        param_name: Name of the parameter
-        value: The value to evaluate
-        thresholds: Dictionary with 'critical', 'significant', and 'monitoring' thresholds
-        
-    Returns:
-        tuple: (criticality_level, description)
-    """
-    if value is None:
-        return ("UNKNOWN", f"{param_name} value is None")
-    
-    # Check critical thresholds
-    if 'critical' in thresholds:
-        for threshold in thresholds['critical']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-    
-    # Check significant thresholds
-    if 'significant' in thresholds:
-        for threshold in thresholds['significant']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-    
-    # Default to monitoring
-    return ("MONITORING", f"{param_name} MONITORING: {value} - Significant morbidity risk prompt")
-
 def analisar_gasometria(dados):
     """
     Analyze arterial blood gas values and provide diagnostic interpretation.
@@ -81,39 +23,23 @@ def analisar_gasometria(dados):
         dict: Dictionary containing detailed interpretation, abnormalities, critical status,
               recommendations, and specific blood gas parameters.
     """
-    raw_params_to_convert = {
-        'pH': dados.get('pH'),
-        'pCO2': dados.get('pCO2'),
-        'pO2': dados.get('pO2'),
-        'HCO3': dados.get('HCO3-'), # Note: key in dados is 'HCO3-'
-        'BE': dados.get('BE'),
-        'SpO2': dados.get('SpO2'),
-        'FiO2': dados.get('FiO2'),
-        'lactato': dados.get('Lactato'),
-        'Hb': dados.get('Hb'),
-        'Na': dados.get('Na+'), # Note: key in dados is 'Na+'
-        'K': dados.get('K+'),   # Note: key in dados is 'K+'
-        'Cl': dados.get('Cl-')  # Note: key in dados is 'Cl-'
+    panel = normalize_panel(dados)
+    params = {
+        'pH': panel.numeric('pH'),
+        'pCO2': panel.numeric('pCO2'),
+        'pO2': panel.numeric('pO2'),
+        'HCO3': panel.numeric('HCO3-'), # Note: key in dados is 'HCO3-'
+        'BE': panel.numeric('BE'),
+        'SpO2': panel.numeric('SpO2'),
+        'FiO2': panel.numeric('FiO2'),
+        'lactato': panel.numeric('Lactato'),
+        'Hb': panel.numeric('Hb'),
+        'Na': panel.numeric('Na+'), # Note: key in dados is 'Na+'
+        'K': panel.numeric('K+'),   # Note: key in dados is 'K+'
+        'Cl': panel.numeric('Cl-')  # Note: key in dados is 'Cl-'
     }
-    
-    params = {}
-    for key, raw_value in raw_params_to_convert.items():
-        if raw_value is not None:
-            if isinstance(raw_value, (int, float)):
-                # If already a number, use it directly
-                params[key] = float(raw_value)
-            else:
-                # Otherwise, try to convert from string using the safe function
-                value_str = str(raw_value)
-                converted_value = _safe_convert_to_float(value_str)
-                if converted_value is not None:
-                    params[key] = converted_value
-                else:
-                    logger.info(f"Could not convert value for {key}: '{raw_value}'. It will be ignored for analysis.")
 
-    if 'pH' in params and 'pCO2' in params:
-        _analisar_gasometria_cached.cache_clear() # Ensure cache is cleared if behavior implies it
-        
+    if params['pH'] is not None and params['pCO2'] is not None:
         return _analisar_gasometria_cached(
             params.get('pH'),
             params.get('pCO2'),
@@ -134,14 +60,14 @@ def analisar_gasometria(dados):
 
 def clear_cache():
     """Clear the analysis function cache. Useful for testing."""
-    _analisar_gasometria_cached.cache_clear()
+    analyzer_cache.clear("blood_gases")
 
-@lru_cache(maxsize=128)
+@analyzer_cache.memoize("blood_gases")
 def _analisar_gasometria_cached(ph, pco2, po2=None, hco3=None, be=None, spo2=None, fio2=None, 
                               lactato=None, hb=None, na=None, k=None, cl=None):
     """
     Cached version of blood gas analysis for improved performance.
-    All parameters must be immutable (numerical values) for the cache to work.
+    Results are stored in the shared analyzer cache keyed on the converted numeric inputs.
     
     Args:
         ph: Blood pH value
@@ -7,68 +7,32 @@ from typing import Any, Dict, List, Optional
 import logging
 
 from utils.reference_ranges import REFERENCE_RANGES
+from .result_cache import analyzer_cache
+from .criticality import CriticalityThresholds
+from .panel import normalize_panel
 
 logger = logging.getLogger(__name__)
 
-def _safe_convert_to_float(value_str: Optional[str]) -> Optional[float]:
-    if value_str is None:
-        return None
-    
-    cleaned_value_str = str(value_str).strip() # Ensure input is string
-
-    if ',' in cleaned_value_str:
-        cleaned_value_str = cleaned_value_str.replace('.', '').replace(',', '.')
+# Criticality thresholds, compiled once at import
+TROPONINA_CRITICALITY = CriticalityThresholds("Troponina", {
+    'critical': [1.0],
+    'significant': [(0.04, 1.0)],
+    'monitoring': [(0, 0.04)]
+})
 
-    try:
-        return float(cleaned_value_str)
-    except ValueError:
-        logger.warning(f"Could not convert '{value_str}' (cleaned: '{cleaned_value_str}') to float.")
-        if cleaned_value_str.startswith('<'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        if cleaned_value_str.startswith('>'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        return None
+NT_PRO_BNP_CRITICALITY = CriticalityThresholds("NT-proBNP", {
+    'critical': [5000],
+    'significant': [(1800, 5000)],
+    'monitoring': [(300, 1800)]
+})
 
-def _get_criticality_level(param_name, value, thresholds):
-    """
-    Determine the criticality level of a parameter based on stratified thresholds.
-    
-    Args:
-        param_name: Name of the parameter
-        value: The value to evaluate
-        thresholds: Dictionary with 'critical', 'significant', and 'monitoring' thresholds
-        
-    Returns:
-        tuple: (criticality_level, description)
-    """
-    if value is None:
-        return ("UNKNOWN", f"{param_name} value is None")
-    
-    # Check critical thresholds
-    if 'critical' in thresholds:
-        for threshold in thresholds['critical']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-    
-    # Check significant thresholds
-    if 'significant' in thresholds:
-        for threshold in thresholds['significant']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-    
-    # Default to monitoring
-    return ("MONITORING", f"{param_name} MONITORING: {value} - Significant morbidity risk prompt")
+BNP_CRITICALITY = CriticalityThresholds("BNP", {
+    'critical': [1000],
+    'significant': [(400, 1000)],
+    'monitoring': [(100, 400)]
+})
 
+@analyzer_cache.memoize("cardiac")
 def analisar_marcadores_cardiacos(dados, paciente_info: Optional[Dict] = None):
     """
     Analyze cardiac markers to assess for myocardial injury and heart failure.
@@ -89,26 +53,9 @@ def analisar_marcadores_cardiacos(dados, paciente_info: Optional[Dict] = None):
     is_critical_flag: bool = False
     details_dict: Dict[str, Any] = {}
 
-    # Process all numeric values using _safe_convert_to_float
-    processed_dados = {}
-    for key, value in dados.items():
-        details_dict[key] = value  # Store original value
-        if value is not None:
-            if isinstance(value, (int, float)):
-                processed_dados[key] = float(value)
-                details_dict[key] = float(value)
-            else:
-                value_str = str(value)
-                converted_value = _safe_convert_to_float(value_str)
-                if converted_value is not None:
-                    processed_dados[key] = converted_value
-                    details_dict[key] = converted_value
-                else:
-                    processed_dados[key] = None
-                    logger.info(f"Could not convert cardiac param {key}: '{value}'. It will be ignored.")
-        else:
-            processed_dados[key] = None
-            logger.info(f"Cardiac param {key} is None. It will be ignored.")
+    panel = normalize_panel(dados)
+    details_dict.update(panel.details_dict())
+    processed_dados = panel.numeric_dict()
 
     # Standardize input parameters and populate details_dict
     # Prioritize high-sensitivity troponin if available
@@ -159,11 +106,7 @@ def analisar_marcadores_cardiacos(dados, paciente_info: Optional[Dict] = None):
     if trop_val is not None and trop_key_used:
         details_dict[trop_key_used] = trop_val
         
-        trop_criticality, trop_description = _get_criticality_level("Troponina", trop_val, {
-            'critical': [1.0],
-            'significant': [(0.04, 1.0)],
-            'monitoring': [(0, 0.04)]
-        })
+        trop_criticality = TROPONINA_CRITICALITY.level(trop_val)
         # Note: criticality assessment integrated into detailed interpretation below
         if trop_criticality == "CRITICAL":
             is_critical_flag = True
@@ -311,11 +254,7 @@ def analisar_marcadores_cardiacos(dados, paciente_info: Optional[Dict] = None):
         details_dict['NTproBNP'] = nt_pro_bnp_val
         interpretations_list.append(f"NT-proBNP: {nt_pro_bnp_val} pg/mL.")
         
-        nt_pro_bnp_criticality, nt_pro_bnp_description = _get_criticality_level("NT-proBNP", nt_pro_bnp_val, {
-            'critical': [5000],
-            'significant': [(1800, 5000)],
-            'monitoring': [(300, 1800)]
-        })
+        nt_pro_bnp_criticality = NT_PRO_BNP_CRITICALITY.level(nt_pro_bnp_val)
         # Note: criticality assessment integrated into detailed interpretation below
         if nt_pro_bnp_criticality in ["CRITICAL", "SIGNIFICANT"]:
             is_critical_flag = True
@@ -368,11 +307,7 @@ def analisar_marcadores_cardiacos(dados, paciente_info: Optional[Dict] = None):
         details_dict['BNP'] = bnp_val
         interpretations_list.append(f"BNP: {bnp_val} pg/mL.")
 
-        bnp_criticality, bnp_description = _get_criticality_level("BNP", bnp_val, {
-            'critical': [1000],
-            'significant': [(400, 1000)],
-            'monitoring': [(100, 400)]
-        })
+        bnp_criticality = BNP_CRITICALITY.level(bnp_val)
         # Note: criticality assessment integrated into detailed interpretation below
         if bnp_criticality in ["CRITICAL", "SIGNIFICANT"]:
             is_critical_flag = True
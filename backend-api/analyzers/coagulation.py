@@ -6,68 +6,48 @@ from typing import Dict, Any, List, Optional
 import logging
 
 from utils.reference_ranges import REFERENCE_RANGES
+from .result_cache import analyzer_cache
+from .criticality import CriticalityThresholds
+from .panel import normalize_panel
 
 logger = logging.getLogger(__name__)
 
-def _safe_convert_to_float(value_str: Optional[str]) -> Optional[float]:
-    if value_str is None:
-        return None
-    
-    cleaned_value_str = str(value_str).strip() # Ensure input is string
+# Criticality thresholds, compiled once at import
+INR_CRITICALITY = CriticalityThresholds("INR", {
+    'critical': [5.0, float('inf')],
+    'significant': [(3.5, 5.0)],
+    'monitoring': [(1.2, 3.5)]
+})
 
-    if ',' in cleaned_value_str:
-        cleaned_value_str = cleaned_value_str.replace('.', '').replace(',', '.')
+# Values between the patient's reference limit and 'significant' fall through to MONITORING
+TTPA_CRITICALITY = CriticalityThresholds("TTPA", {
+    'critical': [70, float('inf')], # Assuming ref_high is around 40, 70 is severely prolonged
+    'significant': [(50, 70)] # Significantly prolonged
+})
 
-    try:
-        return float(cleaned_value_str)
-    except ValueError:
-        logger.warning(f"Could not convert '{value_str}' (cleaned: '{cleaned_value_str}') to float.")
-        if cleaned_value_str.startswith('<'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        if cleaned_value_str.startswith('>'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        return None
+_FIB_REF_LOW, _FIB_REF_HIGH = REFERENCE_RANGES.get('Fibrinogeno', (200, 400))
+FIBRINOGENIO_CRITICALITY = CriticalityThresholds("Fibrinogênio", {
+    'critical': [(-float('inf'), 50), (700, float('inf'))], # Severely low/high
+    'significant': [(50, _FIB_REF_LOW), (_FIB_REF_HIGH, 700)], # Low/High
+    'monitoring': [(100, _FIB_REF_LOW), (_FIB_REF_HIGH, 400)] # Monitoring low/high (some overlap with significant)
+})
 
-def _get_criticality_level(param_name, value, thresholds):
-    """
-    Determine the criticality level of a parameter based on stratified thresholds.
-    
-    Args:
-        param_name: Name of the parameter
-        value: The value to evaluate
-        thresholds: Dictionary with 'critical', 'significant', and 'monitoring' thresholds
-        
-    Returns:
-        tuple: (criticality_level, description)
-    """
-    if value is None:
-        return ("UNKNOWN", f"{param_name} value is None")
-    
-    # Check critical thresholds
-    if 'critical' in thresholds:
-        for threshold in thresholds['critical']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-    
-    # Check significant thresholds
-    if 'significant' in thresholds:
-        for threshold in thresholds['significant']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-    
-    # Default to monitoring
-    return ("MONITORING", f"{param_name} MONITORING: {value} - Significant morbidity risk prompt")
+# Note: D-dimer critical values are assay-dependent and should be interpreted locally
+_DD_REF_HIGH = REFERENCE_RANGES.get('D-dimer', (0, 500))[1]
+D_DIMER_CRITICALITY = CriticalityThresholds("D-dímero", {
+    'critical': [1000, float('inf')], # Severely elevated
+    'significant': [(_DD_REF_HIGH, 1000)], # Elevated
+    'monitoring': [(-float('inf'), _DD_REF_HIGH)] # Normal
+})
 
+_PLAQ_REF_LOW, _PLAQ_REF_HIGH = REFERENCE_RANGES.get('Plaq', (150000, 450000))
+PLAQ_CRITICALITY = CriticalityThresholds("Plaquetas", {
+    'critical': [(-float('inf'), 20000), (1000000, float('inf'))], # Severely low/high
+    'significant': [(20000, _PLAQ_REF_LOW), (_PLAQ_REF_HIGH, 1000000)], # Low/High
+    'monitoring': [(50000, _PLAQ_REF_LOW), (_PLAQ_REF_HIGH, 400000)] # Monitoring low/high (some overlap)
+})
+
+@analyzer_cache.memoize("coagulation")
 def analisar_coagulacao(data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
     """
     Analisa parâmetros de coagulação.
@@ -79,21 +59,22 @@ def analisar_coagulacao(data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
     processed_markers = False
     details = {}
 
+    panel = normalize_panel(data)
+
     # INR / RNI (Tempo de Protrombina)
     # Expected key: 'INR', 'RNI', or 'tempo de protrombina'
     inr_keys = ['INR', 'RNI', 'inr', 'rni', 'tempo de protrombina']
     inr_val_data = None
+    inr_key = None
     for key in inr_keys:
-        if key in data:
-            inr_val_data = data[key]
+        if key in panel:
+            inr_key = key
+            inr_val_data = panel.raw(key)
             break
 
     if inr_val_data is not None:
         processed_markers = True
-        if isinstance(inr_val_data, (int, float)):
-            inr_val = float(inr_val_data)
-        else:
-            inr_val = _safe_convert_to_float(str(inr_val_data))
+        inr_val = panel.numeric(inr_key)
         if inr_val is not None:
             # Store INR in details
             details['INR'] = inr_val
@@ -101,11 +82,7 @@ def analisar_coagulacao(data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
             
             # General reference for non-anticoagulated: 0.8-1.2. Therapeutic: 2.0-3.0 or higher.
             # Critical value thresholds based on evidence-based guidelines
-            inr_criticality, inr_description = _get_criticality_level("INR", inr_val, {
-                'critical': [5.0, float('inf')],
-                'significant': [(3.5, 5.0)],
-                'monitoring': [(1.2, 3.5)]
-            })
+            inr_criticality, inr_description = INR_CRITICALITY.classify(inr_val)
             interpretations.append(inr_description)
             if inr_criticality in ["CRITICAL", "SIGNIFICANT"]:
                 is_critical = True
@@ -134,31 +111,26 @@ def analisar_coagulacao(data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
     ttpa_keys = ['TTPA', 'tempo de tromboplastina parcial ativada', 'ttp', 'TTPA (Relação)', 'TTPA (Segundos)']
     ttpa_val_data = None
     ttpa_ratio_val_data = None
+    ttpa_key = None
     for key in ttpa_keys:
-        if key in data:
+        if key in panel:
+            ttpa_key = key
             if key == 'TTPA (Relação)':
-                ttpa_ratio_val_data = data[key]
+                ttpa_ratio_val_data = panel.raw(key)
             else:
-                ttpa_val_data = data[key]
+                ttpa_val_data = panel.raw(key)
             break
     
     if ttpa_val_data is not None:
         processed_markers = True
-        if isinstance(ttpa_val_data, (int, float)):
-            ttpa_val = float(ttpa_val_data)
-        else:
-            ttpa_val = _safe_convert_to_float(str(ttpa_val_data))
+        ttpa_val = panel.numeric(ttpa_key)
         if ttpa_val is not None:
             ttpa_ref_low, ttpa_ref_high = REFERENCE_RANGES.get('TTPA', (25, 40)) # Default from REFERENCE_RANGES
             details['TTPA_Segundos'] = ttpa_val
             details['TTPA_Ref'] = f"{ttpa_ref_low}-{ttpa_ref_high} Segundos"
 
             # Critical value thresholds based on evidence-based guidelines
-            ttpa_criticality, ttpa_description = _get_criticality_level("TTPA", ttpa_val, {
-                'critical': [70, float('inf')], # Assuming ref_high is around 40, 70 is severely prolonged
-                'significant': [(50, 70)], # Significantly prolonged
-                'monitoring': [(ttpa_ref_high, 50)] # Mildly prolonged, above normal
-            })
+            ttpa_criticality, ttpa_description = TTPA_CRITICALITY.classify(ttpa_val)
             interpretations.append(ttpa_description)
             if ttpa_criticality in ["CRITICAL", "SIGNIFICANT"]:
                 is_critical = True
@@ -191,28 +163,23 @@ def analisar_coagulacao(data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
     # Fibrinogen analysis
     fibrinogen_keys = ['Fibrinogeno', 'Fibrinogênio', 'Fib']
     fibrinogen_val_data = None
+    fibrinogen_key = None
     for key in fibrinogen_keys:
-        if key in data:
-            fibrinogen_val_data = data[key]
+        if key in panel:
+            fibrinogen_key = key
+            fibrinogen_val_data = panel.raw(key)
             break
     
     if fibrinogen_val_data is not None:
         processed_markers = True
-        if isinstance(fibrinogen_val_data, (int, float)):
-            fibrinogen_val = float(fibrinogen_val_data)
-        else:
-            fibrinogen_val = _safe_convert_to_float(str(fibrinogen_val_data))
+        fibrinogen_val = panel.numeric(fibrinogen_key)
         if fibrinogen_val is not None:
             fib_ref_low, fib_ref_high = REFERENCE_RANGES.get('Fibrinogeno', (200, 400))
             details['Fibrinogeno_mg_dL'] = fibrinogen_val
             details['Fibrinogeno_Ref'] = f"{fib_ref_low}-{fib_ref_high} mg/dL"
 
             # Critical value thresholds based on evidence-based guidelines
-            fib_criticality, fib_description = _get_criticality_level("Fibrinogênio", fibrinogen_val, {
-                'critical': [(-float('inf'), 50), (700, float('inf'))], # Severely low/high
-                'significant': [(50, fib_ref_low), (fib_ref_high, 700)], # Low/High
-                'monitoring': [(100, fib_ref_low), (fib_ref_high, 400)] # Monitoring low/high (some overlap with significant)
-            })
+            fib_criticality, fib_description = FIBRINOGENIO_CRITICALITY.classify(fibrinogen_val)
             interpretations.append(fib_description)
             if fib_criticality in ["CRITICAL", "SIGNIFICANT"]:
                 is_critical = True
@@ -244,17 +211,16 @@ def analisar_coagulacao(data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
     # D-Dimer analysis
     d_dimer_keys = ['D-dimer', 'D-dímero', 'Dimeros-D', 'DimerosD']
     d_dimer_val_data = None
+    d_dimer_key = None
     for key in d_dimer_keys:
-        if key in data:
-            d_dimer_val_data = data[key]
+        if key in panel:
+            d_dimer_key = key
+            d_dimer_val_data = panel.raw(key)
             break
     
     if d_dimer_val_data is not None:
         processed_markers = True
-        if isinstance(d_dimer_val_data, (int, float)):
-            d_dimer_val = float(d_dimer_val_data)
-        else:
-            d_dimer_val = _safe_convert_to_float(str(d_dimer_val_data))
+        d_dimer_val = panel.numeric(d_dimer_key)
         if d_dimer_val is not None:
             # Using the generic cutoff from REFERENCE_RANGES, but emphasizing it\'s assay-dependent.
             # Units are assumed ng/mL FEU as per REFERENCE_RANGES entry.
@@ -265,12 +231,7 @@ def analisar_coagulacao(data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
             interpretations.append("Interpretação do D-dímero é altamente dependente do ensaio, unidades (ex: ng/mL FEU, ng/mL DDU, mg/L FEU), e do valor de corte local. Ajuste por idade (idade x 10 ng/mL para >50 anos) pode ser aplicável para exclusão de TEV.")
             
             # Critical value thresholds based on evidence-based guidelines
-            # Note: D-dimer critical values are assay-dependent and should be interpreted locally
-            dd_criticality, dd_description = _get_criticality_level("D-dímero", d_dimer_val, {
-                'critical': [1000, float('inf')], # Severely elevated
-                'significant': [(dd_ref_high, 1000)], # Elevated
-                'monitoring': [(-float('inf'), dd_ref_high)] # Normal
-            })
+            dd_criticality, dd_description = D_DIMER_CRITICALITY.classify(d_dimer_val)
             interpretations.append(dd_description)
             if dd_criticality in ["CRITICAL", "SIGNIFICANT"]:
                 is_critical = True
@@ -294,28 +255,23 @@ def analisar_coagulacao(data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
     # Platelet count consideration (if available)
     platelet_keys = ['Plaquetas', 'PLT', 'Plaq']
     platelet_val_data = None
+    platelet_key = None
     for key in platelet_keys:
-        if key in data:
-            platelet_val_data = data[key]
+        if key in panel:
+            platelet_key = key
+            platelet_val_data = panel.raw(key)
             break
     
     if platelet_val_data is not None:
         # Not marking as processed_markers = True here, as it's an adjunctive interpretation
-        if isinstance(platelet_val_data, (int, float)):
-            platelet_val = float(platelet_val_data)
-        else:
-            platelet_val = _safe_convert_to_float(str(platelet_val_data))
+        platelet_val = panel.numeric(platelet_key)
         if platelet_val is not None:
             plaq_ref_low, plaq_ref_high = REFERENCE_RANGES.get('Plaq', (150000, 450000))
             details['Plaquetas_contagem'] = platelet_val
             details['Plaquetas_Ref'] = f"{plaq_ref_low}-{plaq_ref_high}/mm³"
 
             # Critical value thresholds based on evidence-based guidelines
-            plaq_criticality, plaq_description = _get_criticality_level("Plaquetas", platelet_val, {
-                'critical': [(-float('inf'), 20000), (1000000, float('inf'))], # Severely low/high
-                'significant': [(20000, plaq_ref_low), (plaq_ref_high, 1000000)], # Low/High
-                'monitoring': [(50000, plaq_ref_low), (plaq_ref_high, 400000)] # Monitoring low/high (some overlap)
-            })
+            plaq_criticality, plaq_description = PLAQ_CRITICALITY.classify(platelet_val)
             interpretations.append(plaq_description)
             if plaq_criticality in ["CRITICAL", "SIGNIFICANT"]:
                 is_critical = True
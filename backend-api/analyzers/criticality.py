@@ -0,0 +1,235 @@
+"""
+Compiled criticality thresholds for the analyzer modules.
+
+Analyzers declare stratified thresholds in the format historically used by
+``_get_criticality_level``::
+
+    {
+        'critical': [160, -120],                  # > 160 or < 120
+        'significant': [(150, 160), (120, 130)],  # closed ranges
+        'monitoring': [(130, 150)],               # informational only
+    }
+
+A positive number means "value above", a negative number means "value below
+its absolute value" and a tuple is an inclusive range. ``critical`` is checked
+before ``significant``; anything else is ``MONITORING``.
+
+``CriticalityThresholds`` compiles such a declaration once into a sorted array
+of boundary points, with a severity code for each boundary point and for each
+open interval between them. Classifying a value is then a single ``bisect``,
+and ``codes()`` classifies a whole NumPy array with ``searchsorted``. The
+human-readable description is only formatted when it is actually read.
+"""
+
+import functools
+import math
+from bisect import bisect_left
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Severity codes, ordered so that ``code >= SIGNIFICANT`` means "flag it".
+UNKNOWN = -1
+MONITORING = 0
+SIGNIFICANT = 1
+CRITICAL = 2
+
+LEVEL_NAMES: Dict[int, str] = {
+    UNKNOWN: "UNKNOWN",
+    MONITORING: "MONITORING",
+    SIGNIFICANT: "SIGNIFICANT",
+    CRITICAL: "CRITICAL",
+}
+
+_DESCRIPTION_TEMPLATES: Dict[int, str] = {
+    UNKNOWN: "{name} value is None",
+    MONITORING: "{name} MONITORING: {value} - Significant morbidity risk prompt",
+    SIGNIFICANT: "{name} SIGNIFICANT: {value} - Potentially life-threatening urgent",
+    CRITICAL: "{name} CRITICAL: {value} - Life-threatening immediate",
+}
+
+
+def _matches(items: Sequence[Any], value: float) -> bool:
+    """Reference semantics of one threshold list (used only at compile time)."""
+    for threshold in items:
+        if isinstance(threshold, tuple):
+            if threshold[0] <= value <= threshold[1]:
+                return True
+        elif isinstance(threshold, (int, float)):
+            if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
+                return True
+    return False
+
+
+def _reference_code(thresholds: Dict[str, Sequence[Any]], value: float) -> int:
+    if _matches(thresholds.get('critical', ()), value):
+        return CRITICAL
+    if _matches(thresholds.get('significant', ()), value):
+        return SIGNIFICANT
+    return MONITORING
+
+
+def _boundaries(thresholds: Dict[str, Sequence[Any]]) -> List[float]:
+    points = set()
+    for level in ('critical', 'significant'):
+        for threshold in thresholds.get(level, ()):
+            if isinstance(threshold, tuple):
+                points.update(float(bound) for bound in threshold)
+            elif isinstance(threshold, (int, float)) and threshold != 0:
+                points.add(float(abs(threshold)))
+    return sorted(p for p in points if not math.isnan(p))
+
+
+def _interval_representative(low: Optional[float], high: Optional[float]) -> float:
+    """A value strictly inside the open interval (low, high); None means unbounded."""
+    if low is None or low == -math.inf:
+        if high is None or high == math.inf:
+            return 0.0
+        return high - 1.0 if high != -math.inf else -math.inf
+    if high is None or high == math.inf:
+        return low + 1.0 if low != math.inf else math.inf
+    return low + (high - low) / 2.0
+
+
+class Criticality:
+    """
+    Result of classifying one value.
+
+    Unpacks like the old ``(level, description)`` tuple, but the description
+    string is only rendered on first access.
+    """
+
+    __slots__ = ('code', 'param_name', 'value', '_description')
+
+    def __init__(self, code: int, param_name: str, value: Any):
+        self.code = code
+        self.param_name = param_name
+        self.value = value
+        self._description: Optional[str] = None
+
+    @property
+    def level(self) -> str:
+        return LEVEL_NAMES[self.code]
+
+    @property
+    def description(self) -> str:
+        if self._description is None:
+            self._description = _DESCRIPTION_TEMPLATES[self.code].format(name=self.param_name, value=self.value)
+        return self._description
+
+    @property
+    def is_alert(self) -> bool:
+        """True for SIGNIFICANT and CRITICAL results."""
+        return self.code >= SIGNIFICANT
+
+    def __iter__(self) -> Iterator[str]:
+        yield self.level
+        yield self.description
+
+    def __repr__(self) -> str:
+        return f"Criticality({self.level!r}, {self.param_name!r}, {self.value!r})"
+
+
+class CriticalityThresholds:
+    """
+    Stratified thresholds for one parameter, compiled for fast classification.
+
+    Args:
+        param_name: Display name used in descriptions (e.g. "Na+").
+        thresholds: Declaration with 'critical', 'significant' and optional
+            (informational) 'monitoring' lists.
+    """
+
+    __slots__ = ('param_name', 'thresholds', '_bounds', '_point_codes', '_interval_codes', '_np_tables')
+
+    def __init__(self, param_name: str, thresholds: Dict[str, Sequence[Any]]):
+        self.param_name = param_name
+        self.thresholds = thresholds
+        bounds = _boundaries(thresholds)
+        self._bounds: Tuple[float, ...] = tuple(bounds)
+        self._point_codes: Tuple[int, ...] = tuple(_reference_code(thresholds, b) for b in bounds)
+        # Interval i lies between bounds[i - 1] and bounds[i] (unbounded at both ends)
+        edges: List[Optional[float]] = [None] + bounds + [None]
+        self._interval_codes: Tuple[int, ...] = tuple(
+            _reference_code(thresholds, _interval_representative(edges[i], edges[i + 1]))
+            for i in range(len(bounds) + 1)
+        )
+        self._np_tables = None
+
+    def code(self, value: Optional[float]) -> int:
+        """Severity code for a single value (``UNKNOWN`` for None)."""
+        if value is None:
+            return UNKNOWN
+        if value != value:  # NaN never satisfies a threshold
+            return MONITORING
+        i = bisect_left(self._bounds, value)
+        if i < len(self._bounds) and self._bounds[i] == value:
+            return self._point_codes[i]
+        return self._interval_codes[i]
+
+    def level(self, value: Optional[float]) -> str:
+        """Level name ("CRITICAL", "SIGNIFICANT", "MONITORING" or "UNKNOWN")."""
+        return LEVEL_NAMES[self.code(value)]
+
+    def classify(self, value: Optional[float]) -> Criticality:
+        """Classify a value, deferring the description text until it is read."""
+        return Criticality(self.code(value), self.param_name, value)
+
+    def codes(self, values: Any) -> Any:
+        """
+        Vectorised ``code()`` over an array of values.
+
+        Args:
+            values: Array-like of floats; NaN marks a missing value.
+
+        Returns:
+            numpy.ndarray: int8 severity codes, ``UNKNOWN`` where the input is NaN.
+        """
+        import numpy as np
+
+        if self._np_tables is None:
+            self._np_tables = (
+                np.asarray(self._bounds, dtype=float),
+                np.asarray(self._point_codes + (MONITORING,), dtype=np.int8),
+                np.asarray(self._interval_codes, dtype=np.int8),
+            )
+        bounds, point_codes, interval_codes = self._np_tables
+        arr = np.asarray(values, dtype=float)
+        idx = np.searchsorted(bounds, arr, side='left')
+        if len(bounds):
+            safe_idx = np.minimum(idx, len(bounds) - 1)
+            on_bound = (idx < len(bounds)) & (bounds[safe_idx] == arr)
+        else:
+            safe_idx = idx
+            on_bound = np.zeros(arr.shape, dtype=bool)
+        result = np.where(on_bound, point_codes[safe_idx], interval_codes[idx]).astype(np.int8)
+        result[np.isnan(arr)] = UNKNOWN
+        return result
+
+
+def _freeze(thresholds: Dict[str, Sequence[Any]]) -> Tuple[Any, ...]:
+    return tuple(sorted((level, tuple(items)) for level, items in thresholds.items()))
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_frozen(param_name: str, frozen: Tuple[Any, ...]) -> CriticalityThresholds:
+    return CriticalityThresholds(param_name, {level: list(items) for level, items in frozen})
+
+
+def compile_thresholds(param_name: str, thresholds: Dict[str, Sequence[Any]]) -> CriticalityThresholds:
+    """
+    Compile thresholds that depend on runtime data (e.g. reference ranges).
+
+    Compiled tables are memoised on the threshold values, so repeated calls
+    with the same reference range reuse the same ``CriticalityThresholds``.
+    """
+    return _compile_frozen(param_name, _freeze(thresholds))
+
+
+def get_criticality_level(param_name: str, value: Optional[float], thresholds: Dict[str, Sequence[Any]]) -> Tuple[str, str]:
+    """
+    Drop-in replacement for the per-module ``_get_criticality_level`` helpers.
+
+    Returns:
+        tuple: (criticality_level, description)
+    """
+    result = compile_thresholds(param_name, thresholds).classify(value)
+    return result.level, result.description
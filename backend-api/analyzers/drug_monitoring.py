@@ -6,57 +6,12 @@ from typing import Dict, List, Optional
 import logging
 
 from utils.reference_ranges import REFERENCE_RANGES
+from .result_cache import analyzer_cache
+from .panel import normalize_panel
 
 logger = logging.getLogger(__name__)
 
-def _safe_convert_to_float(value_str: Optional[str]) -> Optional[float]:
-    if value_str is None:
-        return None
-    
-    cleaned_value_str = str(value_str).strip()
-
-    if ',' in cleaned_value_str:
-        cleaned_value_str = cleaned_value_str.replace('.', '').replace(',', '.')
-
-    try:
-        return float(cleaned_value_str)
-    except ValueError:
-        logger.warning(f"Could not convert '{value_str}' (cleaned: '{cleaned_value_str}') to float.")
-        if cleaned_value_str.startswith('<'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        if cleaned_value_str.startswith('>'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        return None
-
-def _get_criticality_level(param_name, value, thresholds):
-    """
-    Determine the criticality level of a parameter based on stratified thresholds.
-    """
-    if value is None:
-        return ("UNKNOWN", f"{param_name} value is None")
-    
-    if 'critical' in thresholds:
-        for threshold in thresholds['critical']:
-            if isinstance(threshold, tuple):
-                if threshold[0] <= value <= threshold[1]:
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-            elif isinstance(threshold, (int, float)):
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-    
-    if 'significant' in thresholds:
-        for threshold in thresholds['significant']:
-            if isinstance(threshold, tuple):
-                if threshold[0] <= value <= threshold[1]:
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-            elif isinstance(threshold, (int, float)):
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-    
-    return ("MONITORING", f"{param_name} MONITORING: {value} - Significant morbidity risk prompt")
-
+@analyzer_cache.memoize("drug_monitoring")
 def analisar_monitoramento_medicamentos(dados: Dict[str, any], idade: Optional[int] = None, sexo: Optional[str] = None) -> Dict[str, any]:
     """
     Analyze therapeutic drug levels and provide clinical interpretation.
@@ -67,25 +22,9 @@ def analisar_monitoramento_medicamentos(dados: Dict[str, any], idade: Optional[i
     is_critical_flag: bool = False
     details_dict: Dict[str, any] = {}
 
-    processed_dados: Dict[str, Optional[float]] = {}
-    for key, value in dados.items():
-        details_dict[key] = value
-        if value is not None:
-            if isinstance(value, (int, float)):
-                processed_dados[key] = float(value)
-                details_dict[key] = float(value)
-            else:
-                value_str = str(value)
-                converted_value = _safe_convert_to_float(value_str)
-                if converted_value is not None:
-                    processed_dados[key] = converted_value
-                    details_dict[key] = converted_value
-                else:
-                    processed_dados[key] = None
-                    logger.info(f"Could not convert drug monitoring param {key}: '{value}'. It will be ignored.")
-        else:
-            processed_dados[key] = None
-            logger.info(f"Drug monitoring param {key} is None. It will be ignored.")
+    panel = normalize_panel(dados)
+    details_dict.update(panel.details_dict())
+    processed_dados: Dict[str, Optional[float]] = panel.numeric_dict()
 
     valid_keys = ['Digoxin', 'Phenytoin', 'Carbamazepine', 'ValproicAcid', 'Lithium', 'Gentamicin', 'Vancomycin', 'Theophylline']
     if not any(k in processed_dados and processed_dados[k] is not None for k in valid_keys):
@@ -7,72 +7,54 @@ from typing import Dict, List, Optional
 import logging
 
 from utils.reference_ranges import REFERENCE_RANGES
-from functools import lru_cache
+from .result_cache import analyzer_cache
+from .criticality import CriticalityThresholds
+from .panel import normalize_panel
 
 logger = logging.getLogger(__name__)
 
-def _safe_convert_to_float(value_str: Optional[str]) -> Optional[float]:
-    if value_str is None:
-        return None
-    
-    cleaned_value_str = value_str.strip()
+# Criticality thresholds, compiled once at import
+NA_CRITICALITY = CriticalityThresholds("Na+", {
+    'critical': [160, -120], # >160 or <120
+    'significant': [(150, 160), (120, 130)],  # 150-160 or 120-130
+    'monitoring': [(130, 150)]  # 130-150 (normal range)
+})
 
-    if ',' in cleaned_value_str:
-        cleaned_value_str = cleaned_value_str.replace('.', '').replace(',', '.')
-    # If only dots, float() should handle it assuming it's a valid US-style float.
-    # More complex cleaning for multiple dots without commas might be needed if encountered.
+K_CRITICALITY = CriticalityThresholds("K+", {
+    'critical': [6.5, -2.5], # >6.5 or <2.5
+    'significant': [(5.5, 6.5), (2.5, 3.0)],  # 5.5-6.5 or 2.5-3.0
+    'monitoring': [(3.0, 5.5)]  # 3.0-5.5 (normal range)
+})
 
-    try:
-        return float(cleaned_value_str)
-    except ValueError:
-        logger.warning(f"Could not convert '{value_str}' (cleaned: '{cleaned_value_str}') to float.")
-        # Attempt to extract number if common non-numeric characters are present
-        # This is a basic attempt, can be made more robust with regex for specific patterns
-        if cleaned_value_str.startswith('<'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        if cleaned_value_str.startswith('>'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        return None
+CL_CRITICALITY = CriticalityThresholds("Cl-", {
+    'critical': [115, -85], # >115 or <85
+    'significant': [(110, 115), (85, 95)],  # 110-115 or 85-95
+    'monitoring': [(95, 110)]  # 95-110 (normal range)
+})
 
-def _get_criticality_level(param_name, value, thresholds):
-    """
-    Determine the criticality level of a parameter based on stratified thresholds.
-    
-    Args:
-        param_name: Name of the parameter
-        value: The value to evaluate
-        thresholds: Dictionary with 'critical', 'significant', and 'monitoring' thresholds
-        
-    Returns:
-        tuple: (criticality_level, description)
-    """
-    if value is None:
-        return ("UNKNOWN", f"{param_name} value is None")
-    
-    # Check critical thresholds
-    if 'critical' in thresholds:
-        for threshold in thresholds['critical']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-    
-    # Check significant thresholds
-    if 'significant' in thresholds:
-        for threshold in thresholds['significant']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-    
-    # Default to monitoring
-    return ("MONITORING", f"{param_name} MONITORING: {value} - Significant morbidity risk prompt")
+CA_CRITICALITY = CriticalityThresholds("Ca+", {
+    'critical': [13.0, -7.0], # >13.0 or <7.0
+    'significant': [(12.0, 13.0), (7.0, 8.0)],  # 12.0-13.0 or 7.0-8.0
+    'monitoring': [(8.0, 12.0)]  # 8.0-12.0 (normal range)
+})
+
+ICA_CRITICALITY = CriticalityThresholds("iCa", {
+    'critical': [1.5, -0.8], # >1.5 or <0.8
+    'significant': [(1.4, 1.5), (0.8, 1.0)],  # 1.4-1.5 or 0.8-1.0
+    'monitoring': [(1.0, 1.4)]  # 1.0-1.4 (normal range)
+})
+
+MG_CRITICALITY = CriticalityThresholds("Mg+", {
+    'critical': [10.0, -1.0], # >10.0 or <1.0
+    'significant': [(7.0, 10.0), (1.0, 1.5)],  # 7.0-10.0 or 1.0-1.5
+    'monitoring': [(1.5, 7.0)]  # 1.5-7.0 (normal range)
+})
+
+FOSFORO_CRITICALITY = CriticalityThresholds("P", {
+    'critical': [7.0, -1.0], # >7.0 or <1.0
+    'significant': [(5.5, 7.0), (1.0, 2.0)],  # 5.5-7.0 or 1.0-2.0
+    'monitoring': [(2.0, 5.5)]  # 2.0-5.5 (normal range)
+})
 
 def analisar_eletrolitos(dados):
     """
@@ -85,59 +67,26 @@ def analisar_eletrolitos(dados):
         dict: Dictionary containing detailed interpretation, abnormalities, critical status,
               recommendations, and specific electrolyte parameters.
     """
-    params = {}
-    raw_params_to_convert = {}
+    panel = normalize_panel(dados)
+    converted_params = {}
+    for key in panel:
+        if not isinstance(key, str):
+            continue
+        std_key = key
+        if 'sod' in key.lower() or key.lower() in ['na+', 'na']: std_key = 'Na+'
+        elif 'pot' in key.lower() or key.lower() in ['k+', 'k']: std_key = 'K+'
+        elif 'clor' in key.lower() or key.lower() in ['cl-', 'cl']: std_key = 'Cl-'
+        elif 'calc' in key.lower() and 'ion' not in key.lower() and 'corr' not in key.lower(): std_key = 'Ca+'
+        elif key.lower() in ['ca', 'calcium']: std_key = 'Ca+'
+        elif ('ion' in key.lower() and 'calc' in key.lower()) or key.lower() == 'ica': std_key = 'iCa'
+        elif 'mag' in key.lower() or key.lower() in ['mg+', 'mg']: std_key = 'Mg+'
+        elif 'phos' in key.lower() or key.lower() == 'p' or key.lower() == 'fosf': std_key = 'P'
+        elif 'album' in key.lower(): std_key = 'Albumina'
+        converted_params[std_key] = panel.numeric(key)
 
-    if isinstance(dados, list):
-        for exam in dados:
-            if 'test' in exam and 'value' in exam:
-                test_name = exam['test']
-                value = exam['value']
-                if 'sod' in test_name.lower() or test_name.lower() == 'na+':
-                    raw_params_to_convert['Na+'] = value
-                elif 'pot' in test_name.lower() or test_name.lower() == 'k+':
-                    raw_params_to_convert['K+'] = value
-                elif 'clor' in test_name.lower() or test_name.lower() == 'cl-':
-                    raw_params_to_convert['Cl-'] = value
-                elif 'calc' in test_name.lower() and 'ion' not in test_name.lower() and 'corr' not in test_name.lower():
-                    raw_params_to_convert['Ca+'] = value
-                elif ('ion' in test_name.lower() and 'calc' in test_name.lower()) or test_name.lower() == 'ica':
-                    raw_params_to_convert['iCa'] = value
-                elif 'mag' in test_name.lower() or test_name.lower() == 'mg+':
-                    raw_params_to_convert['Mg+'] = value
-                elif 'phos' in test_name.lower() or test_name.lower() == 'p' or test_name.lower() == 'fosf':
-                    raw_params_to_convert['P'] = value
-                elif 'album' in test_name.lower():
-                    raw_params_to_convert['Albumina'] = value
-    else: # Assuming dados is a dictionary
-        for key, value in dados.items():
-            std_key = key
-            if 'sod' in key.lower() or key.lower() in ['na+', 'na']: std_key = 'Na+'
-            elif 'pot' in key.lower() or key.lower() in ['k+', 'k']: std_key = 'K+'
-            elif 'clor' in key.lower() or key.lower() in ['cl-', 'cl']: std_key = 'Cl-'
-            elif 'calc' in key.lower() and 'ion' not in key.lower() and 'corr' not in key.lower(): std_key = 'Ca+'
-            elif key.lower() in ['ca', 'calcium']: std_key = 'Ca+'
-            elif ('ion' in key.lower() and 'calc' in key.lower()) or key.lower() == 'ica': std_key = 'iCa'
-            elif 'mag' in key.lower() or key.lower() in ['mg+', 'mg']: std_key = 'Mg+'
-            elif 'phos' in key.lower() or key.lower() == 'p' or key.lower() == 'fosf': std_key = 'P'
-            elif 'album' in key.lower(): std_key = 'Albumina'
-            raw_params_to_convert[std_key] = value
+    # Values the normalizer could not parse are ignored for analysis
+    params = {key: value for key, value in converted_params.items() if value is not None}
 
-    # Convert values using _safe_convert_to_float
-    for key, raw_value in raw_params_to_convert.items():
-        if raw_value is not None:
-            if isinstance(raw_value, (int, float)):
-                # If already a number, use it directly
-                params[key] = float(raw_value)
-            else:
-                # Otherwise, try to convert from string using the safe function
-                value_str = str(raw_value)
-                converted_value = _safe_convert_to_float(value_str)
-                if converted_value is not None:
-                    params[key] = converted_value
-                else:
-                    logger.info(f"Could not convert value for {key}: '{raw_value}'. It will be ignored for analysis.")
-    
     return _analisar_eletrolitos_cached(
         params.get('Na+'),
         params.get('K+'),
@@ -149,11 +98,11 @@ def analisar_eletrolitos(dados):
         params.get('Albumina')
     )
 
-@lru_cache(maxsize=128)
+@analyzer_cache.memoize("electrolytes")
 def _analisar_eletrolitos_cached(na=None, k=None, cl=None, ca=None, ica=None, mg=None, p=None, alb=None):
     """
     Cached version of electrolyte analysis for improved performance.
-    All parameters must be immutable (numerical values) for the cache to work.
+    Results are stored in the shared analyzer cache keyed on the converted numeric inputs.
     
     Args:
         na: Sodium value in mmol/L (optional)
@@ -188,11 +137,7 @@ def _analisar_eletrolitos_cached(na=None, k=None, cl=None, ca=None, ica=None, mg
         val_str = f" ({na} mmol/L)"
         
         # Determine criticality level for sodium (integrated into main interpretation)
-        na_criticality, na_description = _get_criticality_level("Na+", na, {
-            'critical': [160, -120], # >160 or <120
-            'significant': [(150, 160), (120, 130)],  # 150-160 or 120-130
-            'monitoring': [(130, 150)]  # 130-150 (normal range)
-        })
+        na_criticality = NA_CRITICALITY.level(na)
         
         if na < na_min_ref:
             severity = "Leve"
@@ -242,11 +187,7 @@ def _analisar_eletrolitos_cached(na=None, k=None, cl=None, ca=None, ica=None, mg
         val_str = f" ({k} mmol/L)"
         
         # Determine criticality level for potassium (integrated into main interpretation)
-        k_criticality, k_description = _get_criticality_level("K+", k, {
-            'critical': [6.5, -2.5], # >6.5 or <2.5
-            'significant': [(5.5, 6.5), (2.5, 3.0)],  # 5.5-6.5 or 2.5-3.0
-            'monitoring': [(3.0, 5.5)]  # 3.0-5.5 (normal range)
-        })
+        k_criticality = K_CRITICALITY.level(k)
         
         if k < k_min_ref:
             severity = "Leve"
@@ -297,11 +238,7 @@ def _analisar_eletrolitos_cached(na=None, k=None, cl=None, ca=None, ica=None, mg
         val_str = f" ({cl} mmol/L)"
         
         # Determine criticality level for chloride (integrated into main interpretation)
-        cl_criticality, cl_description = _get_criticality_level("Cl-", cl, {
-            'critical': [115, -85], # >115 or <85
-            'significant': [(110, 115), (85, 95)],  # 110-115 or 85-95
-            'monitoring': [(95, 110)]  # 95-110 (normal range)
-        })
+        cl_criticality = CL_CRITICALITY.level(cl)
         
         if cl < cl_min_ref:
             msg = f"Hipocloremia{val_str}"
@@ -365,11 +302,7 @@ def _analisar_eletrolitos_cached(na=None, k=None, cl=None, ca=None, ica=None, mg
         ref_label = "(corrigido)" if ca_corrigido is not None else "(total)"
         
         # Determine criticality level for calcium (integrated into main interpretation)
-        ca_criticality, ca_description = _get_criticality_level("Ca+", ca_a_interpretar, {
-            'critical': [13.0, -7.0], # >13.0 or <7.0
-            'significant': [(12.0, 13.0), (7.0, 8.0)],  # 12.0-13.0 or 7.0-8.0
-            'monitoring': [(8.0, 12.0)]  # 8.0-12.0 (normal range)
-        })
+        ca_criticality = CA_CRITICALITY.level(ca_a_interpretar)
 
         if ca_a_interpretar < ca_min_ref:
             severity = "Leve"
@@ -421,11 +354,7 @@ def _analisar_eletrolitos_cached(na=None, k=None, cl=None, ca=None, ica=None, mg
         val_str = f" ({ica} mmol/L)"
         
         # Determine criticality level for ionized calcium (integrated into main interpretation)
-        ica_criticality, ica_description = _get_criticality_level("iCa", ica, {
-            'critical': [1.5, -0.8], # >1.5 or <0.8
-            'significant': [(1.4, 1.5), (0.8, 1.0)],  # 1.4-1.5 or 0.8-1.0
-            'monitoring': [(1.0, 1.4)]  # 1.0-1.4 (normal range)
-        })
+        ica_criticality = ICA_CRITICALITY.level(ica)
         
         if ica < ica_min_ref:
             severity = "Leve"
@@ -474,11 +403,7 @@ def _analisar_eletrolitos_cached(na=None, k=None, cl=None, ca=None, ica=None, mg
         val_str = f" ({mg} mg/dL)"
         
         # Determine criticality level for magnesium (integrated into main interpretation)
-        mg_criticality, mg_description = _get_criticality_level("Mg+", mg, {
-            'critical': [10.0, -1.0], # >10.0 or <1.0
-            'significant': [(7.0, 10.0), (1.0, 1.5)],  # 7.0-10.0 or 1.0-1.5
-            'monitoring': [(1.5, 7.0)]  # 1.5-7.0 (normal range)
-        })
+        mg_criticality = MG_CRITICALITY.level(mg)
         
         if mg < mg_min_ref: # Using reference range now
             severity = "Leve"
@@ -526,11 +451,7 @@ def _analisar_eletrolitos_cached(na=None, k=None, cl=None, ca=None, ica=None, mg
         val_str = f" ({p} mg/dL)"
         
         # Determine criticality level for phosphorus (integrated into main interpretation)
-        p_criticality, p_description = _get_criticality_level("P", p, {
-            'critical': [7.0, -1.0], # >7.0 or <1.0
-            'significant': [(5.5, 7.0), (1.0, 2.0)],  # 5.5-7.0 or 1.0-2.0
-            'monitoring': [(2.0, 5.5)]  # 2.0-5.5 (normal range)
-        })
+        p_criticality = FOSFORO_CRITICALITY.level(p)
         
         if p < p_min_ref:
             severity = "Leve"
@@ -0,0 +1,410 @@
+"""
+Structured analyzer findings with deferred Portuguese rendering.
+
+The per-patient analyzers format a full Portuguese narrative on every call,
+although alert generation, score gathering and the batch sweeps only look at
+``is_critical`` and at which parameters are out of range. ``extract_findings``
+produces that information directly as compact ``Finding`` records::
+
+    Finding(code='HYPERKALEMIA', parameter='K+', value=7.2, severity=CRITICAL)
+
+``severity`` uses the codes from ``analyzers.criticality`` (MONITORING for an
+out-of-range value below the significant threshold). The Portuguese text of a
+finding is rendered only when ``Finding.text`` is read, from a template that
+is compiled once per (code, severity) pair, so API responses can send the
+structured payload and let the client ask for the narrative separately.
+
+``AnalyzerRegistry.run`` attaches the findings of each analyzer's inputs to
+its merged result, ``IncrementalAnalyzer`` diffs them between updates and
+``crud_lab_result`` turns the difference into alerts.
+"""
+
+import functools
+import importlib
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .criticality import CRITICAL, LEVEL_NAMES, MONITORING, SIGNIFICANT
+from .panel import normalize_panel
+
+logger = logging.getLogger(__name__)
+
+LOW = -1
+HIGH = 1
+
+# test id -> (code when low, code when high, unit, criticality thresholds as "module:NAME").
+# A None code means that direction is not reported for the test.
+FINDING_SPECS: Dict[str, Tuple[Optional[str], Optional[str], str, Optional[str]]] = {
+    # Electrolytes
+    'Na+': ('HYPONATREMIA', 'HYPERNATREMIA', 'mmol/L', 'electrolytes:NA_CRITICALITY'),
+    'K+': ('HYPOKALEMIA', 'HYPERKALEMIA', 'mmol/L', 'electrolytes:K_CRITICALITY'),
+    'Cl-': ('HYPOCHLOREMIA', 'HYPERCHLOREMIA', 'mmol/L', 'electrolytes:CL_CRITICALITY'),
+    'Ca+': ('HYPOCALCEMIA', 'HYPERCALCEMIA', 'mg/dL', 'electrolytes:CA_CRITICALITY'),
+    'iCa': ('IONIZED_HYPOCALCEMIA', 'IONIZED_HYPERCALCEMIA', 'mmol/L', 'electrolytes:ICA_CRITICALITY'),
+    'Mg+': ('HYPOMAGNESEMIA', 'HYPERMAGNESEMIA', 'mg/dL', 'electrolytes:MG_CRITICALITY'),
+    'P': ('HYPOPHOSPHATEMIA', 'HYPERPHOSPHATEMIA', 'mg/dL', 'electrolytes:FOSFORO_CRITICALITY'),
+    # Hematology
+    'Hb': ('ANEMIA', 'HB_HIGH', 'g/dL', 'hematology:HB_CRITICALITY'),
+    'Leuco': ('LEUKOPENIA', 'LEUKOCYTOSIS', '/mm³', 'hematology:LEUCO_CRITICALITY'),
+    'Plaq': ('THROMBOCYTOPENIA', 'THROMBOCYTOSIS', '/mm³', 'hematology:PLAQ_CRITICALITY'),
+    'VCM': ('MICROCYTOSIS', 'MACROCYTOSIS', 'fL', 'hematology:VCM_CRITICALITY'),
+    'HCM': ('HCM_LOW', 'HCM_HIGH', 'pg', 'hematology:HCM_CRITICALITY'),
+    'CHCM': ('CHCM_LOW', 'CHCM_HIGH', 'g/dL', 'hematology:CHCM_CRITICALITY'),
+    'RDW': (None, 'ANISOCYTOSIS', '%', 'hematology:RDW_CRITICALITY'),
+    'Retic': ('RETIC_LOW', 'RETIC_HIGH', '%', 'hematology:RETIC_CRITICALITY'),
+    # Blood gases
+    'pH': ('ACIDEMIA', 'ALKALEMIA', '', 'batch:PH_CRITICALITY'),
+    'pCO2': ('HYPOCAPNIA', 'HYPERCAPNIA', 'mmHg', 'batch:PCO2_CRITICALITY'),
+    'pO2': ('HYPOXEMIA', None, 'mmHg', None),
+    'HCO3-': ('HCO3_LOW', 'HCO3_HIGH', 'mmol/L', None),
+    'Lactato': (None, 'HYPERLACTATEMIA', 'mmol/L', None),
+    # Renal
+    'Creat': (None, 'CREAT_HIGH', 'mg/dL', 'renal:CREAT_CRITICALITY'),
+    'Ur': (None, 'UREA_HIGH', 'mg/dL', None),
+    # Hepatic
+    'TGO': (None, 'AST_HIGH', 'U/L', 'hepatic:TGO_CRITICALITY'),
+    'TGP': (None, 'ALT_HIGH', 'U/L', 'hepatic:TGP_CRITICALITY'),
+    'BT': (None, 'HYPERBILIRUBINEMIA', 'mg/dL', 'hepatic:BT_CRITICALITY'),
+    # Coagulation
+    'RNI': (None, 'INR_HIGH', '', 'coagulation:INR_CRITICALITY'),
+    'TTPA': (None, 'APTT_HIGH', 's', 'coagulation:TTPA_CRITICALITY'),
+    # Inflammatory
+    'PCR': (None, 'CRP_HIGH', 'mg/dL', 'inflammatory:PCR_CRITICALITY'),
+    'Procalcitonina': (None, 'PCT_HIGH', 'ng/mL', 'inflammatory:PCT_CRITICALITY'),
+    # Metabolic / thyroid
+    'Glicose': ('HYPOGLYCEMIA', 'HYPERGLYCEMIA', 'mg/dL', 'metabolic:GLICOSE_JEJUM_CRITICALITY'),
+    'HbA1c': (None, 'HBA1C_HIGH', '%', 'metabolic:HBA1C_CRITICALITY'),
+    'TSH': ('TSH_LOW', 'TSH_HIGH', 'µUI/mL', 'metabolic:TSH_CRITICALITY'),
+    # Cardiac
+    'TropoI': (None, 'TROPONIN_HIGH', 'ng/mL', 'cardiac:TROPONINA_CRITICALITY'),
+    'TropoT': (None, 'TROPONIN_HIGH', 'ng/mL', 'cardiac:TROPONINA_CRITICALITY'),
+    'BNP': (None, 'BNP_HIGH', 'pg/mL', 'cardiac:BNP_CRITICALITY'),
+    'NTproBNP': (None, 'NTPROBNP_HIGH', 'pg/mL', 'cardiac:NT_PRO_BNP_CRITICALITY'),
+}
+
+# Cut-offs beyond which the per-patient analyzers set ``is_critical``, as (low, high):
+# a value strictly below low or above high is CRITICAL even where the
+# *_CRITICALITY table only rates it SIGNIFICANT (e.g. Hb 5-7 g/dL).
+ANALYZER_CRITICAL_LIMITS: Dict[str, Tuple[Optional[float], Optional[float]]] = {
+    'Na+': (125.0, 160.0),
+    'K+': (2.5, 6.5),
+    'Ca+': (7.0, 13.0),
+    'iCa': (0.8, 1.5),
+    'Mg+': (1.0, 4.0),
+    'Hb': (7.0, None),
+    'Leuco': (1000.0, 30000.0),
+    'Plaq': (20000.0, 1000000.0),
+    'pH': (7.20, 7.60),
+    'pCO2': (20.0, 80.0),
+    'pO2': (60.0, None),
+}
+
+# Tests whose analyzer already sets ``is_critical`` at the SIGNIFICANT level
+SIGNIFICANT_IS_CRITICAL = frozenset({'RNI', 'TTPA', 'BNP', 'NTproBNP'})
+
+# Portuguese label of each finding code
+FINDING_LABELS_PT: Dict[str, str] = {
+    'HYPONATREMIA': "Hiponatremia", 'HYPERNATREMIA': "Hipernatremia",
+    'HYPOKALEMIA': "Hipocalemia", 'HYPERKALEMIA': "Hipercalemia",
+    'HYPOCHLOREMIA': "Hipocloremia", 'HYPERCHLOREMIA': "Hipercloremia",
+    'HYPOCALCEMIA': "Hipocalcemia", 'HYPERCALCEMIA': "Hipercalcemia",
+    'IONIZED_HYPOCALCEMIA': "Hipocalcemia iônica", 'IONIZED_HYPERCALCEMIA': "Hipercalcemia iônica",
+    'HYPOMAGNESEMIA': "Hipomagnesemia", 'HYPERMAGNESEMIA': "Hipermagnesemia",
+    'HYPOPHOSPHATEMIA': "Hipofosfatemia", 'HYPERPHOSPHATEMIA': "Hiperfosfatemia",
+    'ANEMIA': "Anemia", 'HB_HIGH': "Hemoglobina elevada",
+    'LEUKOPENIA': "Leucopenia", 'LEUKOCYTOSIS': "Leucocitose",
+    'THROMBOCYTOPENIA': "Plaquetopenia", 'THROMBOCYTOSIS': "Trombocitose",
+    'MICROCYTOSIS': "Microcitose", 'MACROCYTOSIS': "Macrocitose",
+    'HCM_LOW': "Hipocromia (HCM baixo)", 'HCM_HIGH': "HCM elevado",
+    'CHCM_LOW': "Hipocromia (CHCM baixo)", 'CHCM_HIGH': "CHCM elevado",
+    'ANISOCYTOSIS': "Anisocitose (RDW elevado)",
+    'RETIC_LOW': "Reticulocitopenia", 'RETIC_HIGH': "Reticulocitose",
+    'ACIDEMIA': "Acidemia", 'ALKALEMIA': "Alcalemia",
+    'HYPOCAPNIA': "Hipocapnia", 'HYPERCAPNIA': "Hipercapnia",
+    'HYPOXEMIA': "Hipoxemia",
+    'HCO3_LOW': "Bicarbonato baixo", 'HCO3_HIGH': "Bicarbonato elevado",
+    'HYPERLACTATEMIA': "Hiperlactatemia",
+    'CREAT_HIGH': "Creatinina elevada", 'UREA_HIGH': "Ureia elevada",
+    'AST_HIGH': "TGO/AST elevada", 'ALT_HIGH': "TGP/ALT elevada",
+    'HYPERBILIRUBINEMIA': "Hiperbilirrubinemia",
+    'INR_HIGH': "RNI alargado", 'APTT_HIGH': "TTPA prolongado",
+    'CRP_HIGH': "PCR elevada", 'PCT_HIGH': "Procalcitonina elevada",
+    'HYPOGLYCEMIA': "Hipoglicemia", 'HYPERGLYCEMIA': "Hiperglicemia",
+    'HBA1C_HIGH': "HbA1c elevada",
+    'TSH_LOW': "TSH suprimido", 'TSH_HIGH': "TSH elevado",
+    'TROPONIN_HIGH': "Troponina elevada", 'BNP_HIGH': "BNP elevado", 'NTPROBNP_HIGH': "NT-proBNP elevado",
+}
+
+# Alert severity (``Alert.severity``) of each criticality code
+FINDING_ALERT_SEVERITIES: Dict[int, str] = {
+    MONITORING: "warning",
+    SIGNIFICANT: "high",
+    CRITICAL: "critical",
+}
+
+SEVERITY_SUFFIXES_PT: Dict[int, str] = {
+    MONITORING: "",
+    SIGNIFICANT: " - alteração significativa",
+    CRITICAL: " - valor crítico",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled_template(code: str, unit: str, severity: int) -> str:
+    """Format string for one (code, unit, severity), with every static part baked in."""
+    label = FINDING_LABELS_PT.get(code, code).replace('{', '{{').replace('}', '}}')
+    unit_part = f" {unit}" if unit else ""
+    return f"{label} ({{value:g}}{unit_part}){SEVERITY_SUFFIXES_PT.get(severity, '')}"
+
+
+@functools.lru_cache(maxsize=None)
+def _criticality(path: Optional[str]):
+    """Compiled thresholds referenced by a spec, imported on first use."""
+    if path is None:
+        return None
+    module_name, _, attr = path.partition(':')
+    return getattr(importlib.import_module(f"{__package__}.{module_name}"), attr)
+
+
+def analyzer_severity(test: str, value: float, severity: int) -> int:
+    """
+    Raise a *_CRITICALITY code to CRITICAL where the per-patient analyzer flags the value as critical.
+
+    Keeps ``Finding.is_critical`` (and so the alert severity) in line with the
+    ``is_critical`` of the narrative analyzers, whose cut-offs are listed in
+    ``ANALYZER_CRITICAL_LIMITS`` and ``SIGNIFICANT_IS_CRITICAL``.
+    """
+    if severity >= CRITICAL:
+        return severity
+    if severity == SIGNIFICANT and test in SIGNIFICANT_IS_CRITICAL:
+        return CRITICAL
+    limits = ANALYZER_CRITICAL_LIMITS.get(test)
+    if limits is not None:
+        low, high = limits
+        if (low is not None and value < low) or (high is not None and value > high):
+            return CRITICAL
+    return severity
+
+
+class Finding:
+    """
+    One out-of-range or critical result.
+
+    Attributes:
+        code: Stable identifier of the abnormality (e.g. 'HYPERKALEMIA').
+        parameter: Canonical test id (e.g. 'K+').
+        value: Numeric result.
+        severity: ``analyzers.criticality`` code (MONITORING, SIGNIFICANT, CRITICAL).
+    """
+
+    __slots__ = ('code', 'parameter', 'value', 'severity', '_text')
+
+    def __init__(self, code: str, parameter: str, value: float, severity: int = MONITORING):
+        self.code = code
+        self.parameter = parameter
+        self.value = value
+        self.severity = severity
+        self._text: Optional[str] = None
+
+    @property
+    def level(self) -> str:
+        return LEVEL_NAMES[self.severity]
+
+    @property
+    def is_critical(self) -> bool:
+        return self.severity == CRITICAL
+
+    @property
+    def key(self) -> Tuple[str, str, int]:
+        """Identity of the finding across updates: the value may change, the finding stays the same."""
+        return self.code, self.parameter, self.severity
+
+    @property
+    def alert_severity(self) -> str:
+        return FINDING_ALERT_SEVERITIES.get(self.severity, "warning")
+
+    @property
+    def text(self) -> str:
+        """Portuguese description, rendered on first access."""
+        if self._text is None:
+            unit = FINDING_SPECS[self.parameter][2] if self.parameter in FINDING_SPECS else ""
+            self._text = _compiled_template(self.code, unit, self.severity).format(value=self.value)
+        return self._text
+
+    def as_dict(self, narrative: bool = False) -> Dict[str, Any]:
+        data = {"code": self.code, "parameter": self.parameter, "value": self.value, "severity": self.severity}
+        if narrative:
+            data["text"] = self.text
+        return data
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Finding):
+            return NotImplemented
+        return (self.code, self.parameter, self.value, self.severity) == (other.code, other.parameter, other.value, other.severity)
+
+    def __hash__(self) -> int:
+        return hash((self.code, self.parameter, self.value, self.severity))
+
+    def __repr__(self) -> str:
+        return f"Finding({self.code!r}, {self.parameter!r}, {self.value!r}, {self.level})"
+
+
+class FindingSet:
+    """Findings of one panel, ordered from most to least severe."""
+
+    __slots__ = ('findings',)
+
+    def __init__(self, findings: Sequence[Finding] = ()):
+        self.findings: List[Finding] = sorted(findings, key=lambda f: -f.severity)
+
+    def __iter__(self) -> Iterator[Finding]:
+        return iter(self.findings)
+
+    def __len__(self) -> int:
+        return len(self.findings)
+
+    def __bool__(self) -> bool:
+        return bool(self.findings)
+
+    @property
+    def is_critical(self) -> bool:
+        return any(f.severity == CRITICAL for f in self.findings)
+
+    @property
+    def codes(self) -> List[str]:
+        return [f.code for f in self.findings]
+
+    def abnormalities(self) -> List[str]:
+        """Rendered Portuguese text of every finding."""
+        return [f.text for f in self.findings]
+
+    def to_payload(self, narrative: bool = False) -> Dict[str, Any]:
+        """
+        JSON-ready representation.
+
+        Args:
+            narrative: Also include the rendered text (per finding and as an
+                ``abnormalities`` list). Off by default to keep payloads small.
+        """
+        payload: Dict[str, Any] = {
+            "is_critical": self.is_critical,
+            "findings": [f.as_dict(narrative) for f in self.findings],
+        }
+        if narrative:
+            payload["abnormalities"] = self.abnormalities()
+        return payload
+
+    def __repr__(self) -> str:
+        return f"FindingSet({self.findings!r})"
+
+
+def classify_value(test: str, value: Optional[float], reference: Optional[Tuple[Optional[float], Optional[float]]],
+                   severity: Optional[int] = None) -> Optional[Finding]:
+    """
+    Build the finding for one result, or None if it is unremarkable.
+
+    Args:
+        test: Canonical test id (a key of ``FINDING_SPECS``).
+        value: Numeric result.
+        reference: (low, high) reference range for the patient, if known.
+        severity: Precomputed criticality code; looked up from the spec when None.
+            Either way it is raised to CRITICAL past the analyzer's own cut-off.
+
+    Returns:
+        Finding: When the value is outside the reference range or at least
+            SIGNIFICANT, and the spec reports that direction.
+    """
+    spec = FINDING_SPECS.get(test)
+    if spec is None or value is None or value != value:
+        return None
+    low_code, high_code, _unit, criticality_path = spec
+    if severity is None:
+        thresholds = _criticality(criticality_path)
+        severity = thresholds.code(value) if thresholds is not None else MONITORING
+    severity = analyzer_severity(test, value, severity)
+
+    direction = 0
+    low, high = reference if reference is not None else (None, None)
+    if low is not None and value < low:
+        direction = LOW
+    elif high is not None and value > high:
+        direction = HIGH
+    elif severity >= SIGNIFICANT:
+        # Critical value inside (or without) a reference range: side of the midpoint
+        if low is not None and high is not None:
+            direction = LOW if value < (low + high) / 2 else HIGH
+        else:
+            direction = LOW if low_code is not None and high_code is None else HIGH
+    if direction == 0:
+        return None
+
+    code = low_code if direction == LOW else high_code
+    if code is None:
+        return None
+    return Finding(code, test, value, max(severity, MONITORING))
+
+
+def extract_findings(dados: Any, sexo: Optional[str] = None, idade: Optional[float] = None,
+                     tests: Optional[Iterable[str]] = None) -> FindingSet:
+    """
+    Structured findings for a lab panel, without building any narrative.
+
+    Args:
+        dados: Panel in any form accepted by the analyzers (dict, list of
+            dicts or ``LabPanel``).
+        sexo: Patient sex ('M'/'F'), for sex-specific reference ranges.
+        idade: Patient age in years, for age-banded reference ranges.
+        tests: Restrict to these canonical test ids (default: every test in
+            ``FINDING_SPECS``).
+
+    Returns:
+        FindingSet: Findings ordered from most to least severe.
+    """
+    from utils.reference_ranges import get_reference_index
+
+    panel = normalize_panel(dados)
+    index = get_reference_index()
+    findings = []
+    for test in (FINDING_SPECS if tests is None else tests):
+        value = panel.value(test)
+        if value is None:
+            continue
+        finding = classify_value(test, value, index.lookup(test, sexo, idade))
+        if finding is not None:
+            findings.append(finding)
+    return FindingSet(findings)
+
+
+def findings_from_batch(batch: Mapping[str, Any], row: int) -> FindingSet:
+    """
+    Findings of one row of an ``analyzers.batch`` result.
+
+    Uses the flags and criticality codes already computed column-wise, so no
+    per-patient analyzer is run and no text is formatted.
+
+    Args:
+        batch: Result of one of the ``*_batch`` functions.
+        row: Row index.
+
+    Returns:
+        FindingSet: Findings for the tests in ``FINDING_SPECS`` covered by the batch.
+    """
+    findings = []
+    values = batch["values"]
+    for test, flags in batch["flags"].items():
+        if test not in FINDING_SPECS or test not in values:
+            continue
+        value = float(values[test][row])
+        if value != value:
+            continue
+        codes = batch["criticality"].get(test)
+        severity = analyzer_severity(test, value, int(codes[row]) if codes is not None else MONITORING)
+        flag = int(flags[row])
+        if flag == 0:
+            finding = classify_value(test, value, None, severity)
+        else:
+            code = FINDING_SPECS[test][0 if flag == LOW else 1]
+            finding = Finding(code, test, value, max(severity, MONITORING)) if code is not None else None
+        if finding is not None:
+            findings.append(finding)
+    return FindingSet(findings)
@@ -7,78 +7,96 @@ from typing import Dict, List, Optional, Tuple, Any
 import logging
 
 from utils.reference_ranges import get_reference_range
+from .result_cache import analyzer_cache
+from .criticality import CriticalityThresholds
+from .panel import LabPanel, normalize_panel
 
 logger = logging.getLogger(__name__)
 
-def _safe_convert_to_float(value_str: Optional[str]) -> Optional[float]:
-    if value_str is None:
-        return None
-    
-    cleaned_value_str = str(value_str).strip() # Ensure input is string
-
-    if ',' in cleaned_value_str:
-        cleaned_value_str = cleaned_value_str.replace('.', '').replace(',', '.')
-
-    try:
-        return float(cleaned_value_str)
-    except ValueError:
-        logger.warning(f"Could not convert '{value_str}' (cleaned: '{cleaned_value_str}') to float.")
-        if cleaned_value_str.startswith('<'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        if cleaned_value_str.startswith('>'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        return None
-
-# Helper function to safely get and convert lab value
-def _get_float_value(data: Dict[str, Any], key: str) -> Optional[float]:
-    value = data.get(key)
-    if value is not None:
-        if isinstance(value, (int, float)):
-            return float(value)
-        else:
-            value_str = str(value)
-            return _safe_convert_to_float(value_str)
-    return None
-
-def _get_criticality_level(param_name, value, thresholds):
-    """
-    Determine the criticality level of a parameter based on stratified thresholds.
-    
-    Args:
-        param_name: Name of the parameter
-        value: The value to evaluate
-        thresholds: Dictionary with 'critical', 'significant', and 'monitoring' thresholds
-        
-    Returns:
-        tuple: (criticality_level, description)
-    """
-    if value is None:
-        return ("UNKNOWN", f"{param_name} value is None")
-    
-    # Check critical thresholds
-    if 'critical' in thresholds:
-        for threshold in thresholds['critical']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-    
-    # Check significant thresholds
-    if 'significant' in thresholds:
-        for threshold in thresholds['significant']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-    
-    # Default to monitoring
-    return ("MONITORING", f"{param_name} MONITORING: {value} - Significant morbidity risk prompt")
+# Criticality thresholds, compiled once at import
+HB_CRITICALITY = CriticalityThresholds("Hemoglobina", {
+    'critical': [20.0, -5.0], # >20.0 or <5.0
+    'significant': [(18.0, 20.0), (5.0, 7.0)],  # 18.0-20.0 or 5.0-7.0
+    'monitoring': [(7.0, 18.0)]  # 7.0-18.0 (normal range)
+})
+
+LEUCO_CRITICALITY = CriticalityThresholds("Leucócitos Totais", {
+    'critical': [50000, -500], # >50000 or <500
+    'significant': [(30000, 50000), (500, 1000)],  # 30000-50000 or 500-1000
+    'monitoring': [(1000, 30000)]  # 1000-30000 (normal range)
+})
+
+LINFO_CRITICALITY = CriticalityThresholds("Linfócitos", {
+    'critical': [10000, -500], # >10000 or <500
+    'significant': [(5000, 10000), (500, 1000)],  # 5000-10000 or 500-1000
+    'monitoring': [(1000, 5000)]  # 1000-5000 (normal range)
+})
+
+MONO_CRITICALITY = CriticalityThresholds("Monócitos", {
+    'critical': [5000, -100], # >5000 or <100
+    'significant': [(2000, 5000), (100, 500)],  # 2000-5000 or 100-500
+    'monitoring': [(500, 2000)]  # 500-2000 (normal range)
+})
+
+EOSI_CRITICALITY = CriticalityThresholds("Eosinófilos", {
+    'critical': [5000, -50], # >5000 or <50
+    'significant': [(2000, 5000), (50, 500)],  # 2000-5000 or 50-500
+    'monitoring': [(500, 2000)]  # 500-2000 (normal range)
+})
+
+BASO_CRITICALITY = CriticalityThresholds("Basófilos", {
+    'critical': [2000, -20], # >2000 or <20
+    'significant': [(1000, 2000), (20, 200)],  # 1000-2000 or 20-200
+    'monitoring': [(200, 1000)]  # 200-1000 (normal range)
+})
+
+NEUTRO_CRITICALITY = CriticalityThresholds("Neutrófilos", {
+    'critical': [10000, -500], # >10000 or <500
+    'significant': [(7500, 10000), (500, 1000)],  # 7500-10000 or 500-1000
+    'monitoring': [(1000, 7500)]  # 1000-7500 (normal range)
+})
+
+BASTONETES_CRITICALITY = CriticalityThresholds("Bastonetes", {
+    'critical': [5000, -100], # >5000 or <100
+    'significant': [(2000, 5000), (100, 500)],  # 2000-5000 or 100-500
+    'monitoring': [(500, 2000)]  # 500-2000 (normal range)
+})
+
+PLAQ_CRITICALITY = CriticalityThresholds("Plaquetas", {
+    'critical': [1500000, -10000], # >1500000 or <10000
+    'significant': [(1000000, 1500000), (10000, 20000)],  # 1000000-1500000 or 10000-20000
+    'monitoring': [(20000, 1000000)]  # 20000-1000000 (normal range)
+})
+
+RETIC_CRITICALITY = CriticalityThresholds("Reticulócitos", {
+    'critical': [10.0, -0.1], # >10.0 or <0.1
+    'significant': [(5.0, 10.0), (0.1, 1.0)],  # 5.0-10.0 or 0.1-1.0
+    'monitoring': [(1.0, 5.0)]  # 1.0-5.0 (normal range)
+})
+
+VCM_CRITICALITY = CriticalityThresholds("VCM (Volume Corpuscular Médio)", {
+    'critical': [120.0, -60.0], # >120.0 or <60.0
+    'significant': [(100.0, 120.0), (60.0, 80.0)],  # 100.0-120.0 or 60.0-80.0
+    'monitoring': [(80.0, 100.0)]  # 80.0-100.0 (normal range)
+})
+
+HCM_CRITICALITY = CriticalityThresholds("HCM (Hemoglobina Corpuscular Média)", {
+    'critical': [40.0, -20.0], # >40.0 or <20.0
+    'significant': [(33.0, 40.0), (20.0, 27.0)],  # 33.0-40.0 or 20.0-27.0
+    'monitoring': [(27.0, 33.0)]  # 27.0-33.0 (normal range)
+})
+
+CHCM_CRITICALITY = CriticalityThresholds("CHCM (Conc. Hemoglobina Corpuscular Média)", {
+    'critical': [40.0, -25.0], # >40.0 or <25.0
+    'significant': [(36.0, 40.0), (25.0, 32.0)],  # 36.0-40.0 or 25.0-32.0
+    'monitoring': [(32.0, 36.0)]  # 32.0-36.0 (normal range)
+})
+
+RDW_CRITICALITY = CriticalityThresholds("RDW (Amplitude de Distribuição Eritrocitária)", {
+    'critical': [20.0, -10.0], # >20.0 or <10.0
+    'significant': [(15.0, 20.0), (10.0, 12.0)],  # 15.0-20.0 or 10.0-12.0
+    'monitoring': [(12.0, 15.0)]  # 12.0-15.0 (normal range)
+})
 
 # Helper function to safely get and convert lab value (duplicate removed)
 
@@ -86,6 +104,7 @@ def _get_criticality_level(param_name, value, thresholds):
 def _get_ref_range(param_key: str, sexo: Optional[str] = None) -> Optional[Tuple[float, float]]:
     return get_reference_range(param_key, sexo)
 
+@analyzer_cache.memoize("hematology")
 def analisar_hemograma(dados: Dict[str, Any], sexo: Optional[str] = None) -> Dict[str, Any]:
     """
     Analyze complete blood count (CBC) results and provide clinical interpretation.
@@ -107,11 +126,12 @@ def analisar_hemograma(dados: Dict[str, Any], sexo: Optional[str] = None) -> Dic
     is_critical_flag: bool = False
     details_dict: Dict[str, Any] = {} 
 
-    if not isinstance(dados, dict):
+    if not isinstance(dados, (dict, LabPanel)):
         return {
             "interpretation": "Dados de entrada inválidos.",
             "abnormalities": [], "is_critical": False, "recommendations": [], "details": {}
         }
+    panel = normalize_panel(dados)
 
     def _add_interpretation(
         param_display_name: str, value: float, unit: str, ref_range: Optional[Tuple[float, float]],
@@ -154,7 +174,7 @@ def analisar_hemograma(dados: Dict[str, Any], sexo: Optional[str] = None) -> Dic
             details_dict[f"{param_key_for_details}_ref"] = "N/A"
 
     # --- Red Blood Cells ---
-    hb_val = _get_float_value(dados, 'Hb')
+    hb_val = panel.numeric('Hb')
     anemia_present = False
     anemia_severity_msg = ""
     hb_ref_range_for_ri = None # Store Hb ref for RI calculation
@@ -164,11 +184,7 @@ def analisar_hemograma(dados: Dict[str, Any], sexo: Optional[str] = None) -> Dic
         hb_ref_range_for_ri = ref # Save for RI
         
         # Determine criticality level for hemoglobin
-        hb_criticality, hb_description = _get_criticality_level("Hemoglobina", hb_val, {
-            'critical': [20.0, -5.0], # >20.0 or <5.0
-            'significant': [(18.0, 20.0), (5.0, 7.0)],  # 18.0-20.0 or 5.0-7.0
-            'monitoring': [(7.0, 18.0)]  # 7.0-18.0 (normal range)
-        })
+        hb_criticality = HB_CRITICALITY.level(hb_val)
         # Note: criticality assessment integrated into detailed interpretation below
         
         _add_interpretation('Hemoglobina', hb_val, 'g/dL', ref,
@@ -184,7 +200,7 @@ def analisar_hemograma(dados: Dict[str, Any], sexo: Optional[str] = None) -> Dic
             elif hb_val < 10.0: anemia_severity_msg = "Anemia Moderada"
             else: anemia_severity_msg = "Anemia Leve"
     
-    ht_val = _get_float_value(dados, 'Ht')
+    ht_val = panel.numeric('Ht')
     ht_ref_range_for_ri = None # Store Ht ref for RI calculation
     if ht_val is not None:
         ref = _get_ref_range('Ht', sexo)
@@ -193,7 +209,7 @@ def analisar_hemograma(dados: Dict[str, Any], sexo: Optional[str] = None) -> Dic
                             "Reduzido", "Elevado", "Normal",
                             "Hematócrito Baixo", "Hematócrito Alto", "Ht")
 
-    rbc_val = _get_float_value(dados, 'RBC')
+    rbc_val = panel.numeric('RBC')
     if rbc_val is not None:
         ref_rbc = _get_ref_range('RBC', sexo)
         _add_interpretation('Eritrócitos (RBC)', rbc_val, 'milhões/µL', ref_rbc,
@@ -203,16 +219,12 @@ def analisar_hemograma(dados: Dict[str, Any], sexo: Optional[str] = None) -> Dic
                             high_recommendation="Contagem de hemácias alta: Correlacionar com Hb e Ht para avaliar policitemia.")
 
     # --- White Blood Cells (Leukocytes) ---
-    leuco_val = _get_float_value(dados, 'Leuco')
+    leuco_val = panel.numeric('Leuco')
     if leuco_val is not None:
         ref = _get_ref_range('Leuco')
         
         # Determine criticality level for leukocytes
-        leuco_criticality, leuco_description = _get_criticality_level("Leucócitos Totais", leuco_val, {
-            'critical': [50000, -500], # >50000 or <500
-            'significant': [(30000, 50000), (500, 1000)],  # 30000-50000 or 500-1000
-            'monitoring': [(1000, 30000)]  # 1000-30000 (normal range)
-        })
+        leuco_criticality = LEUCO_CRITICALITY.level(leuco_val)
         # Note: criticality assessment integrated into detailed interpretation below
         
         _add_interpretation('Leucócitos Totais', leuco_val, '/mm³', ref,
@@ -240,14 +252,14 @@ def analisar_hemograma(dados: Dict[str, Any], sexo: Optional[str] = None) -> Dic
         
         abs_val = None
         for alias in param_info['aliases_abs']:
-            abs_val = _get_float_value(dados, alias)
+            abs_val = panel.numeric(alias)
             if abs_val is not None: 
                 details_dict[f"{base_key}_abs_direct"] = abs_val # Store which direct key was found
                 break 
         
         perc_val = None
         for alias in param_info['aliases_perc']:
-            perc_val = _get_float_value(dados, alias)
+            perc_val = panel.numeric(alias)
             if perc_val is not None: 
                 details_dict[f"{base_key}_perc_direct"] = perc_val # Store which direct key was found
                 break
@@ -272,49 +284,29 @@ def analisar_hemograma(dados: Dict[str, Any], sexo: Optional[str] = None) -> Dic
             # Add stratified critical value thresholds for lymphocytes
             if base_key == 'Lymphocytes':
                 # Determine criticality level for lymphocytes (integrated into main interpretation)
-                linfo_criticality, linfo_description = _get_criticality_level("Linfócitos", abs_val, {
-                    'critical': [10000, -500], # >10000 or <500
-                    'significant': [(5000, 10000), (500, 1000)],  # 5000-10000 or 500-1000
-                    'monitoring': [(1000, 5000)]  # 1000-5000 (normal range)
-                })
+                linfo_criticality = LINFO_CRITICALITY.level(abs_val)
             
             # Add stratified critical value thresholds for monocytes
             if base_key == 'Monocytes':
                 # Determine criticality level for monocytes (integrated into main interpretation)
-                mono_criticality, mono_description = _get_criticality_level("Monócitos", abs_val, {
-                    'critical': [5000, -100], # >5000 or <100
-                    'significant': [(2000, 5000), (100, 500)],  # 2000-5000 or 100-500
-                    'monitoring': [(500, 2000)]  # 500-2000 (normal range)
-                })
+                mono_criticality = MONO_CRITICALITY.level(abs_val)
             
             # Add stratified critical value thresholds for eosinophils
             if base_key == 'Eosinophils':
                 # Determine criticality level for eosinophils (integrated into main interpretation)
-                eosi_criticality, eosi_description = _get_criticality_level("Eosinófilos", abs_val, {
-                    'critical': [5000, -50], # >5000 or <50
-                    'significant': [(2000, 5000), (50, 500)],  # 2000-5000 or 50-500
-                    'monitoring': [(500, 2000)]  # 500-2000 (normal range)
-                })
+                eosi_criticality = EOSI_CRITICALITY.level(abs_val)
             
             # Add stratified critical value thresholds for basophils
             if base_key == 'Basophils':
                 # Determine criticality level for basophils (integrated into main interpretation)
-                baso_criticality, baso_description = _get_criticality_level("Basófilos", abs_val, {
-                    'critical': [2000, -20], # >2000 or <20
-                    'significant': [(1000, 2000), (20, 200)],  # 1000-2000 or 20-200
-                    'monitoring': [(200, 1000)]  # 200-1000 (normal range)
-                })
+                baso_criticality = BASO_CRITICALITY.level(abs_val)
 
             if base_key == 'Neutrophils':
                 low_msg = "Baixos (Neutropenia)"
                 low_abn = "Neutropenia (Abs)"
                 
                 # Determine criticality level for neutrophils (integrated into main interpretation)
-                neutro_criticality, neutro_description = _get_criticality_level("Neutrófilos", abs_val, {
-                    'critical': [10000, -500], # >10000 or <500
-                    'significant': [(7500, 10000), (500, 1000)],  # 7500-10000 or 500-1000
-                    'monitoring': [(1000, 7500)]  # 1000-7500 (normal range)
-                })
+                neutro_criticality = NEUTRO_CRITICALITY.level(abs_val)
                 
                 if ref_abs and abs_val < ref_abs[0]: # Specific neutropenia recommendations
                     if abs_val < 500:
@@ -329,11 +321,7 @@ def analisar_hemograma(dados: Dict[str, Any], sexo: Optional[str] = None) -> Dic
                  high_abn = "Desvio à Esquerda/Bandemia (Abs)"
                  
                  # Determine criticality level for bands (integrated into main interpretation)
-                 bands_criticality, bands_description = _get_criticality_level("Bastonetes", abs_val, {
-                     'critical': [5000, -100], # >5000 or <100
-                     'significant': [(2000, 5000), (100, 500)],  # 2000-5000 or 100-500
-                     'monitoring': [(500, 2000)]  # 500-2000 (normal range)
-                 })
+                 bands_criticality = BASTONETES_CRITICALITY.level(abs_val)
                  
                  high_rec = "Bandemia/Desvio à Esquerda (Abs): Sugere processo infeccioso/inflamatório agudo."
             
@@ -356,16 +344,12 @@ def analisar_hemograma(dados: Dict[str, Any], sexo: Optional[str] = None) -> Dic
 
 
     # --- Platelets ---
-    plaq_val = _get_float_value(dados, 'Plaq')
+    plaq_val = panel.numeric('Plaq')
     if plaq_val is not None:
         ref = _get_ref_range('Plaq')
         
         # Determine criticality level for platelets (integrated into main interpretation)
-        plaq_criticality, plaq_description = _get_criticality_level("Plaquetas", plaq_val, {
-            'critical': [1500000, -10000], # >1500000 or <10000
-            'significant': [(1000000, 1500000), (10000, 20000)],  # 1000000-1500000 or 10000-20000
-            'monitoring': [(20000, 1000000)]  # 20000-1000000 (normal range)
-        })
+        plaq_criticality = PLAQ_CRITICALITY.level(plaq_val)
         
         _add_interpretation('Plaquetas', plaq_val, '/mm³', ref,
                             "Baixas", "Altas", "Normais",
@@ -377,16 +361,12 @@ def analisar_hemograma(dados: Dict[str, Any], sexo: Optional[str] = None) -> Dic
                             critical_high_recommendation="Trombocitose Extrema (>1.000/mm³): Considerar doença mieloproliferativa. Avaliar risco trombótico. Segundo as diretrizes da American Society of Hematology, considerar JAK2, CALR ou MPL mutation testing e iniciar aspirina para profilaxia trombótica.")
 
     # --- Reticulocytes ---
-    retic_perc_val = _get_float_value(dados, 'Retic')
+    retic_perc_val = panel.numeric('Retic')
     if retic_perc_val is not None:
         ref_perc = _get_ref_range('Retic')
         
         # Determine criticality level for reticulocytes (integrated into main interpretation)
-        retic_criticality, retic_description = _get_criticality_level("Reticulócitos", retic_perc_val, {
-            'critical': [10.0, -0.1], # >10.0 or <0.1
-            'significant': [(5.0, 10.0), (0.1, 1.0)],  # 5.0-10.0 or 0.1-1.0
-            'monitoring': [(1.0, 5.0)]  # 1.0-5.0 (normal range)
-        })
+        retic_criticality = RETIC_CRITICALITY.level(retic_perc_val)
         
         _add_interpretation('Reticulócitos', retic_perc_val, '%', ref_perc,
                             "Reduzidos", "Aumentados", "Normais",
@@ -463,62 +443,46 @@ def analisar_hemograma(dados: Dict[str, Any], sexo: Optional[str] = None) -> Dic
                  interpretations_list.append("Índice Reticulocitário não pôde ser calculado (Ht/Hb ausente), mas a presença de anemia com reticulócitos X% requer avaliação da resposta medular.".replace("X%", str(retic_perc_val)))
 
     # --- Red Cell Indices (VCM, HCM, CHCM, RDW) ---
-    vcm_val = _get_float_value(dados, 'VCM')
+    vcm_val = panel.numeric('VCM')
     if vcm_val is not None:
         ref = _get_ref_range('VCM')
         
         # Determine criticality level for VCM (integrated into main interpretation)
-        vcm_criticality, vcm_description = _get_criticality_level("VCM (Volume Corpuscular Médio)", vcm_val, {
-            'critical': [120.0, -60.0], # >120.0 or <60.0
-            'significant': [(100.0, 120.0), (60.0, 80.0)],  # 100.0-120.0 or 60.0-80.0
-            'monitoring': [(80.0, 100.0)]  # 80.0-100.0 (normal range)
-        })
+        vcm_criticality = VCM_CRITICALITY.level(vcm_val)
         
         _add_interpretation('VCM (Volume Corpuscular Médio)', vcm_val, 'fL', ref,
                             "Baixo (Microcitose)", "Alto (Macrocitose)", "Normal (Normocitose)",
                             "Microcitose", "Macrocitose", "VCM")
 
-    hcm_val = _get_float_value(dados, 'HCM')
+    hcm_val = panel.numeric('HCM')
     if hcm_val is not None:
         ref = _get_ref_range('HCM')
         
         # Determine criticality level for HCM (integrated into main interpretation)
-        hcm_criticality, hcm_description = _get_criticality_level("HCM (Hemoglobina Corpuscular Média)", hcm_val, {
-            'critical': [40.0, -20.0], # >40.0 or <20.0
-            'significant': [(33.0, 40.0), (20.0, 27.0)],  # 33.0-40.0 or 20.0-27.0
-            'monitoring': [(27.0, 33.0)]  # 27.0-33.0 (normal range)
-        })
+        hcm_criticality = HCM_CRITICALITY.level(hcm_val)
         
         _add_interpretation('HCM (Hemoglobina Corpuscular Média)', hcm_val, 'pg', ref,
                             "Baixa (Hipocromia)", "Alta (Hipercromia)", "Normal (Normocromia)",
                             "Hipocromia", "Hipercromia", "HCM")
 
-    chcm_val = _get_float_value(dados, 'CHCM')
+    chcm_val = panel.numeric('CHCM')
     if chcm_val is not None:
         ref = _get_ref_range('CHCM')
         
         # Determine criticality level for CHCM (integrated into main interpretation)
-        chcm_criticality, chcm_description = _get_criticality_level("CHCM (Conc. Hemoglobina Corpuscular Média)", chcm_val, {
-            'critical': [40.0, -25.0], # >40.0 or <25.0
-            'significant': [(36.0, 40.0), (25.0, 32.0)],  # 36.0-40.0 or 25.0-32.0
-            'monitoring': [(32.0, 36.0)]  # 32.0-36.0 (normal range)
-        })
+        chcm_criticality = CHCM_CRITICALITY.level(chcm_val)
         
         _add_interpretation('CHCM (Conc. Hemoglobina Corpuscular Média)', chcm_val, 'g/dL', ref,
                             "Baixa (Hipocromia)", "Alta (Esferocitose? Artefato?)", "Normal (Normocromia)",
                             "Hipocromia (CHCM)", "CHCM Alto", "CHCM")
 
-    rdw_val = _get_float_value(dados, 'RDW')
+    rdw_val = panel.numeric('RDW')
     rdw_is_high = False
     if rdw_val is not None:
         ref = _get_ref_range('RDW')
         
         # Determine criticality level for RDW (integrated into main interpretation)
-        rdw_criticality, rdw_description = _get_criticality_level("RDW (Amplitude de Distribuição Eritrocitária)", rdw_val, {
-            'critical': [20.0, -10.0], # >20.0 or <10.0
-            'significant': [(15.0, 20.0), (10.0, 12.0)],  # 15.0-20.0 or 10.0-12.0
-            'monitoring': [(12.0, 15.0)]  # 12.0-15.0 (normal range)
-        })
+        rdw_criticality = RDW_CRITICALITY.level(rdw_val)
         
         _add_interpretation('RDW (Amplitude de Distribuição Eritrocitária)', rdw_val, '%', ref,
                             "Baixo (raro, sem significado clínico usual)", "Alto (Anisocitose)", "Normal",
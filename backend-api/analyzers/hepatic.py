@@ -7,68 +7,32 @@ from typing import Dict, List, Optional
 import logging
 
 from utils.reference_ranges import REFERENCE_RANGES
+from .result_cache import analyzer_cache
+from .criticality import CriticalityThresholds
+from .panel import normalize_panel
 
 logger = logging.getLogger(__name__)
 
-def _safe_convert_to_float(value_str: Optional[str]) -> Optional[float]:
-    if value_str is None:
-        return None
-    
-    cleaned_value_str = str(value_str).strip() # Ensure input is string
-
-    if ',' in cleaned_value_str:
-        cleaned_value_str = cleaned_value_str.replace('.', '').replace(',', '.')
-
-    try:
-        return float(cleaned_value_str)
-    except ValueError:
-        logger.warning(f"Could not convert '{value_str}' (cleaned: '{cleaned_value_str}') to float.")
-        if cleaned_value_str.startswith('<'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        if cleaned_value_str.startswith('>'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        return None
-
-def _get_criticality_level(param_name, value, thresholds):
-    """
-    Determine the criticality level of a parameter based on stratified thresholds.
-    
-    Args:
-        param_name: Name of the parameter
-        value: The value to evaluate
-        thresholds: Dictionary with 'critical', 'significant', and 'monitoring' thresholds
-        
-    Returns:
-        tuple: (criticality_level, description)
-    """
-    if value is None:
-        return ("UNKNOWN", f"{param_name} value is None")
-    
-    # Check critical thresholds
-    if 'critical' in thresholds:
-        for threshold in thresholds['critical']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-    
-    # Check significant thresholds
-    if 'significant' in thresholds:
-        for threshold in thresholds['significant']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-    
-    # Default to monitoring
-    return ("MONITORING", f"{param_name} MONITORING: {value} - Significant morbidity risk prompt")
-
+# Criticality thresholds, compiled once at import
+TGO_CRITICALITY = CriticalityThresholds("TGO/AST", {
+    'critical': [10000],
+    'significant': [(1000, 10000)],
+    'monitoring': [(40, 1000)]
+})
+
+TGP_CRITICALITY = CriticalityThresholds("TGP/ALT", {
+    'critical': [10000],
+    'significant': [(1000, 10000)],
+    'monitoring': [(56, 1000)]
+})
+
+BT_CRITICALITY = CriticalityThresholds("Bilirrubina Total", {
+    'critical': [20.0],
+    'significant': [(5.0, 20.0)],
+    'monitoring': [(1.2, 5.0)]
+})
+
+@analyzer_cache.memoize("hepatic")
 def analisar_funcao_hepatica(dados: Dict[str, any]) -> Dict[str, any]:
     """
     Analyze liver function tests and provide clinical interpretation.
@@ -88,25 +52,9 @@ def analisar_funcao_hepatica(dados: Dict[str, any]) -> Dict[str, any]:
     details_dict: Dict[str, any] = {}
 
     # Standardize and store all provided data in details_dict, converting to float where possible
-    processed_dados: Dict[str, Optional[float]] = {}
-    for key, value in dados.items():
-        details_dict[key] = value # Store original value first
-        if value is not None:
-            if isinstance(value, (int, float)):
-                processed_dados[key] = float(value)
-                details_dict[key] = float(value)
-            else:
-                value_str = str(value)
-                converted_value = _safe_convert_to_float(value_str)
-                if converted_value is not None:
-                    processed_dados[key] = converted_value
-                    details_dict[key] = converted_value
-                else:
-                    processed_dados[key] = None
-                    logger.info(f"Could not convert hepatic param {key}: '{value}'. It will be ignored.")
-        else:
-            processed_dados[key] = None
-            logger.info(f"Hepatic param {key} is None. It will be ignored.")
+    panel = normalize_panel(dados)
+    details_dict.update(panel.details_dict())
+    processed_dados: Dict[str, Optional[float]] = panel.numeric_dict()
 
     # Check if there's enough data to analyze for hepatic function
     valid_keys = ['TGO', 'TGP', 'BT', 'BD', 'BI', 'GamaGT', 'FosfAlc', 'Albumina', 'RNI']
@@ -121,21 +69,13 @@ def analisar_funcao_hepatica(dados: Dict[str, any]) -> Dict[str, any]:
     tgp = processed_dados.get('TGP')
 
     if tgo is not None:
-        tgo_criticality, tgo_description = _get_criticality_level("TGO/AST", tgo, {
-            'critical': [10000],
-            'significant': [(1000, 10000)],
-            'monitoring': [(40, 1000)]
-        })
+        tgo_criticality = TGO_CRITICALITY.level(tgo)
         # Note: criticality assessment integrated into detailed interpretation below
         if tgo_criticality == "CRITICAL":
             is_critical_flag = True
 
     if tgp is not None:
-        tgp_criticality, tgp_description = _get_criticality_level("TGP/ALT", tgp, {
-            'critical': [10000],
-            'significant': [(1000, 10000)],
-            'monitoring': [(56, 1000)]
-        })
+        tgp_criticality = TGP_CRITICALITY.level(tgp)
         # Note: criticality assessment integrated into detailed interpretation below
         if tgp_criticality == "CRITICAL":
             is_critical_flag = True
@@ -281,11 +221,7 @@ def analisar_funcao_hepatica(dados: Dict[str, any]) -> Dict[str, any]:
     bi = processed_dados.get('BI')
 
     if bt is not None:
-        bt_criticality, bt_description = _get_criticality_level("Bilirrubina Total", bt, {
-            'critical': [20.0],
-            'significant': [(5.0, 20.0)],
-            'monitoring': [(1.2, 5.0)]
-        })
+        bt_criticality = BT_CRITICALITY.level(bt)
         # Note: criticality assessment integrated into detailed interpretation below
         if bt_criticality == "CRITICAL":
             is_critical_flag = True
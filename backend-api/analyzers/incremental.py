@@ -0,0 +1,275 @@
+"""
+Incremental re-analysis of per-patient lab panels.
+
+Results usually arrive one at a time (a new potassium, a repeat creatinine).
+``IncrementalAnalyzer`` keeps, for each patient, the last known value of every
+test and the last output of every analyzer. When new values come in it uses
+the registry's test -> analyzer dependency map to re-run only the analyzers
+that read a changed test, and reports which abnormalities (and structured
+``Finding`` records) appeared and which disappeared so that alert creation can
+act on the difference instead of on a full re-analysis.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+
+from .findings import Finding, FindingSet
+from .panel import parse_lab_value
+from .registry import AnalyzerRegistry, analyzer_registry
+from .result_cache import UncacheableInput, canonicalize
+
+logger = logging.getLogger(__name__)
+
+INCREMENTAL_ANALYSIS_MAX_PATIENTS = int(os.getenv("INCREMENTAL_ANALYSIS_MAX_PATIENTS", "2048"))
+
+
+def _abnormality_key(abnormality: Any) -> Hashable:
+    try:
+        return canonicalize(abnormality)
+    except UncacheableInput:
+        return repr(abnormality)
+
+
+def _same_value(old: Any, new: Any) -> bool:
+    old_num, new_num = parse_lab_value(old), parse_lab_value(new)
+    if old_num is not None or new_num is not None:
+        return old_num == new_num
+    return old == new
+
+
+class AnalysisDelta:
+    """
+    Outcome of one incremental update.
+
+    Attributes:
+        patient_id: Patient the update belongs to.
+        changed_tests: Input keys whose value actually changed.
+        rerun: Analyzer names that were executed.
+        dropped: Analyzers whose inputs are all gone; their previous output was discarded.
+        results: Fresh output of each re-run analyzer.
+        added: (analyzer, abnormality) pairs that were not present before.
+        removed: (analyzer, abnormality) pairs that are no longer reported.
+        added_findings: (analyzer, Finding) pairs that were not present before
+            (compared by ``Finding.key``, so a new value of a standing finding
+            is not reported again).
+        removed_findings: (analyzer, Finding) pairs that are no longer present.
+        is_critical: Whether any analyzer currently reports a critical result.
+        errors: Analyzer failures, by name.
+    """
+
+    __slots__ = ('patient_id', 'changed_tests', 'rerun', 'dropped', 'results', 'added', 'removed',
+                 'added_findings', 'removed_findings', 'is_critical', 'errors')
+
+    def __init__(self, patient_id: Hashable):
+        self.patient_id = patient_id
+        self.changed_tests: List[str] = []
+        self.rerun: List[str] = []
+        self.dropped: List[str] = []
+        self.results: Dict[str, Any] = {}
+        self.added: List[Tuple[str, Any]] = []
+        self.removed: List[Tuple[str, Any]] = []
+        self.added_findings: List[Tuple[str, Finding]] = []
+        self.removed_findings: List[Tuple[str, Finding]] = []
+        self.is_critical = False
+        self.errors: Dict[str, str] = {}
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.removed or self.added_findings or self.removed_findings)
+
+    def __repr__(self) -> str:
+        return (f"AnalysisDelta(patient_id={self.patient_id!r}, rerun={self.rerun!r}, "
+                f"added={len(self.added)}, removed={len(self.removed)})")
+
+
+class _PatientState:
+    __slots__ = ('panel', 'outputs', 'findings', 'patient', 'lock')
+
+    def __init__(self, patient: Optional[Mapping[str, Any]]):
+        self.panel: Dict[str, Any] = {}
+        self.outputs: Dict[str, Any] = {}
+        self.findings: Dict[str, FindingSet] = {}
+        self.patient: Dict[str, Any] = dict(patient or {})
+        self.lock = threading.Lock()
+
+
+class IncrementalAnalyzer:
+    """
+    Per-patient panel state with dependency-driven re-analysis.
+
+    Args:
+        registry: Analyzer registry providing the dependency map.
+        max_patients: Number of patients kept in memory (least recently
+            updated patients are evicted and re-seeded on their next update).
+    """
+
+    def __init__(self, registry: AnalyzerRegistry = analyzer_registry, max_patients: int = INCREMENTAL_ANALYSIS_MAX_PATIENTS):
+        self.registry = registry
+        self.max_patients = max_patients
+        self._states: "OrderedDict[Hashable, _PatientState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, patient_id: Hashable) -> bool:
+        with self._lock:
+            return patient_id in self._states
+
+    def _get_state(self, patient_id: Hashable, patient: Optional[Mapping[str, Any]]) -> Tuple[_PatientState, bool]:
+        with self._lock:
+            state = self._states.get(patient_id)
+            created = state is None
+            if created:
+                state = _PatientState(patient)
+                self._states[patient_id] = state
+                while len(self._states) > self.max_patients:
+                    self._states.popitem(last=False)
+            else:
+                self._states.move_to_end(patient_id)
+            return state, created
+
+    def update(
+        self,
+        patient_id: Hashable,
+        values: Mapping[str, Any],
+        patient: Optional[Mapping[str, Any]] = None,
+        seed: Optional[Callable[[], Mapping[str, Any]]] = None,
+    ) -> AnalysisDelta:
+        """
+        Apply new lab values to a patient's panel and re-run the affected analyzers.
+
+        Args:
+            patient_id: Patient key.
+            values: ``{test: value}`` for the new results; a None value removes the test.
+            patient: Patient context (idade, sexo, ...). A changed context re-runs
+                every analyzer that uses it.
+            seed: Called once when the patient has no state yet, to load the
+                previously known panel (e.g. latest values from the database).
+                The seeded panel is analyzed as a silent baseline, so only the
+                effect of ``values`` shows up in the delta. Without a seed the
+                first update reports every abnormality as added.
+
+        Returns:
+            AnalysisDelta: What was re-run and how the abnormalities changed.
+        """
+        state, created = self._get_state(patient_id, patient)
+        delta = AnalysisDelta(patient_id)
+        with state.lock:
+            if created and seed is not None:
+                # Baseline: analyze what was already known, without reporting it
+                state.panel.update({k: v for k, v in seed().items() if v is not None})
+                if state.panel:
+                    baseline = self.registry.run(state.panel, patient=state.patient)
+                    state.outputs.update(baseline["results"])
+                    state.findings.update(baseline["findings"])
+                created = False
+
+            changed = []
+            for key, value in values.items():
+                if value is None:
+                    if state.panel.pop(key, None) is not None:
+                        changed.append(key)
+                    continue
+                if key not in state.panel or not _same_value(state.panel[key], value):
+                    changed.append(key)
+                state.panel[key] = value
+
+            context_changed = patient is not None and dict(patient) != state.patient
+            if context_changed:
+                state.patient = dict(patient)
+
+            selected = {spec.name for spec in self.registry.select(state.panel)}
+            if created:
+                affected = selected
+                changed = list(state.panel)
+            else:
+                affected = set(self.registry.dependents(changed))
+                if context_changed:
+                    affected |= {spec.name for spec in self.registry
+                                 if spec.patient_args or spec.patient_info_arg}
+                # Analyzers that became relevant through a new input are covered by
+                # dependents(); ones whose inputs all disappeared are dropped below
+                affected |= {name for name in state.outputs if name not in selected}
+            delta.changed_tests = changed
+
+            to_run = [name for name in self.registry.names() if name in affected and name in selected]
+            merged = self.registry.run(state.panel, patient=state.patient, only=to_run) if to_run else None
+
+            for name in self.registry.names():
+                if name not in affected:
+                    continue
+                previous = state.outputs.get(name)
+                previous_findings = state.findings.get(name)
+                if name in selected:
+                    if merged is None or name not in merged["results"]:
+                        if merged is not None and name in merged["errors"]:
+                            delta.errors[name] = merged["errors"][name]
+                        continue  # Keep the last good output on failure
+                    current = merged["results"][name]
+                    current_findings = merged["findings"].get(name)
+                    state.outputs[name] = current
+                    if current_findings is not None:
+                        state.findings[name] = current_findings
+                    delta.rerun.append(name)
+                    delta.results[name] = current
+                else:
+                    current = current_findings = None
+                    state.findings.pop(name, None)
+                    if state.outputs.pop(name, None) is not None:
+                        delta.dropped.append(name)
+                self._diff(name, previous, current, delta)
+                self._diff_findings(name, previous_findings, current_findings, delta)
+
+            delta.is_critical = any(
+                isinstance(output, dict) and bool(output.get("is_critical")) for output in state.outputs.values()
+            )
+        if delta.rerun or delta.dropped:
+            logger.debug(f"Incremental analysis for patient {patient_id}: {delta!r}")
+        return delta
+
+    @staticmethod
+    def _diff(name: str, previous: Any, current: Any, delta: AnalysisDelta) -> None:
+        before = OrderedDict((_abnormality_key(a), a) for a in ((previous or {}).get("abnormalities") or []))
+        after = OrderedDict((_abnormality_key(a), a) for a in ((current or {}).get("abnormalities") or []))
+        delta.added.extend((name, a) for key, a in after.items() if key not in before)
+        delta.removed.extend((name, a) for key, a in before.items() if key not in after)
+
+    @staticmethod
+    def _diff_findings(name: str, previous: Optional[FindingSet], current: Optional[FindingSet],
+                       delta: AnalysisDelta) -> None:
+        before = {finding.key: finding for finding in previous or ()}
+        after = {finding.key: finding for finding in current or ()}
+        delta.added_findings.extend((name, f) for key, f in after.items() if key not in before)
+        delta.removed_findings.extend((name, f) for key, f in before.items() if key not in after)
+
+    def panel(self, patient_id: Hashable) -> Dict[str, Any]:
+        """Copy of the patient's current panel state ({} if unknown)."""
+        with self._lock:
+            state = self._states.get(patient_id)
+        if state is None:
+            return {}
+        with state.lock:
+            return dict(state.panel)
+
+    def outputs(self, patient_id: Hashable) -> Dict[str, Any]:
+        """Last output of each analyzer for the patient ({} if unknown)."""
+        with self._lock:
+            state = self._states.get(patient_id)
+        if state is None:
+            return {}
+        with state.lock:
+            return dict(state.outputs)
+
+    def forget(self, patient_id: Hashable) -> None:
+        """Drop a patient's state; the next update re-seeds it."""
+        with self._lock:
+            self._states.pop(patient_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+
+# Process-wide incremental state used by crud_lab_result
+incremental_analyzer = IncrementalAnalyzer()
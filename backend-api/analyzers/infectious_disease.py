@@ -6,6 +6,8 @@ from typing import Dict, List, Optional
 import logging
 
 from utils.reference_ranges import REFERENCE_RANGES
+from .result_cache import analyzer_cache
+from .panel import normalize_panel
 
 logger = logging.getLogger(__name__)
 
@@ -30,33 +32,7 @@ def _safe_convert_to_float(value_str: Optional[str]) -> Optional[float]:
             except ValueError: pass
         return None
 
-def _get_criticality_level(param_name, value, thresholds):
-    """
-    Determine the criticality level of a parameter based on stratified thresholds.
-    """
-    if value is None:
-        return ("UNKNOWN", f"{param_name} value is None")
-    
-    if 'critical' in thresholds:
-        for threshold in thresholds['critical']:
-            if isinstance(threshold, tuple):
-                if threshold[0] <= value <= threshold[1]:
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-            elif isinstance(threshold, (int, float)):
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-    
-    if 'significant' in thresholds:
-        for threshold in thresholds['significant']:
-            if isinstance(threshold, tuple):
-                if threshold[0] <= value <= threshold[1]:
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-            elif isinstance(threshold, (int, float)):
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-    
-    return ("MONITORING", f"{param_name} MONITORING: {value} - Significant morbidity risk prompt")
-
+@analyzer_cache.memoize("infectious_disease")
 def analisar_marcadores_doencas_infecciosas(dados: Dict[str, any], idade: Optional[int] = None, sexo: Optional[str] = None) -> Dict[str, any]:
     """
     Analyze infectious disease markers and provide clinical interpretation.
@@ -67,12 +43,11 @@ def analisar_marcadores_doencas_infecciosas(dados: Dict[str, any], idade: Option
     is_critical_flag: bool = False
     details_dict: Dict[str, any] = {}
 
-    processed_dados: Dict[str, any] = {}
-    for key, value in dados.items():
-        details_dict[key] = value
-        # For serology, we often deal with strings like "Reagente" or "Não Reagente"
-        # So we will keep them as strings and handle them in the logic
-        processed_dados[key] = value
+    # For serology, we often deal with strings like "Reagente" or "Não Reagente"
+    # So we will keep them as strings and handle them in the logic
+    panel = normalize_panel(dados)
+    details_dict.update(panel.raw_dict())
+    processed_dados: Dict[str, any] = panel.raw_dict()
 
     valid_keys = ['HIV', 'HBsAg', 'AntiHBs', 'AntiHBc', 'HCV', 'Syphilis', 'EBV', 'CMV', 'Toxo']
     if not any(k in processed_dados and processed_dados[k] is not None for k in valid_keys):
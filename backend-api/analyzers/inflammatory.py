@@ -1,69 +1,47 @@
 from typing import Dict, Any, List, Optional
 from utils.reference_ranges import REFERENCE_RANGES
+from .result_cache import analyzer_cache
+from .criticality import CriticalityThresholds
+from .panel import normalize_panel, parse_lab_value as _safe_convert_to_float
 import math
 import logging
 
 logger = logging.getLogger(__name__)
 
-def _safe_convert_to_float(value_str: Optional[str]) -> Optional[float]:
-    if value_str is None:
-        return None
-    
-    cleaned_value_str = str(value_str).strip() # Ensure input is string
+# Criticality thresholds, compiled once at import
+PCR_CRITICALITY = CriticalityThresholds("PCR", {
+    'critical': [5.0, float('inf')],
+    'significant': [(1.0, 5.0)],
+    'monitoring': [(0.5, 1.0)]
+})
 
-    if ',' in cleaned_value_str:
-        cleaned_value_str = cleaned_value_str.replace('.', '').replace(',', '.')
+# Values between the patient's reference limit and 'significant' fall through to MONITORING
+VHS_CRITICALITY = CriticalityThresholds("VHS", {
+    'critical': [100, float('inf')],
+    'significant': [(50, 100)]
+})
 
-    try:
-        return float(cleaned_value_str)
-    except ValueError:
-        logger.warning(f"Could not convert '{value_str}' (cleaned: '{cleaned_value_str}') to float.")
-        if cleaned_value_str.startswith('<'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        if cleaned_value_str.startswith('>'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        return None
+PCT_CRITICALITY = CriticalityThresholds("Procalcitonina", {
+    'critical': [10.0, float('inf')],
+    'significant': [(2.0, 10.0)],
+    'monitoring': [(0.5, 2.0)]
+})
 
-def _get_criticality_level(param_name, value, thresholds):
-    """
-    Determine the criticality level of a parameter based on stratified thresholds.
-    
-    Args:
-        param_name: Name of the parameter
-        value: The value to evaluate
-        thresholds: Dictionary with 'critical', 'significant', and 'monitoring' thresholds
-        
-    Returns:
-        tuple: (criticality_level, description)
-    """
-    if value is None:
-        return ("UNKNOWN", f"{param_name} value is None")
-    
-    # Check critical thresholds
-    if 'critical' in thresholds:
-        for threshold in thresholds['critical']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-    
-    # Check significant thresholds
-    if 'significant' in thresholds:
-        for threshold in thresholds['significant']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-    
-    # Default to monitoring
-    return ("MONITORING", f"{param_name} MONITORING: {value} - Significant morbidity risk prompt")
+# Sex-specific ferritin thresholds (currently identical for both sexes)
+FERRITINA_CRITICALITY = {
+    'male': CriticalityThresholds("Ferritina", {
+        'critical': [(-float('inf'), 15)], # Severe deficiency
+        'significant': [(1000, float('inf'))], # Iron overload/Severe inflammation
+        'monitoring': [(15, 30), (500, 1000)] # Deficiency risk, Inflammation/Iron overload risk
+    }),
+    'female': CriticalityThresholds("Ferritina", {
+        'critical': [(-float('inf'), 15)], # Severe deficiency
+        'significant': [(1000, float('inf'))], # Iron overload/Severe inflammation
+        'monitoring': [(15, 30), (500, 1000)] # Deficiency risk, Inflammation/Iron overload risk
+    }),
+}
 
+@analyzer_cache.memoize("inflammatory")
 def analisar_marcadores_inflamatorios(data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
     """
     Analisa marcadores inflamatórios.
@@ -75,34 +53,31 @@ def analisar_marcadores_inflamatorios(data: Dict[str, Any], **kwargs) -> Dict[st
     processed_markers = False
     details: Dict[str, Any] = {}
 
+    panel = normalize_panel(data)
+
     # PCR (Proteína C Reativa)
     # Expected key from obter_unidade/obter_valores_referencia and normalizer: 'PCR' or 'proteína c reativa'
     # For data dict, it's likely the short form like 'PCR' if from PDF, or normalized name if direct.
     pcr_keys = ['PCR', 'proteína c reativa', 'pcr']
     pcr_val_data = None
+    pcr_key = None
     for key in pcr_keys:
-        if key in data:
-            pcr_val_data = data[key]
+        if key in panel:
+            pcr_key = key
+            pcr_val_data = panel.raw(key)
             break
     
     if pcr_val_data is not None:
         processed_markers = True
         try:
-            if isinstance(pcr_val_data, (int, float)):
-                pcr_val = float(pcr_val_data)
-            else:
-                pcr_val = _safe_convert_to_float(pcr_val_data)
+            pcr_val = panel.numeric(pcr_key)
             if pcr_val is not None:
                 details['PCR'] = pcr_val
                 pcr_ref_min, pcr_ref_max = REFERENCE_RANGES['PCR']
                 details['PCR_ref'] = f"{pcr_ref_min}-{pcr_ref_max} mg/dL"
 
                 # Reference: utils.reference_ranges.REFERENCE_RANGES['PCR'] = (0, 0.5) # mg/dL
-                pcr_criticality, pcr_description = _get_criticality_level("PCR", pcr_val, {
-                    'critical': [5.0, float('inf')],
-                    'significant': [(1.0, 5.0)],
-                    'monitoring': [(0.5, 1.0)]
-                })
+                pcr_criticality, pcr_description = PCR_CRITICALITY.classify(pcr_val)
                 interpretations.append(pcr_description)
                 if pcr_criticality in ["CRITICAL", "SIGNIFICANT"]:
                     is_critical = True
@@ -128,18 +103,19 @@ def analisar_marcadores_inflamatorios(data: Dict[str, Any], **kwargs) -> Dict[st
     # Expected key: 'VHS' or 'velocidade de hemossedimentação'
     vhs_keys = ['VHS', 'velocidade de hemossedimentação', 'vhs']
     vhs_val_data = None
+    vhs_key = None
     for key in vhs_keys:
-        if key in data:
-            vhs_val_data = data[key]
+        if key in panel:
+            vhs_key = key
+            vhs_val_data = panel.raw(key)
             break
 
     if vhs_val_data is not None:
         processed_markers = True
         try:
-            if isinstance(vhs_val_data, (int, float)):
-                vhs_val = float(vhs_val_data)
-            else:
-                vhs_val = float(vhs_val_data)
+            vhs_val = panel.numeric(vhs_key)
+            if vhs_val is None:
+                raise ValueError(f"Could not convert {vhs_val_data!r}")
             patient_sex = kwargs.get('sexo', 'male').lower() # Default to male if sex not provided
             
             vhs_ref_low, vhs_ref_high = (None, None)
@@ -148,11 +124,7 @@ def analisar_marcadores_inflamatorios(data: Dict[str, Any], **kwargs) -> Dict[st
             else: # Male or unknown
                 vhs_ref_low, vhs_ref_high = REFERENCE_RANGES.get('VHS_Male', (0, 15)) # Default male range
 
-            vhs_criticality, vhs_description = _get_criticality_level("VHS", vhs_val, {
-                'critical': [100, float('inf')],
-                'significant': [(50, 100)],
-                'monitoring': [(vhs_ref_high, 50)] # Above normal, below significant
-            })
+            vhs_criticality, vhs_description = VHS_CRITICALITY.classify(vhs_val)
             interpretations.append(vhs_description)
             if vhs_criticality in ["CRITICAL", "SIGNIFICANT"]:
                 is_critical = True
@@ -174,18 +146,19 @@ def analisar_marcadores_inflamatorios(data: Dict[str, Any], **kwargs) -> Dict[st
     # Procalcitonina (PCT)
     pct_keys = ['Procalcitonina', 'PCT', 'procalcitonina', 'pct']
     pct_val_data = None
+    pct_key = None
     for key in pct_keys:
-        if key in data:
-            pct_val_data = data[key]
+        if key in panel:
+            pct_key = key
+            pct_val_data = panel.raw(key)
             break
     
     if pct_val_data is not None:
         processed_markers = True
         try:
-            if isinstance(pct_val_data, (int, float)):
-                pct_val = float(pct_val_data)
-            else:
-                pct_val = float(pct_val_data)
+            pct_val = panel.numeric(pct_key)
+            if pct_val is None:
+                raise ValueError(f"Could not convert {pct_val_data!r}")
             # Ref: REFERENCE_RANGES['Procalcitonina'] = (0, 0.05) ng/mL
             # Thresholds for interpretation:
             # < 0.05: Normal (low likelihood of bacterial infection)
@@ -196,11 +169,7 @@ def analisar_marcadores_inflamatorios(data: Dict[str, Any], **kwargs) -> Dict[st
 
             interpretation_pct = f"Procalcitonina (PCT): {pct_val} ng/mL. "
             
-            pct_criticality, pct_description = _get_criticality_level("Procalcitonina", pct_val, {
-                'critical': [10.0, float('inf')],
-                'significant': [(2.0, 10.0)],
-                'monitoring': [(0.5, 2.0)]
-            })
+            pct_criticality, pct_description = PCT_CRITICALITY.classify(pct_val)
             interpretations.append(pct_description)
             if pct_criticality in ["CRITICAL", "SIGNIFICANT"]:
                 is_critical = True
@@ -240,18 +209,19 @@ def analisar_marcadores_inflamatorios(data: Dict[str, Any], **kwargs) -> Dict[st
     # Ferritina
     ferritina_keys = ['Ferritina', 'ferritina']
     ferritina_val_data = None
+    ferritina_key = None
     for key in ferritina_keys:
-        if key in data:
-            ferritina_val_data = data[key]
+        if key in panel:
+            ferritina_key = key
+            ferritina_val_data = panel.raw(key)
             break
     
     if ferritina_val_data is not None:
         processed_markers = True
         try:
-            if isinstance(ferritina_val_data, (int, float)):
-                ferritina_val = float(ferritina_val_data)
-            else:
-                ferritina_val = float(ferritina_val_data)
+            ferritina_val = panel.numeric(ferritina_key)
+            if ferritina_val is None:
+                raise ValueError(f"Could not convert {ferritina_val_data!r}")
             patient_sex = kwargs.get('sexo', 'male').lower()
             ferritina_ref_key = 'Ferritina_Male' if patient_sex == 'male' else 'Ferritina_Female'
             
@@ -261,22 +231,7 @@ def analisar_marcadores_inflamatorios(data: Dict[str, Any], **kwargs) -> Dict[st
             
             interpretation_fer = f"Ferritina: {ferritina_val} ng/mL. "
             
-            # Define sex-specific criticality thresholds
-            fer_criticality_thresholds = {}
-            if patient_sex == 'male':
-                fer_criticality_thresholds = {
-                    'critical': [(-float('inf'), 15)], # Severe deficiency
-                    'significant': [(1000, float('inf'))], # Iron overload/Severe inflammation
-                    'monitoring': [(15, 30), (500, 1000)] # Deficiency risk, Inflammation/Iron overload risk
-                }
-            else: # female or default
-                fer_criticality_thresholds = {
-                    'critical': [(-float('inf'), 15)], # Severe deficiency
-                    'significant': [(1000, float('inf'))], # Iron overload/Severe inflammation
-                    'monitoring': [(15, 30), (500, 1000)] # Deficiency risk, Inflammation/Iron overload risk
-                }
-            
-            fer_criticality, fer_description = _get_criticality_level("Ferritina", ferritina_val, fer_criticality_thresholds)
+            fer_criticality, fer_description = FERRITINA_CRITICALITY.get(patient_sex, FERRITINA_CRITICALITY['female']).classify(ferritina_val)
             interpretations.append(fer_description)
             if fer_criticality in ["CRITICAL", "SIGNIFICANT"]:
                 is_critical = True
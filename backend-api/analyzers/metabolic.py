@@ -7,68 +7,50 @@ from typing import Dict, List, Optional
 import logging
 
 from utils.reference_ranges import get_reference_range
+from .result_cache import analyzer_cache
+from .criticality import CriticalityThresholds
+from .panel import normalize_panel
 
 logger = logging.getLogger(__name__)
 
-def _safe_convert_to_float(value_str: Optional[str]) -> Optional[float]:
-    if value_str is None:
-        return None
-    
-    cleaned_value_str = str(value_str).strip()
+# Criticality thresholds, compiled once at import
+GLICOSE_JEJUM_CRITICALITY = CriticalityThresholds("Glicose", {
+    'critical': [(-float('inf'), 54), (400, float('inf'))],
+    'significant': [(54, 70), (250, 400)],
+    'monitoring': [(126, 250)]
+})
 
-    if ',' in cleaned_value_str:
-        cleaned_value_str = cleaned_value_str.replace('.', '').replace(',', '.')
+GLICOSE_CASUAL_CRITICALITY = CriticalityThresholds("Glicose Casual", {
+    'critical': [(-float('inf'), 54), (400, float('inf'))],
+    'significant': [(250, 400)],
+    'monitoring': [(140, 250)]
+})
 
-    try:
-        return float(cleaned_value_str)
-    except ValueError:
-        logger.warning(f"Could not convert '{value_str}' (cleaned: '{cleaned_value_str}') to float.")
-        if cleaned_value_str.startswith('<'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        if cleaned_value_str.startswith('>'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        return None
+HBA1C_CRITICALITY = CriticalityThresholds("HbA1c", {
+    'critical': [(12.0, float('inf'))],
+    'significant': [(9.0, 12.0)],
+    'monitoring': [(6.5, 9.0)]
+})
 
-def _get_criticality_level(param_name, value, thresholds):
-    """
-    Determine the criticality level of a parameter based on stratified thresholds.
-    
-    Args:
-        param_name: Name of the parameter
-        value: The value to evaluate
-        thresholds: Dictionary with 'critical', 'significant', and 'monitoring' thresholds
-        
-    Returns:
-        tuple: (criticality_level, description)
-    """
-    if value is None:
-        return ("UNKNOWN", f"{param_name} value is None")
-    
-    # Check critical thresholds
-    if 'critical' in thresholds:
-        for threshold in thresholds['critical']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-    
-    # Check significant thresholds
-    if 'significant' in thresholds:
-        for threshold in thresholds['significant']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-    
-    # Default to monitoring
-    return ("MONITORING", f"{param_name} MONITORING: {value} - Significant morbidity risk prompt")
+LDL_CRITICALITY = CriticalityThresholds("LDL", {
+    'critical': [(250, float('inf'))],
+    'significant': [(190, 250)],
+    'monitoring': [(160, 190)]
+})
+
+TG_CRITICALITY = CriticalityThresholds("Triglicerídeos", {
+    'critical': [(1000, float('inf'))],
+    'significant': [(500, 1000)],
+    'monitoring': [(200, 500)]
+})
+
+# Values between the patient's reference limit and 'significant' fall through to MONITORING
+TSH_CRITICALITY = CriticalityThresholds("TSH", {
+    'critical': [(-float('inf'), 0.1), (50.0, float('inf'))],
+    'significant': [(0.1, 0.4), (10.0, 50.0)]
+})
 
+@analyzer_cache.memoize("metabolic")
 def analisar_metabolismo(dados: Dict[str, any], idade: Optional[int] = None, sexo: Optional[str] = None, jejum: bool = True) -> Dict[str, any]:
     """
     Analyze metabolic parameters including glucose, HbA1c, uric acid, lipid profile, and thyroid function.
@@ -89,29 +71,16 @@ def analisar_metabolismo(dados: Dict[str, any], idade: Optional[int] = None, sex
     is_critical_flag: bool = False
     details_dict: Dict[str, any] = {}
 
-    processed_dados: Dict[str, Optional[float]] = {}
     params_to_convert = ['Glicose', 'HbA1c', 'AcidoUrico', 'CT', 'LDL', 'HDL', 'TG', 'TSH', 'T4L']
 
-    for key, raw_value in dados.items():
-        details_dict[key] = raw_value
-        if key in params_to_convert:
-            if raw_value is not None:
-                if isinstance(raw_value, (int, float)):
-                    processed_dados[key] = float(raw_value)
-                    details_dict[key] = float(raw_value)
-                else:
-                    value_str = str(raw_value)
-                    converted_value = _safe_convert_to_float(value_str)
-                    if converted_value is not None:
-                        processed_dados[key] = converted_value
-                        details_dict[key] = converted_value
-                    else:
-                        processed_dados[key] = None
-                        logger.info(f"Could not convert metabolic param {key}: '{raw_value}'. It will be ignored for numeric analysis.")
-            else:
-                processed_dados[key] = None
-        else:
-            processed_dados[key] = raw_value
+    panel = normalize_panel(dados)
+    details_dict.update(panel.raw_dict())
+    processed_dados: Dict[str, Optional[float]] = panel.raw_dict()
+    for key in params_to_convert:
+        if key in panel:
+            processed_dados[key] = panel.numeric(key)
+            if processed_dados[key] is not None:
+                details_dict[key] = processed_dados[key]
 
     details_dict['jejum'] = jejum
     if idade: details_dict['idade_paciente'] = idade
@@ -126,17 +95,15 @@ def analisar_metabolismo(dados: Dict[str, any], idade: Optional[int] = None, sex
 
     glicose = processed_dados.get('Glicose')
     hba1c = processed_dados.get('HbA1c')
+    has_diabetes_criteria = False
+    has_prediabetes_criteria = False
 
     if glicose is not None:
         glicose_min_ref, glicose_max_ref = get_reference_range('Glicose')
         details_dict['Glicose_ref_jejum'] = f"{glicose_min_ref}-{glicose_max_ref} mg/dL"
         
         if jejum:
-            glicose_criticality, glicose_description = _get_criticality_level("Glicose", glicose, {
-                'critical': [(-float('inf'), 54), (400, float('inf'))],
-                'significant': [(54, 70), (250, 400)],
-                'monitoring': [(126, 250)]
-            })
+            glicose_criticality, glicose_description = GLICOSE_JEJUM_CRITICALITY.classify(glicose)
             # Note: criticality assessment integrated into detailed interpretation below
             if glicose_criticality in ["CRITICAL", "SIGNIFICANT"]:
                 is_critical_flag = True
@@ -169,11 +136,7 @@ def analisar_metabolismo(dados: Dict[str, any], idade: Optional[int] = None, sex
                 interpretations_list.append(f"Glicose em jejum normal ({glicose} mg/dL).")
         else:
             details_dict['Glicose_ref_casual'] = "<140 mg/dL (ideal), <200 mg/dL (aceitável)"
-            glicose_criticality, glicose_description = _get_criticality_level("Glicose Casual", glicose, {
-                'critical': [(-float('inf'), 54), (400, float('inf'))],
-                'significant': [(250, 400)],
-                'monitoring': [(140, 250)]
-            })
+            glicose_criticality, glicose_description = GLICOSE_CASUAL_CRITICALITY.classify(glicose)
             # Note: criticality assessment integrated into detailed interpretation below
             if glicose_criticality in ["CRITICAL", "SIGNIFICANT"]:
                 is_critical_flag = True
@@ -202,11 +165,7 @@ def analisar_metabolismo(dados: Dict[str, any], idade: Optional[int] = None, sex
                 interpretations_list.append(f"Glicose casual normal ({glicose} mg/dL).")
     
     if hba1c is not None:
-        hba1c_criticality, hba1c_description = _get_criticality_level("HbA1c", hba1c, {
-            'critical': [(12.0, float('inf'))],
-            'significant': [(9.0, 12.0)],
-            'monitoring': [(6.5, 9.0)]
-        })
+        hba1c_criticality = HBA1C_CRITICALITY.level(hba1c)
         # Note: criticality assessment integrated into detailed interpretation below
         if hba1c_criticality in ["CRITICAL", "SIGNIFICANT"]:
             is_critical_flag = True
@@ -285,11 +244,7 @@ def analisar_metabolismo(dados: Dict[str, any], idade: Optional[int] = None, sex
                 interpretations_list.append(f"Colesterol total desejável ({ct} mg/dL).")
         
         if ldl is not None:
-            ldl_criticality, ldl_description = _get_criticality_level("LDL", ldl, {
-                'critical': [(250, float('inf'))],
-                'significant': [(190, 250)],
-                'monitoring': [(160, 190)]
-            })
+            ldl_criticality = LDL_CRITICALITY.level(ldl)
             # Note: criticality assessment integrated into detailed interpretation below
             if ldl_criticality in ["CRITICAL", "SIGNIFICANT"]:
                 is_critical_flag = True
@@ -338,11 +293,7 @@ def analisar_metabolismo(dados: Dict[str, any], idade: Optional[int] = None, sex
                 interpretations_list.append(f"HDL-colesterol normal ({hdl} mg/dL).")
         
         if tg is not None:
-            tg_criticality, tg_description = _get_criticality_level("Triglicerídeos", tg, {
-                'critical': [(1000, float('inf'))],
-                'significant': [(500, 1000)],
-                'monitoring': [(200, 500)]
-            })
+            tg_criticality = TG_CRITICALITY.level(tg)
             # Note: criticality assessment integrated into detailed interpretation below
             if tg_criticality in ["CRITICAL", "SIGNIFICANT"]:
                 is_critical_flag = True
@@ -417,11 +368,7 @@ def analisar_metabolismo(dados: Dict[str, any], idade: Optional[int] = None, sex
             t4l_min_ref, t4l_max_ref = (None, None)
 
         if tsh is not None:
-            tsh_criticality, tsh_description = _get_criticality_level("TSH", tsh, {
-                'critical': [(-float('inf'), 0.1), (50.0, float('inf'))],
-                'significant': [(0.1, 0.4), (10.0, 50.0)],
-                'monitoring': [(tsh_max_ref, 10.0)]
-            })
+            tsh_criticality = TSH_CRITICALITY.level(tsh)
             # Note: criticality assessment integrated into detailed interpretation below
             if tsh_criticality in ["CRITICAL", "SIGNIFICANT"]:
                 is_critical_flag = True
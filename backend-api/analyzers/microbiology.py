@@ -4,31 +4,145 @@ Microbiology analysis module for interpreting culture results and other microbio
 
 import re
 import logging
-from typing import Optional
+from typing import Dict, FrozenSet, Iterable, Tuple
+
+from .result_cache import analyzer_cache
+from .panel import normalize_panel, parse_lab_value as _safe_convert_to_float
 
 logger = logging.getLogger(__name__)
 
-def _safe_convert_to_float(value_str: Optional[str]) -> Optional[float]:
-    if value_str is None:
-        return None
-    
-    cleaned_value_str = str(value_str).strip() # Ensure input is string
 
-    if ',' in cleaned_value_str:
-        cleaned_value_str = cleaned_value_str.replace('.', '').replace(',', '.')
+def _trie_pattern(patterns: Iterable[str]) -> str:
+    """Regex source for a character trie of the patterns, preferring the longest match."""
+    trie: Dict[str, dict] = {}
+    for pattern in patterns:
+        node = trie
+        for ch in pattern:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    return emit(trie)
+
+
+class KeywordMatcher:
+    """
+    Finds every keyword of a fixed set that occurs in a text, in one pass.
+
+    The keywords are compiled once into a trie-shaped regex (an Aho-Corasick
+    style automaton run by the ``re`` engine). A zero-width lookahead visits
+    every start position and takes the longest keyword there; all keywords
+    that are prefixes of it also occur at that position. The result is the
+    same as testing ``keyword in text.lower()`` for each keyword, including
+    overlapping ones such as "staphylococcus" and "staphylococcus aureus".
+    Compilation is deferred to the first ``find`` so importing the module
+    stays cheap.
+    """
+
+    __slots__ = ('keywords', '_regex', '_prefixes')
 
-    try:
-        return float(cleaned_value_str)
-    except ValueError:
-        logger.warning(f"Could not convert '{value_str}' (cleaned: '{cleaned_value_str}') to float.")
-        if cleaned_value_str.startswith('<'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        if cleaned_value_str.startswith('>'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        return None
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(k.lower() for k in keywords if k))
+        self._regex = None
+        self._prefixes: Dict[str, FrozenSet[str]] = {}
 
+    def _compile(self) -> None:
+        self._prefixes = {
+            longest: frozenset(k for k in self.keywords if longest.startswith(k)) for longest in self.keywords
+        }
+        self._regex = re.compile('(?=(' + _trie_pattern(self.keywords) + '))')
+
+    def find(self, text: str) -> FrozenSet[str]:
+        """Set of keywords occurring in ``text`` (case-insensitive)."""
+        if self._regex is None:
+            self._compile()
+        found = set()
+        for match in self._regex.finditer(str(text).lower()):
+            found |= self._prefixes[match.group(1)]
+        return frozenset(found)
+
+
+# Organism-specific interpretations, reported for every pattern found in the culture text
+HEMOCULT_ORGANISMS: Tuple[Tuple[str, str], ...] = (
+    ("staphylococcus aureus", "S. aureus é um patógeno virulento associado a endocardite, osteomielite e infecções de pele/partes moles. Testar sensibilidade à oxacilina/meticilina (MRSA). Segundo as diretrizes IDSA 2019, S. aureus bacteremia requer avaliação transthorácica/ecocardiograma e antibioticoterapia por 14 dias mínimo."),
+    ("staphylococcus epidermidis", "S. epidermidis (Staphylococcus coagulase-negativo) frequentemente representa contaminação, mas pode ser patogênico em pacientes com dispositivos implantados (próteses, cateteres). Segundo as diretrizes IDSA 2019, considerar antibioticoterapia se 2+ hemoculturas positivas ou cateter com suspeita clínica."),
+    ("staphylococcus coagulase negativo", "Staphylococcus coagulase-negativo (ex: S. epidermidis, S. haemolyticus) frequentemente representa contaminação, mas pode ser significativo em pacientes com dispositivos implantados. Segundo as diretrizes IDSA 2019, remover cateter suspeito e considerar antibioticoterapia se clínica compatível."),
+    ("staphylococcus", "Staphylococcus spp. pode indicar infecção relacionada a cateter, endocardite ou bacteremia primária. Diferenciar S. aureus de coagulase-negativos. Segundo as diretrizes IDSA 2019, S. aureus bacteremia requer avaliação ecocardiográfica e antibioticoterapia por 14 dias mínimo."), # General staph
+    ("streptococcus pneumoniae", "S. pneumoniae (pneumococo) é comumente associado a pneumonia, meningite, otite média ou sinusite. Segundo as diretrizes IDSA 2019, pneumococo bacteremia associada a pneumonia requer antibioticoterapia por 7 dias mínimo."),
+    ("streptococcus pyogenes", "S. pyogenes (Estreptococo do Grupo A) causa faringite, escarlatina, impetigo, erisipela, celulite, fasceíte necrosante e febre reumática. Segundo as diretrizes IDSA 2019, considerar antibioticoterapia com penicilina G IV ou clindamicina se toxina envolvida."),
+    ("streptococcus agalactiae", "S. agalactiae (Estreptococo do Grupo B) é importante causa de sepse neonatal, meningite e infecção em gestantes/puérperas. Segundo as diretrizes IDSA 2019, considerar antibioticoterapia com penicilina G ou ampicilina IV."),
+    ("streptococcus viridans", "Streptococcus do grupo viridans pode causar endocardite bacteriana subaguda, especialmente em pacientes com valvopatia preexistente. Segundo as diretrizes IDSA 2019, considerar antibioticoterapia com penicilina G + gentamicina por 4-6 semanas."),
+    ("streptococcus bovis", "Streptococcus bovis (S. gallolyticus) na hemocultura está associado a endocardite e carcinoma colorretal. Segundo as diretrizes IDSA 2019, investigar câncer colorretal em pacientes com S. bovis bacteremia."),
+    ("streptococcus", "Streptococcus spp. (não especificado) pode indicar pneumonia, meningite, endocardite ou infecção de pele/partes moles. Identificação da espécie é importante. Segundo as diretrizes IDSA 2019, antibioticoterapia baseada na suscetibilidade e foco infeccioso."), # General strep
+    ("enterococcus faecalis", "Enterococcus faecalis é uma causa comum de ITU, infecções intra-abdominais, endocardite e bacteremia, especialmente em ambiente hospitalar. Verificar sensibilidade à vancomicina (VRE). Segundo as diretrizes IDSA 2019, enterococo bacteremia requer antibioticoterapia por 14 dias mínimo e avaliação ecocardiográfica."),
+    ("enterococcus faecium", "Enterococcus faecium é frequentemente mais resistente que E. faecalis, incluindo maior prevalência de VRE. Associado a ITU, infecções intra-abdominais, endocardite e bacteremia hospitalar. Segundo as diretrizes IDSA 2019, considerar daptomicina ou linezolida se VRE."),
+    ("enterococcus", "Enterococcus spp. pode indicar infecção intra-abdominal, urinária, endocardite ou relacionada a cateter. Verificar sensibilidade à vancomicina (VRE). Segundo as diretrizes IDSA 2019, enterococo bacteremia requer antibioticoterapia por 14 dias mínimo."), # General entero
+    ("escherichia coli", "E. coli é comumente associada a infecções urinárias, intra-abdominais (apendicite, diverticulite, colangite), e bacteremia/sepse de foco urinário ou abdominal. Segundo as diretrizes IDSA 2019, considerar ceftriaxona ou ciprofloxacino se sensível, ou carbapenem se multirresistente."),
+    ("klebsiella pneumoniae", "Klebsiella pneumoniae é associada a pneumonia (frequentemente em etilistas ou comorbidades), ITU, infecções intra-abdominais e hepáticas (abscesso). Pode ser multirresistente (ESBL, KPC). Segundo as diretrizes IDSA 2019, considerar carbapenem ou polimixina B se KPC, ou ceftriaxona se sensível."),
+    ("klebsiella", "Klebsiella spp. é associada a pneumonia, ITU ou infecções intra-abdominais. Verificar perfil de resistência (ESBL, KPC). Segundo as diretrizes IDSA 2019, antibioticoterapia baseada na sensibilidade e gravidade clínica."), # General Klebsiella
+    ("enterobacter", "Enterobacter spp. são bacilos Gram-negativos frequentemente hospitalares, associados a ITU, pneumonia, infecções de sítio cirúrgico. Podem apresentar resistência induzida a cefalosporinas (AmpC). Segundo as diretrizes IDSA 2019, considerar carbapenem ou cefepime se suspeita de AmpC."),
+    ("proteus mirabilis", "Proteus mirabilis é comum em ITU, especialmente associado a cálculos urinários (produz urease). Segundo as diretrizes IDSA 2019, considerar ceftriaxona ou fluoroquinolona se sensível, ou carbapenem se ESBL."),
+    ("proteus", "Proteus spp. pode causar ITU e infecções de feridas. Notável pelo odor característico e mobilidade em ágar. Segundo as diretrizes IDSA 2019, antibioticoterapia baseada na sensibilidade e foco infeccioso."),
+    ("pseudomonas aeruginosa", "Pseudomonas aeruginosa é frequentemente associada a pneumonia hospitalar/associada à ventilação, infecções em queimados, fibrose cística, otite externa maligna, ou em pacientes neutropênicos. Frequentemente multirresistente. Segundo as diretrizes IDSA 2019, considerar terapia combinada com betalactâmico + aminoglicosídeo ou fluoroquinolona."),
+    ("pseudomonas", "Pseudomonas spp. (não aeruginosa) são menos comuns mas podem causar infecções oportunistas. Segundo as diretrizes IDSA 2019, antibioticoterapia baseada na sensibilidade e gravidade clínica."),
+    ("acinetobacter baumannii", "Acinetobacter baumannii é um patógeno hospitalar importante em UTI, associado a pneumonia, infecções de corrente sanguínea e de feridas. Frequentemente multirresistente. Segundo as diretrizes IDSA 2019, considerar polimixina B, tigeciclina ou terapia combinada."),
+    ("acinetobacter", "Acinetobacter spp. (não baumannii) podem causar infecções oportunistas. Segundo as diretrizes IDSA 2019, antibioticoterapia baseada na sensibilidade e gravidade clínica."),
+    ("stenotrophomonas maltophilia", "Stenotrophomonas maltophilia é um bacilo Gram-negativo ambiental, frequentemente multirresistente, causando infecções em pacientes imunocomprometidos ou com hospitalização prolongada (pneumonia, bacteremia). Segundo as diretrizes IDSA 2019, considerar trimetoprim-sulfametoxazol como primeira opção."),
+    ("candida albicans", "Candida albicans é a espécie mais comum de Candida causando candidemia, infecção urinária, mucocutânea. Geralmente sensível a fluconazol. Segundo as diretrizes IDSA 2019, considerar anfotericina B lipossomal ou equinocandina se grave, ou fluconazol se sensível."),
+    ("candida glabrata", "Candida glabrata pode ser resistente a azólicos (fluconazol). Considerar equinocandinas ou anfotericina B se invasiva. Segundo as diretrizes IDSA 2019, considerar anfotericina B lipossomal ou equinocandina devido à resistência ao fluconazol."),
+    ("candida krusei", "Candida krusei é intrinsecamente resistente a fluconazol. Tratar com equinocandinas ou anfotericina B. Segundo as diretrizes IDSA 2019, considerar anfotericina B lipossomal ou equinocandina devido à resistência intrínseca ao fluconazol."),
+    ("candida parapsilosis", "Candida parapsilosis frequentemente associada a infecções de cateter e em neonatos. Pode ter sensibilidade diminuída a equinocandinas. Segundo as diretrizes IDSA 2019, considerar fluconazol ou anfotericina B se sensível às equinocandinas."),
+    ("candida", "Candidemia é uma infecção fúngica grave com alta mortalidade, considerar remoção de cateteres e terapia antifúngica sistêmica. Identificação da espécie é crucial para escolha do antifúngico. Segundo as diretrizes IDSA 2019, considerar anfotericina B lipossomal ou equinocandina como primeira linha."), # General Candida
+    ("aspergillus", "Aspergilose invasiva pode ocorrer em imunocomprometidos (ex: neutropênicos, transplantados), afetando principalmente pulmões. Diagnóstico difícil, requer combinação de achados. Segundo as diretrizes IDSA 2019, considerar voriconazol IV como primeira linha ou anfotericina B lipossomal."),
+    ("cryptococcus", "Cryptococcus neoformans/gattii pode causar meningite ou pneumonia, especialmente em pacientes com HIV/imunodeficiência celular. Segundo as diretrizes IDSA 2019, considerar anfotericina B + flucitosina por 2 semanas, seguida de fluconazol por 8 semanas."),
+    ("bacillus cereus", "Bacillus cereus: Comum contaminante de hemoculturas, mas pode causar infecções graves (ex: alimentar, em usuários de drogas IV, ou associada a cateter). Segundo as diretrizes IDSA 2019, considerar antibioticoterapia apenas se 2+ hemoculturas positivas e clínica compatível."),
+    ("bacillus", "Bacillus spp. (não anthracis/cereus): Geralmente contaminantes em hemoculturas. Avaliar relevância clínica. Segundo as diretrizes IDSA 2019, geralmente não requer tratamento a menos que 2+ hemoculturas positivas e clínica compatível."),
+    ("corynebacterium jeikeium", "Corynebacterium jeikeium (grupo JK) pode causar infecções graves em imunocomprometidos e portadores de dispositivos, frequentemente multirresistente. Segundo as diretrizes IDSA 2019, considerar vancomicina ou teicoplanina, evitando penicilina devido à resistência."),
+    ("corynebacterium", "Corynebacterium spp. (difteroides, não diphtheriae): Frequentemente contaminantes de hemoculturas. Avaliar significado clínico, especialmente em pacientes com dispositivos ou imunossuprimidos. Segundo as diretrizes IDSA 2019, geralmente não requer tratamento a menos que clínica compatível e 2+ hemoculturas positivas."),
+    ("listeria monocytogenes", "Listeria monocytogenes pode causar bacteremia, meningite, especialmente em gestantes, neonatos, idosos e imunocomprometidos. Segundo as diretrizes IDSA 2019, considerar ampicilina + gentamicina por 14-21 dias para bacteremia e 21 dias para meningite."),
+    ("haemophilus influenzae", "Haemophilus influenzae pode causar epiglotite, meningite (em não vacinados), pneumonia, otite média. Cocobacilo Gram-negativo. Segundo as diretrizes IDSA 2019, considerar ceftriaxona ou cefotaxima por 7-10 dias para meningite e 5-7 dias para bacteremia."),
+    ("neisseria meningitidis", "Neisseria meningitidis (meningococo) causa meningite e meningococemia. Diplococo Gram-negativo. Segundo as diretrizes IDSA 2019, considerar ceftriaxona ou penicilina G por 7 dias para meningite e 5-7 dias para bacteremia. Profilaxia de contato próximo com rifampicina, ciprofloxacino ou ceftriaxona."),
+    ("neisseria gonorrhoeae", "Neisseria gonorrhoeae (gonococo) causa uretrite, cervicite, doença inflamatória pélvica. Diplococo Gram-negativo. Segundo as diretrizes IDSA 2019, considerar ceftriaxona IM + azitromicina oral por dose única. Evitar fluoroquinolonas devido à resistência."),
+    ("clostridium perfringens", "Clostridium perfringens pode causar gangrena gasosa, infecções de partes moles, intoxicação alimentar. Bacilo Gram-positivo anaeróbio. Segundo as diretrizes IDSA 2019, considerar penicilina G IV + clindamicina IV + cirurgia desbridante. Evitar aminoglicosídeos devido à sinergia antagonista."),
+    ("clostridium difficile", "Clostridium difficile (Clostridioides difficile) causa colite pseudomembranosa associada a antibióticos. Segundo as diretrizes IDSA 2019, considerar metronidazol PO para leve, vancomicina PO para moderada e fidaxomicina PO ou vancomicina + metronidazol retal para grave/recorrente."),
+    ("bacteroides fragilis", "Bacteroides fragilis é um anaeróbio Gram-negativo comum na flora intestinal, frequentemente isolado em infecções intra-abdominais polimicrobianas. Segundo as diretrizes IDSA 2019, considerar metronidazol, clindamicina ou carbapenem. Evitar aminopenicilinas devido à resistência beta-lactamase."),
+)
+
+UROCULT_ORGANISMS: Tuple[Tuple[str, str], ...] = (
+    ("escherichia coli", "E. coli é o patógeno mais comum em ITU comunitária."),
+    ("klebsiella", "Klebsiella spp. é frequente em ITU hospitalar ou em pacientes com uso recente de antibióticos."),
+    ("proteus", "Proteus spp. produz urease e pode estar associado a cálculos urinários."),
+    ("enterococcus", "Enterococcus spp. pode indicar ITU complicada ou uso prévio de cefalosporinas."),
+    ("pseudomonas", "Pseudomonas aeruginosa é comum em ITU hospitalar, associada a manipulação do trato urinário ou uso de cateteres."),
+    ("candida", "Candidúria pode representar colonização, especialmente em uso de cateter vesical ou antibióticos de amplo espectro."),
+)
+
+CARBAPENEMS = ("meropenem", "imipenem", "ertapenem", "doripenem")
+
+HEMOCULT_MATCHER = KeywordMatcher(
+    [pattern for pattern, _ in HEMOCULT_ORGANISMS] + [
+        "positivo", "negativo", "contamin", "gram", "gram positivo", "gram-positivo",
+        "gram negativo", "gram-negativo", "cocos", "entero", "escherichia", "klebsiella", "enterobac", "pseudo",
+    ]
+)
+UROCULT_MATCHER = KeywordMatcher([pattern for pattern, _ in UROCULT_ORGANISMS] + ["positivo", "negativo", "ausência"])
+ANTIBIOGRAM_RESISTANCE_MATCHER = KeywordMatcher(CARBAPENEMS + (
+    "oxacilina", "meticilina", "vancomicina", "vancomicin", "ciprofloxacino", "levofloxacino",
+    "ceftriaxona", "cefotaxima", "ceftazidima",
+))
+# Resistance markers in surveillance cultures (MRSA, VRE, KPC)
+SURVEILLANCE_MATCHER = KeywordMatcher([
+    "mrsa", "staphylococcus aureus", "resistente", "vre", "enterococcus", "vancomicina",
+    "kpc", "carbapenemase", "carbapenêmicos", "carbapenens",
+])
+
+@analyzer_cache.memoize("microbiology")
 def analisar_microbiologia(dados):
     """
     Analyze microbiology results including cultures, antibiograms, and serology.
@@ -46,6 +160,9 @@ def analisar_microbiologia(dados):
     is_critical_flag = False
     details_dict = {}
 
+    # Culture and serology results are free text, so work on the raw values
+    dados = normalize_panel(dados).raw_dict()
+
     # Store input data in details
     for key, value in dados.items():
         details_dict[key] = value
@@ -64,13 +181,15 @@ def analisar_microbiologia(dados):
             "details": details_dict
         }
     
-    # Analyze blood culture results
+    # Analyze blood culture results (one keyword pass, shared with the antibiogram checks)
+    hemocult_found = HEMOCULT_MATCHER.find(dados['Hemocult']) if 'Hemocult' in dados else frozenset()
     if 'Hemocult' in dados:
         hemocult = dados['Hemocult']
         details_dict['Hemocult'] = hemocult
         interpretations_list.append(f"Hemocultura: {hemocult}")
+        found = hemocult_found
         
-        if "positivo" in hemocult.lower():
+        if "positivo" in found:
             is_critical_flag = True # Positive blood culture is always critical
             abnormalities_list.append("Hemocultura Positiva")
             # Extract organism name if present
@@ -79,79 +198,36 @@ def analisar_microbiologia(dados):
                 details_dict['organismo_isolado'] = organismo
                 interpretations_list.append(f"Organismo isolado: {organismo}")
             
-            if "gram" in hemocult.lower():
+            if "gram" in found:
                 # Check for Gram-positive (with and without hyphen)
-                if "gram positivo" in hemocult.lower() or "gram-positivo" in hemocult.lower():
+                if "gram positivo" in found or "gram-positivo" in found:
                     interpretations_list.append("Bactéria Gram-positiva isolada - considerar Staphylococcus, Streptococcus ou Enterococcus como possíveis agentes")
                     
-                    if "cocos" in hemocult.lower():
+                    if "cocos" in found:
                         interpretations_list.append("Cocos Gram-positivos são frequentemente associados com endocardite, infecções de cateter ou bacteremia")
                 # Check for Gram-negative (with and without hyphen)
-                elif "gram negativo" in hemocult.lower() or "gram-negativo" in hemocult.lower():
+                elif "gram negativo" in found or "gram-negativo" in found:
                     interpretations_list.append("Bactéria Gram-negativa isolada - considerar Enterobacteriaceae (E. coli, Klebsiella) ou não-fermentadores (Pseudomonas, Acinetobacter)")
                     recommendations_list.append("Bacteremia por Gram-negativos pode evoluir para choque séptico rapidamente - monitorar parâmetros hemodinâmicos")
             
             # Look for specific patterns
-            for pattern, interpretation in [
-                ("staphylococcus aureus", "S. aureus é um patógeno virulento associado a endocardite, osteomielite e infecções de pele/partes moles. Testar sensibilidade à oxacilina/meticilina (MRSA). Segundo as diretrizes IDSA 2019, S. aureus bacteremia requer avaliação transthorácica/ecocardiograma e antibioticoterapia por 14 dias mínimo."),
-                ("staphylococcus epidermidis", "S. epidermidis (Staphylococcus coagulase-negativo) frequentemente representa contaminação, mas pode ser patogênico em pacientes com dispositivos implantados (próteses, cateteres). Segundo as diretrizes IDSA 2019, considerar antibioticoterapia se 2+ hemoculturas positivas ou cateter com suspeita clínica."),
-                ("staphylococcus coagulase negativo", "Staphylococcus coagulase-negativo (ex: S. epidermidis, S. haemolyticus) frequentemente representa contaminação, mas pode ser significativo em pacientes com dispositivos implantados. Segundo as diretrizes IDSA 2019, remover cateter suspeito e considerar antibioticoterapia se clínica compatível."),
-                ("staphylococcus", "Staphylococcus spp. pode indicar infecção relacionada a cateter, endocardite ou bacteremia primária. Diferenciar S. aureus de coagulase-negativos. Segundo as diretrizes IDSA 2019, S. aureus bacteremia requer avaliação ecocardiográfica e antibioticoterapia por 14 dias mínimo."), # General staph
-                ("streptococcus pneumoniae", "S. pneumoniae (pneumococo) é comumente associado a pneumonia, meningite, otite média ou sinusite. Segundo as diretrizes IDSA 2019, pneumococo bacteremia associada a pneumonia requer antibioticoterapia por 7 dias mínimo."),
-                ("streptococcus pyogenes", "S. pyogenes (Estreptococo do Grupo A) causa faringite, escarlatina, impetigo, erisipela, celulite, fasceíte necrosante e febre reumática. Segundo as diretrizes IDSA 2019, considerar antibioticoterapia com penicilina G IV ou clindamicina se toxina envolvida."),
-                ("streptococcus agalactiae", "S. agalactiae (Estreptococo do Grupo B) é importante causa de sepse neonatal, meningite e infecção em gestantes/puérperas. Segundo as diretrizes IDSA 2019, considerar antibioticoterapia com penicilina G ou ampicilina IV."),
-                ("streptococcus viridans", "Streptococcus do grupo viridans pode causar endocardite bacteriana subaguda, especialmente em pacientes com valvopatia preexistente. Segundo as diretrizes IDSA 2019, considerar antibioticoterapia com penicilina G + gentamicina por 4-6 semanas."),
-                ("streptococcus bovis", "Streptococcus bovis (S. gallolyticus) na hemocultura está associado a endocardite e carcinoma colorretal. Segundo as diretrizes IDSA 2019, investigar câncer colorretal em pacientes com S. bovis bacteremia."),
-                ("streptococcus", "Streptococcus spp. (não especificado) pode indicar pneumonia, meningite, endocardite ou infecção de pele/partes moles. Identificação da espécie é importante. Segundo as diretrizes IDSA 2019, antibioticoterapia baseada na suscetibilidade e foco infeccioso."), # General strep
-                ("enterococcus faecalis", "Enterococcus faecalis é uma causa comum de ITU, infecções intra-abdominais, endocardite e bacteremia, especialmente em ambiente hospitalar. Verificar sensibilidade à vancomicina (VRE). Segundo as diretrizes IDSA 2019, enterococo bacteremia requer antibioticoterapia por 14 dias mínimo e avaliação ecocardiográfica."),
-                ("enterococcus faecium", "Enterococcus faecium é frequentemente mais resistente que E. faecalis, incluindo maior prevalência de VRE. Associado a ITU, infecções intra-abdominais, endocardite e bacteremia hospitalar. Segundo as diretrizes IDSA 2019, considerar daptomicina ou linezolida se VRE."),
-                ("enterococcus", "Enterococcus spp. pode indicar infecção intra-abdominal, urinária, endocardite ou relacionada a cateter. Verificar sensibilidade à vancomicina (VRE). Segundo as diretrizes IDSA 2019, enterococo bacteremia requer antibioticoterapia por 14 dias mínimo."), # General entero
-                ("escherichia coli", "E. coli é comumente associada a infecções urinárias, intra-abdominais (apendicite, diverticulite, colangite), e bacteremia/sepse de foco urinário ou abdominal. Segundo as diretrizes IDSA 2019, considerar ceftriaxona ou ciprofloxacino se sensível, ou carbapenem se multirresistente."),
-                ("klebsiella pneumoniae", "Klebsiella pneumoniae é associada a pneumonia (frequentemente em etilistas ou comorbidades), ITU, infecções intra-abdominais e hepáticas (abscesso). Pode ser multirresistente (ESBL, KPC). Segundo as diretrizes IDSA 2019, considerar carbapenem ou polimixina B se KPC, ou ceftriaxona se sensível."),
-                ("klebsiella", "Klebsiella spp. é associada a pneumonia, ITU ou infecções intra-abdominais. Verificar perfil de resistência (ESBL, KPC). Segundo as diretrizes IDSA 2019, antibioticoterapia baseada na sensibilidade e gravidade clínica."), # General Klebsiella
-                ("enterobacter", "Enterobacter spp. são bacilos Gram-negativos frequentemente hospitalares, associados a ITU, pneumonia, infecções de sítio cirúrgico. Podem apresentar resistência induzida a cefalosporinas (AmpC). Segundo as diretrizes IDSA 2019, considerar carbapenem ou cefepime se suspeita de AmpC."),
-                ("proteus mirabilis", "Proteus mirabilis é comum em ITU, especialmente associado a cálculos urinários (produz urease). Segundo as diretrizes IDSA 2019, considerar ceftriaxona ou fluoroquinolona se sensível, ou carbapenem se ESBL."),
-                ("proteus", "Proteus spp. pode causar ITU e infecções de feridas. Notável pelo odor característico e mobilidade em ágar. Segundo as diretrizes IDSA 2019, antibioticoterapia baseada na sensibilidade e foco infeccioso."),
-                ("pseudomonas aeruginosa", "Pseudomonas aeruginosa é frequentemente associada a pneumonia hospitalar/associada à ventilação, infecções em queimados, fibrose cística, otite externa maligna, ou em pacientes neutropênicos. Frequentemente multirresistente. Segundo as diretrizes IDSA 2019, considerar terapia combinada com betalactâmico + aminoglicosídeo ou fluoroquinolona."),
-                ("pseudomonas", "Pseudomonas spp. (não aeruginosa) são menos comuns mas podem causar infecções oportunistas. Segundo as diretrizes IDSA 2019, antibioticoterapia baseada na sensibilidade e gravidade clínica."),
-                ("acinetobacter baumannii", "Acinetobacter baumannii é um patógeno hospitalar importante em UTI, associado a pneumonia, infecções de corrente sanguínea e de feridas. Frequentemente multirresistente. Segundo as diretrizes IDSA 2019, considerar polimixina B, tigeciclina ou terapia combinada."),
-                ("acinetobacter", "Acinetobacter spp. (não baumannii) podem causar infecções oportunistas. Segundo as diretrizes IDSA 2019, antibioticoterapia baseada na sensibilidade e gravidade clínica."),
-                ("stenotrophomonas maltophilia", "Stenotrophomonas maltophilia é um bacilo Gram-negativo ambiental, frequentemente multirresistente, causando infecções em pacientes imunocomprometidos ou com hospitalização prolongada (pneumonia, bacteremia). Segundo as diretrizes IDSA 2019, considerar trimetoprim-sulfametoxazol como primeira opção."),
-                ("candida albicans", "Candida albicans é a espécie mais comum de Candida causando candidemia, infecção urinária, mucocutânea. Geralmente sensível a fluconazol. Segundo as diretrizes IDSA 2019, considerar anfotericina B lipossomal ou equinocandina se grave, ou fluconazol se sensível."),
-                ("candida glabrata", "Candida glabrata pode ser resistente a azólicos (fluconazol). Considerar equinocandinas ou anfotericina B se invasiva. Segundo as diretrizes IDSA 2019, considerar anfotericina B lipossomal ou equinocandina devido à resistência ao fluconazol."),
-                ("candida krusei", "Candida krusei é intrinsecamente resistente a fluconazol. Tratar com equinocandinas ou anfotericina B. Segundo as diretrizes IDSA 2019, considerar anfotericina B lipossomal ou equinocandina devido à resistência intrínseca ao fluconazol."),
-                ("candida parapsilosis", "Candida parapsilosis frequentemente associada a infecções de cateter e em neonatos. Pode ter sensibilidade diminuída a equinocandinas. Segundo as diretrizes IDSA 2019, considerar fluconazol ou anfotericina B se sensível às equinocandinas."),
-                ("candida", "Candidemia é uma infecção fúngica grave com alta mortalidade, considerar remoção de cateteres e terapia antifúngica sistêmica. Identificação da espécie é crucial para escolha do antifúngico. Segundo as diretrizes IDSA 2019, considerar anfotericina B lipossomal ou equinocandina como primeira linha."), # General Candida
-                ("aspergillus", "Aspergilose invasiva pode ocorrer em imunocomprometidos (ex: neutropênicos, transplantados), afetando principalmente pulmões. Diagnóstico difícil, requer combinação de achados. Segundo as diretrizes IDSA 2019, considerar voriconazol IV como primeira linha ou anfotericina B lipossomal."),
-                ("cryptococcus", "Cryptococcus neoformans/gattii pode causar meningite ou pneumonia, especialmente em pacientes com HIV/imunodeficiência celular. Segundo as diretrizes IDSA 2019, considerar anfotericina B + flucitosina por 2 semanas, seguida de fluconazol por 8 semanas."),
-                ("bacillus cereus", "Bacillus cereus: Comum contaminante de hemoculturas, mas pode causar infecções graves (ex: alimentar, em usuários de drogas IV, ou associada a cateter). Segundo as diretrizes IDSA 2019, considerar antibioticoterapia apenas se 2+ hemoculturas positivas e clínica compatível."),
-                ("bacillus", "Bacillus spp. (não anthracis/cereus): Geralmente contaminantes em hemoculturas. Avaliar relevância clínica. Segundo as diretrizes IDSA 2019, geralmente não requer tratamento a menos que 2+ hemoculturas positivas e clínica compatível."),
-                ("corynebacterium jeikeium", "Corynebacterium jeikeium (grupo JK) pode causar infecções graves em imunocomprometidos e portadores de dispositivos, frequentemente multirresistente. Segundo as diretrizes IDSA 2019, considerar vancomicina ou teicoplanina, evitando penicilina devido à resistência."),
-                ("corynebacterium", "Corynebacterium spp. (difteroides, não diphtheriae): Frequentemente contaminantes de hemoculturas. Avaliar significado clínico, especialmente em pacientes com dispositivos ou imunossuprimidos. Segundo as diretrizes IDSA 2019, geralmente não requer tratamento a menos que clínica compatível e 2+ hemoculturas positivas."),
-                ("listeria monocytogenes", "Listeria monocytogenes pode causar bacteremia, meningite, especialmente em gestantes, neonatos, idosos e imunocomprometidos. Segundo as diretrizes IDSA 2019, considerar ampicilina + gentamicina por 14-21 dias para bacteremia e 21 dias para meningite."),
-                ("haemophilus influenzae", "Haemophilus influenzae pode causar epiglotite, meningite (em não vacinados), pneumonia, otite média. Cocobacilo Gram-negativo. Segundo as diretrizes IDSA 2019, considerar ceftriaxona ou cefotaxima por 7-10 dias para meningite e 5-7 dias para bacteremia."),
-                ("neisseria meningitidis", "Neisseria meningitidis (meningococo) causa meningite e meningococemia. Diplococo Gram-negativo. Segundo as diretrizes IDSA 2019, considerar ceftriaxona ou penicilina G por 7 dias para meningite e 5-7 dias para bacteremia. Profilaxia de contato próximo com rifampicina, ciprofloxacino ou ceftriaxona."),
-                ("neisseria gonorrhoeae", "Neisseria gonorrhoeae (gonococo) causa uretrite, cervicite, doença inflamatória pélvica. Diplococo Gram-negativo. Segundo as diretrizes IDSA 2019, considerar ceftriaxona IM + azitromicina oral por dose única. Evitar fluoroquinolonas devido à resistência."),
-                ("clostridium perfringens", "Clostridium perfringens pode causar gangrena gasosa, infecções de partes moles, intoxicação alimentar. Bacilo Gram-positivo anaeróbio. Segundo as diretrizes IDSA 2019, considerar penicilina G IV + clindamicina IV + cirurgia desbridante. Evitar aminoglicosídeos devido à sinergia antagonista."),
-                ("clostridium difficile", "Clostridium difficile (Clostridioides difficile) causa colite pseudomembranosa associada a antibióticos. Segundo as diretrizes IDSA 2019, considerar metronidazol PO para leve, vancomicina PO para moderada e fidaxomicina PO ou vancomicina + metronidazol retal para grave/recorrente."),
-                ("bacteroides fragilis", "Bacteroides fragilis é um anaeróbio Gram-negativo comum na flora intestinal, frequentemente isolado em infecções intra-abdominais polimicrobianas. Segundo as diretrizes IDSA 2019, considerar metronidazol, clindamicina ou carbapenem. Evitar aminopenicilinas devido à resistência beta-lactamase."),
-            ]:
-                if pattern in hemocult.lower():
+            for pattern, interpretation in HEMOCULT_ORGANISMS:
+                if pattern in found:
                     interpretations_list.append(interpretation)
             
             recommendations_list.append("Recomendação: revisar fontes potenciais de infecção, avaliar duração de antibioticoterapia baseada no patógeno e foco infeccioso. Segundo as diretrizes IDSA 2019, antibioticoterapia baseada na suscetibilidade, gravidade clínica e comorbidades do paciente. Considerar remoção de dispositivos suspeitos e avaliação para terapia combinada em infecções graves.")
-        elif "negativo" in hemocult.lower():
+        elif "negativo" in found:
             interpretations_list.append("Ausência de crescimento bacteriano")
             if "48h" in hemocult or "72h" in hemocult:
                 interpretations_list.append("Resultado após período de incubação adequado")
             else:
                 interpretations_list.append("Verificar tempo de incubação e número de amostras coletadas")
-        elif "contamin" in hemocult.lower():
+        elif "contamin" in found:
             interpretations_list.append("Provável contaminação - considerar repetir coleta com técnica adequada")
             abnormalities_list.append("Hemocultura Provavelmente Contaminada")
     
     # Analyze antibiogram if available
-    if 'HemocultAntibiograma' in dados and 'Hemocult' in dados and "positivo" in dados['Hemocult'].lower():
+    if 'HemocultAntibiograma' in dados and "positivo" in hemocult_found:
         antibiograma = dados['HemocultAntibiograma']
         details_dict['HemocultAntibiograma'] = antibiograma
         interpretations_list.append("Antibiograma:")
@@ -177,28 +253,28 @@ def analisar_microbiologia(dados):
             details_dict['resistente_a'] = resistente
         
         # Check for common resistance patterns
-        if any(ab in ' '.join(resistente).lower() for ab in ["oxacilina", "meticilina"]):
+        resistance_found = ANTIBIOGRAM_RESISTANCE_MATCHER.find(' '.join(resistente))
+        if not resistance_found.isdisjoint(("oxacilina", "meticilina")):
             interpretations_list.append("Perfil sugestivo de Staphylococcus resistente à meticilina (MRSA)")
             recommendations_list.append("Para MRSA, considerar vancomicina, daptomicina ou linezolida.")
             abnormalities_list.append("Resistência a Oxacilina (MRSA)")
         
-        if any(ab in ' '.join(resistente).lower() for ab in ["vancomicina", "vancomicin"]) and "entero" in dados['Hemocult'].lower():
+        if "vancomicin" in resistance_found and "entero" in hemocult_found:
             interpretations_list.append("Possível Enterococcus resistente à vancomicina (VRE)")
             recommendations_list.append("Para VRE, considerar linezolida ou daptomicina.")
             abnormalities_list.append("Resistência a Vancomicina (VRE)")
         
-        carbapenems = ["meropenem", "imipenem", "ertapenem", "doripenem"]
-        if any(carb in ' '.join(resistente).lower() for carb in carbapenems) and any(gram_neg in dados['Hemocult'].lower() for gram_neg in ["escherichia", "klebsiella", "enterobac"]):
+        if not resistance_found.isdisjoint(CARBAPENEMS) and not hemocult_found.isdisjoint(("escherichia", "klebsiella", "enterobac")):
             interpretations_list.append("Possível Enterobacteriaceae produtora de carbapenemase (KPC)")
             recommendations_list.append("Para KPC, opções terapêuticas são limitadas. Considerar polimixina, tigeciclina ou ceftazidima-avibactam.")
             abnormalities_list.append("Resistência a Carbapenêmicos (KPC)")
         
-        if any(ab in ' '.join(resistente).lower() for ab in ["ciprofloxacino", "levofloxacino"]) and "pseudo" in dados['Hemocult'].lower():
+        if not resistance_found.isdisjoint(("ciprofloxacino", "levofloxacino")) and "pseudo" in hemocult_found:
             interpretations_list.append("Pseudomonas resistente a fluoroquinolonas")
             recommendations_list.append("Para Pseudomonas resistente a fluoroquinolonas, considerar terapia combinada baseada no antibiograma.")
             abnormalities_list.append("Resistência a Fluoroquinolonas (Pseudomonas)")
         
-        if any(ab in ' '.join(resistente).lower() for ab in ["ceftriaxona", "cefotaxima", "ceftazidima"]) and any(gram_neg in dados['Hemocult'].lower() for gram_neg in ["escherichia", "klebsiella"]):
+        if not resistance_found.isdisjoint(("ceftriaxona", "cefotaxima", "ceftazidima")) and not hemocult_found.isdisjoint(("escherichia", "klebsiella")):
             interpretations_list.append("Possível Enterobacteriaceae produtora de beta-lactamase de espectro estendido (ESBL)")
             recommendations_list.append("Para ESBL, evitar cefalosporinas. Considerar carbapenêmicos.")
             abnormalities_list.append("Resistência a Cefalosporinas de 3a Geração (ESBL)")
@@ -208,14 +284,15 @@ def analisar_microbiologia(dados):
         urocult = dados['Urocult']
         details_dict['Urocult'] = urocult
         interpretations_list.append(f"Urocultura: {urocult}")
+        found = UROCULT_MATCHER.find(urocult)
         
-        if "positivo" in urocult.lower() or ">" in urocult or "UFC" in urocult:
+        if "positivo" in found or ">" in urocult or "UFC" in urocult:
             abnormalities_list.append("Urocultura Positiva")
             # Try to extract colony count
             count = None
             colony_count_match = re.search(r'>?\s*(\d[\d.,]*)\s*x?\s*10\^(\d+)', urocult) or re.search(r'>\s*([\d,.]+)', urocult)
             if colony_count_match:
-                if colony_count_match.group(2) is not None:
+                if colony_count_match.lastindex == 2:  # "N x 10^E" form
                     base_str = colony_count_match.group(1)
                     exp_str = colony_count_match.group(2)
                     if isinstance(base_str, (int, float)):
@@ -246,19 +323,12 @@ def analisar_microbiologia(dados):
                     interpretations_list.append(f"Crescimento de baixa contagem (<10^4 UFC/mL) - avaliar contexto clínico")
             
             # Look for common pathogens
-            for pattern, interpretation in [
-                ("escherichia coli", "E. coli é o patógeno mais comum em ITU comunitária."),
-                ("klebsiella", "Klebsiella spp. é frequente em ITU hospitalar ou em pacientes com uso recente de antibióticos."),
-                ("proteus", "Proteus spp. produz urease e pode estar associado a cálculos urinários."),
-                ("enterococcus", "Enterococcus spp. pode indicar ITU complicada ou uso prévio de cefalosporinas."),
-                ("pseudomonas", "Pseudomonas aeruginosa é comum em ITU hospitalar, associada a manipulação do trato urinário ou uso de cateteres."),
-                ("candida", "Candidúria pode representar colonização, especialmente em uso de cateter vesical ou antibióticos de amplo espectro."),
-            ]:
-                if pattern in urocult.lower():
+            for pattern, interpretation in UROCULT_ORGANISMS:
+                if pattern in found:
                     interpretations_list.append(interpretation)
             
             recommendations_list.append("Adequar antibioticoterapia conforme antibiograma e considerar duração baseada na classificação (ITU complicada vs não-complicada).")
-        elif "negativo" in urocult.lower() or "ausência" in urocult.lower():
+        elif "negativo" in found or "ausência" in found:
             interpretations_list.append("Ausência de crescimento bacteriano significativo.")
             recommendations_list.append("Em paciente com sintomas urinários e urocultura negativa, considerar: antibioticoterapia prévia, patógenos fastidiosos, uretrite/cistite não-infecciosa.")
     
@@ -267,8 +337,9 @@ def analisar_microbiologia(dados):
         nasal = dados['CultVigilNasal']
         details_dict['CultVigilNasal'] = nasal
         interpretations_list.append(f"Cultura de vigilância nasal: {nasal}")
+        found = SURVEILLANCE_MATCHER.find(nasal)
         
-        if "mrsa" in nasal.lower() or ("staphylococcus aureus" in nasal.lower() and "resistente" in nasal.lower()):
+        if "mrsa" in found or ("staphylococcus aureus" in found and "resistente" in found):
             interpretations_list.append("Colonização por MRSA detectada.")
             recommendations_list.append("Considerar precaução de contato e possível descolonização em situações específicas (ex: pré-operatório de cirurgia cardíaca).")
             abnormalities_list.append("Colonização por MRSA (Nasal)")
@@ -277,13 +348,14 @@ def analisar_microbiologia(dados):
         retal = dados['CultVigilRetal']
         details_dict['CultVigilRetal'] = retal
         interpretations_list.append(f"Cultura de vigilância retal: {retal}")
+        found = SURVEILLANCE_MATCHER.find(retal)
         
-        if "vre" in retal.lower() or ("enterococcus" in retal.lower() and "resistente" in retal.lower() and "vancomicina" in retal.lower()):
+        if "vre" in found or ("enterococcus" in found and "resistente" in found and "vancomicina" in found):
             interpretations_list.append("Colonização por VRE detectada.")
             recommendations_list.append("Implementar precaução de contato.")
             abnormalities_list.append("Colonização por VRE (Retal)")
         
-        if any(pattern in retal.lower() for pattern in ["kpc", "carbapenemase", "carbapenêmicos", "carbapenens"]):
+        if not found.isdisjoint(("kpc", "carbapenemase", "carbapenêmicos", "carbapenens")):
             interpretations_list.append("Colonização por Enterobacteriaceae produtora de carbapenemase detectada.")
             recommendations_list.append("Implementar precaução de contato.")
             abnormalities_list.append("Colonização por KPC (Retal)")
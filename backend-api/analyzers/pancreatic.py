@@ -6,68 +6,13 @@ from typing import Dict, List, Optional
 import logging
 
 from utils.reference_ranges import REFERENCE_RANGES
+from .result_cache import analyzer_cache
+from .criticality import compile_thresholds
+from .panel import normalize_panel
 
 logger = logging.getLogger(__name__)
 
-def _safe_convert_to_float(value_str: Optional[str]) -> Optional[float]:
-    if value_str is None:
-        return None
-    
-    cleaned_value_str = str(value_str).strip() # Ensure input is string
-
-    if ',' in cleaned_value_str:
-        cleaned_value_str = cleaned_value_str.replace('.', '').replace(',', '.')
-
-    try:
-        return float(cleaned_value_str)
-    except ValueError:
-        logger.warning(f"Could not convert '{value_str}' (cleaned: '{cleaned_value_str}') to float.")
-        if cleaned_value_str.startswith('<'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        if cleaned_value_str.startswith('>'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        return None
-
-def _get_criticality_level(param_name, value, thresholds):
-    """
-    Determine the criticality level of a parameter based on stratified thresholds.
-    
-    Args:
-        param_name: Name of the parameter
-        value: The value to evaluate
-        thresholds: Dictionary with 'critical', 'significant', and 'monitoring' thresholds
-        
-    Returns:
-        tuple: (criticality_level, description)
-    """
-    if value is None:
-        return ("UNKNOWN", f"{param_name} value is None")
-    
-    # Check critical thresholds
-    if 'critical' in thresholds:
-        for threshold in thresholds['critical']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-    
-    # Check significant thresholds
-    if 'significant' in thresholds:
-        for threshold in thresholds['significant']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-    
-    # Default to monitoring
-    return ("MONITORING", f"{param_name} MONITORING: {value} - Significant morbidity risk prompt")
-
+@analyzer_cache.memoize("pancreatic")
 def analisar_funcao_pancreatica(dados: Dict[str, any]) -> Dict[str, any]:
     """
     Analyze pancreatic enzyme tests (Amilase, Lipase) and provide clinical interpretation.
@@ -85,25 +30,9 @@ def analisar_funcao_pancreatica(dados: Dict[str, any]) -> Dict[str, any]:
     is_critical_flag: bool = False
     details_dict: Dict[str, any] = {}
 
-    processed_dados: Dict[str, Optional[float]] = {}
-    for key, value in dados.items():
-        details_dict[key] = value 
-        if value is not None:
-            if isinstance(value, (int, float)):
-                processed_dados[key] = float(value)
-                details_dict[key] = float(value) # Keep details_dict updated
-            else:
-                value_str = str(value)
-                converted_value = _safe_convert_to_float(value_str)
-                if converted_value is not None:
-                    processed_dados[key] = converted_value
-                    details_dict[key] = converted_value # Keep details_dict updated
-                else:
-                    processed_dados[key] = None
-                    logger.info(f"Could not convert pancreatic param {key}: '{value}'. It will be ignored.")
-        else:
-            processed_dados[key] = None
-            logger.info(f"Pancreatic param {key} is None. It will be ignored.")
+    panel = normalize_panel(dados)
+    details_dict.update(panel.details_dict())
+    processed_dados: Dict[str, Optional[float]] = panel.numeric_dict()
 
     valid_keys = ['Amilase', 'Lipase']
     if not any(k in processed_dados and processed_dados[k] is not None for k in valid_keys):
@@ -128,11 +57,11 @@ def analisar_funcao_pancreatica(dados: Dict[str, any]) -> Dict[str, any]:
         interpretations_list.append("Faixa de referência para Lipase não encontrada.")
 
     if amilase is not None and amilase_ref_max is not None and amilase_ref_min is not None:
-        amilase_criticality, amilase_description = _get_criticality_level("Amilase", amilase, {
+        amilase_criticality, amilase_description = compile_thresholds("Amilase", {
             'critical': [3 * amilase_ref_max, float('inf')],
             'significant': [(amilase_ref_max, 3 * amilase_ref_max)],
             'monitoring': [(-float('inf'), amilase_ref_max)]
-        })
+        }).classify(amilase)
         interpretations_list.append(amilase_description)
         if amilase_criticality in ["CRITICAL", "SIGNIFICANT"]:
             is_critical_flag = True
@@ -164,11 +93,11 @@ def analisar_funcao_pancreatica(dados: Dict[str, any]) -> Dict[str, any]:
 
 
     if lipase is not None and lipase_ref_max is not None and lipase_ref_min is not None:
-        lipase_criticality, lipase_description = _get_criticality_level("Lipase", lipase, {
+        lipase_criticality, lipase_description = compile_thresholds("Lipase", {
             'critical': [3 * lipase_ref_max, float('inf')],
             'significant': [(lipase_ref_max, 3 * lipase_ref_max)],
             'monitoring': [(-float('inf'), lipase_ref_max)]
-        })
+        }).classify(lipase)
         interpretations_list.append(lipase_description)
         if lipase_criticality in ["CRITICAL", "SIGNIFICANT"]:
             is_critical_flag = True
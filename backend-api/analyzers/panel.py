@@ -0,0 +1,307 @@
+"""
+Single-pass lab panel normalization shared by all analyzers.
+
+Every analyzer used to carry its own copy of ``_safe_convert_to_float`` and
+re-parse the whole input dict on each call. ``PanelNormalizer`` parses a panel
+once into a compact ``LabPanel`` record: raw values and parsed floats live in
+parallel slots, and recognised tests are also addressable by a canonical test
+id (the ``REFERENCE_RANGES`` naming, e.g. ``'Na+'``, ``'Creat'``, ``'Hb'``).
+A ``LabPanel`` can be handed to any analyzer in place of the original dict, so
+a caller running several analyzers over the same panel pays for parsing once.
+"""
+
+import logging
+import math
+from array import array
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+_NAN = float("nan")
+
+
+def parse_lab_value(value: Any) -> Optional[float]:
+    """
+    Convert a raw lab value into a float.
+
+    Accepts numbers, decimal-comma strings ("3,5", "1.234,56") and censored
+    results ("<0.1", ">100"), which are mapped to their bound.
+
+    Args:
+        value: Raw value as received from the lab system or the user.
+
+    Returns:
+        float: The parsed value, or None if it cannot be interpreted.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    cleaned_value_str = str(value).strip()
+
+    if ',' in cleaned_value_str:
+        cleaned_value_str = cleaned_value_str.replace('.', '').replace(',', '.')
+
+    try:
+        return float(cleaned_value_str)
+    except ValueError:
+        if cleaned_value_str[:1] in ('<', '>'):
+            try:
+                return float(cleaned_value_str[1:])
+            except ValueError:
+                pass
+        logger.debug(f"Could not convert '{value}' (cleaned: '{cleaned_value_str}') to float.")
+        return None
+
+
+# Canonical test ids, following the keys used in utils.reference_ranges.
+CANONICAL_TESTS: Tuple[str, ...] = (
+    # Hematology
+    'Hb', 'Ht', 'RBC', 'VCM', 'HCM', 'CHCM', 'RDW', 'Leuco', 'Plaq', 'Retic',
+    # Electrolytes
+    'Na+', 'K+', 'Cl-', 'Ca+', 'iCa', 'Mg+', 'P', 'Albumina',
+    # Blood gases
+    'pH', 'pCO2', 'pO2', 'HCO3-', 'BE', 'SpO2', 'FiO2', 'Lactato',
+    # Renal
+    'Creat', 'Ur', 'TFG', 'AcidoUrico',
+    # Hepatic / pancreatic
+    'TGO', 'TGP', 'GGT', 'FA', 'BT', 'BD', 'BI', 'Amilase', 'Lipase',
+    # Metabolic
+    'Glicose', 'HbA1c', 'CT', 'LDL', 'HDL', 'TG',
+    # Thyroid
+    'TSH', 'T4L', 'T3L',
+    # Cardiac
+    'TropoI', 'TropoT', 'CK', 'CKMB', 'BNP', 'NTproBNP', 'LDH',
+    # Coagulation
+    'RNI', 'TTPA', 'TP', 'Fibrinogenio', 'DDimero',
+    # Inflammatory
+    'PCR', 'VHS', 'Procalcitonina', 'Ferritina', 'IL6',
+)
+
+TEST_INDEX: Dict[str, int] = {test_id: i for i, test_id in enumerate(CANONICAL_TESTS)}
+
+# Lower-cased input names mapped to their canonical test id. Canonical ids map
+# to themselves; the entries below cover the Portuguese/English spellings seen
+# in lab exports and API payloads.
+TEST_ALIASES: Dict[str, str] = {test_id.lower(): test_id for test_id in CANONICAL_TESTS}
+TEST_ALIASES.update({
+    'hemoglobina': 'Hb', 'hemoglobin': 'Hb', 'hgb': 'Hb',
+    'hematocrito': 'Ht', 'hematócrito': 'Ht', 'hematocrit': 'Ht', 'hct': 'Ht',
+    'hemacias': 'RBC', 'hemácias': 'RBC', 'eritrocitos': 'RBC',
+    'leucocitos': 'Leuco', 'leucócitos': 'Leuco', 'leukocytes': 'Leuco', 'wbc': 'Leuco',
+    'plaquetas': 'Plaq', 'platelets': 'Plaq', 'plt': 'Plaq',
+    'reticulocitos': 'Retic', 'reticulócitos': 'Retic',
+    'na': 'Na+', 'sodio': 'Na+', 'sódio': 'Na+', 'sodium': 'Na+',
+    'k': 'K+', 'potassio': 'K+', 'potássio': 'K+', 'potassium': 'K+',
+    'cl': 'Cl-', 'cloro': 'Cl-', 'cloreto': 'Cl-', 'chloride': 'Cl-',
+    'ca': 'Ca+', 'calcio': 'Ca+', 'cálcio': 'Ca+', 'calcium': 'Ca+',
+    'ica': 'iCa', 'ca_ionico': 'iCa', 'calcio ionico': 'iCa', 'cálcio iônico': 'iCa',
+    'mg': 'Mg+', 'magnesio': 'Mg+', 'magnésio': 'Mg+', 'magnesium': 'Mg+',
+    'fosforo': 'P', 'fósforo': 'P', 'phosphorus': 'P',
+    'albumin': 'Albumina',
+    'hco3': 'HCO3-', 'bicarbonato': 'HCO3-', 'bicarbonate': 'HCO3-',
+    'pao2': 'pO2', 'paco2': 'pCO2',
+    'lactate': 'Lactato', 'lactato arterial': 'Lactato',
+    'creatinina': 'Creat', 'creatinine': 'Creat', 'cr': 'Creat',
+    'ureia': 'Ur', 'uréia': 'Ur', 'urea': 'Ur', 'bun': 'Ur',
+    'acido urico': 'AcidoUrico', 'ácido úrico': 'AcidoUrico',
+    'ast': 'TGO', 'alt': 'TGP',
+    'fosfatase alcalina': 'FA', 'alp': 'FA',
+    'bilirrubina total': 'BT', 'bilirrubina': 'BT',
+    'bilirrubina direta': 'BD', 'bilirrubina indireta': 'BI',
+    'glicemia': 'Glicose', 'glucose': 'Glicose',
+    'colesterol total': 'CT', 'triglicerides': 'TG', 'triglicerídeos': 'TG',
+    'troponina': 'TropoI', 'troponina i': 'TropoI', 'troponina t': 'TropoT',
+    'cpk': 'CK', 'ck-mb': 'CKMB', 'nt-probnp': 'NTproBNP',
+    'inr': 'RNI', 'ttpa': 'TTPA', 'tpa': 'TTPA', 'aptt': 'TTPA',
+    'fibrinogênio': 'Fibrinogenio', 'fibrinogen': 'Fibrinogenio',
+    'd-dimero': 'DDimero', 'd-dímero': 'DDimero', 'd-dimer': 'DDimero', 'ddimer': 'DDimero',
+    'crp': 'PCR', 'pct': 'Procalcitonina', 'procalcitonin': 'Procalcitonina',
+    'esr': 'VHS', 'il-6': 'IL6',
+})
+
+
+def canonical_test_id(name: Any) -> Optional[str]:
+    """
+    Resolve an input test name to its canonical test id.
+
+    Args:
+        name: Test name as it appears in the input panel.
+
+    Returns:
+        str: Canonical id (see ``CANONICAL_TESTS``), or None if unknown.
+    """
+    if not isinstance(name, str):
+        return None
+    return TEST_ALIASES.get(name.strip().lower())
+
+
+def aliases_for_test(test_id: str) -> Tuple[str, ...]:
+    """
+    Every lower-cased name that resolves to ``test_id`` (for matching stored
+    test names in a query).
+    """
+    aliases = _ALIASES_BY_TEST.get(test_id)
+    if aliases is None:
+        aliases = tuple(sorted(alias for alias, target in TEST_ALIASES.items() if target == test_id))
+        _ALIASES_BY_TEST[test_id] = aliases
+    return aliases
+
+
+_ALIASES_BY_TEST: Dict[str, Tuple[str, ...]] = {}
+
+
+class LabPanel(Mapping):
+    """
+    Immutable, parsed view of a lab panel.
+
+    Behaves as a read-only mapping over the original keys; item access returns
+    the parsed float when the value is numeric and the raw value otherwise.
+    Parsed values are kept in a float array (NaN for missing/unparseable) and a
+    second array indexed by ``TEST_INDEX`` gives O(1) access by canonical id.
+    """
+
+    __slots__ = ('_keys', '_raw', '_values', '_positions', '_by_test')
+
+    def __init__(self, keys: Tuple[str, ...], raw: Tuple[Any, ...], values: array, by_test: array):
+        self._keys = keys
+        self._raw = raw
+        self._values = values
+        self._positions = {key: i for i, key in enumerate(keys)}
+        self._by_test = by_test
+
+    # Mapping protocol -----------------------------------------------------
+    def __getitem__(self, key: str) -> Any:
+        i = self._positions[key]
+        parsed = self._values[i]
+        return self._raw[i] if math.isnan(parsed) else parsed
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._positions
+
+    def __repr__(self) -> str:
+        return f"LabPanel({dict(self.items())!r})"
+
+    # Typed accessors ------------------------------------------------------
+    def numeric(self, key: str) -> Optional[float]:
+        """Parsed float for an input key, or None if absent/unparseable."""
+        i = self._positions.get(key)
+        if i is None:
+            return None
+        parsed = self._values[i]
+        return None if math.isnan(parsed) else parsed
+
+    def raw(self, key: str, default: Any = None) -> Any:
+        """Original, unparsed value for an input key."""
+        i = self._positions.get(key)
+        return default if i is None else self._raw[i]
+
+    def value(self, test_id: str) -> Optional[float]:
+        """Parsed float for a canonical test id, regardless of the input spelling."""
+        i = TEST_INDEX.get(test_id)
+        if i is None:
+            return None
+        parsed = self._by_test[i]
+        return None if math.isnan(parsed) else parsed
+
+    def numeric_dict(self) -> Dict[str, Optional[float]]:
+        """``{key: float or None}`` for every input key."""
+        return {key: (None if math.isnan(v) else v) for key, v in zip(self._keys, self._values)}
+
+    def details_dict(self) -> Dict[str, Any]:
+        """``{key: float if parseable else raw value}``, the analyzers' ``details`` layout."""
+        return {key: (r if math.isnan(v) else v) for key, r, v in zip(self._keys, self._raw, self._values)}
+
+    @property
+    def invalid(self) -> List[str]:
+        """Keys whose value was present but could not be parsed."""
+        return [key for key, r, v in zip(self._keys, self._raw, self._values) if r is not None and math.isnan(v)]
+
+    def raw_dict(self) -> Dict[str, Any]:
+        """``{key: raw value}``, i.e. the panel as it was received."""
+        return dict(zip(self._keys, self._raw))
+
+    def renamed(self, names: Mapping[str, str]) -> 'LabPanel':
+        """
+        The same panel with some keys renamed (``{old key: new key}``).
+
+        Values are shared, not parsed again; keys missing from ``names``
+        are kept as they are.
+        """
+        keys = tuple(names.get(key, key) for key in self._keys)
+        return LabPanel(keys, self._raw, self._values, self._by_test)
+
+
+class PanelNormalizer:
+    """
+    Parses lab panels into ``LabPanel`` records.
+
+    Accepts the input shapes analyzers receive today: a ``{test: value}`` dict,
+    a list of ``{'test': ..., 'value': ...}`` records, or an existing
+    ``LabPanel`` (returned as-is, so normalization happens once per panel).
+    """
+
+    def normalize(self, dados: Union[Mapping[str, Any], List[Dict[str, Any]], None]) -> LabPanel:
+        """
+        Normalize a lab panel.
+
+        Args:
+            dados: Panel as dict, list of test records or ``LabPanel``.
+
+        Returns:
+            LabPanel: Parsed panel.
+
+        Raises:
+            TypeError: If the input is not one of the supported shapes.
+        """
+        if isinstance(dados, LabPanel):
+            return dados
+        if dados is None:
+            items: List[Tuple[Any, Any]] = []
+        elif isinstance(dados, Mapping):
+            items = list(dados.items())
+        elif isinstance(dados, (list, tuple)):
+            # Repeated tests keep their first position and their last value,
+            # exactly as if the records had been written into a dict
+            items = list({
+                exam['test']: exam.get('value')
+                for exam in dados
+                if isinstance(exam, dict) and 'test' in exam
+            }.items())
+        else:
+            raise TypeError(f"Unsupported lab panel type: {type(dados).__name__}")
+
+        keys = tuple(key for key, _ in items)
+        raw = tuple(value for _, value in items)
+        values = array('d', [_NAN]) * len(items)
+        by_test = array('d', [_NAN]) * len(CANONICAL_TESTS)
+        for i, (key, value) in enumerate(items):
+            parsed = parse_lab_value(value)
+            if parsed is None:
+                continue
+            values[i] = parsed
+            test_id = canonical_test_id(key)
+            if test_id is not None and math.isnan(by_test[TEST_INDEX[test_id]]):
+                by_test[TEST_INDEX[test_id]] = parsed
+
+        panel = LabPanel(keys, raw, values, by_test)
+        invalid = panel.invalid
+        if invalid:
+            logger.info(f"Lab panel values could not be parsed and will be ignored: {invalid}")
+        return panel
+
+
+# Process-wide normalizer shared by every analyzer module
+panel_normalizer = PanelNormalizer()
+
+
+def normalize_panel(dados: Union[Mapping[str, Any], List[Dict[str, Any]], None]) -> LabPanel:
+    """Normalize a lab panel with the shared ``PanelNormalizer``."""
+    return panel_normalizer.normalize(dados)
@@ -0,0 +1,438 @@
+"""
+Analyzer registry and full-panel execution engine.
+
+Each analyzer is registered together with the lab tests it consumes. Given a
+panel, ``AnalyzerRegistry.run`` normalizes it once, selects only the analyzers
+that have at least one of their inputs present, runs them concurrently in a
+thread or process pool and merges their outputs into a single result with
+per-analyzer timings::
+
+    {
+        "results": {name: analyzer result},
+        "timings": {name: seconds},       # wall time of each analyzer call
+        "errors": {name: message},        # analyzers that raised
+        "skipped": [name, ...],           # registered but no input present
+        "abnormalities": [...],           # merged, in registry order
+        "recommendations": [...],         # merged, de-duplicated
+        "is_critical": bool,
+        "findings": {name: FindingSet},   # structured findings of each analyzer's inputs
+        "elapsed": seconds,               # wall time of the whole run
+    }
+
+Inputs are declared with the key spellings the analyzer reads. Names known to
+``analyzers.panel`` are resolved to their canonical test id, so a panel
+carrying 'Creatinina' selects the renal analyzer that declares 'Creat', and
+the renal analyzer then receives the value under 'Creat'.
+
+Pools are created on first use and kept by the registry (one per executor
+kind and size) until ``shutdown``; a run with a single selected analyzer
+does not use a pool.
+"""
+
+import atexit
+import importlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple, Union
+
+from .findings import FINDING_SPECS, FindingSet, extract_findings
+from .panel import LabPanel, canonical_test_id, normalize_panel
+
+logger = logging.getLogger(__name__)
+
+ANALYZER_POOL_EXECUTOR = os.getenv("ANALYZER_POOL_EXECUTOR", "thread").lower()
+ANALYZER_POOL_MAX_WORKERS = int(os.getenv("ANALYZER_POOL_MAX_WORKERS", "4"))
+
+EXECUTOR_KINDS = ("thread", "process", "serial")
+
+
+def _test_id(name: str) -> str:
+    return canonical_test_id(name) or name
+
+
+def panel_test_ids(panel: LabPanel) -> Set[str]:
+    """Canonical ids (or raw keys for unknown tests) of the non-empty values in a panel."""
+    return {_test_id(key) for key in panel if panel.raw(key) not in (None, "")}
+
+
+class AnalyzerSpec:
+    """
+    Registration record for one analyzer.
+
+    Args:
+        name: Registry key, also used as the key in merged results.
+        func: Analyzer callable taking the panel as first argument, or its
+            import path ("package.module:function"), imported on first use.
+            Must be a module-level function when the process pool is used.
+        inputs: Test names that make the analyzer relevant; it is selected
+            when any of them is present.
+        modifiers: Further tests the analyzer reads but that do not select
+            it on their own (e.g. albumin for corrected calcium).
+        patient_args: Patient context keys passed through as keyword
+            arguments (e.g. ('idade', 'sexo')).
+        patient_info_arg: If set, the whole patient context is passed as a
+            single dict under this keyword (e.g. 'paciente_info').
+    """
+
+    __slots__ = ('name', '_func', 'inputs', 'modifiers', 'test_ids', 'consumed_ids', 'input_keys',
+                 'finding_tests', 'patient_args', 'patient_info_arg')
+
+    def __init__(
+        self,
+        name: str,
+        func: Union[str, Callable[..., Dict[str, Any]]],
+        inputs: Iterable[str],
+        modifiers: Iterable[str] = (),
+        patient_args: Iterable[str] = (),
+        patient_info_arg: Optional[str] = None,
+    ):
+        self.name = name
+        self._func = func
+        self.inputs: Tuple[str, ...] = tuple(inputs)
+        self.modifiers: Tuple[str, ...] = tuple(modifiers)
+        self.test_ids: frozenset = frozenset(_test_id(test) for test in self.inputs)
+        self.consumed_ids: frozenset = self.test_ids | frozenset(_test_id(test) for test in self.modifiers)
+        # Canonical test id -> the key spelling the analyzer reads (first declared wins)
+        self.input_keys: Dict[str, str] = {}
+        for test in self.inputs + self.modifiers:
+            self.input_keys.setdefault(_test_id(test), test)
+        # Inputs with a ``FINDING_SPECS`` entry; modifiers belong to the analyzer that takes them as input
+        self.finding_tests: Tuple[str, ...] = tuple(
+            test_id for test_id in dict.fromkeys(_test_id(test) for test in self.inputs) if test_id in FINDING_SPECS
+        )
+        self.patient_args: Tuple[str, ...] = tuple(patient_args)
+        self.patient_info_arg = patient_info_arg
+
+    @property
+    def func(self) -> Callable[..., Dict[str, Any]]:
+        """The analyzer callable, imported on first access when registered by path."""
+        if isinstance(self._func, str):
+            module_name, _, attr = self._func.partition(':')
+            self._func = getattr(importlib.import_module(module_name), attr)
+        return self._func
+
+    def accepts(self, test_ids: Set[str]) -> bool:
+        """True if at least one declared input is present."""
+        return not self.test_ids.isdisjoint(test_ids)
+
+    def consumes(self, test_ids: Set[str]) -> bool:
+        """True if the analyzer reads any of the given tests (inputs or modifiers)."""
+        return not self.consumed_ids.isdisjoint(test_ids)
+
+    def panel_for(self, panel: LabPanel) -> LabPanel:
+        """
+        The panel with its keys spelled the way this analyzer reads them.
+
+        A key is renamed when it resolves to a declared test but is not a
+        declared spelling itself, and the declared spelling is not already
+        in the panel ('Creatinina' -> 'Creat' for renal).
+        """
+        declared = set(self.input_keys.values())
+        names: Dict[str, str] = {}
+        taken = set(panel)
+        for key in panel:
+            if key in declared:
+                continue
+            target = self.input_keys.get(_test_id(key))
+            if target is not None and target not in taken:
+                names[key] = target
+                taken.add(target)
+        return panel.renamed(names) if names else panel
+
+    def findings(self, panel: LabPanel, patient: Mapping[str, Any]) -> Optional[FindingSet]:
+        """Findings of this analyzer's inputs, or None if none of them has a finding spec."""
+        if not self.finding_tests:
+            return None
+        return extract_findings(panel, patient.get('sexo'), patient.get('idade'), self.finding_tests)
+
+    def call_kwargs(self, patient: Mapping[str, Any]) -> Dict[str, Any]:
+        """Keyword arguments for this analyzer built from the patient context."""
+        kwargs = {arg: patient[arg] for arg in self.patient_args if patient.get(arg) is not None}
+        if self.patient_info_arg and patient:
+            kwargs[self.patient_info_arg] = dict(patient)
+        return kwargs
+
+    def __repr__(self) -> str:
+        return f"AnalyzerSpec({self.name!r}, inputs={self.inputs!r})"
+
+
+def _timed_call(func: Callable[..., Dict[str, Any]], panel: Any, kwargs: Dict[str, Any]) -> Tuple[Any, float, Optional[str]]:
+    """Run one analyzer and time it; module-level so it can be sent to a worker process."""
+    start = time.perf_counter()
+    try:
+        result = func(panel, **kwargs)
+        error = None
+    except Exception as e:
+        result = None
+        error = f"{type(e).__name__}: {e}"
+    return result, time.perf_counter() - start, error
+
+
+class AnalyzerRegistry:
+    """
+    Ordered collection of ``AnalyzerSpec`` records with a concurrent runner.
+
+    Args:
+        executor: Default pool kind, "thread", "process" or "serial".
+        max_workers: Default pool size.
+    """
+
+    def __init__(self, executor: str = ANALYZER_POOL_EXECUTOR, max_workers: int = ANALYZER_POOL_MAX_WORKERS):
+        self._specs: Dict[str, AnalyzerSpec] = {}
+        self.executor = executor
+        self.max_workers = max_workers
+        self._pools: Dict[Tuple[str, int], Executor] = {}
+        self._pools_lock = threading.Lock()
+
+    def register(
+        self,
+        name: str,
+        func: Union[str, Callable[..., Dict[str, Any]]],
+        inputs: Iterable[str],
+        modifiers: Iterable[str] = (),
+        patient_args: Iterable[str] = (),
+        patient_info_arg: Optional[str] = None,
+    ) -> AnalyzerSpec:
+        """
+        Register an analyzer.
+
+        Raises:
+            ValueError: If the name is already registered or no inputs are declared.
+        """
+        if name in self._specs:
+            raise ValueError(f"Analyzer {name!r} is already registered")
+        spec = AnalyzerSpec(name, func, inputs, modifiers, patient_args, patient_info_arg)
+        if not spec.inputs:
+            raise ValueError(f"Analyzer {name!r} must declare at least one input test")
+        self._specs[name] = spec
+        return spec
+
+    def unregister(self, name: str) -> None:
+        self._specs.pop(name, None)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._specs
+
+    def __getitem__(self, name: str) -> AnalyzerSpec:
+        return self._specs[name]
+
+    def __iter__(self):
+        return iter(self._specs.values())
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def dependents(self, tests: Iterable[str]) -> List[str]:
+        """Names of the analyzers that read any of the given tests, modifiers included."""
+        test_ids = {_test_id(test) for test in tests}
+        return [spec.name for spec in self._specs.values() if spec.consumes(test_ids)]
+
+    def select(self, dados: Any) -> List[AnalyzerSpec]:
+        """Analyzers with at least one input present in the panel, in registration order."""
+        test_ids = panel_test_ids(normalize_panel(dados))
+        return [spec for spec in self._specs.values() if spec.accepts(test_ids)]
+
+    def _pool(self, kind: str, max_workers: int) -> Executor:
+        """The registry's pool for (kind, max_workers), created on first use."""
+        with self._pools_lock:
+            pool = self._pools.get((kind, max_workers))
+            if pool is None:
+                if not self._pools:
+                    atexit.register(self.shutdown)
+                if kind == "thread":
+                    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analyzer")
+                else:
+                    pool = ProcessPoolExecutor(max_workers=max_workers)
+                self._pools[(kind, max_workers)] = pool
+            return pool
+
+    def _discard_pool(self, kind: str, max_workers: int, pool: Executor) -> None:
+        with self._pools_lock:
+            if self._pools.get((kind, max_workers)) is pool:
+                del self._pools[(kind, max_workers)]
+        pool.shutdown(wait=False)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down the pools created by ``run``; later runs create new ones."""
+        with self._pools_lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.shutdown(wait=wait)
+
+    def run(
+        self,
+        dados: Any,
+        patient: Optional[Mapping[str, Any]] = None,
+        only: Optional[Iterable[str]] = None,
+        executor: Optional[str] = None,
+        max_workers: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run every relevant analyzer over a panel.
+
+        Args:
+            dados: Panel as dict, list of test records or ``LabPanel``.
+            patient: Patient context (idade, sexo, etnia, ...), forwarded to the
+                analyzers that declare it.
+            only: Restrict the run to these analyzer names (still subject to
+                input selection).
+            executor: "thread", "process" or "serial"; defaults to the registry's.
+            max_workers: Pool size; defaults to the registry's.
+
+        Returns:
+            dict: Merged result (see module docstring).
+
+        Raises:
+            ValueError: If the executor kind is unknown.
+        """
+        start = time.perf_counter()
+        panel = normalize_panel(dados)
+        patient = patient or {}
+        selected = self.select(panel)
+        if only is not None:
+            wanted = set(only)
+            selected = [spec for spec in selected if spec.name in wanted]
+        selected_names = {spec.name for spec in selected}
+
+        kind = (executor or self.executor).lower()
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind {kind!r}; expected one of {EXECUTOR_KINDS}")
+        workers = max_workers or self.max_workers
+        outcomes: Dict[str, Tuple[Any, float, Optional[str]]] = {}
+        if kind == "serial" or workers <= 1 or len(selected) <= 1:
+            for spec in selected:
+                outcomes[spec.name] = _timed_call(spec.func, spec.panel_for(panel), spec.call_kwargs(patient))
+        else:
+            pool = self._pool(kind, workers)
+            futures = {}
+            for spec in selected:
+                payload = spec.panel_for(panel)
+                if kind == "process":
+                    # Worker processes receive the plain dict; analyzers re-normalize it there
+                    payload = payload.raw_dict()
+                futures[spec.name] = pool.submit(_timed_call, spec.func, payload, spec.call_kwargs(patient))
+            for name, future in futures.items():
+                try:
+                    outcomes[name] = future.result()
+                except Exception as e:  # e.g. unpicklable analyzer or broken pool
+                    outcomes[name] = (None, 0.0, f"{type(e).__name__}: {e}")
+                    if isinstance(e, BrokenProcessPool):
+                        self._discard_pool(kind, workers, pool)
+
+        merged = self._merge(selected, outcomes)
+        merged["findings"] = {
+            spec.name: spec.findings(panel, patient)
+            for spec in selected
+            if spec.finding_tests and spec.name in merged["results"]
+        }
+        merged["skipped"] = [name for name in self._specs if name not in selected_names]
+        merged["elapsed"] = time.perf_counter() - start
+        return merged
+
+    @staticmethod
+    def _merge(selected: List[AnalyzerSpec], outcomes: Dict[str, Tuple[Any, float, Optional[str]]]) -> Dict[str, Any]:
+        results: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+        errors: Dict[str, str] = {}
+        abnormalities: List[Any] = []
+        recommendations: List[Any] = []
+        is_critical = False
+        for spec in selected:
+            result, elapsed, error = outcomes[spec.name]
+            timings[spec.name] = elapsed
+            if error is not None:
+                logger.error(f"Analyzer {spec.name} failed: {error}")
+                errors[spec.name] = error
+                continue
+            results[spec.name] = result
+            if not isinstance(result, dict):
+                continue
+            abnormalities.extend(result.get("abnormalities") or [])
+            for recommendation in result.get("recommendations") or []:
+                if recommendation not in recommendations:
+                    recommendations.append(recommendation)
+            is_critical = is_critical or bool(result.get("is_critical"))
+        return {
+            "results": results,
+            "timings": timings,
+            "errors": errors,
+            "abnormalities": abnormalities,
+            "recommendations": recommendations,
+            "is_critical": is_critical,
+        }
+
+
+def _build_default_registry() -> AnalyzerRegistry:
+    # Analyzers are registered by import path so building the registry imports none of them
+    demographics = ('idade', 'sexo')
+    registry = AnalyzerRegistry()
+    registry.register("blood_gases", "analyzers.blood_gases:analisar_gasometria",
+                      ('pH', 'pCO2', 'pO2', 'HCO3-', 'BE', 'SpO2', 'Lactato'),
+                      modifiers=('FiO2', 'Hb', 'Na+', 'K+', 'Cl-'))
+    registry.register("electrolytes", "analyzers.electrolytes:analisar_eletrolitos",
+                      ('Na+', 'K+', 'Cl-', 'Ca+', 'iCa', 'Mg+', 'P'), modifiers=('Albumina',))
+    registry.register("hematology", "analyzers.hematology:analisar_hemograma",
+                      ('Hb', 'Ht', 'RBC', 'Leuco', 'Plaq', 'VCM', 'HCM', 'CHCM', 'RDW', 'Retic'),
+                      patient_args=('sexo',))
+    registry.register("renal", "analyzers.renal:analisar_funcao_renal",
+                      ('Creat', 'Ur', 'ProtCreatRatio', 'ProteinuriaVol', 'UrineHem', 'UrineLeuco',
+                       'RAC_mg_g', 'RAC_mg_mmol', 'AlbCreatRatio_mg_g', 'AlbCreatRatio_mg_mmol', 'ACR_mg_g', 'ACR_mg_mmol'),
+                      modifiers=('K+',),
+                      patient_args=('idade', 'sexo', 'etnia'))
+    registry.register("hepatic", "analyzers.hepatic:analisar_funcao_hepatica",
+                      ('TGO', 'TGP', 'GamaGT', 'FosfAlc', 'BT', 'BD', 'BI'), modifiers=('Albumina', 'RNI'))
+    registry.register("pancreatic", "analyzers.pancreatic:analisar_funcao_pancreatica", ('Amilase', 'Lipase'))
+    registry.register("coagulation", "analyzers.coagulation:analisar_coagulacao",
+                      ('INR', 'RNI', 'tempo de protrombina', 'TTPA', 'tempo de tromboplastina parcial ativada',
+                       'TTPA (Relação)', 'TTPA (Segundos)', 'Fibrinogeno', 'Fibrinogênio', 'Fib',
+                       'D-dimer', 'D-dímero', 'Dimeros-D', 'DimerosD'),
+                      modifiers=('Plaquetas', 'PLT', 'Plaq'))
+    registry.register("inflammatory", "analyzers.inflammatory:analisar_marcadores_inflamatorios",
+                      ('PCR', 'proteína c reativa', 'VHS', 'velocidade de hemossedimentação', 'Procalcitonina', 'Ferritina'),
+                      patient_args=('sexo',))
+    registry.register("cardiac", "analyzers.cardiac:analisar_marcadores_cardiacos",
+                      ('TropoI', 'TropoT', 'hsTropoI', 'hsTropoT', 'CKMB', 'CPK', 'BNP', 'NTproBNP'),
+                      modifiers=('Creat', 'LDH'),
+                      patient_info_arg='paciente_info')
+    registry.register("metabolic", "analyzers.metabolic:analisar_metabolismo",
+                      ('Glicose', 'HbA1c', 'CT', 'LDL', 'HDL', 'TG', 'AcidoUrico'), modifiers=('TSH', 'T4L'),
+                      patient_args=demographics)
+    registry.register("thyroid", "analyzers.thyroid:analisar_funcao_tireoidiana",
+                      ('TSH', 'T4L', 'T3L', 'AntiTPO', 'AntiTG', 'TRAb'), patient_args=demographics)
+    registry.register("bone_metabolism", "analyzers.bone_metabolism:analisar_metabolismo_osseo",
+                      ('PTH', 'VitD', 'IonizedCalcium'), modifiers=('Ca', 'P', 'Albumina', 'FosfAlc'),
+                      patient_args=demographics)
+    registry.register("microbiology", "analyzers.microbiology:analisar_microbiologia",
+                      ('Hemocult', 'HemocultAntibiograma', 'Urocult', 'CultVigilNasal', 'CultVigilRetal',
+                       'CoombsDir', 'VDRL', 'HBsAg', 'AntiHBs', 'AntiHBcIgG', 'AntiHBcIgM', 'AntiHBcTotal', 'HCV', 'HIV'))
+    registry.register("infectious_disease", "analyzers.infectious_disease:analisar_marcadores_doencas_infecciosas",
+                      ('HIV', 'HBsAg', 'AntiHBs', 'AntiHBc', 'HCV', 'Syphilis', 'Toxo', 'CMV', 'EBV'),
+                      patient_args=demographics)
+    registry.register("tumor_markers", "analyzers.tumor_markers:analisar_marcadores_tumorais",
+                      ('PSA', 'CEA', 'AFP', 'CA125', 'CA19-9', 'BetaHCG'), patient_args=demographics)
+    registry.register("autoimmune", "analyzers.autoimmune:analisar_marcadores_autoimunes",
+                      ('ANA', 'AntiDsDNA', 'AntiSm', 'AntiRNP', 'AntiSSA', 'AntiSSB', 'RF', 'AntiCCP', 'ANCA', 'C3', 'C4'),
+                      patient_args=demographics)
+    registry.register("hormones", "analyzers.hormones:analisar_hormonios",
+                      ('Cortisol_AM', 'Cortisol_PM', 'Prolactin', 'Testosterone', 'Estradiol', 'Progesterone',
+                       'LH', 'FSH', 'DHEAS'), patient_args=demographics)
+    registry.register("drug_monitoring", "analyzers.drug_monitoring:analisar_monitoramento_medicamentos",
+                      ('Digoxin', 'Lithium', 'Phenytoin', 'Carbamazepine', 'ValproicAcid', 'Vancomycin',
+                       'Gentamicin', 'Theophylline'), patient_args=demographics)
+    return registry
+
+
+# Process-wide registry with every analyzer in this package
+analyzer_registry = _build_default_registry()
+
+
+def run_all_analyzers(dados: Any, patient: Optional[Mapping[str, Any]] = None, **options) -> Dict[str, Any]:
+    """Run the relevant analyzers of the default registry over a panel (see ``AnalyzerRegistry.run``)."""
+    return analyzer_registry.run(dados, patient=patient, **options)
@@ -7,68 +7,26 @@ from typing import Dict, List, Optional, Any
 import logging
 
 from utils.reference_ranges import REFERENCE_RANGES
+from .result_cache import analyzer_cache
+from .criticality import CriticalityThresholds
+from .panel import LabPanel, normalize_panel
 
 logger = logging.getLogger(__name__)
 
-def _safe_convert_to_float(value_str: Optional[str]) -> Optional[float]:
-    if value_str is None:
-        return None
-    
-    cleaned_value_str = str(value_str).strip() # Ensure input is string
-
-    if ',' in cleaned_value_str:
-        cleaned_value_str = cleaned_value_str.replace('.', '').replace(',', '.')
+# Criticality thresholds, compiled once at import
+# Values between the patient's reference limit and 'significant' fall through to MONITORING
+CREAT_CRITICALITY = CriticalityThresholds("Creatinina", {
+    'critical': [5.0],
+    'significant': [(2.0, 5.0)]
+})
 
-    try:
-        return float(cleaned_value_str)
-    except ValueError:
-        logger.warning(f"Could not convert '{value_str}' (cleaned: '{cleaned_value_str}') to float.")
-        if cleaned_value_str.startswith('<'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        if cleaned_value_str.startswith('>'):
-            try: return float(cleaned_value_str[1:])
-            except ValueError: pass
-        return None
-
-def _get_criticality_level(param_name, value, thresholds):
-    """
-    Determine the criticality level of a parameter based on stratified thresholds.
-    
-    Args:
-        param_name: Name of the parameter
-        value: The value to evaluate
-        thresholds: Dictionary with 'critical', 'significant', and 'monitoring' thresholds
-        
-    Returns:
-        tuple: (criticality_level, description)
-    """
-    if value is None:
-        return ("UNKNOWN", f"{param_name} value is None")
-    
-    # Check critical thresholds
-    if 'critical' in thresholds:
-        for threshold in thresholds['critical']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
-    
-    # Check significant thresholds
-    if 'significant' in thresholds:
-        for threshold in thresholds['significant']:
-            if isinstance(threshold, tuple):  # Range (low, high)
-                if threshold[0] <= value <= threshold[1]:
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-            elif isinstance(threshold, (int, float)):  # Single value comparison
-                if (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
-                    return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
-    
-    # Default to monitoring
-    return ("MONITORING", f"{param_name} MONITORING: {value} - Significant morbidity risk prompt")
+# Values between the patient's reference limit and 'significant' fall through to MONITORING
+BUN_CRITICALITY = CriticalityThresholds("BUN", {
+    'critical': [200],
+    'significant': [(100, 200)]
+})
 
+@analyzer_cache.memoize("renal")
 def analisar_funcao_renal(exams, **patient_kwargs):
     """
     Analyze renal function parameters and provide clinical interpretation.
@@ -88,41 +46,15 @@ def analisar_funcao_renal(exams, **patient_kwargs):
     details_dict: Dict[str, any] = {}
     
     # Standardize input format
-    standardized_params: Dict[str, Optional[float]] = {}
-    if isinstance(exams, list):
-        for exam in exams:
-            if 'test' in exam and 'value' in exam:
-                if exam['value'] is not None:
-                    if isinstance(exam['value'], (int, float)):
-                        standardized_params[exam['test']] = float(exam['value'])
-                    else:
-                        value_str = str(exam['value'])
-                        converted_value = _safe_convert_to_float(value_str)
-                        if converted_value is not None:
-                            standardized_params[exam['test']] = converted_value
-                        else:
-                            logger.info(f"Could not convert renal param {exam['test']}: '{exam['value']}'. It will be ignored.")
-                else:
-                    logger.info(f"Renal param {exam['test']} is None. It will be ignored.")
-    elif isinstance(exams, dict):
-        for key, value in exams.items():
-            if value is not None:
-                if isinstance(value, (int, float)):
-                    standardized_params[key] = float(value)
-                else:
-                    value_str = str(value)
-                    converted_value = _safe_convert_to_float(value_str)
-                    if converted_value is not None:
-                        standardized_params[key] = converted_value
-                    else:
-                        logger.info(f"Could not convert renal param {key}: '{value}'. It will be ignored.")
-            else:
-                logger.info(f"Renal param {key} is None. It will be ignored.")
-    else:
+    if not isinstance(exams, (list, dict, LabPanel)):
         return {
             "interpretation": "Dados de entrada inválidos para análise renal.",
             "abnormalities": [], "is_critical": False, "recommendations": [], "details": {}
         }
+    panel = normalize_panel(exams)
+    standardized_params: Dict[str, Optional[float]] = {
+        key: value for key, value in panel.numeric_dict().items() if value is not None
+    }
     
     # Check for at least one renal test
     renal_test_keys = ['Creat', 'Ur', 'ProtCreatRatio', 'ProteinuriaVol', 'UrineHem', 'UrineLeuco', 'K+']
@@ -150,11 +82,7 @@ def analisar_funcao_renal(exams, **patient_kwargs):
         creat_min_ref, creat_max_ref = REFERENCE_RANGES['Creat']
         details_dict['Creat_ref'] = f"{creat_min_ref}-{creat_max_ref} mg/dL"
         
-        creat_criticality, creat_description = _get_criticality_level("Creatinina", creat_value, {
-            'critical': [5.0],
-            'significant': [(2.0, 5.0)],
-            'monitoring': [(creat_max_ref, 2.0)]
-        })
+        creat_criticality, creat_description = CREAT_CRITICALITY.classify(creat_value)
         interpretations_list.append(creat_description)
 
         if creat_value < creat_min_ref:
@@ -251,11 +179,7 @@ def analisar_funcao_renal(exams, **patient_kwargs):
         details_dict['Ur_ref'] = f"{ur_min_ref}-{ur_max_ref} mg/dL"
         
         bun_value = urea_value / 2.14
-        bun_criticality, bun_description = _get_criticality_level("BUN", bun_value, {
-            'critical': [200],
-            'significant': [(100, 200)],
-            'monitoring': [(ur_max_ref, 100)]
-        })
+        bun_criticality, bun_description = BUN_CRITICALITY.classify(bun_value)
         interpretations_list.append(bun_description)
 
         if urea_value < ur_min_ref:
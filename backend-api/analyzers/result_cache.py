@@ -0,0 +1,204 @@
+"""
+Shared result cache for the analyzer modules.
+
+Analyzer functions are pure with respect to their inputs (lab values plus patient
+demographics such as sex and age), so identical panels re-sent by dashboards,
+alert re-evaluation or agent tool calls can be served from memory. The cache is
+bounded (LRU eviction), entries expire after a TTL, and callers always receive a
+private deep copy so mutating a returned result never poisons the stored entry.
+"""
+
+import copy
+import functools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from .panel import LabPanel
+
+logger = logging.getLogger(__name__)
+
+ANALYZER_CACHE_ENABLED = os.getenv("ANALYZER_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+ANALYZER_CACHE_MAXSIZE = int(os.getenv("ANALYZER_CACHE_MAXSIZE", "1024"))
+ANALYZER_CACHE_TTL_SECONDS = float(os.getenv("ANALYZER_CACHE_TTL_SECONDS", "300"))
+
+_MISSING = object()
+
+
+class UncacheableInput(TypeError):
+    """Raised when an analyzer argument cannot be turned into a cache key."""
+
+
+def canonicalize(value: Any) -> Hashable:
+    """
+    Convert analyzer input into a hashable, order-independent cache key.
+
+    Numbers are normalised to float (so 140 and 140.0 share an entry), sex codes
+    are upper-cased, dict keys are sorted and lists keep their order. A parsed
+    ``LabPanel`` shares its key with the raw dict it was built from.
+
+    Args:
+        value: Raw analyzer argument (dict, list, number, string, None...)
+
+    Returns:
+        A hashable representation of the value.
+
+    Raises:
+        UncacheableInput: If the value contains an unsupported type.
+    """
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return value
+    if isinstance(value, LabPanel):
+        value = value.raw_dict()
+    if isinstance(value, dict):
+        items = []
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise UncacheableInput(f"Unsupported dict key type: {type(key).__name__}")
+            if key.lower() in ("sexo", "sex") and isinstance(item, str):
+                item = item.strip().upper()
+            items.append((key, canonicalize(item)))
+        return ("dict", tuple(sorted(items, key=lambda kv: kv[0])))
+    if isinstance(value, (list, tuple)):
+        return ("seq", tuple(canonicalize(item) for item in value))
+    raise UncacheableInput(f"Unsupported analyzer input type: {type(value).__name__}")
+
+
+class AnalyzerResultCache:
+    """
+    Thread-safe bounded LRU cache with per-entry TTL for analyzer results.
+
+    Counters for hits, misses, evictions (LRU pressure) and expirations (TTL)
+    are kept for observability and exposed through ``stats()``.
+    """
+
+    def __init__(self, maxsize: int = ANALYZER_CACHE_MAXSIZE, ttl_seconds: float = ANALYZER_CACHE_TTL_SECONDS,
+                 enabled: bool = ANALYZER_CACHE_ENABLED, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, namespace: str, key: Hashable) -> Any:
+        """
+        Look up a cached result.
+
+        Returns:
+            A deep copy of the cached result, or the module-level ``_MISSING``
+            sentinel when there is no live entry.
+        """
+        full_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[full_key]
+                self.expirations += 1
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(full_key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, namespace: str, key: Hashable, value: Any) -> None:
+        """Store a private copy of ``value``, evicting the least recently used entry if full."""
+        if self.maxsize <= 0:
+            return
+        stored = copy.deepcopy(value)
+        full_key = (namespace, key)
+        with self._lock:
+            self._entries[full_key] = (self._clock() + self.ttl_seconds, stored)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        """Drop all entries, or only those belonging to one analyzer namespace."""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                return
+            for full_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[full_key]
+
+    def reset_stats(self) -> None:
+        """Reset hit/miss/eviction counters without touching stored entries."""
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def memoize(self, namespace: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """
+        Decorator caching an analyzer function on its canonicalised arguments.
+
+        Args:
+            namespace: Name of the analyzer, used to partition the key space.
+        """
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                try:
+                    key = (canonicalize(args), canonicalize(kwargs))
+                except UncacheableInput as e:
+                    logger.debug(f"Skipping analyzer cache for {namespace}: {e}")
+                    return func(*args, **kwargs)
+
+                cached = self.get(namespace, key)
+                if cached is not _MISSING:
+                    return cached
+                result = func(*args, **kwargs)
+                self.set(namespace, key, result)
+                return result
+
+            wrapper.cache = self
+            wrapper.cache_namespace = namespace
+            return wrapper
+        return decorator
+
+
+# Process-wide cache shared by every analyzer module
+analyzer_cache = AnalyzerResultCache()
+
+
+def get_analyzer_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss/eviction counters of the shared analyzer cache."""
+    return analyzer_cache.stats()
+
+
+def clear_analyzer_cache(namespace: Optional[str] = None) -> None:
+    """Clear the shared analyzer cache (optionally a single analyzer namespace)."""
+    analyzer_cache.clear(namespace)
@@ -1,47 +1,267 @@
+import logging
+import os
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc, func
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import bindparam, desc, func, insert, or_
 from database.models import Alert, Patient, User, doctor_patient_association
 import schemas.alert as alert_schemas
+from utils.alert_events import ALERT_CREATED, ALERT_DELETED, ALERT_UPDATED, queue_alert_events
+from utils.alert_fingerprint import fingerprint_of
 from .associations import is_doctor_assigned_to_patient
-from typing import List, Optional, Tuple
-from datetime import datetime
+from .crud_user_alert_counter import (
+    CounterDeltas, apply_counter_deltas, count_alert, count_change, counted_state, get_alert_counts,
+)
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta
 
-def create_alert(db: Session, alert: alert_schemas.AlertCreate) -> Alert:
+logger = logging.getLogger(__name__)
+
+# An unresolved alert re-raised within this window is updated instead of duplicated (0 disables)
+ALERT_SUPPRESSION_WINDOW_MINUTES = float(os.getenv("ALERT_SUPPRESSION_WINDOW_MINUTES", "60"))
+
+# Columns taken from the latest occurrence of a suppressed alert
+_OCCURRENCE_FIELDS = ("message", "severity", "value", "reference", "interpretation", "recommendation", "details")
+
+
+def _alert_values(alert: alert_schemas.AlertCreate) -> Dict[str, Any]:
+    """Column values of a new alert, including its fingerprint."""
+    values = {
+        "patient_id": alert.patient_id,
+        "alert_type": getattr(alert, 'alert_type', None),
+        "message": alert.message,
+        "severity": alert.severity,
+        "parameter": getattr(alert, 'parameter', None),
+        "category": getattr(alert, 'category', None),
+        "value": getattr(alert, 'value', None),
+        "reference": getattr(alert, 'reference', None),
+        "status": getattr(alert, 'status', "active"),
+        "interpretation": getattr(alert, 'interpretation', None),
+        "recommendation": getattr(alert, 'recommendation', None),
+        "created_by": getattr(alert, 'created_by', None),
+        "user_id": getattr(alert, 'user_id', None),
+        "details": getattr(alert, 'details', None),
+    }
+    values["fingerprint"] = fingerprint_of(values)
+    return values
+
+
+def _suppression_cutoff(window_minutes: Optional[float], now: datetime) -> Optional[datetime]:
+    window = ALERT_SUPPRESSION_WINDOW_MINUTES if window_minutes is None else window_minutes
+    return now - timedelta(minutes=window) if window > 0 else None
+
+
+def _open_alerts_by_fingerprint(db: Session, fingerprints: Sequence[str], cutoff: datetime) -> Dict[str, Alert]:
+    """Newest unresolved alert of each fingerprint last raised at or after ``cutoff`` (one query)."""
+    rows = (
+        db.query(Alert)
+        .filter(
+            Alert.fingerprint.in_(fingerprints),
+            func.coalesce(Alert.updated_at, Alert.created_at) >= cutoff,
+            or_(Alert.status.is_(None), Alert.status != "resolved"),
+        )
+        .order_by(Alert.created_at, Alert.alert_id)
+        .all()
+    )
+    return {row.fingerprint: row for row in rows}
+
+
+def _record_occurrences(db: Session, occurrences: List[Tuple[Alert, int, Dict[str, Any]]], now: datetime) -> None:
+    """
+    Fold re-raised alerts into their open rows: one executemany UPDATE that
+    bumps ``occurrence_count`` and ``updated_at`` and takes the latest message,
+    severity and value. ``occurrences`` holds (open alert, times raised, values);
+    the loaded alerts are brought up to date without reloading them, and the
+    recipients' counters follow a change of severity.
+    """
+    table = Alert.__table__
+    stmt = (
+        table.update()
+        .where(table.c.alert_id == bindparam("b_alert_id"))
+        .values(
+            occurrence_count=table.c.occurrence_count + bindparam("b_count"),
+            updated_at=bindparam("b_updated_at"),
+            **{name: bindparam(f"b_{name}") for name in _OCCURRENCE_FIELDS},
+        )
+    )
+    db.execute(stmt, [
+        {"b_alert_id": db_alert.alert_id, "b_count": count, "b_updated_at": now,
+         **{f"b_{name}": values[name] for name in _OCCURRENCE_FIELDS}}
+        for db_alert, count, values in occurrences
+    ])
+    deltas: CounterDeltas = {}
+    for db_alert, count, values in occurrences:
+        before = counted_state(db_alert)
+        for name in _OCCURRENCE_FIELDS:
+            set_committed_value(db_alert, name, values[name])
+        count_change(deltas, before, counted_state(db_alert))
+        set_committed_value(db_alert, "updated_at", now)
+        set_committed_value(db_alert, "occurrence_count", (db_alert.occurrence_count or 1) + count)
+    # A re-raise may move the alert to another severity of its bucket
+    apply_counter_deltas(db, deltas)
+
+
+def create_alert(db: Session, alert: alert_schemas.AlertCreate,
+                 suppression_window_minutes: Optional[float] = None) -> Alert:
     """
     Create a new alert in the database.
+
+    If an unresolved alert with the same fingerprint (patient, recipient,
+    parameter, alert type, severity bucket) was raised within the suppression
+    window, that alert is updated instead: ``occurrence_count`` and
+    ``updated_at`` are bumped and the latest message and value kept.
     
     Args:
         db: Database session
         alert: Alert data
+        suppression_window_minutes: Overrides ``ALERT_SUPPRESSION_WINDOW_MINUTES`` (0 always inserts)
         
     Returns:
-        The created alert
-    """
-    db_alert = Alert(
-        patient_id=alert.patient_id,
-        alert_type=alert.alert_type if hasattr(alert, 'alert_type') else None,
-        message=alert.message,
-        severity=alert.severity,
-        parameter=alert.parameter if hasattr(alert, 'parameter') else None,
-        category=alert.category if hasattr(alert, 'category') else None,
-        value=alert.value if hasattr(alert, 'value') else None,
-        reference=alert.reference if hasattr(alert, 'reference') else None,
-        status=alert.status if hasattr(alert, 'status') else "active",
-        interpretation=alert.interpretation if hasattr(alert, 'interpretation') else None,
-        recommendation=alert.recommendation if hasattr(alert, 'recommendation') else None,
-        is_read=False,
-        created_at=datetime.now(),
-        created_by=alert.created_by if hasattr(alert, 'created_by') else None,
-        user_id=alert.user_id if hasattr(alert, 'user_id') else None,
-        details=alert.details if hasattr(alert, 'details') else None
-    )
+        The created (or updated) alert
+    """
+    now = datetime.now()
+    values = _alert_values(alert)
+    cutoff = _suppression_cutoff(suppression_window_minutes, now)
+    if cutoff is not None:
+        existing = _open_alerts_by_fingerprint(db, [values["fingerprint"]], cutoff).get(values["fingerprint"])
+        if existing is not None:
+            _record_occurrences(db, [(existing, 1, values)], now)
+            queue_alert_events(db, ALERT_UPDATED, [existing])
+            db.commit()
+            db.refresh(existing)
+            return existing
+
+    db_alert = Alert(**values, is_read=False, created_at=now)
     
     db.add(db_alert)
+    db.flush()
+    deltas: CounterDeltas = {}
+    count_alert(deltas, *counted_state(db_alert))
+    apply_counter_deltas(db, deltas)
+    queue_alert_events(db, ALERT_CREATED, [db_alert])
     db.commit()
     db.refresh(db_alert)
     
     return db_alert
 
+def _insert_alert_rows(db: Session, rows: List[Dict[str, Any]]) -> List[Alert]:
+    """
+    Insert alert rows with one multi-row INSERT ... RETURNING (SQLAlchemy's
+    insertmanyvalues batching of the executemany). Returns the new alerts in row order.
+    """
+    if not rows:
+        return []
+    # RETURNING does not promise row order, and asking SQLAlchemy for it
+    # (sort_by_parameter_order) degrades to one statement per row without a
+    # sentinel column; ids are assigned in VALUES order, so sort by id instead
+    return sorted(db.scalars(insert(Alert).returning(Alert), rows), key=lambda alert: alert.alert_id)
+
+
+def _count_created(db: Session, created: List[Alert]) -> None:
+    deltas: CounterDeltas = {}
+    for db_alert in created:
+        count_alert(deltas, *counted_state(db_alert))
+    apply_counter_deltas(db, deltas)
+
+
+def _finish_bulk_write(db: Session, alert_ids: List[int], commit: bool) -> None:
+    """Commit and reload the written alerts with one query (instead of one refresh per alert)."""
+    if not commit:
+        return
+    db.commit()
+    if alert_ids:
+        db.query(Alert).filter(Alert.alert_id.in_(alert_ids)).all()
+
+
+def create_alerts_bulk(db: Session, alerts: Sequence[alert_schemas.AlertCreate], commit: bool = True) -> List[Alert]:
+    """
+    Create many alerts in one transaction.
+
+    Every alert is inserted (no suppression, see ``upsert_alerts``) with a
+    single INSERT ... RETURNING statement, then committed once and reloaded
+    with one query.
+
+    Args:
+        db: Database session
+        alerts: Alert data
+        commit: When False the inserts are only flushed, to be committed by the caller
+
+    Returns:
+        The created alerts, in input order
+    """
+    now = datetime.now()
+    rows = [{**_alert_values(alert), "is_read": False, "created_at": now, "occurrence_count": 1} for alert in alerts]
+    created = _insert_alert_rows(db, rows)
+    _count_created(db, created)
+    queue_alert_events(db, ALERT_CREATED, created)
+    _finish_bulk_write(db, [alert.alert_id for alert in created], commit)
+    return created
+
+
+def upsert_alerts(db: Session, alerts: Sequence[alert_schemas.AlertCreate],
+                  suppression_window_minutes: Optional[float] = None, commit: bool = True) -> List[Alert]:
+    """
+    Create a batch of alerts in one transaction, deduplicated.
+
+    Alerts of the batch that share a fingerprint become one row, and
+    fingerprints with an open alert inside the suppression window update it
+    (as in ``create_alert``). The open alerts are looked up with one query and
+    updated with one executemany statement, and the new ones inserted as in
+    ``create_alerts_bulk``, whatever the batch size.
+
+    Args:
+        db: Database session
+        alerts: Alert data
+        suppression_window_minutes: Overrides ``ALERT_SUPPRESSION_WINDOW_MINUTES`` (0 inserts every alert)
+        commit: When False the writes are only flushed, to be committed by the caller
+
+    Returns:
+        One alert per input, in input order (duplicates share the same row)
+    """
+    now = datetime.now()
+    values = [_alert_values(alert) for alert in alerts]
+    if not values:
+        return []
+    cutoff = _suppression_cutoff(suppression_window_minutes, now)
+
+    # Input indexes per fingerprint (per input when suppression is off)
+    groups: Dict[Any, List[int]] = {}
+    for i, row in enumerate(values):
+        groups.setdefault(row["fingerprint"] if cutoff is not None else i, []).append(i)
+    existing = _open_alerts_by_fingerprint(db, list(groups), cutoff) if cutoff is not None else {}
+
+    occurrences = []
+    new_groups = []
+    for key, indexes in groups.items():
+        latest = values[indexes[-1]]
+        db_alert = existing.get(key)
+        if db_alert is not None:
+            occurrences.append((db_alert, len(indexes), latest))
+        else:
+            new_groups.append(indexes)
+
+    if occurrences:
+        _record_occurrences(db, occurrences, now)
+        queue_alert_events(db, ALERT_UPDATED, [db_alert for db_alert, _, _ in occurrences])
+    created = _insert_alert_rows(db, [
+        {**values[indexes[-1]], "is_read": False, "created_at": now, "occurrence_count": len(indexes)}
+        for indexes in new_groups
+    ])
+    _count_created(db, created)
+    queue_alert_events(db, ALERT_CREATED, created)
+
+    results: List[Optional[Alert]] = [None] * len(values)
+    for key, indexes in groups.items():
+        if key in existing:
+            for i in indexes:
+                results[i] = existing[key]
+    for db_alert, indexes in zip(created, new_groups):
+        for i in indexes:
+            results[i] = db_alert
+
+    _finish_bulk_write(db, [db_alert.alert_id for db_alert, _, _ in occurrences] + [alert.alert_id for alert in created], commit)
+    logger.info(f"Upserted {len(values)} alerts: {len(created)} new, {len(occurrences)} suppressed into open alerts")
+    return results
+
 def get_alert(db: Session, alert_id: int) -> Optional[Alert]:
     """
     Get an alert by ID.
@@ -88,17 +308,26 @@ def get_alerts_by_user_and_status(
         limit: Maximum number of alerts to return
         
     Returns:
-        Tuple containing list of alerts and total count
+        Tuple containing list of alerts and total count (from ``user_alert_counters``)
     """
     query = db.query(Alert).filter(Alert.user_id == user_id)
     
     query = query.filter(Alert.is_read == is_read)
     
-    total = query.count()
+    counts = get_alert_counts(db, user_id)
+    total = counts["total"] - counts["unread"] if is_read else counts["unread"]
     
     alerts = query.order_by(desc(Alert.created_at)).offset(skip).limit(limit).all()
     return alerts, total
 
+def get_alert_stats(db: Session, user_id: int) -> alert_schemas.AlertStats:
+    """
+    Alert totals of a user for the header badge: total, unread and unread per
+    severity, read from ``user_alert_counters`` (one primary-key range read,
+    independent of how many alerts the user has).
+    """
+    return alert_schemas.AlertStats(**get_alert_counts(db, user_id))
+
 def get_alerts(
     db: Session,
     current_user: User,
@@ -187,10 +416,21 @@ def mark_alert_as_read(db: Session, alert_id: int, user: User) -> Optional[Alert
         # Returning None might be confused with alert not found, so exception is clearer
         raise PermissionError("User not authorized to modify this alert.")
 
-    # Proceed with marking as read if authorized
+    # Proceed with marking as read if authorized. The UPDATE only matches an
+    # unread row, so of two concurrent requests only one moves the counters.
     if not db_alert.is_read:
-        db_alert.is_read = True
-        db.add(db_alert)
+        changed = (
+            db.query(Alert)
+            .filter(Alert.alert_id == alert_id, Alert.is_read == False)  # noqa: E712
+            .update({Alert.is_read: True}, synchronize_session=False)
+        )
+        if changed:
+            before = counted_state(db_alert)
+            set_committed_value(db_alert, 'is_read', True)
+            deltas: CounterDeltas = {}
+            count_change(deltas, before, counted_state(db_alert))
+            apply_counter_deltas(db, deltas)
+            queue_alert_events(db, ALERT_UPDATED, [db_alert])
         db.commit()
         db.refresh(db_alert)
     
@@ -208,16 +448,23 @@ def update_alert(db: Session, alert_id: int, alert_update: alert_schemas.AlertUp
     Returns:
         The updated alert or None if not found
     """
-    db_alert = db.query(Alert).filter(Alert.alert_id == alert_id).first()
+    # Row lock (PostgreSQL) so the state the counter delta is computed from
+    # cannot change before this transaction commits
+    db_alert = db.query(Alert).filter(Alert.alert_id == alert_id).with_for_update().populate_existing().first()
     
     if not db_alert:
         return None
     
     # Update fields
+    before = counted_state(db_alert)
     update_data = alert_update.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_alert, key, value)
     
+    deltas: CounterDeltas = {}
+    count_change(deltas, before, counted_state(db_alert))
+    apply_counter_deltas(db, deltas)
+    queue_alert_events(db, ALERT_UPDATED, [db_alert])
     db.commit()
     db.refresh(db_alert)
     
@@ -239,6 +486,10 @@ def delete_alert(db: Session, alert_id: int) -> bool:
     if not db_alert:
         return False
     
+    deltas: CounterDeltas = {}
+    count_alert(deltas, *counted_state(db_alert), sign=-1)
+    apply_counter_deltas(db, deltas)
+    queue_alert_events(db, ALERT_DELETED, [db_alert])
     db.delete(db_alert)
     db.commit()
     
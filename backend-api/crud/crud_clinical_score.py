@@ -0,0 +1,87 @@
+"""
+Clinical score series (``clinical_scores``).
+
+Rows are appended by the score maintenance pipeline
+(``utils.score_maintenance``) whenever a patient's score changes, so the
+table holds one point per change and trends are plain range reads on
+``ix_clinical_scores_patient_type_time``.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database.models import ClinicalScore
+
+logger = logging.getLogger(__name__)
+
+
+def latest_score_values(db: Session, patient_ids: Iterable[int],
+                        score_types: Iterable[str]) -> Dict[Tuple[int, str], float]:
+    """
+    Most recent value of each score of each patient, in one query.
+
+    Returns:
+        dict: {(patient_id, score_type): value} for the pairs that have a row.
+    """
+    from utils.severity_scores import _latest_values_query_mode
+
+    patient_ids, score_types = list(patient_ids), list(score_types)
+    if not patient_ids or not score_types:
+        return {}
+    filters = (ClinicalScore.patient_id.in_(patient_ids), ClinicalScore.score_type.in_(score_types))
+
+    if _latest_values_query_mode(db) == 'scan':
+        latest: Dict[Tuple[int, str], float] = {}
+        rows = (
+            db.query(ClinicalScore.patient_id, ClinicalScore.score_type, ClinicalScore.value)
+            .filter(*filters)
+            .order_by(ClinicalScore.timestamp.desc(), ClinicalScore.score_id.desc())
+        )
+        for patient_id, score_type, value in rows:
+            latest.setdefault((patient_id, score_type), value)
+        return latest
+
+    rank = func.row_number().over(
+        partition_by=(ClinicalScore.patient_id, ClinicalScore.score_type),
+        order_by=(ClinicalScore.timestamp.desc(), ClinicalScore.score_id.desc()),
+    ).label('rank')
+    ranked = (
+        db.query(ClinicalScore.patient_id, ClinicalScore.score_type, ClinicalScore.value, rank)
+        .filter(*filters)
+        .subquery()
+    )
+    rows = db.query(ranked.c.patient_id, ranked.c.score_type, ranked.c.value).filter(ranked.c.rank == 1)
+    return {(patient_id, score_type): value for patient_id, score_type, value in rows}
+
+
+def get_score_series(db: Session, patient_id: int, score_type: str, since: Optional[datetime] = None,
+                     until: Optional[datetime] = None, limit: Optional[int] = None) -> List[ClinicalScore]:
+    """
+    A patient's values of one score, oldest first.
+
+    Each row is a change point: the score kept its value until the next row.
+
+    Args:
+        db: Database session.
+        patient_id: The ID of the patient.
+        score_type: Score name as stored (``schemas.clinical_score.ScoreType`` value).
+        since: Only rows at or after this time.
+        until: Only rows at or before this time.
+        limit: Keep only the most recent ``limit`` points.
+    """
+    query = db.query(ClinicalScore).filter(
+        ClinicalScore.patient_id == patient_id,
+        ClinicalScore.score_type == score_type,
+    )
+    if since is not None:
+        query = query.filter(ClinicalScore.timestamp >= since)
+    if until is not None:
+        query = query.filter(ClinicalScore.timestamp <= until)
+    if limit is not None:
+        newest = query.order_by(ClinicalScore.timestamp.desc(), ClinicalScore.score_id.desc()).limit(limit).all()
+        return newest[::-1]
+    return query.order_by(ClinicalScore.timestamp, ClinicalScore.score_id).all()
@@ -1,11 +1,24 @@
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Dict, Optional, Tuple
-from database.models import LabResult, Patient
+from typing import Any, List, Dict, Optional, Tuple
+from database.models import Alert, LabResult, Patient
 # from schemas.lab_result import LabResultCreate, LabResult as LabResultSchema
 import schemas.lab_result as lab_result_schemas
+from schemas.alert import AlertCreate
 from collections import defaultdict
 from datetime import datetime
 import logging
+import os
+
+from analyzers.aki import BASELINE_WINDOW, AKIStage, aki_stager
+from analyzers.findings import Finding
+from analyzers.incremental import AnalysisDelta, incremental_analyzer
+from analyzers.panel import aliases_for_test, canonical_test_id
+from crud.alerts import create_alerts_bulk, upsert_alerts
+from crud.crud_patient_latest_lab import get_latest_labs, lab_test_key, newest_lab_result, upsert_latest_lab
+from crud.patients import patient_demographics
+from utils.alert_events import ALERT_UPDATED, queue_alert_events
+from utils.score_parameter_cache import invalidate_score_parameters
 
 # Assuming frontend type LabSummary = LabTrendItem[]
 # where LabTrendItem = { name: string; [key: string]: string | number | undefined; }
@@ -13,6 +26,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+INCREMENTAL_ANALYSIS_ENABLED = os.getenv("INCREMENTAL_ANALYSIS_ENABLED", "true").lower() not in ("0", "false", "no")
+AKI_STAGING_ENABLED = os.getenv("AKI_STAGING_ENABLED", "true").lower() not in ("0", "false", "no")
+
 def get_lab_summary_for_patient(db: Session, patient_id: int, limit_days: int = 90) -> List[Dict[str, any]]:
     """
     Retrieve and format recent lab results for summary trend chart.
@@ -84,13 +100,242 @@ def create_lab_result(db: Session, result_data: lab_result_schemas.LabResultCrea
     if 'timestamp' not in db_result_data or db_result_data['timestamp'] is None:
         db_result_data['timestamp'] = datetime.utcnow()
 
-    db_lab_result = LabResult(**db_result_data)
+    db_lab_result = LabResult(**db_result_data)  # value_normalized is set on flush (see models)
     db.add(db_lab_result)
+    db.flush()
+    upsert_latest_lab(db, db_lab_result)  # Same transaction as the insert
     db.commit()
+    invalidate_score_parameters(patient_id)
     db.refresh(db_lab_result)
     logger.info(f"Created lab result ID {db_lab_result.result_id} for patient {patient_id}")
+
+    if INCREMENTAL_ANALYSIS_ENABLED:
+        refresh_analysis_for_result(db, db_lab_result, user_id)
+    if AKI_STAGING_ENABLED and canonical_test_id(db_lab_result.test_name) == 'Creat':
+        refresh_aki_for_result(db, db_lab_result, user_id)
     return db_lab_result
 
+
+def _latest_lab_values(db: Session, patient_id: int, exclude_result_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Latest value of every test for a patient, as {test key: value}, from the
+    ``patient_latest_lab`` snapshot (one primary-key range read).
+
+    A test whose snapshot row is ``exclude_result_id`` (the result being
+    analyzed) gets its previous result instead, if it has one.
+    """
+    latest: Dict[str, Any] = {}
+    for key, row in get_latest_labs(db, patient_id).items():
+        if exclude_result_id is not None and row.result_id == exclude_result_id:
+            previous = newest_lab_result(db, patient_id, key, exclude_result_id=exclude_result_id)
+            if previous is not None:
+                latest[key] = previous.value_normalized if previous.value_normalized is not None else previous.value_text
+            continue
+        latest[key] = row.value if row.value is not None else row.value_text
+    return latest
+
+
+def _patient_context(db: Session, patient_id: int) -> Dict[str, Any]:
+    """Demographics the analyzers accept (idade, sexo), taken from the patient record."""
+    return patient_demographics(db.query(Patient).filter(Patient.patient_id == patient_id).first())
+
+
+def _abnormality_message(abnormality: Any) -> str:
+    if isinstance(abnormality, dict):
+        return str(abnormality.get("message") or abnormality.get("description") or abnormality)
+    return str(abnormality)
+
+
+def _finding_alert(patient_id: int, user_id: Optional[int], analyzer_name: str, finding: Finding,
+                   source_result_id: int) -> AlertCreate:
+    return AlertCreate(
+        patient_id=patient_id,
+        user_id=user_id,
+        created_by=user_id,
+        alert_type="lab_abnormality",
+        message=finding.text,  # The only place the finding's Portuguese text is rendered
+        severity=finding.alert_severity,
+        category=analyzer_name,
+        parameter=finding.parameter,
+        value=finding.value,
+        status="active",
+        details={"analyzer": analyzer_name, "finding": finding.code, "source_result_id": source_result_id},
+    )
+
+
+def refresh_analysis_for_result(db: Session, db_lab_result: LabResult, user_id: Optional[int] = None) -> Optional[AnalysisDelta]:
+    """
+    Re-run only the analyzers that read the new result and reconcile lab alerts.
+
+    New findings become active 'lab_abnormality' alerts (one per test, with
+    the parameter, value and severity of the ``Finding``); findings that are
+    no longer present resolve the matching active alerts. Analyzers without
+    structured findings (``AnalyzerSpec.finding_tests`` empty) are reconciled
+    on their narrative abnormalities instead. Failures are logged and never
+    undo the lab result insert.
+
+    A result older than the patient's latest one of the same test (backdated
+    or imported) did not become the snapshot value, so it is not fed to the
+    in-memory panel either.
+
+    Returns:
+        AnalysisDelta: The incremental analysis outcome, or None when the
+            result is not the latest of its test or on failure.
+    """
+    patient_id = db_lab_result.patient_id
+    key = lab_test_key(db_lab_result.test_name)
+    latest = get_latest_labs(db, patient_id, [key]).get(key)
+    if latest is not None and latest.result_id != db_lab_result.result_id:
+        logger.debug(f"Lab result {db_lab_result.result_id} is older than the latest {key} of patient {patient_id}; "
+                     f"incremental analysis skipped")
+        return None
+    value = db_lab_result.value_normalized if db_lab_result.value_normalized is not None else db_lab_result.value_text
+    try:
+        delta = incremental_analyzer.update(
+            patient_id,
+            {key: value},
+            patient=_patient_context(db, patient_id),
+            seed=lambda: _latest_lab_values(db, patient_id, exclude_result_id=db_lab_result.result_id),
+        )
+        if not delta.has_changes:
+            return delta
+        registry = incremental_analyzer.registry
+
+        def narrative(analyzer_name: str) -> bool:
+            return analyzer_name in registry and not registry[analyzer_name].finding_tests
+
+        # Resolve first, so a finding replaced on the same test (e.g. a severity
+        # change) does not resolve the alert that replaces it
+        resolved = []
+        for analyzer_name, finding in delta.removed_findings:
+            resolved.append(and_(Alert.category == analyzer_name, Alert.parameter == finding.parameter,
+                                 Alert.severity == finding.alert_severity))
+        removed: Dict[str, List[str]] = defaultdict(list)
+        for analyzer_name, abnormality in delta.removed:
+            if narrative(analyzer_name):
+                removed[analyzer_name].append(_abnormality_message(abnormality))
+        for analyzer_name, messages in removed.items():
+            resolved.append(and_(Alert.category == analyzer_name, Alert.message.in_(messages)))
+        if resolved:
+            # Loaded rather than bulk-updated so subscribers get an alert.updated event
+            resolved_alerts = (
+                db.query(Alert)
+                .filter(
+                    Alert.patient_id == patient_id,
+                    Alert.alert_type == "lab_abnormality",
+                    Alert.status == "active",
+                    or_(*resolved),
+                )
+                .all()
+            )
+            now = datetime.now()
+            for alert in resolved_alerts:
+                alert.status = "resolved"
+                alert.updated_at = now
+            queue_alert_events(db, ALERT_UPDATED, resolved_alerts)
+
+        source_id = db_lab_result.result_id
+        new_alerts = [
+            _finding_alert(patient_id, user_id, analyzer_name, finding, source_id)
+            for analyzer_name, finding in delta.added_findings
+        ]
+        for analyzer_name, abnormality in delta.added:
+            if not narrative(analyzer_name):
+                continue
+            result = delta.results.get(analyzer_name) or {}
+            new_alerts.append(AlertCreate(
+                patient_id=patient_id,
+                user_id=user_id,
+                created_by=user_id,
+                alert_type="lab_abnormality",
+                message=_abnormality_message(abnormality),
+                severity="critical" if result.get("is_critical") else "warning",
+                category=analyzer_name,
+                status="active",
+                details={"analyzer": analyzer_name, "source_result_id": source_id},
+            ))
+        # Deduplicated against open alerts by fingerprint, committed with the resolutions above
+        upsert_alerts(db, new_alerts, commit=False)
+        db.commit()
+        logger.info(
+            f"Incremental analysis for patient {patient_id}: re-ran {delta.rerun}, "
+            f"{len(new_alerts)} new and {len(resolved)} resolved findings"
+        )
+        return delta
+    except Exception as e:
+        db.rollback()
+        # The in-memory state may now be ahead of the alerts table; re-seed next time
+        incremental_analyzer.forget(patient_id)
+        logger.error(f"Incremental analysis failed for lab result {db_lab_result.result_id}: {e}", exc_info=True)
+        return None
+
+def _creatinine_history(db: Session, patient_id: int, until: datetime, exclude_result_id: Optional[int] = None) -> List[Tuple[datetime, float]]:
+    """(timestamp, mg/dL) creatinine readings of the 7 days before ``until``."""
+    query = (
+        db.query(LabResult.timestamp, LabResult.value_normalized)
+        .filter(
+            LabResult.patient_id == patient_id,
+            func.lower(LabResult.test_name).in_(aliases_for_test('Creat')),
+            LabResult.value_normalized.isnot(None),
+            LabResult.unit_normalized == 'mg/dL',
+            LabResult.timestamp >= until - BASELINE_WINDOW,
+            LabResult.timestamp <= until,
+        )
+    )
+    if exclude_result_id is not None:
+        query = query.filter(LabResult.result_id != exclude_result_id)
+    return [(timestamp, value) for timestamp, value in query.all()]
+
+
+def refresh_aki_for_result(db: Session, db_lab_result: LabResult, user_id: Optional[int] = None) -> Optional[AKIStage]:
+    """
+    Update the patient's streaming KDIGO stage with a new creatinine result.
+
+    The first creatinine seen for a patient seeds the window with the previous
+    7 days from the database; later results are staged from memory. A stage
+    higher than the previous one raises an 'aki' alert. Failures are logged
+    and never undo the lab result insert.
+
+    Returns:
+        AKIStage: Stage of the new result, or None if it could not be staged.
+    """
+    patient_id = db_lab_result.patient_id
+    creatinine = db_lab_result.value_normalized
+    if creatinine is None or db_lab_result.unit_normalized != 'mg/dL':
+        return None
+    try:
+        previous = aki_stager.current(patient_id)
+        stage = aki_stager.update(
+            patient_id,
+            creatinine,
+            db_lab_result.timestamp,
+            seed=lambda: _creatinine_history(db, patient_id, db_lab_result.timestamp, exclude_result_id=db_lab_result.result_id),
+        )
+        previous_stage = previous.stage if previous is not None else 0
+        if stage.stage > previous_stage and stage is aki_stager.current(patient_id):
+            create_alerts_bulk(db, [AlertCreate(
+                patient_id=patient_id,
+                user_id=user_id,
+                created_by=user_id,
+                alert_type="aki",
+                message=stage.interpretation,
+                severity="critical" if stage.stage >= 2 else "warning",
+                category="renal",
+                parameter="Creatinina",
+                value=creatinine,
+                status="active",
+                details={"kdigo_stage": stage.stage, "baseline": stage.baseline, "criteria": list(stage.criteria),
+                         "source_result_id": db_lab_result.result_id},
+            )], commit=False)
+            db.commit()
+            logger.info(f"AKI KDIGO stage {stage.stage} for patient {patient_id} (result {db_lab_result.result_id})")
+        return stage
+    except Exception as e:
+        db.rollback()
+        aki_stager.forget(patient_id)
+        logger.error(f"AKI staging failed for lab result {db_lab_result.result_id}: {e}", exc_info=True)
+        return None
+
 # New function to get all lab results for a patient
 def get_lab_results_for_patient(
     db: Session, 
@@ -0,0 +1,189 @@
+"""
+Per-patient latest-lab snapshot (``patient_latest_lab``).
+
+One row per (patient, test) holding the newest result of that test. Lab
+result writes upsert it in the same transaction as the insert, so readers
+(severity scores, dashboards, patient context) get "latest value of every
+test" with a primary-key range read. ``rebuild_patient_latest_labs`` derives
+the table again from ``lab_results`` (after imports or a migration).
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from analyzers.panel import aliases_for_test, canonical_test_id
+from database.models import LabResult, PatientLatestLab
+
+logger = logging.getLogger(__name__)
+
+REBUILD_BATCH_SIZE = 5000
+
+
+def lab_test_key(test_name: str) -> str:
+    """Snapshot key of a test: its canonical id, or the lower-cased name of tests the panel does not know."""
+    return canonical_test_id(test_name) or test_name.strip().lower()[:100]
+
+
+def _has_value(result: LabResult) -> bool:
+    return result.value_normalized is not None or bool(result.value_text)
+
+
+def _snapshot_values(result: LabResult) -> Dict[str, object]:
+    return {
+        "result_id": result.result_id,
+        "test_name": result.test_name,
+        "value": result.value_normalized,
+        "value_text": result.value_text,
+        "unit": result.unit_normalized,
+        "timestamp": result.timestamp,
+        "updated_at": datetime.utcnow(),
+    }
+
+
+def upsert_latest_lab(db: Session, result: LabResult) -> None:
+    """
+    Make ``result`` the patient's latest value of its test unless a newer
+    result is already recorded. Does not commit: call it inside the
+    transaction that writes the result (``result_id`` must be assigned, i.e.
+    the result flushed).
+
+    On PostgreSQL and SQLite this is one INSERT ... ON CONFLICT DO UPDATE
+    guarded by the timestamp, so concurrent writers cannot move the snapshot
+    backwards.
+    """
+    if not _has_value(result):
+        return
+    key = lab_test_key(result.test_name)
+    values = _snapshot_values(result)
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        table = PatientLatestLab.__table__
+        stmt = insert(table).values(patient_id=result.patient_id, test_key=key, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.patient_id, table.c.test_key],
+            set_={name: stmt.excluded[name] for name in values},
+            where=table.c.timestamp <= stmt.excluded.timestamp,
+        )
+        db.execute(stmt)
+        return
+
+    row = db.get(PatientLatestLab, (result.patient_id, key))
+    if row is None:
+        db.add(PatientLatestLab(patient_id=result.patient_id, test_key=key, **values))
+    elif row.timestamp <= result.timestamp:
+        for name, value in values.items():
+            setattr(row, name, value)
+
+
+def newest_lab_result(db: Session, patient_id: int, test_key: str,
+                      exclude_result_id: Optional[int] = None) -> Optional[LabResult]:
+    """Newest result with a value of one test (any spelling), read from ``lab_results``."""
+    names = aliases_for_test(test_key) or (test_key,)
+    query = db.query(LabResult).filter(
+        LabResult.patient_id == patient_id,
+        func.lower(LabResult.test_name).in_(names),
+        (LabResult.value_normalized.isnot(None)) | (LabResult.value_text.isnot(None)),
+    )
+    if exclude_result_id is not None:
+        query = query.filter(LabResult.result_id != exclude_result_id)
+    return query.order_by(LabResult.timestamp.desc(), LabResult.result_id.desc()).first()
+
+
+def refresh_latest_lab(db: Session, patient_id: int, test_name: str) -> Optional[PatientLatestLab]:
+    """
+    Re-derive one snapshot row from ``lab_results`` (after a result is
+    updated or deleted). Does not commit.
+
+    Returns:
+        PatientLatestLab: The refreshed row, or None if the patient has no
+            result of that test anymore.
+    """
+    key = lab_test_key(test_name)
+    newest = newest_lab_result(db, patient_id, key)
+    row = db.get(PatientLatestLab, (patient_id, key))
+    if newest is None:
+        if row is not None:
+            db.delete(row)
+        return None
+    if row is None:
+        row = PatientLatestLab(patient_id=patient_id, test_key=key)
+        db.add(row)
+    for name, value in _snapshot_values(newest).items():
+        setattr(row, name, value)
+    return row
+
+
+def rebuild_patient_latest_labs(db: Session, patient_ids: Optional[Iterable[int]] = None,
+                                batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """
+    Rebuild the snapshot from ``lab_results``, for every patient or only the
+    given ones, and commit.
+
+    Results are streamed in (patient, time) order and each patient's rows are
+    written as soon as the scan moves past the patient, so memory stays
+    bounded by one patient's tests.
+
+    Returns:
+        int: Number of snapshot rows written.
+    """
+    snapshot = db.query(PatientLatestLab)
+    results = db.query(LabResult).filter(
+        (LabResult.value_normalized.isnot(None)) | (LabResult.value_text.isnot(None))
+    )
+    if patient_ids is not None:
+        patient_ids = list(patient_ids)
+        snapshot = snapshot.filter(PatientLatestLab.patient_id.in_(patient_ids))
+        results = results.filter(LabResult.patient_id.in_(patient_ids))
+    snapshot.delete(synchronize_session=False)
+
+    written = 0
+    current_patient: Optional[int] = None
+    latest: Dict[str, Dict[str, object]] = {}
+
+    def flush_patient() -> None:
+        nonlocal written
+        if latest:
+            db.bulk_insert_mappings(PatientLatestLab, [
+                {"patient_id": current_patient, "test_key": key, **values} for key, values in latest.items()
+            ])
+            written += len(latest)
+            latest.clear()
+
+    ordered = results.order_by(LabResult.patient_id, LabResult.timestamp, LabResult.result_id)
+    for result in ordered.yield_per(batch_size):
+        if result.patient_id != current_patient:
+            flush_patient()
+            current_patient = result.patient_id
+        latest[lab_test_key(result.test_name)] = _snapshot_values(result)
+    flush_patient()
+    db.commit()
+    logger.info(f"Rebuilt patient_latest_lab: {written} rows")
+    return written
+
+
+def get_latest_labs(db: Session, patient_id: int, test_keys: Optional[Iterable[str]] = None,
+                    since: Optional[datetime] = None) -> Dict[str, PatientLatestLab]:
+    """
+    Latest result of each test of a patient, as {test_key: row}.
+
+    Args:
+        db: Database session.
+        patient_id: The ID of the patient.
+        test_keys: Canonical test ids (see ``lab_test_key``); all tests if None.
+        since: Ignore tests whose latest result is older than this.
+    """
+    query = db.query(PatientLatestLab).filter(PatientLatestLab.patient_id == patient_id)
+    if test_keys is not None:
+        query = query.filter(PatientLatestLab.test_key.in_(list(test_keys)))
+    if since is not None:
+        query = query.filter(PatientLatestLab.timestamp >= since)
+    return {row.test_key: row for row in query.all()}
+
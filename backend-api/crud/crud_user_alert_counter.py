@@ -0,0 +1,158 @@
+"""
+Per-recipient alert counters (``user_alert_counters``).
+
+One row per (user, severity) holding how many alerts addressed to the user
+(``Alert.user_id``) exist and how many are unread. The alert write paths of
+``crud.alerts`` (create, bulk create/upsert, mark as read, update, delete)
+adjust them in the same transaction as the alert write, so the header badge
+and the totals of ``get_alerts_by_user_and_status`` are a primary-key range
+read instead of a ``count()`` over alerts. ``rebuild_user_alert_counters``
+derives the table again from ``alerts`` (after the migration, or after writes
+that bypassed ``crud.alerts``).
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from database.models import Alert, UserAlertCounter
+
+logger = logging.getLogger(__name__)
+
+# {(user_id, severity): [total delta, unread delta]}
+CounterDeltas = Dict[Tuple[int, str], List[int]]
+
+
+def count_alert(deltas: CounterDeltas, user_id: Optional[int], severity: Optional[str], is_read: Optional[bool],
+                sign: int = 1) -> None:
+    """Add (sign=1) or remove (sign=-1) one alert in ``deltas``; alerts without a recipient are not counted."""
+    if user_id is None:
+        return
+    delta = deltas.setdefault((user_id, severity or ''), [0, 0])
+    delta[0] += sign
+    if not is_read:
+        delta[1] += sign
+
+
+def counted_state(alert: Any) -> Tuple[Optional[int], Optional[str], bool]:
+    """The fields of an alert the counters depend on."""
+    return alert.user_id, alert.severity, bool(alert.is_read)
+
+
+def count_change(deltas: CounterDeltas, before: Tuple[Optional[int], Optional[str], bool],
+                 after: Tuple[Optional[int], Optional[str], bool]) -> None:
+    """Move one alert from its ``counted_state`` before a change to the one after it."""
+    if before != after:
+        count_alert(deltas, *before, sign=-1)
+        count_alert(deltas, *after)
+
+
+def apply_counter_deltas(db: Session, deltas: CounterDeltas) -> None:
+    """
+    Apply counter deltas. Does not commit: call it inside the transaction
+    that writes the alerts.
+
+    On PostgreSQL and SQLite this is one INSERT ... ON CONFLICT DO UPDATE
+    that adds the deltas in the database, so concurrent writers do not lose
+    increments.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "severity": severity, "total": total, "unread": unread, "updated_at": now}
+        for (user_id, severity), (total, unread) in deltas.items()
+        if total or unread
+    ]
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        table = UserAlertCounter.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.severity],
+            set_={
+                "total": table.c.total + stmt.excluded.total,
+                "unread": table.c.unread + stmt.excluded.unread,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db.execute(stmt, rows)
+        return
+
+    for row in rows:
+        counter = db.get(UserAlertCounter, (row["user_id"], row["severity"]))
+        if counter is None:
+            db.add(UserAlertCounter(**row))
+        else:
+            counter.total += row["total"]
+            counter.unread += row["unread"]
+            counter.updated_at = now
+
+
+def get_unread_alert_counts(db: Session, user_id: int) -> Dict[str, int]:
+    """Unread alerts addressed to a user, per severity (severities with none are left out)."""
+    rows = (
+        db.query(UserAlertCounter.severity, UserAlertCounter.unread)
+        .filter(UserAlertCounter.user_id == user_id, UserAlertCounter.unread > 0)
+        .all()
+    )
+    return {severity: unread for severity, unread in rows}
+
+
+def get_alert_counts(db: Session, user_id: int) -> Dict[str, Any]:
+    """
+    Alert totals of a user from the counters (``schemas.alert.AlertStats`` shape).
+
+    Returns:
+        dict: 'total', 'unread' and 'by_severity' (unread alerts per severity).
+    """
+    rows = (
+        db.query(UserAlertCounter.severity, UserAlertCounter.total, UserAlertCounter.unread)
+        .filter(UserAlertCounter.user_id == user_id)
+        .all()
+    )
+    return {
+        "total": sum(total for _, total, _ in rows),
+        "unread": sum(unread for _, _, unread in rows),
+        "by_severity": {severity: unread for severity, _, unread in rows if unread > 0},
+    }
+
+
+def rebuild_user_alert_counters(db: Session, user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Rebuild the counters from ``alerts``, for every user or only the given
+    ones, and commit.
+
+    Returns:
+        int: Number of counter rows written.
+    """
+    counters = db.query(UserAlertCounter)
+    alerts = db.query(
+        Alert.user_id,
+        func.coalesce(Alert.severity, ''),
+        func.count(Alert.alert_id),
+        func.sum(case((Alert.is_read == True, 0), else_=1)),  # noqa: E712
+    ).filter(Alert.user_id.isnot(None))
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        counters = counters.filter(UserAlertCounter.user_id.in_(user_ids))
+        alerts = alerts.filter(Alert.user_id.in_(user_ids))
+    counters.delete(synchronize_session=False)
+
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "severity": severity, "total": total, "unread": unread or 0, "updated_at": now}
+        for user_id, severity, total, unread in alerts.group_by(Alert.user_id, func.coalesce(Alert.severity, '')).all()
+    ]
+    if rows:
+        db.bulk_insert_mappings(UserAlertCounter, rows)
+    db.commit()
+    logger.info(f"Rebuilt user_alert_counters: {len(rows)} rows")
+    return len(rows)
@@ -7,6 +7,7 @@ import logging
 from database import models # Corrected
 # from backend_api.schemas import vital_sign as schemas # Use alias to avoid name clash
 import schemas.vital_sign as vital_sign_schemas # Corrected
+from utils.score_parameter_cache import invalidate_score_parameters
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +19,7 @@ def create_vital_sign(db: Session, vital_sign: vital_sign_schemas.VitalSignCreat
     )
     db.add(db_vital_sign)
     db.commit()
+    invalidate_score_parameters(patient_id)
     db.refresh(db_vital_sign)
     logger.info(f"Created vital sign record ID {db_vital_sign.vital_id} for patient {patient_id}")
     return db_vital_sign
@@ -53,6 +55,7 @@ def delete_vital_sign(db: Session, vital_id: int) -> Optional[models.VitalSign]:
     if db_vital_sign:
         db.delete(db_vital_sign)
         db.commit()
+        invalidate_score_parameters(db_vital_sign.patient_id)
         logger.info(f"Deleted vital sign record ID {vital_id}")
         return db_vital_sign
     logger.warning(f"Attempted to delete non-existent vital sign record ID {vital_id}")
@@ -9,6 +9,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy import desc
 
 from database.models import LabResult
+from crud.crud_patient_latest_lab import refresh_latest_lab, upsert_latest_lab
+from utils.score_parameter_cache import invalidate_score_parameters
 import logging
 
 logger = logging.getLogger(__name__)
@@ -39,16 +41,25 @@ class LabResultCRUD:
         """Create a new lab result."""
         db_obj = LabResult(**obj_in.dict())
         db.add(db_obj)
+        db.flush()
+        upsert_latest_lab(db, db_obj)
         db.commit()
+        invalidate_score_parameters(db_obj.patient_id)
         db.refresh(db_obj)
         return db_obj
 
     def update(self, db: Session, *, db_obj: LabResult, obj_in) -> LabResult:
         """Update a lab result."""
         update_data = obj_in.dict(exclude_unset=True)
+        previous_test_name = db_obj.test_name
         for field, value in update_data.items():
             setattr(db_obj, field, value)
+        db.flush()
+        refresh_latest_lab(db, db_obj.patient_id, db_obj.test_name)
+        if db_obj.test_name != previous_test_name:
+            refresh_latest_lab(db, db_obj.patient_id, previous_test_name)
         db.commit()
+        invalidate_score_parameters(db_obj.patient_id)
         db.refresh(db_obj)
         return db_obj
 
@@ -57,7 +68,10 @@ class LabResultCRUD:
         obj = db.query(LabResult).filter(LabResult.result_id == result_id).first()
         if obj:
             db.delete(obj)
+            db.flush()
+            refresh_latest_lab(db, obj.patient_id, obj.test_name)
             db.commit()
+            invalidate_score_parameters(obj.patient_id)
             return True
         return False
 
@@ -9,6 +9,7 @@ import schemas.patient as patient_schemas
 import schemas.lab_result as lab_result_schemas
 import schemas.medication as medication_schemas
 from .associations import is_doctor_assigned_to_patient
+from utils.score_parameter_cache import invalidate_score_parameters
 
 import logging
 
@@ -44,6 +45,20 @@ def get_patients_by_user(*args, **kwargs):
     raise NotImplementedError("get_patients_by_user is deprecated, use get_patients with appropriate filters.")
     # return get_patients(db, user_id, skip, limit)
 
+def patient_demographics(patient: Optional[Patient]) -> Dict[str, Any]:
+    """Age in years ('idade') and sex 'M'/'F' ('sexo') of a patient record, where known."""
+    context: Dict[str, Any] = {}
+    if patient is None:
+        return context
+    gender = (patient.gender or "").strip().upper()
+    if gender[:1] in ("M", "F"):
+        context["sexo"] = gender[:1]
+    if patient.birthDate is not None:
+        today = datetime.utcnow().date()
+        birth = patient.birthDate.date() if isinstance(patient.birthDate, datetime) else patient.birthDate
+        context["idade"] = today.year - birth.year - ((today.month, today.day) < (birth.month, birth.day))
+    return context
+
 def get_patient(
     db: Session, 
     patient_id: int
@@ -156,6 +171,7 @@ def update_patient(
     
     db_patient.updated_at = datetime.now(timezone.utc) # Use timezone aware
     db.commit()
+    invalidate_score_parameters(patient_id)
     db.refresh(db_patient)
     return db_patient
 
@@ -174,6 +190,7 @@ def delete_patient(
 
     db.delete(db_patient)
     db.commit()
+    invalidate_score_parameters(patient_id)
     return True
 
 def count_patients_by_user(
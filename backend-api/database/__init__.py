@@ -78,7 +78,7 @@ def get_db():
 
 # Import all models to make them available as database.models.*
 from .models import (
-    User, Patient, VitalSign, Exam, TestCategory, LabResult, LabInterpretation,
+    User, Patient, VitalSign, Exam, TestCategory, LabResult, LabInterpretation, PatientLatestLab,
     Medication, ClinicalScore, ClinicalNote, Analysis, AIChatConversation,
     AIChatMessage, Alert, HealthTip, HealthDiaryEntry, GroupInvitation,
     Group, GroupMembership, GroupPatient, MedicationStatus, MedicationRoute,
@@ -7,7 +7,7 @@ All models should be defined here to avoid duplication and conflicts.
 from datetime import datetime
 import enum
 import uuid
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, JSON, Enum as SQLAlchemyEnum, Table, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, JSON, Enum as SQLAlchemyEnum, Table, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID
@@ -178,6 +178,7 @@ class Patient(Base):
 
     # Keep other existing relationships
     lab_results = relationship("LabResult", back_populates="patient", cascade="all, delete-orphan")
+    latest_labs = relationship("PatientLatestLab", cascade="all, delete-orphan", passive_deletes=True)
     medications = relationship("Medication", back_populates="patient", cascade="all, delete-orphan")
     clinical_scores = relationship("ClinicalScore", back_populates="patient", cascade="all, delete-orphan")
     alerts = relationship("Alert", back_populates="patient")
@@ -279,6 +280,8 @@ class LabResult(Base):
     value_numeric = Column(Float)
     value_text = Column(String(255))
     unit = Column(String(50))
+    value_normalized = Column(Float, nullable=True)  # value_numeric in unit_normalized, set at write time
+    unit_normalized = Column(String(50), nullable=True)
     timestamp = Column(DateTime, nullable=False)
     reference_range_low = Column(Float)
     reference_range_high = Column(Float)
@@ -301,6 +304,26 @@ class LabResult(Base):
     interpretations = relationship("LabInterpretation", back_populates="result", cascade="all, delete-orphan")
 
 
+# "Latest value per test" lookups are a range scan: patient, case-folded test name, time
+Index('ix_lab_results_patient_test_time', LabResult.patient_id, func.lower(LabResult.test_name), LabResult.timestamp)
+
+
+@event.listens_for(LabResult, "before_insert")
+@event.listens_for(LabResult, "before_update")
+def _normalize_lab_result_units(mapper, connection, target):
+    """Fill value_normalized/unit_normalized on every ORM write path."""
+    from utils.unit_conversion import unit_registry
+    unit_registry.apply(target)
+
+
+@event.listens_for(VitalSign, "after_insert")
+@event.listens_for(LabResult, "after_insert")
+def _track_score_inputs(mapper, connection, target):
+    """Queue the patient for severity score maintenance once the transaction commits."""
+    from utils.score_maintenance import track_score_input
+    track_score_input(target)
+
+
 class LabInterpretation(Base):
     """Model for storing interpretations of lab results."""
     __tablename__ = "lab_interpretations"
@@ -316,6 +339,25 @@ class LabInterpretation(Base):
     result = relationship("LabResult", back_populates="interpretations")
     user = relationship("User", back_populates="lab_interpretations")
 
+
+class PatientLatestLab(Base):
+    """
+    Latest result of each test per patient, kept in step with lab_results on
+    write (see crud.crud_patient_latest_lab) so "latest value of every test"
+    reads are a primary-key range read instead of a sort over the history.
+    """
+    __tablename__ = "patient_latest_lab"
+
+    patient_id = Column(Integer, ForeignKey("patients.patient_id", ondelete="CASCADE"), primary_key=True)
+    test_key = Column(String(100), primary_key=True)  # Canonical test id, or the lower-cased name of unknown tests
+    result_id = Column(Integer, ForeignKey("lab_results.result_id", ondelete="SET NULL"), nullable=True)
+    test_name = Column(String(100), nullable=False)
+    value = Column(Float, nullable=True)  # LabResult.value_normalized
+    value_text = Column(String(255), nullable=True)
+    unit = Column(String(50), nullable=True)  # LabResult.unit_normalized
+    timestamp = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
 # ================ MEDICATION & TREATMENT MODELS ================
 
 class Medication(Base):
@@ -361,6 +403,10 @@ class ClinicalScore(Base):
     user = relationship("User", back_populates="clinical_scores")
 
 
+# Score series reads: one patient's values of one score over time
+Index('ix_clinical_scores_patient_type_time', ClinicalScore.patient_id, ClinicalScore.score_type, ClinicalScore.timestamp)
+
+
 class ClinicalNote(Base):
     """Model for clinical notes about patients."""
     __tablename__ = "clinical_notes"
@@ -478,11 +524,38 @@ class Alert(Base):
     acknowledged_by = Column(String, nullable=True)
     acknowledged_at = Column(DateTime, nullable=True)
 
+    # Deduplication: see utils.alert_fingerprint and crud.alerts
+    fingerprint = Column(String(40), nullable=True, index=True)
+    occurrence_count = Column(Integer, default=1, server_default='1', nullable=False)
+
     # Relacionamentos
     patient = relationship("Patient", back_populates="alerts")
     user = relationship("User", foreign_keys=[user_id], back_populates="alerts")
     creator = relationship("User", foreign_keys=[created_by]) 
 
+
+@event.listens_for(Alert, "before_insert")
+def _fingerprint_alert(mapper, connection, target):
+    """Fill the deduplication fingerprint on every ORM insert path."""
+    if target.fingerprint is None:
+        from utils.alert_fingerprint import fingerprint_of
+        target.fingerprint = fingerprint_of(target)
+
+
+class UserAlertCounter(Base):
+    """
+    Alert counts per recipient and severity, kept in step with alerts by the
+    write paths of crud.alerts (see crud.crud_user_alert_counter) so badge
+    counts are a primary-key range read instead of a count over alerts.
+    """
+    __tablename__ = "user_alert_counters"
+
+    user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    severity = Column(String(50), primary_key=True)  # Alert.severity ('' when missing)
+    total = Column(Integer, nullable=False, default=0, server_default='0')
+    unread = Column(Integer, nullable=False, default=0, server_default='0')
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
 # ================ HEALTH & WELLNESS MODELS ===============
 
 class HealthTip(Base):
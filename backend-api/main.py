@@ -18,6 +18,9 @@ from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from utils.rate_limit import limiter
+from utils.score_maintenance import score_queue
+from utils.alert_events import alert_event_bus
+from database import SessionLocal
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -34,8 +37,12 @@ async def lifespan(app: FastAPI):
     global mcp_client_instance
     logger.info("Lifespan startup: MCP Client e outros serviços inicializados.")
     mcp_client_instance = MCPClient()
+    score_queue.start(SessionLocal)
+    alert_event_bus.start()
     yield # Application runs
     logger.info("Lifespan shutdown: Closing MCP Client...")
+    score_queue.stop()
+    alert_event_bus.stop()
     if mcp_client_instance:
         await mcp_client_instance.close()
 
@@ -44,6 +44,8 @@ class LabResult(LabResultBase):
     patient_id: int
     user_id: Optional[int] = None
     category_id: Optional[int] = None
+    value_normalized: Optional[float] = None
+    unit_normalized: Optional[str] = None
     created_at: datetime
     
     model_config = ConfigDict(from_attributes=True)
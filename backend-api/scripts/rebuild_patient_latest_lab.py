@@ -0,0 +1,49 @@
+"""
+Rebuild the patient_latest_lab snapshot from lab_results.
+
+Run from backend-api/ after the migration that creates the table, or after
+bulk imports that bypass the CRUD layer:
+
+    python -m scripts.rebuild_patient_latest_lab                  # every patient
+    python -m scripts.rebuild_patient_latest_lab --patient-id 12 --patient-id 40
+"""
+
+import argparse
+import logging
+import os
+import sys
+from typing import Optional, Sequence
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from database import SessionLocal
+from crud.crud_patient_latest_lab import REBUILD_BATCH_SIZE, rebuild_patient_latest_labs
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Rebuild the patient_latest_lab snapshot table")
+    ap.add_argument('--patient-id', type=int, action='append', dest='patient_ids',
+                    help='Only rebuild these patients (repeatable)')
+    ap.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE, help='Lab results fetched per round trip')
+    args = ap.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        written = rebuild_patient_latest_labs(db, args.patient_ids, args.batch_size)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Rebuild failed: {e}", exc_info=True)
+        return 1
+    finally:
+        db.close()
+    print(f"[OK] patient_latest_lab rebuilt: {written} rows")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
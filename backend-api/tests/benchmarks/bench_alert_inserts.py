@@ -0,0 +1,162 @@
+"""
+Benchmark of alert inserts: ``create_alert`` per alert vs ``create_alerts_bulk``.
+
+For each batch size, the same synthetic analysis output (``AlertCreate``
+list) is written once alert by alert (one commit and refresh each, with
+suppression disabled so every alert is an insert) and once in bulk, each into
+a fresh file-backed SQLite database so commits pay their real cost. Reported
+per size: wall time of each strategy, statements executed and the speedup.
+
+Usage (from backend-api/):
+
+    python -m tests.benchmarks.bench_alert_inserts                   # sizes 10, 100, 1000
+    python -m tests.benchmarks.bench_alert_inserts --sizes 10 50 --repeat 5
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+BENCH_SIZES = (10, 100, 1000)
+BENCH_REPEAT = int(os.getenv("ALERT_BENCH_REPEAT", "3"))
+BENCH_SEED = int(os.getenv("ALERT_BENCH_SEED", "20240601"))
+
+_PARAMETERS = ('Potássio', 'Sódio', 'Creatinina', 'Glicose', 'pH', 'Lactato', 'Hemoglobina', 'Plaquetas')
+_SEVERITIES = ('critical', 'high', 'warning', 'info')
+
+
+def synthetic_alerts(n: int, patient_id: int, user_id: int, seed: int = BENCH_SEED) -> List[Any]:
+    """``n`` AlertCreate shaped like an analysis run's output (seeded)."""
+    from schemas.alert import AlertCreate
+
+    rng = random.Random(seed)
+    alerts = []
+    for i in range(n):
+        parameter = rng.choice(_PARAMETERS)
+        value = round(rng.uniform(0.5, 500.0), 2)
+        alerts.append(AlertCreate(
+            patient_id=patient_id, user_id=user_id, created_by=user_id,
+            alert_type=rng.choice(('lab_high', 'lab_low', 'lab_critical_high', 'lab_abnormality')),
+            parameter=parameter, message=f"{parameter} alterado ({value}) #{i}",
+            severity=rng.choice(_SEVERITIES), category="Lab Result", value=value,
+            reference="N/A", details={"run": seed, "index": i},
+        ))
+    return alerts
+
+
+class _Database:
+    """A fresh file-backed SQLite database with one doctor and one patient."""
+
+    def __init__(self):
+        from sqlalchemy import create_engine, event
+        from sqlalchemy.orm import sessionmaker
+        from database import Base
+        from database.models import Patient, User
+
+        self._dir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self._dir.name, 'bench.db')}")
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.statements = 0
+        event.listen(self.engine, "before_cursor_execute", self._count)
+
+        user = User(email="bench@example.com", name="Bench Doctor", role="doctor")
+        self.session.add(user)
+        self.session.commit()
+        patient = Patient(user_id=user.user_id, name="Bench Patient", gender="F", birthDate=datetime(1960, 1, 1))
+        self.session.add(patient)
+        self.session.commit()
+        self.user_id, self.patient_id = user.user_id, patient.patient_id
+        self.statements = 0
+
+    def _count(self, *args: Any) -> None:
+        self.statements += 1
+
+    def close(self) -> None:
+        self.session.close()
+        self.engine.dispose()
+        self._dir.cleanup()
+
+
+def _per_row(db: Any, alerts: Sequence[Any]) -> None:
+    from crud.alerts import create_alert
+
+    for alert in alerts:
+        create_alert(db, alert, suppression_window_minutes=0)
+
+
+def _bulk(db: Any, alerts: Sequence[Any]) -> None:
+    from crud.alerts import create_alerts_bulk
+
+    create_alerts_bulk(db, alerts)
+
+
+STRATEGIES: Dict[str, Callable[[Any, Sequence[Any]], None]] = {"per_row": _per_row, "bulk": _bulk}
+
+
+def measure(strategy: Callable[[Any, Sequence[Any]], None], size: int, repeat: int = BENCH_REPEAT) -> Dict[str, Any]:
+    """Best wall time (over ``repeat`` fresh databases) and statements of writing ``size`` alerts."""
+    from database.models import Alert
+
+    best = None
+    statements = 0
+    for _ in range(max(1, repeat)):
+        database = _Database()
+        try:
+            alerts = synthetic_alerts(size, database.patient_id, database.user_id)
+            start = time.perf_counter()
+            strategy(database.session, alerts)
+            elapsed = time.perf_counter() - start
+            statements = database.statements
+            stored = database.session.query(Alert).count()
+            if stored != size:
+                raise AssertionError(f"expected {size} alerts, found {stored}")
+        finally:
+            database.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return {"seconds": best, "statements": statements, "alerts_per_sec": size / best if best else 0.0}
+
+
+def run_benchmarks(sizes: Sequence[int] = BENCH_SIZES, repeat: int = BENCH_REPEAT) -> Dict[int, Dict[str, Dict[str, Any]]]:
+    """{size: {strategy: metrics}} for every batch size."""
+    logging.disable(logging.WARNING)
+    try:
+        return {size: {name: measure(func, size, repeat) for name, func in STRATEGIES.items()} for size in sizes}
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def format_report(results: Dict[int, Dict[str, Dict[str, Any]]]) -> str:
+    lines = [f"{'alerts':>7}  {'per_row ms':>11}  {'stmts':>6}  {'bulk ms':>9}  {'stmts':>6}  {'speedup':>8}"]
+    for size, metrics in results.items():
+        per_row, bulk = metrics["per_row"], metrics["bulk"]
+        speedup = per_row["seconds"] / bulk["seconds"] if bulk["seconds"] else float('inf')
+        lines.append(
+            f"{size:>7}  {per_row['seconds'] * 1000:>11.1f}  {per_row['statements']:>6}  "
+            f"{bulk['seconds'] * 1000:>9.1f}  {bulk['statements']:>6}  {speedup:>7.1f}x"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Per-row vs bulk alert insert benchmark")
+    ap.add_argument('--sizes', type=int, nargs='+', default=list(BENCH_SIZES), help='Alerts per batch')
+    ap.add_argument('--repeat', type=int, default=BENCH_REPEAT, help='Fresh databases per measurement (best is kept)')
+    args = ap.parse_args(argv)
+    print(format_report(run_benchmarks(args.sizes, args.repeat)))
+    return 0
+
+
+if __name__ == '__main__':
+    os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_alerts.db")
+    sys.exit(main())
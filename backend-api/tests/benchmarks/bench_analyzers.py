@@ -0,0 +1,283 @@
+"""
+Micro-benchmarks for the analyzers and the severity-score calculators.
+
+Each target is run over a fixed, seeded list of synthetic panels (see
+``synthetic_panels``) and reported as ops/sec, p50/p99 latency and the mean
+number of bytes allocated per call (tracemalloc, measured in a separate pass
+so tracing does not distort the timings). The analyzer result cache is turned
+off and logging is silenced up to WARNING while measuring, so every call
+does the full analysis work and nothing else.
+
+Usage (from backend-api/):
+
+    python -m tests.benchmarks.bench_analyzers                     # print a report
+    python -m tests.benchmarks.bench_analyzers --update-baseline   # store the baseline JSON
+    python -m tests.benchmarks.bench_analyzers --check             # exit 1 on regression
+
+A target regresses when its throughput drops below
+``baseline * (1 - tolerance)``; the tolerance defaults to
+ANALYZER_BENCH_TOLERANCE (0.25). It also fails when more inputs raise than in
+the baseline, and ``--update-baseline`` refuses to store results with errors.
+Inputs that raise are counted, then left out of the timed passes. Baselines
+are machine specific: refresh the file on the machine that runs the check.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from tests.benchmarks.synthetic_panels import SyntheticPanelGenerator
+
+BASELINE_PATH = os.getenv(
+    "ANALYZER_BENCH_BASELINE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_analyzers.json")
+)
+BENCH_TOLERANCE = float(os.getenv("ANALYZER_BENCH_TOLERANCE", "0.25"))
+BENCH_SEED = int(os.getenv("ANALYZER_BENCH_SEED", "20240601"))
+BENCH_PANELS = int(os.getenv("ANALYZER_BENCH_PANELS", "200"))
+BENCH_MIN_SECONDS = float(os.getenv("ANALYZER_BENCH_MIN_SECONDS", "1.0"))
+
+# (name, callable taking one prepared input)
+Target = Tuple[str, Callable[[Any], Any]]
+
+
+def _percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def analyzer_targets() -> List[Target]:
+    """One target per registered analyzer, called the way the registry calls it."""
+    from analyzers.registry import analyzer_registry
+
+    targets = []
+    for spec in analyzer_registry:
+        def call(item, spec=spec):
+            panel, patient = item
+            return spec.func(panel, **spec.call_kwargs(patient))
+        targets.append((f"analyzer.{spec.name}", call))
+    return targets
+
+
+def score_targets() -> List[Target]:
+    """One target per ``utils.severity_scores`` calculator."""
+    from utils import severity_scores
+
+    def tfg(params):
+        return severity_scores.calcular_tfg_ckd_epi(params.get('creatinina'), params.get('idade'), params.get('sexo'))
+
+    targets: List[Target] = [
+        (f"score.{name}", lambda params, func=getattr(severity_scores, name): func(dict(params)))
+        for name in ('calcular_sofa', 'calcular_qsofa', 'calcular_apache2', 'calcular_saps3',
+                     'calcular_news', 'calcular_child_pugh')
+    ]
+    targets.append(("score.calcular_tfg_ckd_epi", tfg))
+    return targets
+
+
+def measure(func: Callable[[Any], Any], inputs: Sequence[Any], min_seconds: float = BENCH_MIN_SECONDS) -> Dict[str, Any]:
+    """
+    Measure allocations over one pass of ``func`` over ``inputs``, then time
+    it (repeated until ``min_seconds`` elapsed) over the inputs that did not
+    raise in that pass.
+
+    Throughput is taken from the fastest pass over the inputs, which is far
+    less sensitive to scheduler noise than the mean; the latency percentiles
+    cover every call.
+
+    Returns:
+        dict: ops_per_sec, p50_us, p99_us, alloc_bytes_per_op, calls and
+            errors (inputs that raised, out of one pass).
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    allocated = 0
+    valid: List[Any] = []
+    try:
+        for item in inputs:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            try:
+                func(item)
+            except Exception:
+                continue
+            _, peak = tracemalloc.get_traced_memory()
+            allocated += max(0, peak - before)
+            valid.append(item)
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    latencies: List[float] = []
+    best_pass = float('inf')
+    perf = time.perf_counter
+    started = perf()
+    while valid:
+        pass_time = 0.0
+        for item in valid:
+            t0 = perf()
+            func(item)
+            elapsed = perf() - t0
+            pass_time += elapsed
+            latencies.append(elapsed)
+        best_pass = min(best_pass, pass_time)
+        if perf() - started >= min_seconds:
+            break
+
+    latencies.sort()
+    return {
+        "ops_per_sec": round(len(valid) / best_pass, 1) if valid and best_pass else 0.0,
+        "p50_us": round(_percentile(latencies, 0.50) * 1e6, 2),
+        "p99_us": round(_percentile(latencies, 0.99) * 1e6, 2),
+        "alloc_bytes_per_op": int(allocated / len(valid)) if valid else 0,
+        "calls": len(latencies),
+        "errors": len(inputs) - len(valid),
+    }
+
+
+def run_benchmarks(seed: int = BENCH_SEED, n_panels: int = BENCH_PANELS, min_seconds: float = BENCH_MIN_SECONDS,
+                   only: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Run every analyzer and score target.
+
+    Args:
+        seed: Seed for the synthetic inputs.
+        n_panels: Number of distinct inputs per target.
+        min_seconds: Minimum timed duration per target.
+        only: Substring filter on target names.
+
+    Returns:
+        dict: {target name: metrics}
+    """
+    from analyzers.result_cache import analyzer_cache
+
+    generator = SyntheticPanelGenerator(seed)
+    panels = [(generator.panel(), generator.patient()) for _ in range(n_panels)]
+    score_inputs = [generator.score_parameters() for _ in range(n_panels)]
+
+    results: Dict[str, Dict[str, Any]] = {}
+    cache_enabled = analyzer_cache.enabled
+    analyzer_cache.enabled = False
+    # Warnings logged on every call (e.g. unimplemented scores) would dominate the timings
+    logging.disable(logging.WARNING)
+    try:
+        for targets, inputs in ((analyzer_targets(), panels), (score_targets(), score_inputs)):
+            for name, func in targets:
+                if only and only not in name:
+                    continue
+                results[name] = measure(func, inputs, min_seconds)
+    finally:
+        analyzer_cache.enabled = cache_enabled
+        logging.disable(logging.NOTSET)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float = BENCH_TOLERANCE) -> List[str]:
+    """
+    Regressions of ``results`` against a stored baseline.
+
+    Returns:
+        list: One message per target slower than ``baseline * (1 - tolerance)``
+            and one per target with more errors than in the baseline (none
+            if the baseline does not record them); targets missing from
+            either side are ignored.
+    """
+    regressions = []
+    for name, reference in baseline.get("results", {}).items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if current.get("errors", 0) > reference.get("errors", 0):
+            regressions.append(f"{name}: {current['errors']} inputs raised (baseline {reference.get('errors', 0)})")
+        if not reference.get("ops_per_sec"):
+            continue
+        floor = reference["ops_per_sec"] * (1 - tolerance)
+        if current["ops_per_sec"] < floor:
+            regressions.append(
+                f"{name}: {current['ops_per_sec']:.0f} ops/s < {floor:.0f} "
+                f"(baseline {reference['ops_per_sec']:.0f}, tolerance {tolerance:.0%})"
+            )
+    return regressions
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(results: Dict[str, Dict[str, Any]], path: str = BASELINE_PATH, seed: int = BENCH_SEED,
+                  n_panels: int = BENCH_PANELS) -> None:
+    data = {
+        "seed": seed,
+        "n_panels": n_panels,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def format_report(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]] = None) -> str:
+    reference = (baseline or {}).get("results", {})
+    lines = [f"{'target':<40} {'ops/s':>10} {'p50 us':>9} {'p99 us':>9} {'B/op':>9} {'err':>4} {'vs base':>8}"]
+    for name, m in results.items():
+        base = reference.get(name, {}).get("ops_per_sec")
+        delta = f"{(m['ops_per_sec'] / base - 1):+.0%}" if base else "-"
+        lines.append(f"{name:<40} {m['ops_per_sec']:>10.0f} {m['p50_us']:>9.1f} {m['p99_us']:>9.1f} "
+                     f"{m['alloc_bytes_per_op']:>9} {m['errors']:>4} {delta:>8}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Analyzer and severity score micro-benchmarks")
+    ap.add_argument('--seed', type=int, default=BENCH_SEED)
+    ap.add_argument('--panels', type=int, default=BENCH_PANELS, help='Distinct synthetic inputs per target')
+    ap.add_argument('--min-seconds', type=float, default=BENCH_MIN_SECONDS, help='Minimum timed duration per target')
+    ap.add_argument('--only', default=None, help='Only run targets whose name contains this text')
+    ap.add_argument('--baseline', default=BASELINE_PATH)
+    ap.add_argument('--tolerance', type=float, default=BENCH_TOLERANCE, help='Allowed throughput drop (0.25 = 25%%)')
+    ap.add_argument('--update-baseline', action='store_true', help='Write the results as the new baseline')
+    ap.add_argument('--check', action='store_true', help='Exit with status 1 if any target regressed')
+    args = ap.parse_args(argv)
+
+    results = run_benchmarks(args.seed, args.panels, args.min_seconds, args.only)
+    baseline = load_baseline(args.baseline)
+    print(format_report(results, baseline))
+
+    if args.update_baseline:
+        failing = {name: m["errors"] for name, m in results.items() if m["errors"]}
+        if failing:
+            print(f"[ERR] Not writing a baseline; inputs raised in: {failing}")
+            return 1
+        save_baseline(results, args.baseline, args.seed, args.panels)
+        print(f"[OK] Baseline written to {args.baseline}")
+        return 0
+    if args.check:
+        if baseline is None:
+            print(f"[ERR] No baseline at {args.baseline}; run with --update-baseline first")
+            return 1
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f"[REGRESSION] {message}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
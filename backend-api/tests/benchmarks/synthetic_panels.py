@@ -0,0 +1,229 @@
+"""
+Seeded synthetic lab panels and score parameters for benchmarking.
+
+Every generated panel follows one of four profiles:
+
+- ``normal``: values inside the reference range.
+- ``borderline``: values within a few percent of a reference limit.
+- ``critical``: values beyond the critical limits.
+- ``malformed``: the strings real lab exports contain (decimal commas,
+  censored "<0,1" / ">100" results, units glued to the number, blanks and
+  free text that cannot be parsed).
+
+The same seed always yields the same sequence, so benchmark runs are
+comparable across commits.
+"""
+
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+PROFILES: Tuple[str, ...] = ('normal', 'borderline', 'critical', 'malformed')
+
+# test -> (reference low, reference high, critical low, critical high, decimals)
+NUMERIC_ANALYTES: Dict[str, Tuple[float, float, Optional[float], Optional[float], int]] = {
+    # Blood gases
+    'pH': (7.35, 7.45, 7.10, 7.65, 2),
+    'pCO2': (35, 45, 20, 80, 0),
+    'pO2': (80, 100, 45, None, 0),
+    'HCO3-': (22, 26, 10, 40, 0),
+    'BE': (-2, 2, -15, 15, 1),
+    'SpO2': (95, 100, 80, None, 0),
+    'Lactato': (0.5, 2.0, None, 6.0, 1),
+    'FiO2': (21, 40, None, 100, 0),
+    # Electrolytes
+    'Na+': (135, 145, 115, 165, 0),
+    'K+': (3.5, 5.0, 2.2, 7.2, 1),
+    'Cl-': (98, 107, 80, 120, 0),
+    'Ca+': (8.5, 10.5, 6.5, 13.5, 1),
+    'iCa': (1.15, 1.32, 0.7, 1.6, 2),
+    'Mg+': (1.7, 2.2, 0.8, 10.5, 1),
+    'P': (2.5, 4.5, 0.8, 7.5, 1),
+    'Albumina': (3.5, 5.0, 1.5, None, 1),
+    # Hematology
+    'Hb': (12.0, 16.0, 5.5, 21.0, 1),
+    'Ht': (36.0, 46.0, 18.0, 62.0, 1),
+    'RBC': (4.0, 5.5, 2.0, 7.0, 2),
+    'Leuco': (4000, 10000, 800, 40000, 0),
+    'Plaq': (150000, 450000, 15000, 1200000, 0),
+    'VCM': (80, 100, 60, 120, 1),
+    'HCM': (27, 33, 20, 40, 1),
+    'CHCM': (32, 36, 28, 40, 1),
+    'RDW': (11.5, 14.5, None, 22, 1),
+    'Retic': (0.5, 2.5, 0.1, 8.0, 1),
+    # Renal
+    'Creat': (0.6, 1.2, None, 7.5, 2),
+    'Ur': (15, 50, None, 300, 0),
+    # Hepatic / pancreatic
+    'TGO': (10, 40, None, 3000, 0),
+    'TGP': (7, 35, None, 3000, 0),
+    'GamaGT': (8, 61, None, 900, 0),
+    'FosfAlc': (40, 130, None, 1200, 0),
+    'BT': (0.3, 1.2, None, 22.0, 1),
+    'BD': (0.0, 0.3, None, 15.0, 1),
+    'Amilase': (30, 110, None, 1500, 0),
+    'Lipase': (10, 140, None, 3000, 0),
+    # Coagulation
+    'RNI': (0.8, 1.2, None, 6.0, 2),
+    'TTPA': (25, 40, None, 90, 0),
+    'Fibrinogenio': (200, 400, 60, 800, 0),
+    'D-dimer': (0, 500, None, 8000, 0),
+    # Inflammatory
+    'PCR': (0, 0.5, None, 25.0, 1),
+    'VHS': (0, 20, None, 120, 0),
+    'Procalcitonina': (0, 0.05, None, 30.0, 2),
+    'Ferritina': (30, 400, 5, 5000, 0),
+    # Cardiac
+    'TropoI': (0, 0.04, None, 5.0, 3),
+    'CKMB': (0, 5, None, 80, 1),
+    'CPK': (30, 200, None, 8000, 0),
+    'BNP': (0, 100, None, 2500, 0),
+    'LDH': (140, 280, None, 1500, 0),
+    # Metabolic / thyroid
+    'Glicose': (70, 100, 40, 550, 0),
+    'HbA1c': (4.0, 5.6, None, 13.0, 1),
+    'CT': (120, 190, None, 400, 0),
+    'LDL': (50, 100, None, 260, 0),
+    'HDL': (40, 80, 20, None, 0),
+    'TG': (50, 150, None, 1200, 0),
+    'AcidoUrico': (3.5, 7.2, None, 13.0, 1),
+    'TSH': (0.4, 4.0, 0.01, 60.0, 2),
+    'T4L': (0.8, 1.8, 0.2, 5.0, 2),
+    # Bone
+    'PTH': (15, 65, 5, 600, 0),
+    'VitD': (30, 60, 8, 150, 0),
+    # Tumor markers / hormones / drug levels
+    'PSA': (0, 4, None, 60, 1),
+    'CEA': (0, 5, None, 80, 1),
+    'Cortisol_AM': (6, 23, 1, 60, 1),
+    'Prolactin': (4, 23, None, 250, 0),
+    'Digoxin': (0.5, 0.9, None, 3.0, 1),
+    'Lithium': (0.6, 1.2, None, 2.8, 1),
+    'Vancomycin': (10, 20, None, 45, 0),
+}
+
+# Qualitative tests -> (normal results, critical results)
+QUALITATIVE_ANALYTES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    'Hemocult': (("Negativo",), ("Positivo para Staphylococcus aureus", "Positivo para Klebsiella pneumoniae KPC")),
+    'Urocult': (("Negativo",), ("Escherichia coli > 100.000 UFC/mL", "Candida albicans > 100.000 UFC/mL")),
+    'HemocultAntibiograma': (("Sensível a oxacilina",), ("Resistente a meropenem e oxacilina",)),
+    'HBsAg': (("Não reagente",), ("Reagente",)),
+    'HIV': (("Não reagente",), ("Reagente",)),
+    'VDRL': (("Não reagente",), ("Reagente 1:32",)),
+    'ANA': (("Não reagente",), ("Reagente 1:640 padrão homogêneo",)),
+}
+
+_MALFORMED_NUMERIC = ("{value_comma}", "<{value}", ">{value}", "{value} mg/dL", " {value} ", "", "n/a", "pendente", "--")
+
+
+def _fmt(value: float, decimals: int) -> str:
+    return f"{value:.{decimals}f}"
+
+
+class SyntheticPanelGenerator:
+    """
+    Deterministic generator of lab panels and severity-score parameters.
+
+    Args:
+        seed: Seed of the private random generator.
+        coverage: Fraction of the known analytes included in each panel.
+    """
+
+    def __init__(self, seed: int = 1234, coverage: float = 0.6):
+        self.seed = seed
+        self.coverage = coverage
+        self._rng = random.Random(seed)
+
+    def _numeric(self, test: str, profile: str) -> Any:
+        rng = self._rng
+        low, high, crit_low, crit_high, decimals = NUMERIC_ANALYTES[test]
+        span = (high - low) or 1.0
+        if profile == 'normal':
+            value = rng.uniform(low, high)
+        elif profile == 'borderline':
+            edge = rng.choice((low, high))
+            value = edge + rng.uniform(-0.05, 0.05) * span
+        elif profile == 'critical':
+            sides = [c for c in (crit_low, crit_high) if c is not None]
+            target = rng.choice(sides)
+            value = target - rng.uniform(0, 0.1) * span if target == crit_low else target + rng.uniform(0, 0.5) * span
+        else:
+            value = rng.uniform(low, high)
+            template = rng.choice(_MALFORMED_NUMERIC)
+            text = _fmt(value, decimals)
+            return template.format(value=text, value_comma=text.replace('.', ','))
+        return round(value, decimals) if decimals else int(round(value))
+
+    def _qualitative(self, test: str, profile: str) -> str:
+        normal, critical = QUALITATIVE_ANALYTES[test]
+        if profile == 'critical':
+            return self._rng.choice(critical)
+        if profile == 'malformed':
+            return self._rng.choice(("", "Amostra insuficiente", "???", "ver laudo"))
+        return self._rng.choice(normal)
+
+    def panel(self, profile: Optional[str] = None) -> Dict[str, Any]:
+        """One lab panel; a random profile is drawn when none is given."""
+        profile = profile or self._rng.choice(PROFILES)
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile {profile!r}; expected one of {PROFILES}")
+        panel: Dict[str, Any] = {}
+        for test in NUMERIC_ANALYTES:
+            if self._rng.random() < self.coverage:
+                panel[test] = self._numeric(test, profile)
+        for test in QUALITATIVE_ANALYTES:
+            if self._rng.random() < self.coverage:
+                panel[test] = self._qualitative(test, profile)
+        return panel
+
+    def panels(self, count: int, profile: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [self.panel(profile) for _ in range(count)]
+
+    def patient(self) -> Dict[str, Any]:
+        """Demographics accepted by the analyzers (idade, sexo, etnia)."""
+        return {
+            'idade': self._rng.randint(18, 95),
+            'sexo': self._rng.choice(('M', 'F')),
+            'etnia': self._rng.choice(('branca', 'parda', 'negra')),
+        }
+
+    def score_parameters(self, profile: Optional[str] = None) -> Dict[str, Any]:
+        """Parameters for the ``utils.severity_scores`` calculators (lowercase keys)."""
+        rng = self._rng
+        profile = profile or rng.choice(PROFILES)
+        severe = profile == 'critical'
+        params: Dict[str, Any] = {
+            'idade': rng.randint(18, 95),
+            'sexo': rng.choice(('M', 'F')),
+            'temp': round(rng.uniform(39.5, 41.5) if severe else rng.uniform(36.0, 37.8), 1),
+            'fc': rng.randint(130, 180) if severe else rng.randint(60, 100),
+            'fr': rng.randint(30, 45) if severe else rng.randint(12, 20),
+            'pas': rng.randint(60, 85) if severe else rng.randint(100, 140),
+            'pad': rng.randint(30, 50) if severe else rng.randint(60, 90),
+            'spo2': rng.randint(78, 90) if severe else rng.randint(94, 100),
+            'glasgow': rng.randint(3, 9) if severe else 15,
+            'fio2': round(rng.uniform(0.5, 1.0), 2) if severe else 0.21,
+            'pao2': rng.randint(45, 70) if severe else rng.randint(80, 100),
+            'pco2': rng.randint(50, 80) if severe else rng.randint(35, 45),
+            'ph': round(rng.uniform(7.0, 7.2) if severe else rng.uniform(7.35, 7.45), 2),
+            'na': rng.randint(118, 128) if severe else rng.randint(135, 145),
+            'k': round(rng.uniform(6.0, 7.5) if severe else rng.uniform(3.5, 5.0), 1),
+            'creatinina': round(rng.uniform(3.5, 6.0) if severe else rng.uniform(0.6, 1.2), 2),
+            'ht': round(rng.uniform(18, 25) if severe else rng.uniform(36, 46), 1),
+            'leuco': rng.randint(25000, 45000) if severe else rng.randint(4000, 10000),
+            'plaquetas': rng.randint(10, 45) if severe else rng.randint(150, 400),
+            'bilirrubina': round(rng.uniform(6.0, 15.0) if severe else rng.uniform(0.3, 1.2), 1),
+            'diurese': rng.randint(50, 400) if severe else rng.randint(800, 2500),
+            'aminas': severe,
+            'noradrenalina': round(rng.uniform(0.1, 0.5), 2) if severe else 0,
+            'dopamina': 0, 'dobutamina': 0, 'adrenalina': 0,
+            'doenca_cronica': severe, 'insuficiencia_renal_aguda': severe,
+            'tipo_internacao': rng.choice(('clinica', 'cirurgia_urgencia', 'cirurgia_eletiva')),
+        }
+        params['map'] = round((params['pas'] + 2 * params['pad']) / 3)
+        if profile == 'borderline':
+            params.update({'fr': 22, 'pas': 100, 'glasgow': 14, 'spo2': 94, 'plaquetas': 150, 'creatinina': 1.2})
+        elif profile == 'malformed':
+            # Missing and non-numeric inputs the calculators must tolerate
+            for key in rng.sample(sorted(params), 5):
+                params[key] = None
+        return params
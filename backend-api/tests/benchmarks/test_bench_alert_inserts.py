@@ -0,0 +1,18 @@
+"""
+Tests for the alert insert benchmark harness.
+"""
+
+from tests.benchmarks import bench_alert_inserts
+
+
+def test_synthetic_alerts_are_deterministic():
+    first = bench_alert_inserts.synthetic_alerts(20, patient_id=1, user_id=2)
+    assert first == bench_alert_inserts.synthetic_alerts(20, patient_id=1, user_id=2)
+    assert first != bench_alert_inserts.synthetic_alerts(20, patient_id=1, user_id=2, seed=1)
+
+
+def test_bulk_uses_constant_statements():
+    results = bench_alert_inserts.run_benchmarks(sizes=(5, 20), repeat=1)
+    assert results[20]["per_row"]["statements"] == 3 * 20  # INSERT, counters, refresh
+    assert results[5]["bulk"]["statements"] == results[20]["bulk"]["statements"]
+    assert "speedup" in bench_alert_inserts.format_report(results)
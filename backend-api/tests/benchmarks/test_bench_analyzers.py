@@ -0,0 +1,108 @@
+"""
+Tests for the analyzer benchmark harness.
+
+The throughput regression check itself is machine dependent and only runs
+when RUN_ANALYZER_BENCH=1 (e.g. on the machine that produced the baseline).
+"""
+
+import os
+
+import pytest
+
+from tests.benchmarks import bench_analyzers
+from tests.benchmarks.synthetic_panels import NUMERIC_ANALYTES, PROFILES, SyntheticPanelGenerator
+from analyzers.panel import parse_lab_value
+
+
+def test_generator_is_deterministic():
+    first, second = SyntheticPanelGenerator(7), SyntheticPanelGenerator(7)
+    assert first.panels(20) == second.panels(20)
+    assert first.score_parameters() == second.score_parameters()
+    assert SyntheticPanelGenerator(8).panels(20) != SyntheticPanelGenerator(7).panels(20)
+
+
+def test_profiles_shape_the_values():
+    generator = SyntheticPanelGenerator(3, coverage=1.0)
+    normal = generator.panel('normal')
+    for test, (low, high, _, _, decimals) in NUMERIC_ANALYTES.items():
+        rounding = 0.5 * 10 ** -decimals
+        assert low - rounding <= normal[test] <= high + rounding, test
+
+    critical = generator.panel('critical')
+    assert critical['K+'] <= 2.2 or critical['K+'] >= 7.2
+
+    malformed = generator.panel('malformed')
+    assert all(isinstance(value, str) for value in malformed.values())
+    assert any(parse_lab_value(value) is None for value in malformed.values())
+
+    with pytest.raises(ValueError):
+        generator.panel('extreme')
+    assert set(PROFILES) == {'normal', 'borderline', 'critical', 'malformed'}
+
+
+def test_measure_reports_metrics():
+    metrics = bench_analyzers.measure(lambda item: [item] * 100, list(range(50)), min_seconds=0)
+    assert metrics["calls"] == 50
+    assert metrics["ops_per_sec"] > 0
+    assert metrics["p50_us"] <= metrics["p99_us"]
+    assert metrics["alloc_bytes_per_op"] > 0
+    assert metrics["errors"] == 0
+
+
+def test_measure_keeps_failing_inputs_out_of_the_timed_pass():
+    calls = []
+
+    def func(item):
+        calls.append(item)
+        if item % 5 == 0:
+            raise ValueError(item)
+
+    metrics = bench_analyzers.measure(func, list(range(10)), min_seconds=0)
+    assert metrics["errors"] == 2
+    assert metrics["calls"] == 8
+    assert calls[10:] == [1, 2, 3, 4, 6, 7, 8, 9]
+
+
+def test_run_covers_analyzers_and_scores():
+    results = bench_analyzers.run_benchmarks(seed=1, n_panels=5, min_seconds=0)
+    assert "analyzer.electrolytes" in results
+    assert "score.calcular_sofa" in results
+    assert all(m["ops_per_sec"] > 0 for m in results.values())
+    assert {name: m["errors"] for name, m in results.items() if m["errors"]} == {}
+
+
+def test_compare_applies_tolerance():
+    baseline = {"results": {"a": {"ops_per_sec": 1000.0}, "b": {"ops_per_sec": 1000.0}, "gone": {"ops_per_sec": 5.0}}}
+    results = {"a": {"ops_per_sec": 800.0}, "b": {"ops_per_sec": 700.0}}
+    regressions = bench_analyzers.compare(results, baseline, tolerance=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith("b:")
+
+
+def test_compare_reports_new_errors():
+    baseline = {"results": {"a": {"ops_per_sec": 1000.0, "errors": 0}, "b": {"ops_per_sec": 1000.0, "errors": 3}}}
+    results = {"a": {"ops_per_sec": 1000.0, "errors": 1}, "b": {"ops_per_sec": 1000.0, "errors": 3}}
+    assert bench_analyzers.compare(results, baseline) == ["a: 1 inputs raised (baseline 0)"]
+
+
+def test_update_baseline_refuses_errors(tmp_path, monkeypatch):
+    path = str(tmp_path / "baseline.json")
+    metrics = {"ops_per_sec": 10.0, "p50_us": 1.0, "p99_us": 1.0, "alloc_bytes_per_op": 0, "calls": 1}
+    monkeypatch.setattr(bench_analyzers, "run_benchmarks",
+                        lambda *args: {"a": {**metrics, "errors": 2}, "b": {**metrics, "errors": 0}})
+    assert bench_analyzers.main(["--update-baseline", "--baseline", path]) == 1
+    assert bench_analyzers.load_baseline(path) is None
+
+
+def test_baseline_round_trip(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    bench_analyzers.save_baseline({"a": {"ops_per_sec": 10.0}}, path, seed=1, n_panels=2)
+    assert bench_analyzers.load_baseline(path)["results"] == {"a": {"ops_per_sec": 10.0}}
+    assert bench_analyzers.load_baseline(str(tmp_path / "missing.json")) is None
+
+
+@pytest.mark.skipif(os.getenv("RUN_ANALYZER_BENCH") != "1", reason="set RUN_ANALYZER_BENCH=1 to run the benchmark gate")
+def test_no_throughput_regression():
+    baseline = bench_analyzers.load_baseline()
+    assert baseline is not None, "no baseline; run python -m tests.benchmarks.bench_analyzers --update-baseline"
+    results = bench_analyzers.run_benchmarks(baseline["seed"], baseline["n_panels"])
+    assert bench_analyzers.compare(results, baseline) == []
@@ -262,7 +262,7 @@ class TestDatabaseAlertIntegration:
         patient_alerts = get_alerts_by_patient_id(db_session, test_patient.patient_id)
         
         # Verify retrieved alerts match what was saved
-        assert len(patient_alerts) == len(saved_alerts), "Retrieved alert count doesn't match saved alerts"
+        assert len(patient_alerts) == len({a.alert_id for a in saved_alerts}), "Retrieved alert count doesn't match saved alerts"
         
         # Check that severe/critical alerts were saved with correct severity
         critical_alerts = [a for a in patient_alerts if a.severity in ['critical', 'severe']]
@@ -270,7 +270,7 @@ class TestDatabaseAlertIntegration:
             assert len(critical_alerts) > 0, "Critical/severe alerts were not saved correctly"
         
         # Cleanup
-        for alert in saved_alerts:
+        for alert in patient_alerts:
             db_session.delete(alert)
         db_session.commit()
     
@@ -459,12 +459,15 @@ class TestDatabaseAlertIntegration:
         # Fetch all alerts
         all_alerts = get_alerts_by_patient_id(db_session, patient_id)
         
-        # Count alerts created
+        # Re-raised alerts are folded into one alert per severity bucket
         created_potassium_alerts = [a for a in all_alerts if a.parameter == "Potássio" and a.alert_id in alert_ids]
-        assert len(created_potassium_alerts) == 5, f"Expected 5 potassium alerts, got {len(created_potassium_alerts)}"
+        assert len(created_potassium_alerts) == 2, f"Expected 2 potassium alerts, got {len(created_potassium_alerts)}"
+        counts = sorted((a.severity, a.occurrence_count) for a in created_potassium_alerts)
+        assert counts == [("severe", 2), ("warning", 3)]
+        assert max(a.value for a in created_potassium_alerts) == 5.9
         
         # Cleanup
-        for alert in similar_alerts:
+        for alert in created_potassium_alerts:
             db_session.delete(alert)
         db_session.commit()
     
@@ -0,0 +1,16 @@
+"""
+Shared fixtures for the analyzer tests.
+"""
+
+import pytest
+
+from analyzers.result_cache import analyzer_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_analyzer_cache():
+    """Isolate tests from each other: several tests patch REFERENCE_RANGES."""
+    analyzer_cache.clear()
+    analyzer_cache.reset_stats()
+    yield
+    analyzer_cache.clear()
@@ -0,0 +1,126 @@
+"""
+Tests for streaming KDIGO AKI staging.
+"""
+
+import random
+import sys
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+if os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analyzers.aki import AKIStager, kdigo_stage, peak_stage, replay, replay_many
+
+T0 = datetime(2024, 3, 1, 8, 0)
+
+
+def _brute_force(history):
+    """Stage each reading by scanning the full history (the query the engine replaces)."""
+    ordered = sorted(history, key=lambda r: r[0])
+    stages = []
+    for i, (timestamp, value) in enumerate(ordered):
+        previous = ordered[:i]
+        week = [v for t, v in previous if timestamp - t <= timedelta(days=7)]
+        two_days = [v for t, v in previous if timestamp - t <= timedelta(hours=48)]
+        stages.append(kdigo_stage(value, min(week) if week else None, min(two_days) if two_days else None)[0])
+    return stages
+
+
+@pytest.mark.parametrize("creatinine,baseline,min_48h,expected", [
+    (1.0, None, None, 0),
+    (1.2, 1.0, 1.0, 0),
+    (1.3, 1.0, 1.0, 1),    # +0.3 within 48h
+    (1.5, 1.0, 1.4, 1),    # 1.5x baseline
+    (2.0, 1.0, 1.9, 2),
+    (3.0, 1.0, 2.9, 3),
+    (4.1, 3.8, 3.8, 3),    # >= 4.0 with an acute 0.3 rise
+    (4.1, 4.0, 4.0, 0),    # high but stable (CKD)
+    (1.2, 0.8, None, 1),   # exact ratio boundaries
+    (2.4, 0.8, None, 3),
+    (0.6, 0.4, None, 1),
+    (0.8, 0.4, None, 2),
+    (1.2, 0.4, None, 3),
+    (3.3, 1.1, None, 3),
+    (2.4, 1.6, None, 1),
+    (3.3, 2.2, None, 1),
+    (4.05, 2.7, None, 3),  # 1.5x and >= 4.0
+    (4.8, 3.2, None, 3),
+])
+def test_kdigo_thresholds(creatinine, baseline, min_48h, expected):
+    assert kdigo_stage(creatinine, baseline, min_48h)[0] == expected
+
+
+def test_replay_stages_exact_ratio_boundaries():
+    assert [s.stage for s in replay([(T0, 0.8), (T0 + timedelta(days=4), 1.2)])] == [0, 1]
+    assert [s.stage for s in replay([(T0, 0.8), (T0 + timedelta(days=4), 2.4)])] == [0, 3]
+
+
+def test_replay_uses_seven_day_baseline_and_48h_delta():
+    history = [
+        (T0, 1.0),
+        (T0 + timedelta(hours=20), 1.1),
+        (T0 + timedelta(hours=40), 1.35),
+        (T0 + timedelta(days=3), 2.1),
+        (T0 + timedelta(days=9), 2.2),   # 7-day baseline is now 1.35
+    ]
+    stages = replay(history)
+    assert [s.stage for s in stages] == [0, 0, 1, 2, 0]
+    assert stages[2].criteria == ('delta_48h',)
+    assert stages[3].baseline == 1.0
+    assert stages[4].baseline == 2.1
+    assert "estágio 2" in stages[3].interpretation
+    assert peak_stage(stages) == 2
+
+
+def test_streaming_matches_full_scan_on_random_histories():
+    rng = random.Random(11)
+    for _ in range(50):
+        t = T0
+        history = []
+        for _ in range(rng.randint(1, 40)):
+            t += timedelta(hours=rng.choice((2, 6, 12, 24, 60, 200)))
+            history.append((t, round(rng.uniform(0.5, 5.0), 2)))
+        assert [s.stage for s in replay(history)] == _brute_force(history)
+
+
+def test_stager_is_per_patient_and_seeds_once():
+    stager = AKIStager()
+    first = stager.update("p1", 1.2, T0 + timedelta(hours=12), seed=lambda: [(T0, 1.0)])
+    assert first.baseline == 1.0 and first.stage == 0
+
+    def unused_seed():
+        raise AssertionError("seed loaded for an existing window")
+
+    second = stager.update("p1", 2.0, T0 + timedelta(hours=24), seed=unused_seed)
+    assert second.stage == 2
+    assert stager.current("p1") is second
+    assert stager.update("p2", 2.0, T0).stage == 0
+    stager.forget("p1")
+    assert "p1" not in stager and "p2" in stager
+
+
+def test_late_result_rebuilds_window():
+    stager = AKIStager()
+    stager.update("p", 1.0, T0)
+    stager.update("p", 1.6, T0 + timedelta(hours=30))
+    late = stager.update("p", 1.05, T0 + timedelta(hours=10))
+    assert late.baseline == 1.0 and late.stage == 0
+    # The newest result is still the patient's current stage
+    assert stager.current("p").creatinine == 1.6
+    assert stager.current("p").stage == 1
+
+
+def test_lru_eviction():
+    stager = AKIStager(max_patients=2)
+    for patient in ("a", "b", "c"):
+        stager.update(patient, 1.0, T0)
+    assert "a" not in stager and "c" in stager
+
+
+def test_replay_many():
+    staged = replay_many({"x": [(T0, 1.0), (T0 + timedelta(days=1), 3.1)], "y": []})
+    assert [s.stage for s in staged["x"]] == [0, 3]
+    assert staged["y"] == []
@@ -0,0 +1,195 @@
+"""
+Tests for the column-wise (batch) analyzer entry points.
+"""
+
+import sys
+import os
+
+import numpy as np
+import pytest
+
+if os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analyzers import (
+    analisar_coagulacao_batch, analisar_eletrolitos, analisar_eletrolitos_batch, analisar_funcao_hepatica,
+    analisar_funcao_hepatica_batch, analisar_funcao_renal_batch, analisar_gasometria, analisar_gasometria_batch,
+    analisar_funcao_renal, analisar_hemograma, analisar_hemograma_batch,
+)
+from analyzers.coagulation import analisar_coagulacao
+from analyzers.batch import as_columns, corrected_calcium, pf_ratio
+
+
+def _random_electrolytes(n, seed=7):
+    rng = np.random.default_rng(seed)
+    return {
+        'Na+': rng.normal(138, 8, n).round(0),
+        'K+': rng.normal(4.3, 0.9, n).round(1),
+        'Cl-': rng.normal(102, 6, n).round(0),
+        'Ca+': rng.normal(9.3, 1.0, n).round(1),
+        'Albumina': rng.normal(3.8, 0.6, n).round(1),
+        'HCO3-': rng.normal(24, 4, n).round(0),
+    }
+
+
+def test_electrolyte_rows_match_per_patient_analyzer():
+    columns = _random_electrolytes(200)
+    batch = analisar_eletrolitos_batch(columns)
+
+    assert batch["n_rows"] == 200
+    for row in range(200):
+        row_data = {test: float(values[row]) for test, values in columns.items() if test != 'HCO3-'}
+        single = analisar_eletrolitos(row_data)
+        if batch["abnormal"][row]:
+            assert batch["results"][row] == single
+        else:
+            assert row not in batch["results"]
+            assert single["abnormalities"] == []
+            assert single["is_critical"] is False
+
+
+def test_electrolyte_derived_values():
+    batch = analisar_eletrolitos_batch({
+        'Na+': [140, 140], 'Cl-': [100, 100], 'HCO3-': [24, np.nan],
+        'Ca+': [8.0, 8.0], 'Albumina': [2.0, np.nan],
+    })
+    assert batch["derived"]["anion_gap"][0] == pytest.approx(16.0)
+    assert np.isnan(batch["derived"]["anion_gap"][1])
+    assert batch["derived"]["ca_corrigido"][0] == pytest.approx(9.6)
+    assert np.isnan(batch["derived"]["ca_corrigido"][1])
+    # Corrected calcium is normal, total calcium is low
+    assert batch["flags"]["Ca+"].tolist() == [0, -1]
+
+
+def test_critical_rows_and_lazy_narratives():
+    batch = analisar_eletrolitos_batch({'Na+': [140, 115, 141], 'K+': [4.0, 4.2, 7.2]}, materialize=False)
+    assert batch["critical"].tolist() == [False, True, True]
+    assert batch["abnormal"].tolist() == [False, True, True]
+    assert batch["results"] == {}
+
+
+def test_hemograma_batch_uses_per_row_sex():
+    columns = {'Hb': [13.0, 13.0, 4.5], 'Plaq': [250000, 250000, 250000]}
+    batch = analisar_hemograma_batch(columns, sexo=['M', 'F', None])
+
+    assert batch["flags"]["Hb"].tolist() == [-1, 0, -1]
+    assert batch["critical"].tolist() == [False, False, True]
+    assert batch["results"][0] == analisar_hemograma({'Hb': 13.0, 'Plaq': 250000.0}, sexo='M')
+    assert 1 not in batch["results"]
+
+
+def test_gasometria_batch_pf_ratio_and_narratives():
+    columns = {'pH': [7.40, 7.25], 'pCO2': [40, 55], 'pO2': [95, 70], 'FiO2': [21, 0.5], 'HCO3-': [24, 23]}
+    batch = analisar_gasometria_batch(columns)
+
+    assert batch["derived"]["pf_ratio"].tolist() == pytest.approx([95 / 0.21, 140.0])
+    assert batch["critical"].tolist() == [False, True]
+    assert batch["results"][1] == analisar_gasometria({'pH': 7.25, 'pCO2': 55, 'pO2': 70, 'FiO2': 0.5, 'HCO3-': 23})
+
+
+def test_renal_batch_flags():
+    batch = analisar_funcao_renal_batch({'creatinina': ['1,0', '6,2'], 'Ur': [30, 180]})
+    assert batch["flags"]["Creat"].tolist() == [0, 1]
+    assert batch["critical"].tolist() == [False, True]
+    assert list(batch["results"]) == [1]
+
+
+def _assert_rows_match(batch, columns, analyze):
+    for row in range(batch["n_rows"]):
+        row_data = {test: float(values[row]) for test, values in columns.items() if not np.isnan(values[row])}
+        single = analyze(row_data)
+        if batch["abnormal"][row]:
+            assert batch["results"][row] == single
+        else:
+            assert row not in batch["results"]
+            assert single["abnormalities"] == []
+            assert single["is_critical"] is False
+
+
+def test_hepatic_rows_match_per_patient_analyzer():
+    rng = np.random.default_rng(11)
+    n = 200
+    columns = {
+        'TGO': rng.lognormal(3.3, 0.6, n).round(0),
+        'TGP': rng.lognormal(3.2, 0.6, n).round(0),
+        'GamaGT': rng.lognormal(3.5, 0.6, n).round(0),
+        'FosfAlc': np.where(rng.random(n) < 0.5, np.nan, rng.lognormal(4.5, 0.4, n).round(0)),
+        'BT': rng.lognormal(-0.3, 0.6, n).round(1),
+        'Albumina': rng.normal(4.0, 0.5, n).round(1),
+        'RNI': rng.normal(1.0, 0.2, n).round(2),
+    }
+    batch = analisar_funcao_hepatica_batch(columns)
+
+    assert not batch["abnormal"].all()
+    _assert_rows_match(batch, columns, analisar_funcao_hepatica)
+
+
+def test_hepatic_r_value_rows_are_narrated():
+    batch = analisar_funcao_hepatica_batch({'TGO': [20, 20], 'TGP': [20, 20], 'FA': [100, np.nan]})
+    assert batch["derived"]["r_value"][0] == pytest.approx((20 / 35) / (100 / 147))
+    assert np.isnan(batch["derived"]["r_value"][1])
+    assert batch["abnormal"].tolist() == [True, False]
+
+
+def test_coagulation_rows_match_per_patient_analyzer():
+    rng = np.random.default_rng(13)
+    n = 200
+    columns = {
+        'INR': rng.normal(1.0, 0.25, n).round(2),
+        'TTPA': rng.normal(32, 6, n).round(0),
+        'Fibrinogeno': rng.normal(300, 80, n).round(0),
+        'D-dimer': rng.lognormal(5.5, 0.7, n).round(0),
+        'Plaquetas': rng.choice([150000, 250000, 300000, 450000], n),
+    }
+    batch = analisar_coagulacao_batch(columns)
+
+    assert batch["flags"]["RNI"].shape == (n,)
+    assert not batch["abnormal"].all()
+    _assert_rows_match(batch, columns, analisar_coagulacao)
+
+
+def test_renal_batch_uses_per_row_demographics():
+    batch = analisar_funcao_renal_batch({'Creat': [1.2, 0.9], 'Ur': [40, 30]}, idade=[85, 30], sexo=['F', 'M'])
+    assert batch["derived"]["tfg"][0] < 60 and batch["flags"]["TFG"].tolist() == [-1, 0]
+    assert batch["abnormal"].tolist() == [True, False]
+    single = analisar_funcao_renal({'Creat': 1.2, 'Ur': 40.0}, idade=85, sexo='F')
+    assert "TFG Reduzida (Estágio G3b)" in single["abnormalities"]
+    assert batch["results"][0] == single
+
+    with pytest.raises(ValueError):
+        analisar_funcao_renal_batch({'Creat': [1.2, 1.2]}, idade=[85])
+
+
+def test_renal_rows_match_per_patient_analyzer():
+    rng = np.random.default_rng(5)
+    n = 200
+    columns = {
+        'Creat': rng.lognormal(0, 0.4, n).round(2),
+        'Ur': rng.normal(35, 12, n).round(0),
+        'K+': rng.normal(4.3, 0.6, n).round(1),
+    }
+    ages = [None if rng.random() < 0.1 else int(age) for age in rng.integers(20, 95, n)]
+    sexes = list(rng.choice(['M', 'F', None], n))
+    batch = analisar_funcao_renal_batch(columns, idade=ages, sexo=sexes)
+
+    assert not batch["abnormal"].all()
+    for row in range(n):
+        patient = {name: value for name, value in (('idade', ages[row]), ('sexo', sexes[row])) if value is not None}
+        single = analisar_funcao_renal({test: float(values[row]) for test, values in columns.items()}, **patient)
+        if batch["abnormal"][row]:
+            assert batch["results"][row] == single
+        else:
+            assert single["abnormalities"] == [] and single["is_critical"] is False
+
+
+def test_column_helpers():
+    n_rows, values = as_columns({'sodio': ['140', None], 'K+': [4.0, 5.0]}, ('Na+', 'Cl-'))
+    assert n_rows == 2
+    assert values['Na+'][0] == 140.0 and np.isnan(values['Na+'][1])
+    assert np.isnan(values['Cl-']).all()
+
+    with pytest.raises(ValueError):
+        as_columns({'Na+': [140], 'K+': [4.0, 5.0]}, ())
+
+    assert np.isnan(corrected_calcium(np.array([9.0]), np.array([9.0])))[0]
+    assert np.isnan(pf_ratio(np.array([80.0]), np.array([0.1])))[0]
@@ -0,0 +1,128 @@
+"""
+Tests for the vectorized serial blood gas trend analysis.
+"""
+
+import math
+import random
+import sys
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+if os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analyzers.blood_gas_trends import analisar_gasometria_serie, analisar_gasometrias_pacientes, previous_valid_index
+
+T0 = datetime(2024, 5, 2, 6, 0)
+
+
+def _scalar_reference(samples):
+    """Per-sample loop computing the same indices, for comparison."""
+    pf, ag, clearance = [], [], []
+    last_lactate = None
+    for sample in samples:
+        fio2 = sample.get('FiO2')
+        if fio2 is not None and fio2 > 1.0:
+            fio2 = fio2 / 100.0
+        po2 = sample.get('pO2')
+        pf.append(po2 / fio2 if po2 is not None and fio2 is not None and 0.21 <= fio2 <= 1.0 else None)
+        na, cl, hco3 = sample.get('Na+'), sample.get('Cl-'), sample.get('HCO3-')
+        ag.append(na - (cl + hco3) if None not in (na, cl, hco3) else None)
+        lactate = sample.get('Lactato')
+        if lactate is None:
+            clearance.append(None)
+            continue
+        clearance.append((last_lactate - lactate) / last_lactate * 100 if last_lactate else None)
+        last_lactate = lactate
+    return pf, ag, clearance
+
+
+def _columns(samples, tests=('pO2', 'FiO2', 'Na+', 'Cl-', 'HCO3-', 'Lactato')):
+    return {test: [s.get(test) for s in samples] for test in tests}
+
+
+def _assert_matches(array, expected):
+    for got, want in zip(array.tolist(), expected):
+        if want is None:
+            assert math.isnan(got)
+        else:
+            assert got == pytest.approx(want)
+
+
+def test_derived_indices_match_scalar_loop():
+    rng = random.Random(5)
+    samples = []
+    for _ in range(60):
+        sample = {
+            'pO2': rng.uniform(50, 120), 'FiO2': rng.choice((0.21, 0.4, 60, 1.0, 1.5)),
+            'Na+': rng.uniform(130, 150), 'Cl-': rng.uniform(95, 115), 'HCO3-': rng.uniform(10, 30),
+            'Lactato': rng.uniform(0.8, 8.0),
+        }
+        for test in list(sample):
+            if rng.random() < 0.2:
+                del sample[test]
+        samples.append(sample)
+    result = analisar_gasometria_serie([T0 + timedelta(hours=i) for i in range(60)], _columns(samples))
+    pf, ag, clearance = _scalar_reference(samples)
+    _assert_matches(result["derived"]["pf_ratio"], pf)
+    _assert_matches(result["derived"]["anion_gap"], ag)
+    _assert_matches(result["derived"]["lactate_clearance_pct"], clearance)
+
+
+def test_pf_drop_and_lactate_nonclearance_events():
+    samples = [
+        {'pO2': 90, 'FiO2': 0.4, 'Lactato': 4.0},   # P/F 225
+        {'pO2': 85, 'FiO2': 0.4, 'Lactato': 3.8},   # 212; clearance 5% after lactate 4.0
+        {'pO2': 70, 'FiO2': 0.4},                   # 175: crosses below 200
+        {'pO2': 60, 'FiO2': 0.4, 'Lactato': 2.5},   # 150: still below, no new event; clearance 34%
+        {'pO2': 110, 'FiO2': 0.5, 'Lactato': 1.9},  # 220; clearance 24%
+        {'pO2': 95, 'FiO2': 0.5, 'Lactato': 1.9},   # 190: second crossing; lactate no longer elevated
+    ]
+    result = analisar_gasometria_serie([T0 + timedelta(hours=2 * i) for i in range(6)], _columns(samples))
+    assert [(e["code"], e["index"]) for e in result["events"]] == [
+        ("LACTATE_CLEARANCE_BELOW_10", 1),
+        ("PF_BELOW_200", 2),
+        ("PF_BELOW_200", 5),
+    ]
+    assert result["flags"]["pf_below_200"].tolist() == [False, False, True, True, False, True]
+    assert result["events"][1]["timestamp"] == T0 + timedelta(hours=4)
+    assert result["derived"]["pf_slope_per_hour"][2] == pytest.approx((175 - 212.5) / 2)
+    assert result["hours"].tolist() == [0, 2, 4, 6, 8, 10]
+
+
+def test_unordered_samples_are_sorted_and_numeric_hours_accepted():
+    result = analisar_gasometria_serie([3.0, 0.0, 1.5], {'pO2': [60, 100, 90], 'FiO2': [0.4, 0.4, 0.4]})
+    assert result["order"].tolist() == [1, 2, 0]
+    assert result["hours"].tolist() == [0.0, 1.5, 3.0]
+    assert result["derived"]["pf_ratio"].tolist() == [250.0, 225.0, 150.0]
+    assert [(e["code"], e["index"], e["hours"]) for e in result["events"]] == [("PF_BELOW_200", 2, 3.0)]
+    assert "timestamp" not in result["events"][0]
+
+    start = datetime(2024, 1, 1, 8, 0)
+    result = analisar_gasometria_serie([start + timedelta(hours=2), start], {'pO2': [90, 100], 'FiO2': [0.4, 0.4]})
+    assert result["hours"].tolist() == [0.0, 2.0]
+
+
+def test_delta_ratio_only_with_high_anion_gap():
+    result = analisar_gasometria_serie([0, 1], {'Na+': [140, 140], 'Cl-': [104, 100], 'HCO3-': [24, 14]})
+    ratio = result["derived"]["delta_ratio"]
+    assert math.isnan(ratio[0])          # AG 12: not elevated
+    assert ratio[1] > 0
+
+
+def test_previous_valid_index_and_length_mismatch():
+    assert previous_valid_index(np.array([np.nan, 1.0, np.nan, 2.0])).tolist() == [-1, -1, 1, 1]
+    with pytest.raises(ValueError):
+        analisar_gasometria_serie([0, 1, 2], {'pO2': [80, 90]})
+
+
+def test_many_patients():
+    results = analisar_gasometrias_pacientes({
+        "a": {"timestamps": [0, 1], "columns": {'Lactato': [4.0, 3.9]}},
+        "b": {"timestamps": [], "columns": {}},
+    })
+    assert results["a"]["events"][0]["code"] == "LACTATE_CLEARANCE_BELOW_10"
+    assert results["b"]["n_samples"] == 0 and results["b"]["events"] == []
@@ -0,0 +1,96 @@
+"""
+Tests for the compiled criticality threshold engine.
+"""
+
+import random
+import sys
+import os
+
+import numpy as np
+import pytest
+
+if os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analyzers.criticality import (
+    CRITICAL, MONITORING, SIGNIFICANT, UNKNOWN,
+    CriticalityThresholds, compile_thresholds, get_criticality_level,
+)
+from analyzers import electrolytes, hematology, metabolic
+
+
+def _legacy_criticality_level(param_name, value, thresholds):
+    """The per-module helper the engine replaces, kept as the oracle."""
+    if value is None:
+        return ("UNKNOWN", f"{param_name} value is None")
+    for threshold in thresholds.get('critical', []):
+        if isinstance(threshold, tuple):
+            if threshold[0] <= value <= threshold[1]:
+                return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
+        elif (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
+            return ("CRITICAL", f"{param_name} CRITICAL: {value} - Life-threatening immediate")
+    for threshold in thresholds.get('significant', []):
+        if isinstance(threshold, tuple):
+            if threshold[0] <= value <= threshold[1]:
+                return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
+        elif (threshold < 0 and value < abs(threshold)) or (threshold > 0 and value > threshold):
+            return ("SIGNIFICANT", f"{param_name} SIGNIFICANT: {value} - Potentially life-threatening urgent")
+    return ("MONITORING", f"{param_name} MONITORING: {value} - Significant morbidity risk prompt")
+
+
+SPECS = [
+    electrolytes.NA_CRITICALITY,
+    electrolytes.K_CRITICALITY,
+    hematology.PLAQ_CRITICALITY,
+    metabolic.GLICOSE_JEJUM_CRITICALITY,
+    metabolic.TSH_CRITICALITY,
+    CriticalityThresholds("INR", {'critical': [5.0, float('inf')], 'significant': [(3.5, 5.0)]}),
+    CriticalityThresholds("Fib", {'critical': [(-float('inf'), 50), (700, float('inf'))], 'significant': [(50, 200), (400, 700)]}),
+]
+
+
+def _probe_values(compiled):
+    values = [0.0, -1.0, float('inf'), float('-inf')]
+    for bound in compiled._bounds:
+        if abs(bound) != float('inf'):
+            values += [bound, bound - 1e-9, bound + 1e-9, bound * 0.999, bound * 1.001]
+    rng = random.Random(42)
+    finite = [b for b in compiled._bounds if abs(b) != float('inf')] or [1.0]
+    values += [rng.uniform(min(finite) - 10, max(finite) * 1.5 + 10) for _ in range(500)]
+    return values
+
+
+@pytest.mark.parametrize("compiled", SPECS, ids=lambda c: c.param_name)
+def test_compiled_matches_legacy_helper(compiled):
+    for value in _probe_values(compiled):
+        assert tuple(compiled.classify(value)) == _legacy_criticality_level(compiled.param_name, value, compiled.thresholds)
+
+
+@pytest.mark.parametrize("compiled", SPECS, ids=lambda c: c.param_name)
+def test_numpy_codes_match_scalar_codes(compiled):
+    values = _probe_values(compiled)
+    codes = compiled.codes(np.array(values))
+    assert codes.tolist() == [compiled.code(v) for v in values]
+
+
+def test_missing_values():
+    compiled = electrolytes.NA_CRITICALITY
+    assert compiled.code(None) == UNKNOWN
+    assert compiled.level(None) == "UNKNOWN"
+    assert compiled.codes([float('nan'), 170.0, 140.0, 125.0]).tolist() == [UNKNOWN, CRITICAL, MONITORING, SIGNIFICANT]
+
+
+def test_description_is_rendered_lazily():
+    result = electrolytes.K_CRITICALITY.classify(7.1)
+    assert result._description is None
+    assert result.level == "CRITICAL"
+    assert result.is_alert
+    assert result.description == "K+ CRITICAL: 7.1 - Life-threatening immediate"
+    level, description = result
+    assert (level, description) == ("CRITICAL", result.description)
+
+
+def test_runtime_thresholds_are_compiled_once():
+    spec = {'critical': [3 * 100, float('inf')], 'significant': [(100, 300)]}
+    assert compile_thresholds("Amilase", spec) is compile_thresholds("Amilase", dict(spec))
+    assert get_criticality_level("Amilase", 150, spec) == ("SIGNIFICANT", "Amilase SIGNIFICANT: 150 - Potentially life-threatening urgent")
@@ -0,0 +1,105 @@
+"""
+Tests for structured analyzer findings and their deferred text rendering.
+"""
+
+import sys
+import os
+
+import pytest
+
+if os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analyzers import (
+    Finding, analisar_eletrolitos, analisar_eletrolitos_batch, analisar_hemograma,
+    analisar_hemograma_batch, extract_findings, findings_from_batch,
+)
+from analyzers.coagulation import analisar_coagulacao
+from analyzers.criticality import CRITICAL, MONITORING, SIGNIFICANT
+
+
+def test_extracts_codes_and_severities():
+    findings = extract_findings({'sodio': '118', 'K+': 5.8, 'Cl-': 100, 'creatinina': '1,0'})
+    assert [(f.code, f.parameter, f.value, f.severity) for f in findings] == [
+        ('HYPONATREMIA', 'Na+', 118.0, CRITICAL),
+        ('HYPERKALEMIA', 'K+', 5.8, SIGNIFICANT),
+    ]
+    assert findings.is_critical
+    assert findings.codes == ['HYPONATREMIA', 'HYPERKALEMIA']
+
+
+def test_normal_panel_has_no_findings():
+    findings = extract_findings({'Na+': 140, 'K+': 4.2, 'Hb': 14.0})
+    assert not findings
+    assert findings.is_critical is False
+
+
+def test_sex_specific_reference_ranges():
+    assert extract_findings({'Hb': 13.0}, sexo='M').codes == ['ANEMIA']
+    assert extract_findings({'Hb': 13.0}, sexo='F').codes == []
+
+
+def test_critical_status_agrees_with_narrative_analyzer():
+    for panel in ({'Na+': 118}, {'K+': 7.2}, {'Na+': 150, 'K+': 4.0}, {'K+': 4.0}):
+        assert extract_findings(panel).is_critical == analisar_eletrolitos(panel)["is_critical"]
+
+
+@pytest.mark.parametrize("hb, severity", [(6.0, CRITICAL), (7.0, SIGNIFICANT), (4.5, CRITICAL)])
+def test_hemoglobin_severity_follows_analyzer_cutoff(hb, severity):
+    # HB_CRITICALITY rates 5-7 g/dL SIGNIFICANT, but the hematology analyzer is critical below 7
+    finding = extract_findings({'Hb': hb}, sexo='M').findings[0]
+    assert finding.severity == severity
+    assert finding.is_critical == analisar_hemograma({'Hb': hb}, sexo='M')["is_critical"]
+    assert finding.alert_severity == ('critical' if severity == CRITICAL else 'high')
+
+
+def test_critical_status_agrees_with_other_analyzers():
+    for panel in ({'Leuco': 800}, {'Leuco': 35000}, {'Plaq': 15000}, {'Leuco': 5000, 'Plaq': 200000}):
+        assert extract_findings(panel).is_critical == analisar_hemograma(panel)["is_critical"]
+    for panel in ({'K+': 6.6}, {'K+': 2.4}, {'Na+': 124}, {'Na+': 161}):
+        assert extract_findings(panel).is_critical == analisar_eletrolitos(panel)["is_critical"]
+    for panel in ({'RNI': 1.0}, {'RNI': 2.5}, {'RNI': 5.0}):
+        assert extract_findings(panel).is_critical == analisar_coagulacao(panel)["is_critical"]
+
+
+def test_batch_severity_follows_analyzer_cutoff():
+    batch = analisar_hemograma_batch({'Hb': [6.0, 12.0]}, sexo=['M', 'M'], materialize=False)
+    assert findings_from_batch(batch, 0).findings[0].severity == CRITICAL
+
+
+def test_text_is_rendered_lazily():
+    finding = extract_findings({'K+': 7.2}).findings[0]
+    assert finding._text is None
+    assert finding.text == "Hipercalemia (7.2 mmol/L) - valor crítico"
+    assert Finding('HYPONATREMIA', 'Na+', 133.0, MONITORING).text == "Hiponatremia (133 mmol/L)"
+
+
+def test_payload_omits_narrative_by_default():
+    findings = extract_findings({'K+': 7.2})
+    assert findings.to_payload() == {
+        "is_critical": True,
+        "findings": [{"code": "HYPERKALEMIA", "parameter": "K+", "value": 7.2, "severity": CRITICAL}],
+    }
+    assert findings.findings[0]._text is None
+    assert findings.to_payload(narrative=True)["abnormalities"] == ["Hipercalemia (7.2 mmol/L) - valor crítico"]
+
+
+@pytest.mark.parametrize("row", [0, 1, 2])
+def test_batch_rows_match_per_patient_findings(row):
+    columns = {'Na+': [140, 115, 133], 'K+': [4.0, 7.2, 5.3]}
+    batch = analisar_eletrolitos_batch(columns, materialize=False)
+    expected = extract_findings({test: values[row] for test, values in columns.items()})
+    assert findings_from_batch(batch, row).findings == expected.findings
+
+
+def test_batch_findings_use_per_row_sex():
+    batch = analisar_hemograma_batch({'Hb': [13.0, 13.0]}, sexo=['M', 'F'], materialize=False)
+    assert findings_from_batch(batch, 0).codes == ['ANEMIA']
+    assert findings_from_batch(batch, 1).codes == []
+
+
+def test_restricted_to_tests():
+    findings = extract_findings({'sodio': '118', 'K+': 5.8}, tests=('K+', 'Creat'))
+    assert findings.codes == ['HYPERKALEMIA']
+    assert findings.findings[0].alert_severity == 'high'
+    assert findings.findings[0].key == ('HYPERKALEMIA', 'K+', SIGNIFICANT)
@@ -0,0 +1,65 @@
+"""
+Import-time budget for the analyzer package and the modules that use it.
+
+Each check runs in a fresh interpreter so that modules already imported by the
+test session do not hide the cost. The budget can be tightened or relaxed per
+environment through IMPORT_TIME_BUDGET_MS.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "150"))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"elapsed_ms": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def _probe(module):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_package_import_loads_no_analyzer():
+    loaded = _probe("analyzers")["modules"]
+    assert "numpy" not in loaded
+    assert [m for m in loaded if m.startswith("analyzers.")] == []
+
+
+@pytest.mark.parametrize("module", ["analyzers", "utils.severity_scores", "utils.alert_system"])
+def test_import_time_within_budget(module):
+    # Best of three, to keep a busy CI machine from failing the check
+    elapsed = min(_probe(module)["elapsed_ms"] for _ in range(3))
+    assert elapsed < IMPORT_TIME_BUDGET_MS, f"import {module} took {elapsed:.1f} ms (budget {IMPORT_TIME_BUDGET_MS} ms)"
+
+
+def test_score_calculators_do_not_load_the_database_layer():
+    loaded = _probe("utils.severity_scores")["modules"]
+    assert "sqlalchemy" not in loaded
+    assert "database.models" not in loaded
+
+
+def test_lazy_names_resolve_on_first_use():
+    import analyzers
+    from analyzers import analisar_funcao_renal, analyzer_registry
+
+    assert analisar_funcao_renal is analyzers.renal.analisar_funcao_renal
+    assert "analisar_funcao_renal" in dir(analyzers)
+    assert analyzer_registry["renal"].func is analisar_funcao_renal
+    with pytest.raises(AttributeError):
+        analyzers.not_an_analyzer
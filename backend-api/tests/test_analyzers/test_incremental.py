@@ -0,0 +1,85 @@
+"""
+Tests for incremental, dependency-driven re-analysis.
+"""
+
+import sys
+import os
+
+if os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analyzers import analyzer_registry
+from analyzers.incremental import IncrementalAnalyzer
+
+BASELINE = {'Creat': 1.0, 'Ur': 30, 'Na+': 140, 'K+': 4.2, 'Hb': 13.5, 'Plaq': 250000, 'TGO': 25}
+
+
+def test_seed_is_a_silent_baseline():
+    engine = IncrementalAnalyzer()
+    delta = engine.update(1, {'K+': 4.3}, seed=lambda: dict(BASELINE))
+
+    assert delta.added == [] and delta.removed == []
+    assert set(delta.rerun) == {'electrolytes', 'renal'}
+    assert set(engine.outputs(1)) == {spec.name for spec in analyzer_registry.select(BASELINE)}
+
+
+def test_only_dependent_analyzers_rerun_and_diff_is_reported():
+    engine = IncrementalAnalyzer()
+    engine.update(1, {}, seed=lambda: dict(BASELINE))
+    hematology_before = engine.outputs(1)['hematology']
+
+    delta = engine.update(1, {'K+': 6.9})
+    assert set(delta.rerun) == {'electrolytes', 'renal'}
+    assert delta.added and all(name in ('electrolytes', 'renal') for name, _ in delta.added)
+    assert delta.removed == []
+    assert delta.is_critical
+    assert engine.outputs(1)['hematology'] is hematology_before
+
+    resolved = engine.update(1, {'K+': '4,1'})
+    assert {a for _, a in resolved.removed} == {a for _, a in delta.added}
+    assert resolved.added == []
+    assert not resolved.is_critical
+
+
+def test_unchanged_value_reruns_nothing():
+    engine = IncrementalAnalyzer()
+    engine.update(1, {}, seed=lambda: dict(BASELINE))
+    delta = engine.update(1, {'Creat': '1,0'})
+    assert delta.changed_tests == [] and delta.rerun == []
+
+
+def test_new_input_selects_analyzer_and_removal_drops_it():
+    engine = IncrementalAnalyzer()
+    engine.update(1, {}, seed=lambda: dict(BASELINE))
+
+    delta = engine.update(1, {'Lipase': 900})
+    assert delta.rerun == ['pancreatic']
+    assert delta.added
+
+    dropped = engine.update(1, {'Lipase': None})
+    assert dropped.dropped == ['pancreatic']
+    assert {a for _, a in dropped.removed} == {a for _, a in delta.added}
+    assert 'pancreatic' not in engine.outputs(1)
+
+
+def test_patients_are_isolated_and_bounded():
+    engine = IncrementalAnalyzer(max_patients=2)
+    for patient_id in (1, 2, 3):
+        engine.update(patient_id, {'Na+': 140 + patient_id})
+    assert 1 not in engine and 3 in engine
+    assert engine.panel(2) == {'Na+': 142}
+
+
+def test_findings_are_diffed_by_code_and_severity():
+    engine = IncrementalAnalyzer()
+    engine.update(1, {}, seed=lambda: dict(BASELINE))
+
+    raised = engine.update(1, {'K+': 6.9})
+    assert [(name, f.code, f.value) for name, f in raised.added_findings] == [('electrolytes', 'HYPERKALEMIA', 6.9)]
+    assert raised.removed_findings == []
+
+    assert engine.update(1, {'K+': 7.0}).added_findings == []  # same finding, new value
+
+    resolved = engine.update(1, {'K+': 4.1})
+    assert [(name, f.code) for name, f in resolved.removed_findings] == [('electrolytes', 'HYPERKALEMIA')]
+    assert resolved.added_findings == []
@@ -414,4 +414,32 @@ def test_microbiology_analyzer_hepatitis_b_igm_igg_differentiation():
     assert any("anti-hbc igm negativo" in r.lower() for r in result)
     assert any("anti-hbc igg positivo" in r.lower() for r in result)
     assert any("infecção prévia" in r.lower() for r in result)
-    assert any("imunidade" in r.lower() for r in result) 
\ No newline at end of file
+    assert any("imunidade" in r.lower() for r in result) 
+
+def test_keyword_matcher_matches_substring_semantics():
+    """The compiled matcher finds exactly the keywords a per-pattern `in` scan finds."""
+    import random
+    from analyzers.microbiology import HEMOCULT_MATCHER, HEMOCULT_ORGANISMS, KeywordMatcher
+
+    rng = random.Random(3)
+    words = [p for p, _ in HEMOCULT_ORGANISMS] + ["Positivo:", "Gram-negativo", "cocos", "ESBL", "KPC", "após 48h", "e"]
+    for _ in range(300):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 8)))
+        text = text.upper() if rng.random() < 0.3 else text
+        expected = {k for k in HEMOCULT_MATCHER.keywords if k in text.lower()}
+        assert HEMOCULT_MATCHER.find(text) == expected
+
+    overlapping = KeywordMatcher(["he", "she", "his", "hers"])
+    assert overlapping.find("ushers") == {"she", "he", "hers"}
+    assert overlapping.find("") == frozenset()
+
+
+def test_microbiology_resistance_markers_in_one_report():
+    """MRSA, VRE and KPC markers are all picked up from free-text surveillance cultures."""
+    result = analisar_microbiologia({
+        "CultVigilNasal": "Positivo para MRSA",
+        "CultVigilRetal": "Enterococcus faecium resistente à vancomicina (VRE); Klebsiella KPC detectada",
+    })
+    assert "Colonização por MRSA (Nasal)" in result["abnormalities"]
+    assert "Colonização por VRE (Retal)" in result["abnormalities"]
+    assert "Colonização por KPC (Retal)" in result["abnormalities"]
@@ -0,0 +1,75 @@
+"""
+Tests for the shared lab panel normalizer.
+"""
+
+import pytest
+import sys
+import os
+
+if os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analyzers.panel import LabPanel, canonical_test_id, normalize_panel, parse_lab_value
+from analyzers.result_cache import canonicalize
+from analyzers import analisar_funcao_renal, analisar_hemograma, analisar_gasometria
+
+
+def test_parse_lab_value_formats():
+    assert parse_lab_value(140) == 140.0
+    assert parse_lab_value('3,5') == 3.5
+    assert parse_lab_value('1.234,56') == 1234.56
+    assert parse_lab_value('<0.1') == 0.1
+    assert parse_lab_value('>100') == 100.0
+    assert parse_lab_value('Positivo') is None
+    assert parse_lab_value(None) is None
+
+
+def test_panel_keeps_raw_and_parsed_values():
+    panel = normalize_panel({'Creat': '1,8', 'Hemocult': 'Positivo', 'K+': None})
+
+    assert isinstance(panel, LabPanel)
+    assert panel['Creat'] == 1.8
+    assert panel.raw('Creat') == '1,8'
+    assert panel['Hemocult'] == 'Positivo'
+    assert panel.numeric('Hemocult') is None
+    assert panel.numeric_dict() == {'Creat': 1.8, 'Hemocult': None, 'K+': None}
+    assert panel.details_dict() == {'Creat': 1.8, 'Hemocult': 'Positivo', 'K+': None}
+    assert panel.invalid == ['Hemocult']
+
+
+def test_panel_indexes_by_canonical_test_id():
+    panel = normalize_panel({'sodio': '138', 'Creatinina': 2.1, 'hemoglobina': '9,5'})
+
+    assert canonical_test_id(' Potássio ') == 'K+'
+    assert panel.value('Na+') == 138.0
+    assert panel.value('Creat') == 2.1
+    assert panel.value('Hb') == 9.5
+    assert panel.value('K+') is None
+    assert panel.value('not-a-test') is None
+
+
+def test_list_input_matches_dict_input():
+    as_list = normalize_panel([{'test': 'Creat', 'value': '1.0'}, {'test': 'Creat', 'value': '2.5'}, {'test': 'Ur', 'value': 40}])
+    as_dict = normalize_panel({'Creat': '2.5', 'Ur': 40})
+
+    assert as_list.numeric_dict() == as_dict.numeric_dict()
+    assert normalize_panel(as_list) is as_list
+
+
+def test_unsupported_input_raises_type_error():
+    with pytest.raises(TypeError):
+        normalize_panel('Creat=1.0')
+
+
+def test_analyzers_accept_normalized_panel():
+    dados = {'Hb': '6,5', 'Plaq': '15000', 'Creat': '3,2', 'Ur': 90, 'pH': '7,25', 'pCO2': 60, 'HCO3-': 24}
+    panel = normalize_panel(dados)
+
+    assert analisar_hemograma(panel, sexo='F') == analisar_hemograma(dados, sexo='F')
+    assert analisar_funcao_renal(panel) == analisar_funcao_renal(dados)
+    assert analisar_gasometria(panel) == analisar_gasometria(dados)
+
+
+def test_panel_shares_cache_key_with_raw_dict():
+    dados = {'Creat': '1,8', 'Ur': 40}
+    assert canonicalize(normalize_panel(dados)) == canonicalize(dados)
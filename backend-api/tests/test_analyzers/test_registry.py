@@ -0,0 +1,112 @@
+"""
+Tests for the analyzer registry and full-panel runner.
+"""
+
+import sys
+import os
+
+import pytest
+
+if os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analyzers import (
+    AnalyzerRegistry, analisar_eletrolitos, analisar_funcao_renal, analisar_hemograma,
+    analyzer_registry, normalize_panel, run_all_analyzers,
+)
+
+PANEL = {'Creatinina': '3,2', 'Ur': 110, 'K+': 6.8, 'Na+': 128, 'Hb': 7.1, 'Plaq': 90000}
+
+
+def test_select_picks_analyzers_with_inputs_present():
+    names = [spec.name for spec in analyzer_registry.select(PANEL)]
+    assert names == ['electrolytes', 'hematology', 'renal']
+    assert analyzer_registry.select({'Albumina': 3.0}) == []  # modifier only
+
+
+def test_dependents_include_modifiers():
+    assert set(analyzer_registry.dependents(['Albumina'])) == {'electrolytes', 'hepatic', 'bone_metabolism'}
+    assert 'renal' in analyzer_registry.dependents(['creatinina'])
+
+
+@pytest.mark.parametrize("executor", ["serial", "thread", "process"])
+def test_run_matches_direct_calls(executor):
+    merged = run_all_analyzers(PANEL, patient={'sexo': 'F', 'idade': 70}, executor=executor, max_workers=2)
+
+    assert merged['errors'] == {}
+    assert set(merged['results']) == set(merged['timings']) == {'electrolytes', 'hematology', 'renal'}
+    assert all(t >= 0 for t in merged['timings'].values())
+    assert 'cardiac' in merged['skipped']
+    assert merged['results']['hematology'] == analisar_hemograma(PANEL, sexo='F')
+    renal_panel = {('Creat' if key == 'Creatinina' else key): value for key, value in PANEL.items()}
+    assert merged['results']['renal'] == analisar_funcao_renal(renal_panel, sexo='F', idade=70)
+    assert merged['results']['electrolytes'] == analisar_eletrolitos(PANEL)
+    assert merged['is_critical'] is True
+    assert {name: findings.codes for name, findings in merged['findings'].items()} == {
+        'electrolytes': ['HYPERKALEMIA', 'HYPONATREMIA'],
+        'hematology': ['ANEMIA', 'THROMBOCYTOPENIA'],
+        'renal': ['CREAT_HIGH', 'UREA_HIGH'],
+    }
+    assert len(merged['abnormalities']) == sum(len(r['abnormalities']) for r in merged['results'].values())
+
+
+def test_failing_analyzer_is_reported_not_raised():
+    def broken(dados):
+        raise RuntimeError("boom")
+
+    registry = AnalyzerRegistry(executor="thread", max_workers=2)
+    registry.register("broken", broken, ('Na+',))
+    registry.register("electrolytes", analisar_eletrolitos, ('Na+',))
+    merged = registry.run({'sodio': 150})
+
+    assert merged['errors'] == {'broken': 'RuntimeError: boom'}
+    assert list(merged['results']) == ['electrolytes']
+    assert 'broken' in merged['timings']
+
+
+def test_register_validation():
+    registry = AnalyzerRegistry()
+    registry.register("renal", analisar_funcao_renal, ('Creat',))
+    with pytest.raises(ValueError):
+        registry.register("renal", analisar_funcao_renal, ('Creat',))
+    with pytest.raises(ValueError):
+        registry.register("empty", analisar_funcao_renal, ())
+    with pytest.raises(ValueError):
+        registry.run({'Creat': 1.0, 'Ur': 30}, executor="fiber", max_workers=2)
+
+
+@pytest.mark.parametrize("executor", ["serial", "thread", "process"])
+def test_analyzers_receive_their_own_input_keys(executor):
+    merged = run_all_analyzers({'Creatinina': 4.5, 'Ureia': 150, 'Potássio': 6.8},
+                               executor=executor, max_workers=2)
+
+    assert merged['errors'] == {}
+    renal = merged['results']['renal']
+    assert renal == analisar_funcao_renal({'Creat': 4.5, 'Ur': 150, 'K+': 6.8})
+    assert 'Dados insuficientes' not in renal['interpretation']
+    assert 'Creatinina Elevada' in renal['abnormalities']
+    assert merged['results']['electrolytes'] == analisar_eletrolitos({'Creatinina': 4.5, 'Ureia': 150, 'K+': 6.8})
+
+
+def test_panel_for_keeps_declared_spellings():
+    spec = analyzer_registry['renal']
+    panel = normalize_panel({'Creat': 1.0, 'creatinina': 2.0, 'Ureia': 40, 'Glicose': 90})
+
+    assert dict(spec.panel_for(panel)) == {'Creat': 1.0, 'creatinina': 2.0, 'Ur': 40.0, 'Glicose': 90.0}
+
+
+def test_pool_is_reused_until_shutdown():
+    registry = AnalyzerRegistry(executor="thread", max_workers=2)
+    registry.register("electrolytes", analisar_eletrolitos, ('Na+',))
+    registry.register("renal", analisar_funcao_renal, ('Creat',))
+    panel = {'Na+': 128, 'Creat': 2.0}
+
+    registry.run(panel)
+    pool = registry._pools[("thread", 2)]
+    registry.run(panel)
+    assert registry._pools == {("thread", 2): pool}
+
+    registry.shutdown()
+    assert registry._pools == {}
+    assert registry.run(panel)['errors'] == {}
+    registry.shutdown()
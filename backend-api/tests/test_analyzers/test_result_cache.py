@@ -0,0 +1,95 @@
+"""
+Tests for the shared analyzer result cache.
+"""
+
+import pytest
+import sys
+import os
+
+if os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) not in sys.path:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from analyzers.result_cache import AnalyzerResultCache, analyzer_cache, canonicalize
+from analyzers.blood_gases import analisar_gasometria
+from analyzers.hematology import analisar_hemograma
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_repeated_blood_gas_panel_hits_cache():
+    dados = {"pH": 7.25, "pCO2": 60, "HCO3-": 24, "pO2": 70, "FiO2": 21}
+    first = analisar_gasometria(dados)
+    second = analisar_gasometria(dict(dados))
+
+    assert first == second
+    stats = analyzer_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_returned_results_are_private_copies():
+    dados = {"Hb": 6.5, "Plaq": 15000}
+    result = analisar_hemograma(dados, sexo="F")
+    result["abnormalities"].append("poisoned")
+    result["details"].clear()
+
+    again = analisar_hemograma(dados, sexo="F")
+    assert "poisoned" not in again["abnormalities"]
+    assert again["details"]
+
+
+def test_canonicalize_normalizes_numbers_order_and_sex():
+    assert canonicalize({"b": 1, "a": "x"}) == canonicalize({"a": "x", "b": 1.0})
+    assert canonicalize({"sexo": " f"}) == canonicalize({"sexo": "F"})
+    assert canonicalize([1, 2]) != canonicalize([2, 1])
+
+
+def test_uncacheable_arguments_bypass_cache():
+    cache = AnalyzerResultCache(maxsize=4, ttl_seconds=60)
+    calls = []
+
+    @cache.memoize("custom")
+    def analyzer(dados):
+        calls.append(1)
+        return {"n": len(calls)}
+
+    analyzer({"x": object()})
+    analyzer({"x": object()})
+    assert len(calls) == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_ttl_expiry_and_lru_eviction_counters():
+    clock = FakeClock()
+    cache = AnalyzerResultCache(maxsize=2, ttl_seconds=10, clock=clock)
+
+    @cache.memoize("custom")
+    def analyzer(value):
+        return {"value": value}
+
+    analyzer(1)
+    analyzer(2)
+    analyzer(1)  # hit, 1 becomes most recently used
+    analyzer(3)  # evicts 2
+    assert cache.stats()["evictions"] == 1
+
+    clock.now = 11
+    analyzer(1)  # expired -> recomputed
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+
+
+def test_clear_namespace_only_drops_that_analyzer():
+    cache = AnalyzerResultCache(maxsize=10, ttl_seconds=60)
+    cache.set("a", 1, {"x": 1})
+    cache.set("b", 1, {"x": 2})
+    cache.clear("a")
+    assert cache.stats()["size"] == 1
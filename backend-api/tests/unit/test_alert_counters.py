@@ -0,0 +1,109 @@
+"""
+Tests for the per-user alert counters.
+"""
+
+import os
+import sys
+from datetime import datetime
+
+# Add the root directory to the Python path
+parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from database import models
+
+
+def test_user_alert_counters_follow_alert_writes(sqlite_session):
+    """Alert writes keep user_alert_counters equal to a recount; badge counts read only the counters."""
+    from sqlalchemy import event
+    from crud import alerts as alerts_crud
+    from crud.crud_user_alert_counter import get_unread_alert_counts, rebuild_user_alert_counters
+    from schemas.alert import AlertCreate, AlertUpdate
+
+    doctor = models.User(email="alert_counters@example.com", name="Counter Doctor", role="doctor")
+    sqlite_session.add(doctor)
+    sqlite_session.commit()
+    patient = models.Patient(user_id=doctor.user_id, name="Counter Patient", gender="M", birthDate=datetime(1955, 1, 1))
+    patient.managing_doctors.append(doctor)
+    sqlite_session.add(patient)
+    sqlite_session.commit()
+    patient_id, doctor_id = patient.patient_id, doctor.user_id
+
+    def alert(parameter, severity, user_id=doctor_id):
+        return AlertCreate(patient_id=patient_id, user_id=user_id, alert_type="lab_high", parameter=parameter,
+                           message=f"{parameter} alterado", severity=severity)
+
+    def counters():
+        return {(row.severity, row.total, row.unread) for row in sqlite_session.query(models.UserAlertCounter)
+                if row.total or row.unread}
+
+    potassium = alerts_crud.create_alert(sqlite_session, alert("Potássio", "critical"), suppression_window_minutes=0)
+    bulk = alerts_crud.create_alerts_bulk(sqlite_session, [alert("Sódio", "warning"), alert("Glicose", "warning"),
+                                                           alert("Ureia", "info", user_id=None)])
+    alerts_crud.upsert_alerts(sqlite_session, [alert("Potássio", "severe"), alert("pH", "critical")],
+                              suppression_window_minutes=60)
+    assert counters() == {("severe", 1, 1), ("critical", 1, 1), ("warning", 2, 2)}
+
+    assert alerts_crud.mark_alert_as_read(sqlite_session, bulk[0].alert_id, doctor).is_read
+    alerts_crud.mark_alert_as_read(sqlite_session, bulk[0].alert_id, doctor)  # already read: no change
+    alerts_crud.update_alert(sqlite_session, potassium.alert_id, AlertUpdate(is_read=True))
+    alerts_crud.update_alert(sqlite_session, bulk[1].alert_id, AlertUpdate(status="acknowledged"))
+    assert alerts_crud.delete_alert(sqlite_session, bulk[1].alert_id)
+    expected = {("severe", 1, 0), ("critical", 1, 1), ("warning", 1, 0)}
+    assert counters() == expected
+
+    statements = []
+    bind = sqlite_session.get_bind()
+    listener = lambda conn, cursor, statement, params, context, executemany: statements.append(statement)
+    event.listen(bind, "before_cursor_execute", listener)
+    try:
+        assert get_unread_alert_counts(sqlite_session, doctor_id) == {"critical": 1}
+        stats = alerts_crud.get_alert_stats(sqlite_session, doctor_id)
+    finally:
+        event.remove(bind, "before_cursor_execute", listener)
+    assert len(statements) == 2 and all("user_alert_counters" in s for s in statements)
+    assert (stats.total, stats.unread, stats.by_severity) == (3, 1, {"critical": 1})
+
+    unread, total = alerts_crud.get_alerts_by_user_and_status(sqlite_session, doctor_id, is_read=False)
+    assert total == len(unread) == 1
+    read, total = alerts_crud.get_alerts_by_user_and_status(sqlite_session, doctor_id, is_read=True, limit=1)
+    assert (len(read), total) == (1, 2)
+
+    assert rebuild_user_alert_counters(sqlite_session) == 3
+    assert counters() == expected
+
+
+def test_mark_alert_as_read_counts_a_stale_alert_once(sqlite_session):
+    """Marking an alert another request already marked as read leaves the counters alone."""
+    from sqlalchemy.orm.attributes import set_committed_value
+    from crud import alerts as alerts_crud
+    from crud.crud_user_alert_counter import get_unread_alert_counts
+    from schemas.alert import AlertCreate
+
+    doctor = models.User(email="alert_race@example.com", name="Race Doctor", role="doctor")
+    sqlite_session.add(doctor)
+    sqlite_session.commit()
+    patient = models.Patient(user_id=doctor.user_id, name="Race Patient", gender="F", birthDate=datetime(1970, 1, 1))
+    patient.managing_doctors.append(doctor)
+    sqlite_session.add(patient)
+    sqlite_session.commit()
+    alert = alerts_crud.create_alert(sqlite_session, AlertCreate(
+        patient_id=patient.patient_id, user_id=doctor.user_id, alert_type="lab_high", parameter="Potássio",
+        message="Potássio alterado", severity="critical"))
+    assert get_unread_alert_counts(sqlite_session, doctor.user_id) == {"critical": 1}
+
+    # The other request: its UPDATE and counter delta, invisible to this session's loaded copy
+    sqlite_session.execute(
+        models.Alert.__table__.update().where(models.Alert.alert_id == alert.alert_id).values(is_read=True))
+    sqlite_session.execute(
+        models.UserAlertCounter.__table__.update()
+        .where(models.UserAlertCounter.user_id == doctor.user_id)
+        .values(unread=models.UserAlertCounter.unread - 1))
+    sqlite_session.commit()
+    set_committed_value(alert, "is_read", False)
+
+    assert alerts_crud.mark_alert_as_read(sqlite_session, alert.alert_id, doctor).is_read
+    assert get_unread_alert_counts(sqlite_session, doctor.user_id) == {}
+    counter = sqlite_session.get(models.UserAlertCounter, (doctor.user_id, "critical"))
+    assert (counter.total, counter.unread) == (1, 0)
@@ -0,0 +1,69 @@
+"""
+Tests for the alert events published by the CRUD layer.
+"""
+
+import os
+import sys
+from datetime import datetime
+
+# Add the root directory to the Python path
+parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from database import models
+
+
+def test_alert_writes_publish_events_after_commit(sqlite_session):
+    """Alert writes reach the streams of the alert's users once committed; rolled back writes never do."""
+    import asyncio
+    from crud import alerts as alerts_crud
+    from schemas.alert import AlertCreate, AlertUpdate
+    from utils.alert_events import AlertEventBus, queue_alert_events
+    import utils.alert_events as alert_events
+
+    doctor = models.User(email="alert_events_doc@example.com", name="Events Doctor", role="doctor")
+    owner = models.User(email="alert_events_pt@example.com", name="Events Patient", role="patient")
+    outsider = models.User(email="alert_events_out@example.com", name="Other Doctor", role="doctor")
+    sqlite_session.add_all([doctor, owner, outsider])
+    sqlite_session.commit()
+    patient = models.Patient(user_id=owner.user_id, name="Events Patient", gender="F", birthDate=datetime(1980, 1, 1))
+    patient.managing_doctors.append(doctor)
+    sqlite_session.add(patient)
+    sqlite_session.commit()
+    patient_id, doctor_id, owner_id, outsider_id = patient.patient_id, doctor.user_id, owner.user_id, outsider.user_id
+
+    async def scenario():
+        subscriptions = {user_id: bus.subscribe(user_id) for user_id in (doctor_id, owner_id, outsider_id)}
+        created = alerts_crud.create_alert(sqlite_session, AlertCreate(
+            patient_id=patient_id, alert_type="lab_high", parameter="Sódio", message="Sódio elevado (150)",
+            severity="high", value=150), suppression_window_minutes=0)
+        for user_id in (doctor_id, owner_id):
+            received = await subscriptions[user_id].get(timeout=1)
+            assert received["type"] == "alert.created"
+            assert received["alert"]["alert_id"] == created.alert_id and received["alert"]["severity"] == "high"
+        assert await subscriptions[outsider_id].get(timeout=0.05) is None
+
+        alerts_crud.update_alert(sqlite_session, created.alert_id, AlertUpdate(status="acknowledged"))
+        received = await subscriptions[doctor_id].get(timeout=1)
+        assert (received["type"], received["alert"]["status"]) == ("alert.updated", "acknowledged")
+
+        queue_alert_events(sqlite_session, "alert.updated", [created])
+        sqlite_session.rollback()
+        sqlite_session.commit()
+        assert await subscriptions[owner_id].get(timeout=1) == {
+            "type": "alert.updated", "alert": received["alert"]}  # the acknowledged update only
+        assert await subscriptions[owner_id].get(timeout=0.05) is None
+
+        assert alerts_crud.delete_alert(sqlite_session, created.alert_id)
+        assert (await subscriptions[doctor_id].get(timeout=1))["type"] == "alert.deleted"
+        for subscription in subscriptions.values():
+            subscription.close()
+
+    bus = AlertEventBus(enabled=True)
+    original = alert_events.alert_event_bus
+    alert_events.alert_event_bus = bus
+    try:
+        asyncio.run(scenario())
+    finally:
+        alert_events.alert_event_bus = original
@@ -0,0 +1,119 @@
+"""
+Tests for the alert event bus: per-user fan-out, bounded queues and the stream helpers.
+"""
+
+import asyncio
+import threading
+import unittest
+
+from utils.alert_events import ALERTS_RESYNC, AlertEventBus, format_sse, sse_stream, websocket_stream
+
+try:
+    import fakeredis
+except ImportError:  # optional shared backend
+    fakeredis = None
+
+
+def alert_event(alert_id, recipients):
+    return {"type": "alert.created", "recipients": recipients, "alert": {"alert_id": alert_id}}
+
+
+class FakeWebSocket:
+    def __init__(self, fail_after):
+        self.sent = []
+        self.fail_after = fail_after
+
+    async def send_json(self, data):
+        if len(self.sent) >= self.fail_after:
+            raise RuntimeError("disconnected")
+        self.sent.append(data)
+
+
+class TestAlertEventBus(unittest.IsolatedAsyncioTestCase):
+    """Test cases for utils.alert_events."""
+
+    async def test_events_reach_only_their_recipients(self):
+        bus = AlertEventBus(enabled=True)
+        first, second, other = bus.subscribe(1), bus.subscribe(1), bus.subscribe(2)
+        bus.publish(alert_event(10, [1]))
+        for subscription in (first, second):
+            received = await subscription.get(timeout=1)
+            self.assertEqual(received, {"type": "alert.created", "alert": {"alert_id": 10}})
+        self.assertIsNone(await other.get(timeout=0.05))
+        self.assertEqual(bus.stats()["delivered"], 2)
+
+        first.close()
+        bus.publish(alert_event(11, [1, 2]))
+        self.assertEqual((await second.get(timeout=1))["alert"]["alert_id"], 11)
+        self.assertEqual((await other.get(timeout=1))["alert"]["alert_id"], 11)
+        self.assertEqual(bus.stats()["subscriptions"], 2)
+
+    async def test_slow_subscriber_drops_oldest_and_resyncs(self):
+        bus = AlertEventBus(queue_size=3, enabled=True)
+        subscription = bus.subscribe(1)
+        for alert_id in range(5):
+            bus.publish(alert_event(alert_id, [1]))
+        await asyncio.sleep(0)  # let the loop run the queued deliveries
+        self.assertEqual(await subscription.get(timeout=1), {"type": ALERTS_RESYNC, "dropped": 2})
+        received = [(await subscription.get(timeout=1))["alert"]["alert_id"] for _ in range(3)]
+        self.assertEqual(received, [2, 3, 4])
+        self.assertEqual(bus.stats()["dropped"], 2)
+
+    async def test_publish_from_worker_thread(self):
+        bus = AlertEventBus(enabled=True)
+        async with bus.subscribe(7) as subscription:
+            thread = threading.Thread(target=bus.publish, args=(alert_event(1, [7]),))
+            thread.start()
+            thread.join()
+            self.assertEqual((await subscription.get(timeout=1))["alert"]["alert_id"], 1)
+        self.assertFalse(bus.wants_events())
+
+    async def test_disabled_bus_publishes_nothing(self):
+        bus = AlertEventBus(enabled=False)
+        subscription = bus.subscribe(1)
+        bus.publish(alert_event(1, [1]))
+        self.assertIsNone(await subscription.get(timeout=0.05))
+        self.assertFalse(bus.wants_events())
+
+    async def test_sse_stream_frames_and_keep_alive(self):
+        bus = AlertEventBus(enabled=True)
+        stream = sse_stream(3, bus=bus, heartbeat_seconds=0.05)
+        self.assertEqual(await stream.__anext__(), ": connected\n\n")
+        self.assertEqual(await stream.__anext__(), ": keep-alive\n\n")
+        bus.publish(alert_event(5, [3]))
+        frame = await stream.__anext__()
+        self.assertEqual(frame, format_sse({"type": "alert.created", "alert": {"alert_id": 5}}))
+        self.assertTrue(frame.startswith("event: alert.created\ndata: "))
+        await stream.aclose()
+        self.assertEqual(bus.stats()["subscriptions"], 0)
+
+    async def test_websocket_stream_ends_on_disconnect(self):
+        bus = AlertEventBus(enabled=True)
+        websocket = FakeWebSocket(fail_after=2)
+        task = asyncio.create_task(websocket_stream(websocket, 4, bus=bus, heartbeat_seconds=0.05))
+        await asyncio.sleep(0.01)
+        bus.publish(alert_event(6, [4]))
+        await asyncio.wait_for(task, 1)
+        self.assertEqual(websocket.sent[0]["alert"]["alert_id"], 6)
+        self.assertEqual(websocket.sent[1], {"type": "ping"})
+        self.assertEqual(bus.stats()["subscriptions"], 0)
+
+    @unittest.skipIf(fakeredis is None, "fakeredis not installed")
+    async def test_shared_backend(self):
+        client = fakeredis.FakeStrictRedis()
+        publisher = AlertEventBus(enabled=True, shared_client=client)
+        subscriber = AlertEventBus(enabled=True, shared_client=client)
+        subscriber.start()
+        try:
+            subscription = subscriber.subscribe(9)
+            await asyncio.sleep(0.1)
+            publisher.publish(alert_event(12, [9]))
+            received = await subscription.get(timeout=3)
+            self.assertEqual(received["alert"]["alert_id"], 12)
+            self.assertEqual(subscriber.stats()["backend"], "redis")
+        finally:
+            subscriber.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Tests for the compiled AlertSystem threshold rules: agreement with the per-test rule loop.
+"""
+
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from utils.alert_rules import SEVERITY_CODES, ThresholdRuleTable, reference_text, severity_code
+from utils.alert_system import AlertSystem
+
+
+def reference_alerts(numeric_data):
+    """The per-test loop the compiled rules replace."""
+    alerts = []
+    for test_name, value in numeric_data.items():
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            continue
+        info = AlertSystem.THRESHOLDS.get(test_name)
+        if not info:
+            continue
+        unit = info.get('unit')
+
+        def alert(alert_type, severity, qualifier):
+            alerts.append({
+                "alert_type": alert_type,
+                "message": f"{test_name} {qualifier} ({value} {unit or ''})",
+                "severity": severity,
+                "parameter": test_name,
+                "value": value,
+                "reference": reference_text(info),
+                "category": "Lab Result",
+                "status": "active",
+                "interpretation": None,
+                "recommendation": None,
+                "details": None,
+            })
+
+        if 'critical_high' in info and value >= info['critical_high']:
+            alert("lab_critical_high", "critical", "CRITICAMENTE ALTO")
+        elif 'high' in info and value > info['high']:
+            alert("lab_high", "high", "elevado")
+        if 'critical_low' in info and value <= info['critical_low']:
+            alert("lab_critical_low", "critical", "CRITICAMENTE BAIXO")
+        elif 'low' in info and value < info['low']:
+            alert("lab_low", "high", "baixo")
+    return sorted(alerts, key=lambda a: AlertSystem._severity_to_number(a['severity']), reverse=True)
+
+
+class TestThresholdRules(unittest.TestCase):
+    """Test cases for utils.alert_rules."""
+
+    def test_random_panels_match_rule_loop(self):
+        rng = np.random.default_rng(7)
+        names = list(AlertSystem.THRESHOLDS)
+        system = AlertSystem()
+        for _ in range(200):
+            panel = {}
+            for name in rng.choice(names, int(rng.integers(1, len(names))), replace=False):
+                info = AlertSystem.THRESHOLDS[name]
+                bounds = [v for k, v in info.items() if k != 'unit']
+                choice = rng.integers(0, 3)
+                if choice == 0:
+                    panel[name] = float(rng.choice(bounds))  # exactly on a bound
+                elif choice == 1:
+                    panel[name] = round(float(rng.uniform(0, max(bounds) * 1.5)), 2)
+                else:
+                    panel[name] = int(rng.integers(0, int(max(bounds) * 1.5) + 2))
+            self.assertEqual(system.generate_threshold_alerts(panel), reference_alerts(panel))
+
+    def test_non_numeric_and_unknown_values_are_skipped(self):
+        panel = {'Potássio': '6.5', 'Sódio': None, 'pH': True, 'Ferritina': 2000, 'Glicose': 45}
+        alerts = AlertSystem().generate_threshold_alerts(panel)
+        self.assertEqual([(a['parameter'], a['alert_type']) for a in alerts], [('Glicose', 'lab_critical_low')])
+        self.assertEqual(alerts[0]['message'], "Glicose CRITICAMENTE BAIXO (45 mg/dL)")
+        self.assertEqual(alerts[0]['reference'], "> 70 e < 180 mg/dL")
+
+    def test_batch_columns_group_by_patient(self):
+        results = [
+            SimpleNamespace(patient_id=1, test_name='Potássio', value_numeric=6.4),
+            SimpleNamespace(patient_id=2, test_name='Sódio', value_numeric=140),
+            SimpleNamespace(patient_id=2, test_name='Sódio', value_numeric=150),
+            SimpleNamespace(patient_id=1, test_name='Lactato', value_numeric=2.5),
+            SimpleNamespace(patient_id=3, test_name='Glicose', value_numeric=None),
+        ]
+        alerts = AlertSystem.threshold_rules().evaluate_results(results)
+        self.assertEqual(len(alerts), 3)
+        self.assertEqual(list(alerts.rows), [0, 2, 3])
+        self.assertEqual(list(alerts.severities), [5, 4, 4])
+        grouped = alerts.by_patient()
+        self.assertEqual([a['alert_type'] for a in grouped[1]], ['lab_critical_high', 'lab_high'])
+        self.assertEqual([a['value'] for a in grouped[2]], [150])
+        self.assertNotIn(3, grouped)
+
+    def test_canonical_names_resolve_to_rules(self):
+        table = ThresholdRuleTable(AlertSystem.THRESHOLDS)
+        self.assertEqual(table.names[table.rule_index('Potássio')], 'Potássio')
+        self.assertEqual(table.names[table.rule_index('K+')], 'Potássio')
+        self.assertEqual(table.rule_index('Ferritina'), -1)
+
+    def test_empty_input_and_length_mismatch(self):
+        table = AlertSystem.threshold_rules()
+        self.assertEqual(len(table.evaluate([], [])), 0)
+        self.assertEqual(table.evaluate([], []).to_dicts(), [])
+        with self.assertRaises(ValueError):
+            table.evaluate(['pH'], [7.0, 7.1])
+
+    def test_compiled_once_until_thresholds_change(self):
+        self.assertIs(AlertSystem.threshold_rules(), AlertSystem.threshold_rules())
+
+        class CustomAlertSystem(AlertSystem):
+            THRESHOLDS = {'Lactato': {'unit': 'mmol/L', 'high': 1.0}}
+
+        alerts = CustomAlertSystem().generate_threshold_alerts({'Lactato': 1.5})
+        self.assertEqual([a['alert_type'] for a in alerts], ['lab_high'])
+        self.assertEqual(len(AlertSystem().generate_threshold_alerts({'Lactato': 1.5})), 0)
+
+    def test_severity_codes_match_sort_ranks(self):
+        for severity in SEVERITY_CODES:
+            self.assertEqual(severity_code(severity), AlertSystem._severity_to_number(severity))
+        self.assertEqual(severity_code('CRITICAL'), 5)
+        self.assertEqual(severity_code(None), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Tests for the cohort score parameter queries.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the root directory to the Python path
+parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from database import models
+
+
+def test_score_cohort_constant_queries(sqlite_session):
+    """Cohort scoring loads any number of patients in three queries and matches the per-patient path."""
+    from sqlalchemy import event
+    from crud import crud_lab_result
+    from schemas.lab_result import LabResultCreate
+    from utils.cohort_scores import score_cohort
+    from utils.severity_scores import calcular_news, calcular_sofa, gather_score_parameters
+
+    user = models.User(email="cohort@example.com", name="Cohort Doctor", role="doctor")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    now = datetime.utcnow()
+    patient_ids = []
+    for i in range(5):
+        patient = models.Patient(user_id=user.user_id, name=f"Cohort {i}", gender="M", birthDate=datetime(1940 + 10 * i, 1, 1))
+        sqlite_session.add(patient)
+        sqlite_session.commit()
+        patient_ids.append(patient.patient_id)
+        for hours_ago, rr in ((5, 14), (1, 18 + 3 * i)):
+            sqlite_session.add(models.VitalSign(patient_id=patient.patient_id, timestamp=now - timedelta(hours=hours_ago),
+                                                heart_rate=80 + 15 * i, respiratory_rate=rr, systolic_bp=130 - 12 * i,
+                                                diastolic_bp=70, oxygen_saturation=97 - i, glasgow_coma_scale=15 - i,
+                                                temperature_c=37.0 + 0.5 * i))
+        sqlite_session.commit()
+        for test_name, value in (("Creatinina", 0.8 + 0.6 * i), ("Plaquetas", 250 - 50 * i), ("pO2", 95 - 10 * i)):
+            crud_lab_result.create_lab_result(
+                sqlite_session,
+                LabResultCreate(test_name=test_name, value_numeric=value, patient_id=patient.patient_id,
+                                timestamp=now - timedelta(hours=2)),
+                patient.patient_id, user.user_id,
+            )
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(sqlite_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        cohort = score_cohort(sqlite_session, patient_ids + [max(patient_ids) + 100])
+    finally:
+        event.remove(sqlite_session.get_bind(), "before_cursor_execute", listener)
+    assert len(statements) == 3, statements
+    assert list(cohort) == patient_ids
+
+    for patient_id in patient_ids:
+        params = gather_score_parameters(sqlite_session, patient_id, use_cache=False)
+        sofa, sofa_components, _ = calcular_sofa(params)
+        assert cohort[patient_id]["sofa"] == {"score": sofa, "components": sofa_components}
+        assert cohort[patient_id]["news2"]["score"] == calcular_news(params)[0]
+    assert cohort[patient_ids[-1]]["qsofa"]["components"] == {"glasgow": 1, "fr": 1, "pas": 1}
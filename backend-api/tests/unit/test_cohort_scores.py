@@ -0,0 +1,88 @@
+"""
+Tests for the column-wise cohort scores: they must agree with the scalar calculators.
+"""
+
+import unittest
+
+import numpy as np
+
+from utils.cohort_scores import PointTable, score_parameters_batch
+from utils.severity_scores import calcular_apache2, calcular_news, calcular_qsofa, calcular_sofa
+
+RANGES = {
+    'temp': (28.0, 43.0), 'fc': (20, 200), 'fr': (3, 55), 'pas': (50, 240), 'pad': (20, 130), 'spo2': (70, 100),
+    'pao2': (35, 500), 'pco2': (15, 90), 'ph': (6.9, 7.8), 'plaquetas': (5, 400), 'leuco': (0.5, 50),
+    'ht': (15, 65), 'bilirrubina': (0.2, 20), 'creatinina': (0.3, 7), 'na': (105, 185), 'k': (2, 8),
+    'idade': (18, 95), 'diurese': (0, 3000),
+}
+INTEGER_PARAMETERS = ('fc', 'fr', 'pas', 'pad', 'spo2', 'idade')
+
+
+def random_parameters(rng):
+    params = {}
+    for name, (low, high) in RANGES.items():
+        if rng.random() < 0.15:
+            continue  # missing
+        value = rng.uniform(low, high)
+        params[name] = int(round(value)) if name in INTEGER_PARAMETERS and rng.random() < 0.8 else round(value, 1)
+    if rng.random() < 0.85:
+        params['glasgow'] = int(rng.integers(3, 16))
+    params['fio2'] = float(rng.choice([0.21, 0.3, 0.5, 0.8, 1.0, 40.0]))
+    if 'pas' in params and 'pad' in params:
+        params['map'] = params['pad'] + (params['pas'] - params['pad']) / 3
+    params['doenca_cronica'] = bool(rng.random() < 0.3)
+    params['tipo_internacao'] = str(rng.choice(['clinica', 'cirurgica_urgencia', 'cirurgica_eletiva']))
+    params['insuficiencia_renal_aguda'] = bool(rng.random() < 0.2)
+    if rng.random() < 0.3:
+        params['aminas'] = True
+        for drug in ('adrenalina', 'noradrenalina', 'dopamina'):
+            params[drug] = float(rng.choice([0, 0, 0.05, 0.2, 3, 10, 20]))
+        params['dobutamina'] = bool(rng.random() < 0.5)
+    return params
+
+
+class TestCohortScores(unittest.TestCase):
+    """Test cases for utils.cohort_scores."""
+
+    def test_point_table_boundaries(self):
+        table = PointTable([3, 0, 1], [(8, False), (9, True)])
+        values = np.array([7.0, 8.0, 8.5, 9.0, 12.0, np.nan])
+        self.assertEqual(table(values).tolist(), [3, 3, 0, 1, 1, 0])
+        with self.assertRaises(ValueError):
+            PointTable([1, 2], [])
+
+    def test_matches_scalar_calculators(self):
+        rng = np.random.default_rng(2024)
+        params_list = [random_parameters(rng) for _ in range(600)]
+        # Boundary values of the scalar chains
+        params_list += [
+            {'fr': 8.5, 'temp': 35.05, 'pas': 100.5, 'fc': 130.5, 'spo2': 91.5, 'glasgow': 15, 'fio2': 0.21},
+            {'fr': 22, 'pas': 99.5, 'glasgow': 14, 'temp': 41.0, 'map': 70, 'fc': 40, 'ph': 7.15, 'k': 3.5},
+            {'pao2': 60, 'fio2': 0.5, 'pco2': 40, 'creatinina': 5.0, 'plaquetas': 150, 'bilirrubina': 1.2},
+            {},
+        ]
+        results = score_parameters_batch(params_list)
+
+        for params, result in zip(params_list, results):
+            sofa, sofa_components, _ = calcular_sofa(dict(params))
+            self.assertEqual(result['sofa']['score'], sofa, params)
+            self.assertEqual(result['sofa']['components'], sofa_components, params)
+
+            self.assertEqual(result['qsofa']['score'], calcular_qsofa(dict(params))[0], params)
+
+            news, news_components, _ = calcular_news(dict(params))
+            self.assertEqual(result['news2']['score'], news, params)
+            self.assertEqual(result['news2']['components'], news_components, params)
+
+            apache, apache_components, mortality, _ = calcular_apache2(dict(params))
+            apache_components.pop('fc')  # backwards-compatibility alias, not part of the total
+            self.assertEqual(result['apache2']['score'], apache, params)
+            self.assertEqual(result['apache2']['components'], apache_components, params)
+            self.assertAlmostEqual(result['apache2']['mortality'], mortality)
+
+    def test_empty_cohort(self):
+        self.assertEqual(score_parameters_batch([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Tests for alert writes: fingerprint deduplication and bulk inserts.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the root directory to the Python path
+parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from database import models
+
+
+def test_alerts_are_deduplicated_within_suppression_window(sqlite_session):
+    """Re-raised alerts update the open alert with the same fingerprint; batches are folded in one pass."""
+    from sqlalchemy import event
+    from crud import alerts as alerts_crud
+    from schemas.alert import AlertCreate
+
+    user = models.User(email="alert_dedupe@example.com", name="Alert Doctor", role="doctor")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    patient = models.Patient(user_id=user.user_id, name="Alert Patient", gender="M", birthDate=datetime(1960, 1, 1))
+    sqlite_session.add(patient)
+    sqlite_session.commit()
+
+    patient_id, user_id = patient.patient_id, user.user_id
+
+    def alert(value, severity="critical", parameter="Potássio", user_id=user_id):
+        return AlertCreate(patient_id=patient_id, user_id=user_id, alert_type="lab_critical_high",
+                           parameter=parameter, message=f"{parameter} CRITICAMENTE ALTO ({value} mEq/L)",
+                           severity=severity, value=value)
+
+    first = alerts_crud.create_alert(sqlite_session, alert(6.5), suppression_window_minutes=30)
+    again = alerts_crud.create_alert(sqlite_session, alert(6.8, severity="severe"), suppression_window_minutes=30)
+    assert again.alert_id == first.alert_id
+    assert (again.occurrence_count, again.value, again.severity) == (2, 6.8, "severe")
+    assert again.updated_at is not None
+
+    other_bucket = alerts_crud.create_alert(sqlite_session, alert(5.5, severity="high"), suppression_window_minutes=30)
+    other_user = alerts_crud.create_alert(sqlite_session, alert(6.5, user_id=None), suppression_window_minutes=30)
+    assert len({first.alert_id, other_bucket.alert_id, other_user.alert_id}) == 3
+
+    # Outside the window, or once resolved, the finding is a new alert
+    first.updated_at = datetime.now() - timedelta(minutes=45)
+    sqlite_session.commit()
+    late = alerts_crud.create_alert(sqlite_session, alert(6.9), suppression_window_minutes=30)
+    assert late.alert_id != first.alert_id
+    late.status = "resolved"
+    sqlite_session.commit()
+    assert alerts_crud.create_alert(sqlite_session, alert(7.0), suppression_window_minutes=30).alert_id != late.alert_id
+    newest = alerts_crud.create_alert(sqlite_session, alert(7.0), suppression_window_minutes=0)
+    assert newest.occurrence_count == 1
+
+    statements = []
+    bind = sqlite_session.get_bind()
+    listener = lambda conn, cursor, statement, params, context, executemany: statements.append(statement)
+    event.listen(bind, "before_cursor_execute", listener)
+    try:
+        batch = alerts_crud.upsert_alerts(
+            sqlite_session,
+            [alert(7.1), alert(7.2), alert(140, severity="warning", parameter="Sódio"),
+             alert(141, severity="warning", parameter="Sódio"), alert(5.6, severity="high")],
+            suppression_window_minutes=30,
+        )
+    finally:
+        event.remove(bind, "before_cursor_execute", listener)
+    assert len(statements) == 5  # open-alert lookup, executemany UPDATE, INSERT ... RETURNING, counters, reload
+    assert batch[0] is batch[1] and batch[2] is batch[3]
+    assert batch[2].occurrence_count == 2 and batch[2].value == 141
+    assert batch[4].alert_id == other_bucket.alert_id and batch[4].occurrence_count == 2
+    assert batch[0].alert_id == newest.alert_id and batch[0].occurrence_count == 3
+
+
+def test_create_alerts_bulk_single_insert(sqlite_session):
+    """A batch of alerts is written with one INSERT ... RETURNING and one commit, in input order."""
+    from sqlalchemy import event
+    from crud import alerts as alerts_crud
+    from schemas.alert import AlertCreate
+
+    user = models.User(email="alert_bulk@example.com", name="Bulk Doctor", role="doctor")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    patient = models.Patient(user_id=user.user_id, name="Bulk Patient", gender="F", birthDate=datetime(1970, 1, 1))
+    sqlite_session.add(patient)
+    sqlite_session.commit()
+    patient_id, user_id = patient.patient_id, user.user_id
+
+    batch = [
+        AlertCreate(patient_id=patient_id, user_id=user_id, alert_type="lab_high", parameter=f"Teste {i}",
+                    message=f"Teste {i} elevado", severity="high", value=float(i), details={"i": i})
+        for i in range(30)
+    ]
+    statements = []
+    bind = sqlite_session.get_bind()
+    listener = lambda conn, cursor, statement, params, context, executemany: statements.append(statement)
+    event.listen(bind, "before_cursor_execute", listener)
+    try:
+        created = alerts_crud.create_alerts_bulk(sqlite_session, batch)
+        assert [(a.parameter, a.value, a.details, a.is_read, a.occurrence_count) for a in created] == [
+            (f"Teste {i}", float(i), {"i": i}, False, 1) for i in range(30)
+        ]
+    finally:
+        event.remove(bind, "before_cursor_execute", listener)
+    assert len(statements) == 3  # INSERT ... RETURNING, counters upsert, reload after commit
+    assert all(a.fingerprint for a in created)
+    assert alerts_crud.create_alerts_bulk(sqlite_session, []) == []
+    assert sqlite_session.query(models.Alert).filter(models.Alert.patient_id == patient_id).count() == 30
@@ -0,0 +1,180 @@
+"""
+Tests for the lab result write path: unit normalization, incremental re-analysis and AKI staging.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add the root directory to the Python path
+parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from database import models
+
+
+def test_lab_result_value_is_normalized_on_write(sqlite_session):
+    """value_normalized/unit_normalized are filled on insert and kept in step on update."""
+    user = models.User(email="lab_units@example.com", name="Units Doctor", role="doctor")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    patient = models.Patient(user_id=user.user_id, name="Units Patient", gender="F", birthDate=datetime(1970, 1, 1))
+    sqlite_session.add(patient)
+    sqlite_session.commit()
+
+    result = models.LabResult(patient_id=patient.patient_id, user_id=user.user_id, test_name="Ureia",
+                              value_numeric=10.0, unit="mmol/L", timestamp=datetime.now())
+    sqlite_session.add(result)
+    sqlite_session.commit()
+    assert result.value_normalized == pytest.approx(60.06)
+    assert result.unit_normalized == "mg/dL"
+
+    result.value_numeric = 40.0
+    result.unit = "mg/dL"
+    sqlite_session.commit()
+    assert result.value_normalized == 40.0
+
+
+def test_lab_result_insert_reconciles_alerts_incrementally(sqlite_session):
+    """A single lab result insert re-runs dependent analyzers and opens/resolves alerts."""
+    from crud import crud_lab_result
+    from schemas.lab_result import LabResultCreate
+    from analyzers.incremental import incremental_analyzer
+
+    incremental_analyzer.clear()
+    user = models.User(email="lab_incremental@example.com", name="Lab Doctor", role="doctor")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    patient = models.Patient(user_id=user.user_id, name="Lab Patient", gender="F", birthDate=datetime(1980, 1, 1))
+    sqlite_session.add(patient)
+    sqlite_session.commit()
+
+    def insert(test_name, value, timestamp=None):
+        return crud_lab_result.create_lab_result(
+            sqlite_session,
+            LabResultCreate(test_name=test_name, value_numeric=value, patient_id=patient.patient_id,
+                            timestamp=timestamp or datetime.now()),
+            patient.patient_id,
+            user.user_id,
+        )
+
+    insert("Creatinina", 0.7)
+    insert("Potássio", 4.0)
+    assert sqlite_session.query(models.Alert).count() == 0
+
+    insert("Potássio", 6.9)
+    alerts = sqlite_session.query(models.Alert).filter(models.Alert.patient_id == patient.patient_id).all()
+    assert [(a.category, a.parameter, a.value, a.severity, a.details["finding"]) for a in alerts] == [
+        ("electrolytes", "K+", 6.9, "critical", "HYPERKALEMIA")]
+    assert alerts[0].status == "active" and alerts[0].alert_type == "lab_abnormality"
+    assert alerts[0].message.startswith("Hipercalemia (6.9 mmol/L)")
+
+    insert("Potássio", 7.0)  # same finding, new value: no new alert
+    assert sqlite_session.query(models.Alert).count() == 1
+
+    insert("Potássio", 4.0, timestamp=datetime.now() - timedelta(days=1))  # backdated: not the current value
+    sqlite_session.expire_all()
+    assert [a.status for a in sqlite_session.query(models.Alert).all()] == ["active"]
+
+    queued = []
+    original_queue = crud_lab_result.queue_alert_events
+    crud_lab_result.queue_alert_events = lambda db, event_type, alerts: queued.append(
+        (event_type, [(a.alert_id, a.status) for a in alerts]))
+    try:
+        insert("Potássio", 4.1)
+    finally:
+        crud_lab_result.queue_alert_events = original_queue
+    sqlite_session.expire_all()
+    assert all(a.status == "resolved" for a in sqlite_session.query(models.Alert).all())
+    assert queued == [("alert.updated", [(alerts[0].alert_id, "resolved")])]
+
+    # Portuguese names reach the renal analyzer under the keys it reads
+    insert("Ureia", 150)
+    insert("Creatinina", 4.5)
+    lab_alerts = sqlite_session.query(models.Alert).filter(models.Alert.alert_type == "lab_abnormality")
+    renal = lab_alerts.filter(models.Alert.category == "renal", models.Alert.status == "active").all()
+    assert {(a.parameter, a.details["finding"]) for a in renal} == {("Ur", "UREA_HIGH"), ("Creat", "CREAT_HIGH")}
+
+    insert("Creatinina", 0.7)
+    sqlite_session.expire_all()
+    renal = {a.parameter: a.status for a in lab_alerts.filter(models.Alert.category == "renal")}
+    assert renal == {"Ur": "active", "Creat": "resolved"}
+    incremental_analyzer.clear()
+
+
+def test_lab_result_finding_alert_joins_open_alert_with_same_fingerprint(sqlite_session):
+    """A finding alert raised by an insert is folded into an open alert with the same fingerprint."""
+    from crud import crud_lab_result
+    from crud.alerts import create_alert
+    from schemas.alert import AlertCreate
+    from schemas.lab_result import LabResultCreate
+    from analyzers.incremental import incremental_analyzer
+
+    incremental_analyzer.clear()
+    user = models.User(email="lab_fingerprint@example.com", name="Lab Doctor", role="doctor")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    patient = models.Patient(user_id=user.user_id, name="Lab Patient", gender="F", birthDate=datetime(1980, 1, 1))
+    sqlite_session.add(patient)
+    sqlite_session.commit()
+    manual = create_alert(sqlite_session, AlertCreate(
+        patient_id=patient.patient_id, user_id=user.user_id, created_by=user.user_id, alert_type="lab_abnormality",
+        message="Hipercalemia", severity="critical", category="electrolytes", parameter="K+", value=6.8,
+        status="active"))
+
+    crud_lab_result.create_lab_result(
+        sqlite_session,
+        LabResultCreate(test_name="Potássio", value_numeric=6.9, patient_id=patient.patient_id, timestamp=datetime.now()),
+        patient.patient_id,
+        user.user_id,
+    )
+    sqlite_session.expire_all()
+    alerts = sqlite_session.query(models.Alert).filter(models.Alert.patient_id == patient.patient_id).all()
+    assert [(a.alert_id, a.value, a.occurrence_count) for a in alerts] == [(manual.alert_id, 6.9, 2)]
+    incremental_analyzer.clear()
+
+
+def test_creatinine_insert_stages_aki_from_history(sqlite_session):
+    """A creatinine insert is KDIGO-staged against the 7-day history and a stage rise raises an alert."""
+    from crud import crud_lab_result
+    from schemas.lab_result import LabResultCreate
+    from analyzers.aki import aki_stager
+
+    aki_stager.clear()
+    user = models.User(email="lab_aki@example.com", name="Renal Doctor", role="doctor")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    patient = models.Patient(user_id=user.user_id, name="AKI Patient", gender="M", birthDate=datetime(1960, 1, 1))
+    sqlite_session.add(patient)
+    sqlite_session.commit()
+    now = datetime.now()
+
+    # History loaded straight into the table, as an import would
+    for days_ago, value in ((6, 1.0), (3, 1.1)):
+        sqlite_session.add(models.LabResult(patient_id=patient.patient_id, user_id=user.user_id, test_name="Creatinina",
+                                            value_numeric=value, unit="mg/dL", timestamp=now - timedelta(days=days_ago)))
+    sqlite_session.commit()
+
+    def insert(value, hours_ago, unit="mg/dL"):
+        return crud_lab_result.create_lab_result(
+            sqlite_session,
+            LabResultCreate(test_name="Creatinina", value_numeric=value, unit=unit, patient_id=patient.patient_id,
+                            timestamp=now - timedelta(hours=hours_ago)),
+            patient.patient_id,
+            user.user_id,
+        )
+
+    insert(1.2, 30)
+    assert aki_stager.current(patient.patient_id).stage == 0
+    insert(203.0, 0, unit="µmol/L")  # 2.3 mg/dL, 2.3x the 7-day baseline
+    assert aki_stager.current(patient.patient_id).stage == 2
+
+    alerts = sqlite_session.query(models.Alert).filter(models.Alert.alert_type == "aki").all()
+    assert len(alerts) == 1
+    assert alerts[0].severity == "critical"
+    assert alerts[0].details["kdigo_stage"] == 2
+    assert alerts[0].details["baseline"] == 1.0
+    aki_stager.clear()
@@ -0,0 +1,74 @@
+"""
+Tests for the vectorized CKD-EPI 2021 eGFR: element-wise agreement with the scalar functions.
+"""
+
+import math
+import unittest
+
+import numpy as np
+
+from utils.egfr import (
+    KDIGO_STAGE_CODES,
+    _round2,
+    calcular_tfg_ckd_epi_array,
+    classificar_tfg_kdigo_array,
+    kdigo_stage_labels,
+)
+from utils.severity_scores import KDIGO_TFG_STAGES, calcular_tfg_ckd_epi, classificar_tfg_kdigo
+
+
+def scalar_reference(creat, idade, sexo):
+    tfg = calcular_tfg_ckd_epi(creat, idade, sexo)
+    return (math.nan if tfg is None else tfg), classificar_tfg_kdigo(tfg)
+
+
+class TestEgfrArrays(unittest.TestCase):
+    """Test cases for utils.egfr."""
+
+    def assert_matches_scalar(self, creat, idade, sexo):
+        tfg = calcular_tfg_ckd_epi_array(creat, idade, sexo)
+        labels = kdigo_stage_labels(classificar_tfg_kdigo_array(tfg))
+        for i in range(len(creat)):
+            expected_tfg, expected_label = scalar_reference(creat[i], idade[i], sexo[i])
+            if math.isnan(expected_tfg):
+                self.assertTrue(math.isnan(tfg[i]), (creat[i], idade[i], sexo[i]))
+            else:
+                self.assertEqual(tfg[i], expected_tfg, (creat[i], idade[i], sexo[i]))
+            self.assertEqual(labels[i], expected_label, (creat[i], idade[i], sexo[i]))
+
+    def test_random_inputs_match_scalar(self):
+        rng = np.random.default_rng(20210923)
+        for _ in range(20):
+            n = int(rng.integers(1, 400))
+            creat = [round(float(v), int(rng.integers(1, 4))) for v in rng.uniform(0.05, 15.0, n)]
+            idade = [int(v) for v in rng.integers(1, 105, n)]
+            sexo = [str(s) for s in rng.choice(['M', 'F', 'm', 'f'], n)]
+            self.assert_matches_scalar(creat, idade, sexo)
+
+    def test_invalid_inputs_match_scalar(self):
+        creat = [None, 0.0, -1.0, 1.0, 1.0, 1.0, 1.0, 1.0]
+        idade = [50, 50, 50, None, 0, 50, 50, 50]
+        sexo = ['M', 'M', 'M', 'M', 'M', None, '', 'X']
+        self.assert_matches_scalar(creat, idade, sexo)
+
+    def test_stage_boundaries(self):
+        tfg = [90.0, 89.99, 60.0, 59.99, 45.0, 44.99, 30.0, 29.99, 15.0, 14.99, 0.5, None]
+        stages = classificar_tfg_kdigo_array(tfg)
+        self.assertEqual(list(kdigo_stage_labels(stages)), [classificar_tfg_kdigo(v) for v in tfg])
+        self.assertEqual([KDIGO_STAGE_CODES[s] for s in stages[:-1:2]], ['G1', 'G2', 'G3a', 'G3b', 'G4', 'G5'])
+        self.assertEqual(len(KDIGO_STAGE_CODES), len(KDIGO_TFG_STAGES))
+        self.assertEqual(stages[-1], -1)
+
+    def test_rounding_matches_python_round_on_halves(self):
+        values = np.array([59.995, 0.125, 2.675, 1.005, 14.985, 89.995, 44.995, 1e6 + 0.005])
+        self.assertEqual(list(_round2(values)), [round(float(v), 2) for v in values])
+
+    def test_broadcasts_single_patient_inputs(self):
+        tfg = calcular_tfg_ckd_epi_array(np.array([0.8, 1.6, 4.0]), 70, 'F')
+        self.assertEqual(list(tfg), [calcular_tfg_ckd_epi(c, 70, 'F') for c in (0.8, 1.6, 4.0)])
+        with self.assertRaises(ValueError):
+            calcular_tfg_ckd_epi_array([1.0, 2.0], [60, 70], ['M'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Tests for the latest lab values read by the severity scores.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add the root directory to the Python path
+parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from database import models
+
+
+def test_latest_lab_results_single_query(sqlite_session):
+    """One row per requested canonical test, newest numeric value within the window, on every query path."""
+    from unittest.mock import patch
+    from sqlalchemy import text
+    from utils import severity_scores
+
+    user = models.User(email="lab_latest@example.com", name="Scores Doctor", role="doctor")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    patient = models.Patient(user_id=user.user_id, name="Scores Patient", gender="M", birthDate=datetime(1955, 1, 1))
+    sqlite_session.add(patient)
+    sqlite_session.commit()
+    now = datetime.utcnow()
+    for test_name, value, unit, hours_ago in (
+        ("Creatinina", 1.1, "mg/dL", 30),
+        ("Cr", 176.8, "µmol/L", 2),          # newest creatinine, stored under another alias and unit
+        ("Sódio", 139.0, "mEq/L", 5),
+        ("SODIO", 150.0, "mEq/L", 24 * 10),   # outside the 7-day window
+        ("Plaquetas", 95.0, None, 3),         # stored as reported without a unit
+        ("Potássio", None, "mEq/L", 1),       # no numeric value
+    ):
+        sqlite_session.add(models.LabResult(patient_id=patient.patient_id, user_id=user.user_id, test_name=test_name,
+                                            value_numeric=value, value_text=None if value else "hemolisado",
+                                            unit=unit, timestamp=now - timedelta(hours=hours_ago)))
+    sqlite_session.commit()
+
+    names = ['creatinina', 'na', 'k', 'plaquetas', 'inexistente']
+    expected = {'creatinina': pytest.approx(2.0), 'na': 139.0, 'k': None, 'plaquetas': 95.0, 'inexistente': None}
+    assert severity_scores.get_latest_lab_results(sqlite_session, patient.patient_id, names) == expected
+    with patch.object(severity_scores, '_latest_values_query_mode', return_value='scan'):
+        assert severity_scores.get_latest_lab_results(sqlite_session, patient.patient_id, names) == expected
+
+    plan = sqlite_session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT value_normalized FROM lab_results "
+        "WHERE patient_id = 1 AND lower(test_name) IN ('creatinina', 'cr') AND timestamp >= '2000-01-01'"
+    )).all()
+    assert any("ix_lab_results_patient_test_time" in str(row) for row in plan)
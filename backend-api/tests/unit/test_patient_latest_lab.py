@@ -0,0 +1,78 @@
+"""
+Tests for the per-patient latest lab snapshot.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add the root directory to the Python path
+parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from database import models
+
+
+def test_patient_latest_lab_snapshot(sqlite_session):
+    """Lab writes keep patient_latest_lab current; the bulk rebuild derives the same rows; scores read it."""
+    from crud import crud_lab_result, crud_patient_latest_lab
+    from crud.lab_result import lab_result as lab_result_crud
+    from schemas.lab_result import LabResultCreate
+    from utils.severity_scores import gather_score_parameters
+
+    user = models.User(email="lab_snapshot@example.com", name="Snapshot Doctor", role="doctor")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    patient = models.Patient(user_id=user.user_id, name="Snapshot Patient", gender="F", birthDate=datetime(1950, 6, 1))
+    sqlite_session.add(patient)
+    sqlite_session.commit()
+    now = datetime.utcnow()
+
+    def insert(test_name, value, hours_ago, unit=None):
+        return crud_lab_result.create_lab_result(
+            sqlite_session,
+            LabResultCreate(test_name=test_name, value_numeric=value, unit=unit, patient_id=patient.patient_id,
+                            timestamp=now - timedelta(hours=hours_ago)),
+            patient.patient_id,
+            user.user_id,
+        )
+
+    insert("Creatinina", 1.0, 20, "mg/dL")
+    newest = insert("Cr", 1.8, 2, "mg/dL")
+    insert("creatinine", 0.9, 40, "mg/dL")     # late arrival: older than the snapshot, ignored
+    insert("Plaquetas", 80, 3)
+    insert("Exame Raro", 7.0, 1)
+
+    snapshot = crud_patient_latest_lab.get_latest_labs(sqlite_session, patient.patient_id)
+    assert set(snapshot) == {"Creat", "Plaq", "exame raro"}
+    assert snapshot["Creat"].value == 1.8 and snapshot["Creat"].result_id == newest.result_id
+    assert snapshot["Plaq"].value == 80.0  # stored as reported; scores read it as 10^3/µL
+
+    params = gather_score_parameters(sqlite_session, patient.patient_id)
+    assert params["creatinina"] == 1.8
+    assert params["plaquetas"] == pytest.approx(80.0)
+    assert params["sexo"] == "F" and params["idade"] >= 70
+
+    # A test without a snapshot row (written around the CRUD layer) is read from lab_results
+    sqlite_session.add(models.LabResult(patient_id=patient.patient_id, user_id=user.user_id, test_name="Sódio",
+                                        value_numeric=131.0, unit="mEq/L", timestamp=now - timedelta(hours=1)))
+    sqlite_session.commit()
+    assert gather_score_parameters(sqlite_session, patient.patient_id, use_cache=False)["na"] == 131.0
+    sqlite_session.query(models.LabResult).filter(models.LabResult.test_name == "Sódio").delete()
+    sqlite_session.commit()
+
+    # Deleting the newest result falls back to the previous one
+    assert lab_result_crud.remove(sqlite_session, result_id=newest.result_id)
+    assert crud_patient_latest_lab.get_latest_labs(sqlite_session, patient.patient_id, ["Creat"])["Creat"].value == 1.0
+
+    def rows():
+        return {(r.test_key, r.result_id, r.value) for r in sqlite_session.query(models.PatientLatestLab).all()}
+
+    maintained = rows()
+    assert crud_patient_latest_lab.rebuild_patient_latest_labs(sqlite_session) == 3
+    assert rows() == maintained
+    assert crud_patient_latest_lab.rebuild_patient_latest_labs(sqlite_session, [patient.patient_id + 1]) == 0
+    assert rows() == maintained
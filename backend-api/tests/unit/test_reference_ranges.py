@@ -3,7 +3,13 @@ Tests for the reference ranges utilities.
 """
 
 import unittest
-from utils.reference_ranges import REFERENCE_RANGES, is_abnormal, get_reference_range_text
+
+import numpy as np
+
+from utils.reference_ranges import (
+    REFERENCE_RANGES, ReferenceRangeIndex, get_reference_index, get_reference_range,
+    get_reference_range_text, is_abnormal, is_abnormal_many,
+)
 
 class TestReferenceRanges(unittest.TestCase):
     """Test cases for the reference ranges module."""
@@ -51,5 +57,59 @@ class TestReferenceRanges(unittest.TestCase):
         # Test with non-existent parameter
         self.assertEqual(get_reference_range_text('NonExistentParam'), "")
 
+
+class TestReferenceRangeIndex(unittest.TestCase):
+    """Test cases for the indexed reference-range store."""
+
+    def test_lookup_matches_flat_table(self):
+        """Indexed lookups reproduce the sex-suffix fallback of the flat table."""
+        for test in list(REFERENCE_RANGES) + ['HDL', 'Unknown']:
+            for sex in (None, 'M', 'f', 'Male', ''):
+                suffixed = f"{test}_{sex.upper()}" if sex else None
+                expected = REFERENCE_RANGES.get(suffixed) or REFERENCE_RANGES.get(test)
+                self.assertEqual(get_reference_range(test, sex), expected, (test, sex))
+
+    def test_aliases_and_age_bands(self):
+        """Aliases resolve to canonical ids and age bands override the general range."""
+        index = ReferenceRangeIndex(
+            {'Creat': (0.6, 1.2), 'Hb_M': (13.5, 17.5), 'Hb': (12.0, 16.0)},
+            age_ranges={('Creat', None, 'pediatric'): (0.2, 0.7)},
+        )
+        self.assertEqual(index.lookup('creatinina'), (0.6, 1.2))
+        self.assertEqual(index.lookup('Creat', age=8), (0.2, 0.7))
+        self.assertEqual(index.lookup('Creat', sex='M', age=8), (0.2, 0.7))
+        self.assertEqual(index.lookup('Creat', age=40), (0.6, 1.2))
+        self.assertEqual(index.lookup('Hb', sex='M', age=70), (13.5, 17.5))
+        self.assertTrue(index.is_abnormal('Creat', 0.9, age=8))
+        self.assertFalse(index.is_abnormal('Creat', 0.9, age=40))
+
+    def test_is_abnormal_many_matches_scalar(self):
+        """The vectorised check agrees with the scalar one row by row."""
+        rng = np.random.default_rng(11)
+        tests = ['Hb', 'Na+', 'K+', 'Creat', 'Ht', 'HDL', 'Unknown']
+        test_ids = rng.choice(tests, 500).tolist()
+        values = rng.normal(20, 40, 500)
+        sexes = rng.choice(['M', 'F', None], 500).tolist()
+        ages = rng.choice([None, 5, 40, 80], 500).tolist()
+
+        result = is_abnormal_many(test_ids, values, sexes, ages)
+        expected = [is_abnormal(t, float(v), s, a) for t, v, s, a in zip(test_ids, values, sexes, ages)]
+        self.assertEqual(result.tolist(), expected)
+        self.assertFalse(is_abnormal_many('Na+', [np.nan])[0])
+
+    def test_plausibility_bounds_from_validation_file(self):
+        """validation_ranges.json is loaded and flags impossible values."""
+        index = get_reference_index()
+        self.assertEqual(index.plausibility('Na+'), (100, 180))
+        self.assertEqual(index.plausibility('Sodium'), (100, 180))
+        checked = index.check_many(['K+', 'K+', 'Glicose', 'Ur'], [4.0, 12.0, 5000, 900])
+        self.assertEqual(checked['implausible'].tolist(), [False, True, True, False])
+        self.assertEqual(checked['flags'].tolist(), [0, 1, 1, 1])
+
+    def test_mismatched_lengths_raise(self):
+        with self.assertRaises(ValueError):
+            is_abnormal_many(['Na+', 'K+'], [140.0])
+
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
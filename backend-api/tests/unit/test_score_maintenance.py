@@ -0,0 +1,101 @@
+"""
+Tests for the ClinicalScore series maintenance queue.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the root directory to the Python path
+parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from database import models
+
+
+def test_score_maintenance_appends_changed_scores(sqlite_session):
+    """Vital/lab inserts queue the patient on commit; a flush appends only the scores that changed."""
+    from crud import crud_lab_result
+    from crud.crud_clinical_score import get_score_series, latest_score_values
+    from schemas.lab_result import LabResultCreate
+    from utils.score_maintenance import ScoreMaintenanceQueue, score_queue
+
+    while score_queue.drain():
+        pass
+    user = models.User(email="score_series@example.com", name="Series Doctor", role="doctor")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    patient = models.Patient(user_id=user.user_id, name="Series Patient", gender="F", birthDate=datetime(1960, 3, 1))
+    sqlite_session.add(patient)
+    sqlite_session.commit()
+    now = datetime.utcnow()
+
+    def add_vitals(hours_ago, respiratory_rate, glasgow):
+        sqlite_session.add(models.VitalSign(patient_id=patient.patient_id, timestamp=now - timedelta(hours=hours_ago),
+                                            heart_rate=95, respiratory_rate=respiratory_rate, systolic_bp=118,
+                                            diastolic_bp=70, oxygen_saturation=95, glasgow_coma_scale=glasgow,
+                                            temperature_c=37.5))
+
+    add_vitals(3, 18, 15)
+    sqlite_session.rollback()
+    assert len(score_queue) == 0  # rolled back inserts are not queued
+
+    add_vitals(3, 18, 15)
+    sqlite_session.commit()
+    crud_lab_result.create_lab_result(
+        sqlite_session,
+        LabResultCreate(test_name="Plaquetas", value_numeric=90, patient_id=patient.patient_id,
+                        timestamp=now - timedelta(hours=3)),
+        patient.patient_id, user.user_id,
+    )
+    assert len(score_queue) == 1
+    assert score_queue.flush(sqlite_session) == 3
+    assert latest_score_values(sqlite_session, [patient.patient_id], ["SOFA", "qSOFA", "NEWS"]) == {
+        (patient.patient_id, "SOFA"): 2.0, (patient.patient_id, "qSOFA"): 0.0, (patient.patient_id, "NEWS"): 2.0,
+    }
+
+    add_vitals(2, 18, 15)  # same values: nothing new
+    sqlite_session.commit()
+    assert score_queue.flush(sqlite_session) == 0
+
+    add_vitals(1, 24, 13)
+    sqlite_session.commit()
+    assert score_queue.flush(sqlite_session) == 3
+    series = get_score_series(sqlite_session, patient.patient_id, "NEWS")
+    assert [row.value for row in series] == [2.0, 7.0]
+    assert all(row.user_id == user.user_id for row in series)
+    assert [row.value for row in get_score_series(sqlite_session, patient.patient_id, "NEWS", limit=1)] == [7.0]
+
+    queue = ScoreMaintenanceQueue(debounce_seconds=60, batch_size=2)
+    queue.enqueue({1: None})
+    queue.enqueue({1: 7})
+    assert not queue.due()
+    queue.enqueue({2: None, 3: None})
+    assert queue.due()
+    assert queue.drain() == {1: 7, 2: None}
+    assert queue.drain() == {3: None}
+
+
+def test_score_maintenance_retries_failed_patients(sqlite_session):
+    """A failed batch is scored patient by patient; a patient that keeps failing is retried, then dropped."""
+    import utils.score_maintenance as score_maintenance
+
+    calls = []
+
+    def recompute(db, patients, timestamp=None):
+        calls.append(sorted(patients))
+        if 2 in patients:
+            raise RuntimeError("bad patient")
+        return [object()] * len(patients)
+
+    original = score_maintenance.recompute_scores
+    score_maintenance.recompute_scores = recompute
+    try:
+        queue = score_maintenance.ScoreMaintenanceQueue(debounce_seconds=60, batch_size=10, max_retries=2)
+        queue.enqueue({1: None, 2: None, 3: None})
+        assert queue.flush(sqlite_session) == 2
+    finally:
+        score_maintenance.recompute_scores = original
+    assert calls == [[1, 2, 3], [1], [2], [3], [2], [2]]
+    assert len(queue) == 0
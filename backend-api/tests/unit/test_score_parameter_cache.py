@@ -0,0 +1,70 @@
+"""
+Tests for the per-patient score parameter cache.
+"""
+
+import unittest
+
+from utils.score_parameter_cache import ScoreParameterCache
+
+try:
+    import fakeredis
+except ImportError:  # optional shared backend
+    fakeredis = None
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestScoreParameterCache(unittest.TestCase):
+    """Test cases for utils.score_parameter_cache."""
+
+    def test_lru_and_ttl(self):
+        clock = FakeClock()
+        cache = ScoreParameterCache(maxsize=2, ttl_seconds=10, enabled=True, clock=clock)
+        cache.set(1, {'fc': 80})
+        cache.set(2, {'fc': 90})
+        self.assertEqual(cache.get(1), {'fc': 80})
+        cache.set(3, {'fc': 100})  # evicts 2, the least recently used
+        self.assertIsNone(cache.get(2))
+        clock.now = 11
+        self.assertIsNone(cache.get(1))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 2, 1))
+
+    def test_load_racing_an_invalidation_is_not_stored(self):
+        cache = ScoreParameterCache(enabled=True)
+
+        def load():
+            cache.invalidate(1)  # a write committed while loading
+            return {'fr': 16}
+
+        self.assertEqual(cache.get_or_load(1, load), {'fr': 16})
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.get_or_load(1, lambda: {'fr': 18}), {'fr': 18})
+        self.assertEqual(cache.get(1), {'fr': 18})
+
+    def test_disabled(self):
+        cache = ScoreParameterCache(enabled=False)
+        cache.set(1, {'fc': 80})
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.stats()['hits'], 0)
+
+    @unittest.skipIf(fakeredis is None, "fakeredis not installed")
+    def test_shared_backend(self):
+        client = fakeredis.FakeStrictRedis()
+        writer = ScoreParameterCache(enabled=True, shared_client=client)
+        reader = ScoreParameterCache(enabled=True, shared_client=client)
+        writer.set(7, {'pas': 110, 'sexo': 'F'})
+        self.assertEqual(reader.get(7), {'pas': 110, 'sexo': 'F'})
+        reader.invalidate(7)
+        self.assertIsNone(writer.get(7))
+        self.assertEqual(writer.stats()['backend'], 'redis')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Tests for the score parameter cache on the database read and write paths.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add the root directory to the Python path
+parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from database import models
+
+
+def test_score_parameters_cached_until_write(sqlite_session):
+    """Repeated score parameter reads hit the cache; vital, lab and patient writes invalidate it."""
+    from datetime import date
+    from sqlalchemy import event
+    from crud import crud_lab_result, crud_vital_sign
+    from crud.patients import update_patient
+    from schemas.lab_result import LabResultCreate
+    from schemas.patient import PatientUpdate
+    from schemas.vital_sign import VitalSignCreate
+    from utils.score_parameter_cache import score_parameter_cache
+    from utils.severity_scores import gather_score_parameters
+
+    score_parameter_cache.clear()
+    score_parameter_cache.reset_stats()
+    user = models.User(email="param_cache@example.com", name="Cache Doctor", role="doctor")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    patient = models.Patient(user_id=user.user_id, name="Cache Patient", gender="M", birthDate=datetime(1970, 1, 1))
+    sqlite_session.add(patient)
+    sqlite_session.commit()
+    patient_id = patient.patient_id
+    now = datetime.utcnow()
+
+    crud_vital_sign.create_vital_sign(sqlite_session, VitalSignCreate(timestamp=now, heart_rate=88, respiratory_rate=16),
+                                      patient_id)
+    assert gather_score_parameters(sqlite_session, patient_id)["fr"] == 16
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(sqlite_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        params = gather_score_parameters(sqlite_session, patient_id)
+        params["fr"] = 99  # callers get private copies
+        assert gather_score_parameters(sqlite_session, patient_id)["fr"] == 16
+    finally:
+        event.remove(sqlite_session.get_bind(), "before_cursor_execute", listener)
+    assert statements == []
+
+    crud_vital_sign.create_vital_sign(sqlite_session, VitalSignCreate(timestamp=now + timedelta(minutes=5), heart_rate=90,
+                                                                      respiratory_rate=24), patient_id)
+    assert gather_score_parameters(sqlite_session, patient_id)["fr"] == 24
+
+    crud_lab_result.create_lab_result(
+        sqlite_session,
+        LabResultCreate(test_name="Creatinina", value_numeric=2.4, unit="mg/dL", patient_id=patient_id, timestamp=now),
+        patient_id, user.user_id,
+    )
+    assert gather_score_parameters(sqlite_session, patient_id)["creatinina"] == 2.4
+
+    update_patient(sqlite_session, patient_id, PatientUpdate(gender="F", birthDate=date(1940, 1, 1)))
+    params = gather_score_parameters(sqlite_session, patient_id)
+    assert params["sexo"] == "F" and params["idade"] >= 80
+
+    stats = score_parameter_cache.stats()
+    assert stats["backend"] == "local"
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (2, 4, 4)
+    assert stats["hit_rate"] == pytest.approx(2 / 6)
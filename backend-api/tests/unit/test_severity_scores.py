@@ -18,7 +18,7 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 # Import severity score functions
-from utils.severity_scores import calcular_sofa, calcular_qsofa, calcular_apache2, calcular_saps3
+from utils.severity_scores import calcular_sofa, calcular_qsofa, calcular_apache2, calcular_saps3, score_lab_value
 
 def test_sofa_all_normal_parameters():
     """Test SOFA calculation with all normal parameters."""
@@ -463,4 +463,15 @@ def test_saps3_comorbidities():
     score_cirrhosis, _, _ = calcular_saps3(params_cirrhosis)
 
     # SAPS3 is not fully implemented, so all scores will be 0
-    assert score_cirrhosis == score_no_comorbid  # Both are 0 since not implemented
\ No newline at end of file
+    assert score_cirrhosis == score_no_comorbid  # Both are 0 since not implemented
+
+def test_score_lab_value_cell_count_units():
+    """Stored /mm³ counts are scaled to 10^3/µL; counts stored as typed in thousands are kept."""
+    assert score_lab_value('plaquetas', 150000.0) == 150.0
+    assert score_lab_value('plaquetas', 1500.0) == 1.5
+    assert score_lab_value('plaquetas', 95.0) == 95.0
+    assert score_lab_value('leuco', 12000.0) == 12.0
+    assert score_lab_value('leuco', 150.0) == 0.15
+    assert score_lab_value('leuco', 12.0) == 12.0
+    assert score_lab_value('creatinina', 1.2) == 1.2
+    assert score_lab_value('leuco', None) is None
@@ -0,0 +1,68 @@
+"""
+Tests for the lab unit normalization registry.
+"""
+
+import unittest
+from types import SimpleNamespace
+
+from utils.unit_conversion import UnitConversionRegistry, unit_key, unit_registry
+
+
+class TestUnitConversion(unittest.TestCase):
+    """Test cases for utils.unit_conversion."""
+
+    def test_unit_key_ignores_spelling(self):
+        self.assertEqual(unit_key('µmol/L'), unit_key('umol/l'))
+        self.assertEqual(unit_key('μmol / L'), unit_key('mcmol/L'))
+        self.assertEqual(unit_key('x10^3/µL'), unit_key('x10³/uL'))
+        self.assertEqual(unit_key(None), '')
+
+    def test_converts_to_canonical_units(self):
+        value, unit = unit_registry.normalize('Creatinina', 88.4, 'µmol/L')
+        self.assertAlmostEqual(value, 1.0)
+        self.assertEqual(unit, 'mg/dL')
+        value, unit = unit_registry.normalize('calcio ionico', 4.8, 'mg/dL')
+        self.assertAlmostEqual(value, 1.1976, places=3)
+        self.assertEqual(unit, 'mmol/L')
+        value, _ = unit_registry.normalize('Glicose', 5.5, 'mmol/l')
+        self.assertAlmostEqual(value, 99.09, places=1)
+        value, _ = unit_registry.normalize('Plaquetas', 150, 'x10^3/µL')
+        self.assertEqual(value, 150000)
+        for unit in ('10^3/uL', '10³/µL', '10^9/L'):
+            self.assertEqual(unit_registry.normalize('Leucócitos', 12.5, unit), (12500.0, '/mm³'))
+            self.assertEqual(unit_registry.normalize('Plaquetas', 150, unit), (150000.0, '/mm³'))
+
+    def test_canonical_or_missing_unit_is_unchanged(self):
+        self.assertEqual(unit_registry.normalize('Creatinina', 1.1, 'mg/dl'), (1.1, 'mg/dL'))
+        self.assertEqual(unit_registry.normalize('Creatinina', 1.1, None), (1.1, 'mg/dL'))
+
+    def test_unitless_counts_are_stored_as_reported(self):
+        self.assertEqual(unit_registry.normalize('Leucócitos', 150, None), (150, '/mm³'))
+        self.assertEqual(unit_registry.normalize('Plaquetas', 1500, ''), (1500, '/mm³'))
+
+    def test_pcr_is_kept_in_mg_dl(self):
+        self.assertEqual(unit_registry.normalize('PCR', 3.0, 'mg/dL'), (3.0, 'mg/dL'))
+        self.assertEqual(unit_registry.normalize('PCR', 3.0, None), (3.0, 'mg/dL'))
+        value, unit = unit_registry.normalize('PCR', 30.0, 'mg/L')
+        self.assertAlmostEqual(value, 3.0)
+        self.assertEqual(unit, 'mg/dL')
+
+    def test_unknown_unit_or_test_keeps_reported_value(self):
+        with self.assertLogs('utils.unit_conversion', level='WARNING'):
+            self.assertEqual(unit_registry.normalize('Creatinina', 1.1, 'furlongs'), (1.1, 'furlongs'))
+        self.assertEqual(unit_registry.normalize('Teste Desconhecido', 3.0, 'U/L'), (3.0, 'U/L'))
+        self.assertEqual(unit_registry.normalize('Creatinina', None, 'mg/dL'), (None, 'mg/dL'))
+
+    def test_apply_and_register(self):
+        registry = UnitConversionRegistry({})
+        registry.register('Creat', 'mg/dL', {'µmol/L': 1 / 88.4})
+        self.assertEqual(registry.canonical_unit('creatinina'), 'mg/dL')
+        self.assertIsNone(registry.factor('Ureia', 'mmol/L'))
+        result = SimpleNamespace(test_name='Creatinina', value_numeric=176.8, unit='umol/L')
+        registry.apply(result)
+        self.assertAlmostEqual(result.value_normalized, 2.0)
+        self.assertEqual(result.unit_normalized, 'mg/dL')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Tests for the ward eGFR and per-patient eGFR history queries.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add the root directory to the Python path
+parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from database import models
+
+
+def test_ward_egfr_and_history(sqlite_session):
+    """Ward eGFR comes from the latest-lab snapshot; histories stage every creatinine with the age at collection."""
+    from crud import crud_lab_result
+    from schemas.lab_result import LabResultCreate
+    from utils.egfr import egfr_history, ward_egfr
+    from utils.severity_scores import calcular_tfg_ckd_epi
+
+    user = models.User(email="egfr@example.com", name="Renal Doctor", role="doctor")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    now = datetime.utcnow()
+    patients = []
+    for gender, birth in (("M", datetime(1950, 1, 1)), ("F", datetime(1985, 1, 1)), ("F", None)):
+        patient = models.Patient(user_id=user.user_id, name="Renal Patient", gender=gender, birthDate=birth)
+        sqlite_session.add(patient)
+        sqlite_session.commit()
+        patients.append(patient)
+
+    def insert(patient, value, unit, days_ago):
+        crud_lab_result.create_lab_result(
+            sqlite_session,
+            LabResultCreate(test_name="Creatinina", value_numeric=value, unit=unit, patient_id=patient.patient_id,
+                            timestamp=now - timedelta(days=days_ago)),
+            patient.patient_id, user.user_id,
+        )
+
+    insert(patients[0], 1.1, "mg/dL", 400)
+    insert(patients[0], 265.2, "µmol/L", 1)   # 3.0 mg/dL
+    insert(patients[1], 0.7, "mg/dL", 2)
+    insert(patients[2], 1.0, "mg/dL", 2)
+
+    def age_on(day):
+        return day.year - 1950 - ((day.month, day.day) < (1, 1))
+
+    ward = ward_egfr(sqlite_session, [p.patient_id for p in patients] + [9999])
+    assert set(ward) == {p.patient_id for p in patients}
+    first = ward[patients[0].patient_id]
+    assert first["creatinina"] == pytest.approx(3.0)
+    assert first["tfg"] == calcular_tfg_ckd_epi(first["creatinina"], age_on(now), "M")
+    assert first["estagio"] == "G4"
+    assert ward[patients[1].patient_id]["estagio"] == "G1"
+    assert ward[patients[2].patient_id]["tfg"] is None  # no birth date
+    assert ward[patients[2].patient_id]["classificacao"].startswith("Inválido")
+
+    history = egfr_history(sqlite_session, patients[0].patient_id)
+    collected = [now - timedelta(days=400), now - timedelta(days=1)]
+    assert list(history["creatinina"]) == [1.1, pytest.approx(3.0)]
+    assert list(history["idade"]) == [age_on(day) for day in collected]
+    assert list(history["tfg"]) == [calcular_tfg_ckd_epi(c, age_on(day), "M")
+                                    for c, day in zip(history["creatinina"], collected)]
+    assert len(egfr_history(sqlite_session, patients[0].patient_id, since=now - timedelta(days=30))["tfg"]) == 1
@@ -0,0 +1,382 @@
+"""
+Alert event bus: pushes new and updated alerts to the users who can see them.
+
+Clients used to poll ``get_alerts`` / ``get_alerts_by_user_and_status``
+(a count plus an ordered page with the doctor-patient join) to notice new
+alerts. The alert write paths in ``crud.alerts`` now queue an event per
+written alert on the session; once the transaction commits the events are
+published to ``alert_event_bus``, which fans them out to the per-user
+subscriptions behind the SSE/WebSocket streams (``sse_stream`` /
+``websocket_stream``).
+
+Recipients of an alert event are its ``user_id``, the doctors assigned to the
+patient and the patient's own user, i.e. everyone whose ``get_alerts`` would
+list it.
+
+Every subscription has a bounded queue. A subscriber that falls behind loses
+its oldest events instead of slowing publishers down, and is sent one
+``alerts.resync`` event telling the client to reload its list once.
+
+By default the bus is in-process (asyncio fan-out). Setting
+``ALERT_EVENTS_REDIS_URL`` publishes through Redis pub/sub instead (requires
+the ``redis`` package), so a write handled by one worker reaches streams held
+by the others.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+ALERT_EVENTS_ENABLED = os.getenv("ALERT_EVENTS_ENABLED", "true").lower() not in ("0", "false", "no")
+ALERT_EVENTS_QUEUE_SIZE = int(os.getenv("ALERT_EVENTS_QUEUE_SIZE", "100"))
+ALERT_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("ALERT_EVENTS_HEARTBEAT_SECONDS", "15"))
+ALERT_EVENTS_REDIS_URL = os.getenv("ALERT_EVENTS_REDIS_URL", "")
+
+ALERT_CREATED = "alert.created"
+ALERT_UPDATED = "alert.updated"
+ALERT_DELETED = "alert.deleted"
+ALERTS_RESYNC = "alerts.resync"
+
+_REDIS_CHANNEL = "alert_events"
+_SESSION_PENDING_KEY = "alert_events_pending"
+
+# Alert columns sent in event payloads
+_PAYLOAD_FIELDS = (
+    "alert_id", "patient_id", "user_id", "alert_type", "message", "severity", "parameter", "category",
+    "value", "reference", "status", "is_read", "occurrence_count", "created_at", "updated_at",
+)
+
+
+class AlertSubscription:
+    """
+    One stream's view of the bus: a bounded queue of events for a user.
+
+    Iterate it (``async for event in subscription``) inside the event loop
+    that created it; ``close()`` (or leaving ``async with``) unsubscribes.
+    """
+
+    __slots__ = ('bus', 'user_id', 'loop', 'queue', 'dropped', '_lagged', 'closed')
+
+    def __init__(self, bus: "AlertEventBus", user_id: int, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.bus = bus
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max(1, maxsize))
+        self.dropped = 0
+        self._lagged = False
+        self.closed = False
+
+    def _offer(self, event: Dict[str, Any]) -> None:
+        """Enqueue an event (loop thread only), dropping the oldest one when full."""
+        if self.closed:
+            return
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            self._lagged = True
+            self.bus._count('dropped')
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next event; None if ``timeout`` elapses first."""
+        if self._lagged:
+            self._lagged = False
+            return {"type": ALERTS_RESYNC, "dropped": self.dropped}
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.bus.unsubscribe(self)
+
+    def __aiter__(self) -> "AlertSubscription":
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        if self.closed:
+            raise StopAsyncIteration
+        return await self.get()
+
+    async def __aenter__(self) -> "AlertSubscription":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class _RedisBackend:
+    """Redis pub/sub transport; a listener thread dispatches every worker's events locally."""
+
+    __slots__ = ('client', 'channel', '_pubsub', '_thread', '_stop')
+
+    def __init__(self, client: Any, channel: str = _REDIS_CHANNEL):
+        self.client = client
+        self.channel = channel
+        self._pubsub = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        self.client.publish(self.channel, json.dumps(event, default=str))
+
+    def start(self, dispatch: Callable[[Dict[str, Any]], None]) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(self.channel)
+
+        def listen() -> None:
+            while not self._stop.is_set():
+                try:
+                    message = self._pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        dispatch(json.loads(message["data"]))
+                except Exception as e:
+                    logger.warning(f"Alert event listener error: {e}")
+                    self._stop.wait(1.0)
+
+        self._thread = threading.Thread(target=listen, name="alert-events", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._pubsub is not None:
+            try:
+                self._pubsub.close()
+            except Exception:
+                pass
+            self._pubsub = None
+
+
+class AlertEventBus:
+    """
+    Thread-safe publish / asyncio subscribe fan-out of alert events.
+
+    Args:
+        queue_size: Events buffered per subscription before the oldest are dropped.
+        enabled: When False nothing is published.
+        shared_client: Redis client (or compatible, e.g. fakeredis) to publish
+            through instead of dispatching in-process.
+    """
+
+    def __init__(self, queue_size: int = ALERT_EVENTS_QUEUE_SIZE, enabled: bool = ALERT_EVENTS_ENABLED,
+                 shared_client: Any = None):
+        self.queue_size = queue_size
+        self.enabled = enabled
+        self._backend = _RedisBackend(shared_client) if shared_client is not None else None
+        self._subscribers: Dict[int, Set[AlertSubscription]] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+
+    @property
+    def shared(self) -> bool:
+        return self._backend is not None
+
+    def _count(self, counter: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def start(self) -> None:
+        """Start receiving events from Redis (no-op for the in-process bus)."""
+        if self._backend is not None:
+            self._backend.start(self._dispatch)
+
+    def stop(self) -> None:
+        if self._backend is not None:
+            self._backend.stop()
+
+    def subscribe(self, user_id: int) -> AlertSubscription:
+        """Subscribe to the events of a user; call from the event loop that will consume them."""
+        subscription = AlertSubscription(self, user_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: AlertSubscription) -> None:
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+
+    def wants_events(self) -> bool:
+        """Whether publishing can reach anyone (Redis, or local subscribers)."""
+        if not self.enabled:
+            return False
+        if self.shared:
+            return True
+        with self._lock:
+            return bool(self._subscribers)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """
+        Publish an event ({'type', 'recipients', ...}) from any thread. Never
+        blocks on subscribers and never raises.
+        """
+        if not self.enabled:
+            return
+        self._count('published')
+        if self._backend is None:
+            self._dispatch(event)
+            return
+        try:
+            self._backend.publish(event)
+        except Exception as e:
+            self._count('errors')
+            logger.warning(f"Alert event publish failed: {e}")
+
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        payload = {key: value for key, value in event.items() if key != "recipients"}
+        with self._lock:
+            targets = [
+                subscription
+                for user_id in event.get("recipients") or ()
+                for subscription in self._subscribers.get(user_id, ())
+            ]
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, payload)
+                self._count('delivered')
+            except RuntimeError:  # the subscriber's loop is closed
+                subscription.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the bus counters."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "backend": "redis" if self.shared else "local",
+                "users": len(self._subscribers),
+                "subscriptions": sum(len(s) for s in self._subscribers.values()),
+                "published": self.published,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "errors": self.errors,
+            }
+
+
+def _shared_client() -> Any:
+    if not ALERT_EVENTS_REDIS_URL:
+        return None
+    try:
+        import redis
+    except ImportError:
+        logger.warning("ALERT_EVENTS_REDIS_URL is set but redis is not installed; using the in-process bus")
+        return None
+    return redis.Redis.from_url(ALERT_EVENTS_REDIS_URL)
+
+
+# Process-wide bus fed by crud.alerts
+alert_event_bus = AlertEventBus(shared_client=_shared_client())
+
+
+def alert_payload(alert: Any) -> Dict[str, Any]:
+    """JSON-ready fields of an Alert row."""
+    payload = {}
+    for name in _PAYLOAD_FIELDS:
+        value = getattr(alert, name, None)
+        payload[name] = value.isoformat() if hasattr(value, "isoformat") else value
+    return payload
+
+
+def alert_recipients(db: Session, patient_ids: Iterable[int]) -> Dict[int, Set[int]]:
+    """{patient_id: user ids that see the patient's alerts} (assigned doctors and the patient's user)."""
+    from database.models import Patient, doctor_patient_association
+
+    patient_ids = list({patient_id for patient_id in patient_ids if patient_id is not None})
+    recipients: Dict[int, Set[int]] = {patient_id: set() for patient_id in patient_ids}
+    if not patient_ids:
+        return recipients
+    assignments = db.query(
+        doctor_patient_association.c.patient_patient_id, doctor_patient_association.c.doctor_user_id
+    ).filter(doctor_patient_association.c.patient_patient_id.in_(patient_ids))
+    owners = db.query(Patient.patient_id, Patient.user_id).filter(Patient.patient_id.in_(patient_ids))
+    for patient_id, user_id in list(assignments) + list(owners):
+        if user_id is not None:
+            recipients[patient_id].add(user_id)
+    return recipients
+
+
+def queue_alert_events(db: Session, event_type: str, alerts: Iterable[Any]) -> None:
+    """
+    Queue one event per alert on the session; they are published when the
+    transaction commits and dropped if it rolls back. Alerts must be flushed
+    (``alert_id`` assigned). Skipped entirely when nobody can receive them.
+    """
+    if not alert_event_bus.wants_events():
+        return
+    alerts = list({id(alert): alert for alert in alerts}.values())
+    if not alerts:
+        return
+    recipients = alert_recipients(db, (alert.patient_id for alert in alerts))
+    pending: List[Dict[str, Any]] = db.info.setdefault(_SESSION_PENDING_KEY, [])
+    for alert in alerts:
+        users = set(recipients.get(alert.patient_id, ()))
+        if alert.user_id is not None:
+            users.add(alert.user_id)
+        if users:
+            pending.append({"type": event_type, "recipients": sorted(users), "alert": alert_payload(alert)})
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session) -> None:
+    for alert_event in session.info.pop(_SESSION_PENDING_KEY, None) or ():
+        alert_event_bus.publish(alert_event)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    session.info.pop(_SESSION_PENDING_KEY, None)
+
+
+def format_sse(alert_event: Dict[str, Any]) -> str:
+    """One Server-Sent Events frame."""
+    return f"event: {alert_event['type']}\ndata: {json.dumps(alert_event, default=str)}\n\n"
+
+
+async def sse_stream(user_id: int, bus: Optional[AlertEventBus] = None,
+                     heartbeat_seconds: float = ALERT_EVENTS_HEARTBEAT_SECONDS) -> AsyncIterator[str]:
+    """
+    Server-Sent Events body for a user's alert stream, with keep-alive
+    comments while idle. Serve with
+    ``StreamingResponse(sse_stream(user_id), media_type="text/event-stream")``.
+    """
+    async with (bus or alert_event_bus).subscribe(user_id) as subscription:
+        yield ": connected\n\n"
+        while True:
+            alert_event = await subscription.get(timeout=heartbeat_seconds)
+            yield ": keep-alive\n\n" if alert_event is None else format_sse(alert_event)
+
+
+async def websocket_stream(websocket: Any, user_id: int, bus: Optional[AlertEventBus] = None,
+                           heartbeat_seconds: float = ALERT_EVENTS_HEARTBEAT_SECONDS) -> None:
+    """
+    Send a user's alert events over an accepted WebSocket (``send_json``)
+    until the client disconnects; idle periods send a ping event.
+    """
+    async with (bus or alert_event_bus).subscribe(user_id) as subscription:
+        while True:
+            alert_event = await subscription.get(timeout=heartbeat_seconds)
+            try:
+                await websocket.send_json(alert_event if alert_event is not None else {"type": "ping"})
+            except Exception:
+                return
@@ -0,0 +1,60 @@
+"""
+Alert fingerprints.
+
+Two alerts with the same fingerprint report the same finding: same patient,
+same recipient, same parameter, same alert type and the same severity bucket
+(e.g. 'severe' and 'critical' are one bucket). ``crud.alerts`` uses the
+fingerprint to fold re-raised alerts into the open one instead of inserting
+duplicates; ``database.models`` fills it on every ORM insert.
+"""
+
+import hashlib
+from typing import Any, Optional
+
+SEVERITY_BUCKETS = {
+    'critical': 'critical',
+    'severe': 'critical',
+    'high': 'high',
+    'moderate': 'high',
+    'medium': 'high',
+    'warning': 'warning',
+    'mild': 'warning',
+    'low': 'warning',
+    'info': 'info',
+    'normal': 'info',
+}
+
+
+def severity_bucket(severity: Optional[str]) -> str:
+    """Bucket of a severity string (unknown severities are their own bucket)."""
+    severity = (severity or '').strip().lower()
+    return SEVERITY_BUCKETS.get(severity, severity)
+
+
+def alert_fingerprint(patient_id: Optional[int], parameter: Optional[str], alert_type: Optional[str],
+                      severity: Optional[str], user_id: Optional[int] = None,
+                      category: Optional[str] = None, message: Optional[str] = None) -> str:
+    """
+    Fingerprint (40 hex characters) of an alert.
+
+    Alerts without a parameter (analyzer findings) are told apart by their
+    category and message instead.
+    """
+    subject = (parameter or '').strip().lower() or f"{category or ''}:{message or ''}"
+    key = "\x1f".join((
+        '' if patient_id is None else str(patient_id),
+        '' if user_id is None else str(user_id),
+        subject,
+        alert_type or '',
+        severity_bucket(severity),
+    ))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def fingerprint_of(alert: Any) -> str:
+    """Fingerprint of an Alert row, AlertCreate or alert values dict."""
+    get = alert.get if isinstance(alert, dict) else (lambda name: getattr(alert, name, None))
+    return alert_fingerprint(
+        get('patient_id'), get('parameter'), get('alert_type'), get('severity'),
+        user_id=get('user_id'), category=get('category'), message=get('message'),
+    )
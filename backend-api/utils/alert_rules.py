@@ -0,0 +1,223 @@
+"""
+Compiled threshold rules for ``AlertSystem``.
+
+``AlertSystem.THRESHOLDS`` is the clinician-facing rule source. ``ThresholdRuleTable``
+compiles it once into per-test numeric arrays (critical high, high, low,
+critical low; +/-inf where a bound is not defined) so a whole lab import is
+evaluated in one vectorized pass over ``(patient, test, value)`` columns.
+
+Evaluation yields ``ThresholdAlerts``: integer arrays (row, test, rule kind,
+severity code). Message, reference and alert dicts are only built for the
+alerts actually emitted, when they are read. The rule semantics are those of
+the original per-test loop:
+
+- high side: ``value >= critical_high`` -> critical, else ``value > high`` -> high;
+- low side: ``value <= critical_low`` -> critical, else ``value < low`` -> high
+  (low values are reported with 'high' severity);
+- alerts are ordered by severity, most severe first, stable otherwise.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from analyzers.panel import canonical_test_id
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_CODES = {
+    'critical': 5,
+    'severe': 4,
+    'high': 4,
+    'moderate': 3,
+    'warning': 2,
+    'info': 1,
+    'normal': 0,
+    '': 0,
+}
+
+# Rule kinds, in emission order within a test: high side, then low side
+KIND_CRITICAL_HIGH, KIND_HIGH, KIND_CRITICAL_LOW, KIND_LOW = range(4)
+_KINDS = (
+    # (alert_type, severity, message qualifier)
+    ('lab_critical_high', 'critical', 'CRITICAMENTE ALTO'),
+    ('lab_high', 'high', 'elevado'),
+    ('lab_critical_low', 'critical', 'CRITICAMENTE BAIXO'),
+    ('lab_low', 'high', 'baixo'),
+)
+_KIND_SEVERITY_CODES = np.array([SEVERITY_CODES[severity] for _, severity, _ in _KINDS], dtype=np.int8)
+
+
+def severity_code(severity: Optional[str]) -> int:
+    """Integer rank of a severity string (case-insensitive; unknown -> 0)."""
+    return SEVERITY_CODES.get((severity or '').lower(), 0)
+
+
+def reference_text(threshold_info: Mapping[str, Any]) -> str:
+    """Reference range text of one rule, e.g. '> 3.5 e < 5.1 mEq/L'."""
+    parts = []
+    if 'low' in threshold_info:
+        parts.append(f"> {threshold_info['low']}")
+    if 'high' in threshold_info:
+        parts.append(f"< {threshold_info['high']}")
+    ref = " e ".join(parts)
+    if threshold_info.get('unit'):
+        ref += f" {threshold_info['unit']}"
+    return ref if ref else "N/A"
+
+
+def _is_number(value: Any) -> bool:
+    return (isinstance(value, (int, float)) and not isinstance(value, bool)) or isinstance(value, np.number)
+
+
+class ThresholdAlerts:
+    """
+    Alerts emitted by one evaluation, most severe first.
+
+    Attributes:
+        rows: Input row of each alert.
+        tests: Rule (test) index of each alert in the table.
+        kinds: Rule kind of each alert (``KIND_*``).
+        severities: Integer severity code of each alert (see ``SEVERITY_CODES``).
+    """
+
+    __slots__ = ('table', 'rows', 'tests', 'kinds', 'severities', '_patients', '_names', '_values')
+
+    def __init__(self, table: "ThresholdRuleTable", rows: np.ndarray, tests: np.ndarray, kinds: np.ndarray,
+                 patients: Optional[Sequence[Any]], names: Sequence[Any], values: Sequence[Any]):
+        order = np.argsort(-_KIND_SEVERITY_CODES[kinds], kind='stable')
+        self.table = table
+        self.rows = rows[order]
+        self.tests = tests[order]
+        self.kinds = kinds[order]
+        self.severities = _KIND_SEVERITY_CODES[self.kinds]
+        self._patients = patients
+        self._names = names
+        self._values = values
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def alert(self, i: int) -> Dict[str, Any]:
+        """Alert dict (``AlertCreate`` fields) of the i-th emitted alert."""
+        row, test, kind = int(self.rows[i]), int(self.tests[i]), int(self.kinds[i])
+        alert_type, severity, qualifier = _KINDS[kind]
+        parameter = self._names[row]
+        value = self._values[row]
+        unit = self.table.units[test]
+        return {
+            "alert_type": alert_type,
+            "message": f"{parameter} {qualifier} ({value} {unit or ''})",
+            "severity": severity,
+            "parameter": parameter,
+            "value": value,
+            "reference": self.table.references[test],
+            "category": "Lab Result",
+            "status": "active",
+            "interpretation": None,
+            "recommendation": None,
+            "details": None,
+        }
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Every emitted alert as a dict."""
+        return [self.alert(i) for i in range(len(self))]
+
+    def by_patient(self) -> Dict[Any, List[Dict[str, Any]]]:
+        """Emitted alert dicts grouped by the patient column (most severe first per patient)."""
+        if self._patients is None:
+            raise ValueError("Evaluated without a patient column")
+        grouped: Dict[Any, List[Dict[str, Any]]] = {}
+        for i in range(len(self)):
+            grouped.setdefault(self._patients[int(self.rows[i])], []).append(self.alert(i))
+        return grouped
+
+
+class ThresholdRuleTable:
+    """
+    ``THRESHOLDS``-style rules compiled into numeric arrays.
+
+    Args:
+        thresholds: {test name: {'unit', 'critical_high', 'high', 'low', 'critical_low'}}.
+    """
+
+    __slots__ = ('names', 'units', 'references', 'bounds', '_index')
+
+    def __init__(self, thresholds: Mapping[str, Mapping[str, Any]]):
+        self.names = tuple(thresholds)
+        self.units = tuple(info.get('unit') for info in thresholds.values())
+        self.references = tuple(reference_text(info) for info in thresholds.values())
+        # One row per test: critical_high, high, critical_low, low (indexed by KIND_*)
+        self.bounds = np.array([
+            (info.get('critical_high', np.inf), info.get('high', np.inf),
+             info.get('critical_low', -np.inf), info.get('low', -np.inf))
+            for info in thresholds.values()
+        ], dtype=float).reshape(len(self.names), 4)
+        self._index: Dict[str, int] = {}
+        for i, name in enumerate(self.names):
+            canonical = canonical_test_id(name)
+            if canonical is not None:
+                self._index.setdefault(canonical, i)
+        self._index.update({name: i for i, name in enumerate(self.names)})
+
+    def rule_index(self, test_name: Any) -> int:
+        """Rule of a test name (exact name, else same canonical test), -1 if none."""
+        if not isinstance(test_name, str):
+            return -1
+        index = self._index.get(test_name)
+        if index is None:
+            index = self._index.get(canonical_test_id(test_name), -1)
+        return index
+
+    def evaluate(self, test_names: Sequence[Any], values: Sequence[Any],
+                 patient_ids: Optional[Sequence[Any]] = None) -> ThresholdAlerts:
+        """
+        Evaluate columns of results against the rules.
+
+        Args:
+            test_names: Test name of each row.
+            values: Value of each row; non-numeric values are skipped.
+            patient_ids: Optional patient of each row (for ``by_patient``).
+
+        Returns:
+            ThresholdAlerts: The emitted alerts.
+        """
+        n = len(test_names)
+        if len(values) != n or (patient_ids is not None and len(patient_ids) != n):
+            raise ValueError("test_names, values and patient_ids must have the same length")
+        names, inverse = np.unique(np.asarray([str(name) for name in test_names], dtype=object), return_inverse=True) \
+            if n else (np.array([], dtype=object), np.array([], dtype=np.int64))
+        name_rules = np.array([self.rule_index(name) for name in names], dtype=np.int64)
+        rules = name_rules[inverse] if n else np.array([], dtype=np.int64)
+        numeric = np.array([float(v) if _is_number(v) else np.nan for v in values], dtype=float).reshape(n)
+
+        active = (rules >= 0) & ~np.isnan(numeric)
+        rows = np.flatnonzero(active)
+        v = numeric[rows]
+        bounds = self.bounds[rules[rows]]
+        critical_high = v >= bounds[:, KIND_CRITICAL_HIGH]
+        high = ~critical_high & (v > bounds[:, KIND_HIGH])
+        critical_low = v <= bounds[:, KIND_CRITICAL_LOW]
+        low = ~critical_low & (v < bounds[:, KIND_LOW])
+
+        # (row, kind) pairs in row order, high side before low side
+        hits = np.stack([critical_high, high, critical_low, low], axis=1)
+        hit_rows, hit_kinds = np.nonzero(hits)
+        return ThresholdAlerts(
+            self, rows[hit_rows], rules[rows][hit_rows], hit_kinds.astype(np.int8),
+            patient_ids, list(test_names), list(values),
+        )
+
+    def evaluate_panel(self, numeric_data: Mapping[str, Any]) -> ThresholdAlerts:
+        """Evaluate one ``{test name: value}`` panel."""
+        return self.evaluate(list(numeric_data), list(numeric_data.values()))
+
+    def evaluate_results(self, results: Iterable[Any]) -> ThresholdAlerts:
+        """Evaluate LabResult-like rows (``patient_id``, ``test_name``, ``value_numeric``)."""
+        results = list(results)
+        return self.evaluate(
+            [r.test_name for r in results],
+            [r.value_numeric for r in results],
+            [r.patient_id for r in results],
+        )
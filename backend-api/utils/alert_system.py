@@ -3,18 +3,9 @@ import importlib
 # import sys # Not used
 # import os # Not used directly here, path ops done by __file__
 
-# Add analyzers to the path so we can import them
-# sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "analyzers")) # Commented out
-
-# Import all analyzers using relative paths
-from analyzers.hepatic import analisar_funcao_hepatica
-from analyzers.renal import analisar_funcao_renal
-from analyzers.blood_gases import analisar_gasometria
-from analyzers.electrolytes import analisar_eletrolitos
-from analyzers.hematology import analisar_hematologia
-from analyzers.cardiac import analisar_marcadores_cardiacos
-from analyzers.microbiology import analisar_microbiologia
-from analyzers.metabolic import analisar_metabolismo
+# The analyzer entry points used below are thin module-level wrappers (defined
+# at the bottom of this file and patched by the tests); the analyzer package is
+# not imported here so that loading the alert system stays cheap.
 
 # Define severity levels consistently
 CRITICAL = "critical"
@@ -47,7 +38,41 @@ class AlertSystem:
         'TGP': {'unit': 'U/L', 'high': 40},
     }
 
-    def generate_alerts(self, numeric_data: Dict[str, Union[float, str]]) -> List[Dict[str, Any]]:
+    # Compiled form of THRESHOLDS: (THRESHOLDS object, utils.alert_rules.ThresholdRuleTable)
+    _compiled_thresholds = None
+
+    @classmethod
+    def threshold_rules(cls):
+        """
+        ``THRESHOLDS`` compiled into numeric arrays (``utils.alert_rules.ThresholdRuleTable``).
+
+        Compiled on first use and again whenever ``THRESHOLDS`` is replaced.
+        """
+        compiled = cls._compiled_thresholds
+        if compiled is None or compiled[0] is not cls.THRESHOLDS:
+            from utils.alert_rules import ThresholdRuleTable
+            compiled = (cls.THRESHOLDS, ThresholdRuleTable(cls.THRESHOLDS))
+            cls._compiled_thresholds = compiled
+        return compiled[1]
+
+    @classmethod
+    def evaluate_thresholds(cls, test_names: List[str], values: List[Any],
+                            patient_ids: Optional[List[Any]] = None):
+        """
+        Avalia colunas (paciente, exame, valor) contra ``THRESHOLDS`` em uma única passada vetorizada.
+
+        Args:
+            test_names: Nome do exame de cada linha.
+            values: Valor de cada linha (valores não numéricos são ignorados).
+            patient_ids: Paciente de cada linha (opcional).
+
+        Returns:
+            utils.alert_rules.ThresholdAlerts: Alertas emitidos, mais graves primeiro;
+            as mensagens só são geradas em ``to_dicts()``/``by_patient()``.
+        """
+        return cls.threshold_rules().evaluate(test_names, values, patient_ids)
+
+    def generate_threshold_alerts(self, numeric_data: Dict[str, Union[float, str]]) -> List[Dict[str, Any]]:
         """
         Gera alertas para um dicionário de dados numéricos de exames.
 
@@ -56,81 +81,10 @@ class AlertSystem:
                           Ex: {"pH": 7.3, "Potássio": 6.1, ...}
 
         Returns:
-            Lista de dicionários de alerta, cada um compatível com o schema AlertCreate.
+            Lista de dicionários de alerta, cada um compatível com o schema AlertCreate,
+            ordenada por gravidade (críticos primeiro).
         """
-        alerts = []
-
-        for test_name, value in numeric_data.items():
-            if not isinstance(value, (int, float)): # Skip non-numeric values
-                continue
-
-            threshold_info = self.THRESHOLDS.get(test_name)
-            if not threshold_info:
-                continue # No rules defined for this test
-
-            unit = threshold_info.get('unit')
-            ref_text = self._get_reference_text(threshold_info)
-
-            # Check Critical High
-            if 'critical_high' in threshold_info and value >= threshold_info['critical_high']:
-                alerts.append(self._create_alert(
-                    parameter=test_name, value=value, severity=CRITICAL,
-                    message=f"{test_name} CRITICAMENTE ALTO ({value} {unit or ''})",
-                    reference=ref_text, alert_type="lab_critical_high"
-                ))
-            # Check High (only if not critical high)
-            elif 'high' in threshold_info and value > threshold_info['high']:
-                alerts.append(self._create_alert(
-                    parameter=test_name, value=value, severity=HIGH,
-                    message=f"{test_name} elevado ({value} {unit or ''})",
-                    reference=ref_text, alert_type="lab_high"
-                ))
-            
-            # Check Critical Low
-            if 'critical_low' in threshold_info and value <= threshold_info['critical_low']:
-                alerts.append(self._create_alert(
-                    parameter=test_name, value=value, severity=CRITICAL,
-                    message=f"{test_name} CRITICAMENTE BAIXO ({value} {unit or ''})",
-                    reference=ref_text, alert_type="lab_critical_low"
-                ))
-            # Check Low (only if not critical low)
-            elif 'low' in threshold_info and value < threshold_info['low']:
-                 alerts.append(self._create_alert(
-                    parameter=test_name, value=value, severity=HIGH, # Consider low values also high severity? Adjust if needed
-                    message=f"{test_name} baixo ({value} {unit or ''})",
-                    reference=ref_text, alert_type="lab_low"
-                ))
-
-        # Ordenar alertas por gravidade (críticos primeiro)
-        return sorted(alerts, key=lambda x: self._severity_to_number(x['severity']), reverse=True)
-
-    def _get_reference_text(self, threshold_info: Dict) -> str:
-        """Helper to create a simple reference text from thresholds."""
-        parts = []
-        if 'low' in threshold_info:
-            parts.append(f"> {threshold_info['low']}")
-        if 'high' in threshold_info:
-             parts.append(f"< {threshold_info['high']}")
-        ref = " e ".join(parts)
-        if threshold_info.get('unit'):
-            ref += f" {threshold_info['unit']}"
-        return ref if ref else "N/A"
-
-    def _create_alert(self, parameter: str, value: float, severity: str, message: str, reference: str, alert_type: str) -> Dict[str, Any]:
-         """Helper to create the alert dictionary."""
-         return {
-            "alert_type": alert_type,
-            "message": message,
-            "severity": severity,
-            "parameter": parameter,
-            "value": value,
-            "reference": reference,
-            "category": "Lab Result", # General category for now
-            "status": "active",
-            "interpretation": None, # Can add simple interpretation based on rule later
-            "recommendation": None, # Can add simple recommendation based on rule later
-            "details": None # Can add extra details if needed
-         }
+        return self.threshold_rules().evaluate_panel(numeric_data).to_dicts()
 
     @staticmethod
     def _severity_to_number(severity: str) -> int:
@@ -0,0 +1,348 @@
+"""
+Cohort severity scoring (SOFA, qSOFA, NEWS2, APACHE II).
+
+``calcular_sofa`` & co. score one patient from a ``parametros`` dict.
+Dashboards and ward views need the scores of every patient in a unit at
+once, and calling ``gather_score_parameters`` per patient costs a handful of
+queries each. ``score_cohort`` loads patients, their latest vital signs and
+their ``patient_latest_lab`` snapshot rows for the whole list in three
+queries, builds the same ``parametros`` with ``build_score_parameters`` and
+scores them column-wise.
+
+Each threshold chain of the scalar calculators is expressed as a
+``PointTable`` (interval starts plus the points of each interval), so a whole
+column is scored with two ``searchsorted`` calls and a lookup. The tables
+mirror the scalar ones exactly, including the NEWS2 gaps between integer
+ranges that score 0 (e.g. a respiratory rate of 8.5); the unit tests check
+the two paths agree.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from utils.severity_scores import (
+    SCORE_LAB_MAX_AGE_DAYS,
+    _latest_values_query_mode,
+    build_score_parameters,
+    score_lab_test_keys,
+)
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class PointTable:
+    """
+    Piecewise-constant points over a numeric scale.
+
+    ``starts`` are the boundaries between consecutive intervals as
+    ``(value, inclusive)``: an inclusive start begins the next interval at
+    ``x >= value``, an exclusive one at ``x > value`` (i.e. the previous
+    interval ends with ``x <= value``). Missing values (NaN) score 0.
+    """
+
+    __slots__ = ('points', '_inclusive', '_exclusive')
+
+    def __init__(self, points: Sequence[int], starts: Sequence[Tuple[float, bool]]):
+        if len(points) != len(starts) + 1:
+            raise ValueError("A point table needs one more interval than boundaries")
+        self.points = np.asarray(points, dtype=np.int64)
+        self._inclusive = np.asarray(sorted(v for v, inclusive in starts if inclusive), dtype=float)
+        self._exclusive = np.asarray(sorted(v for v, inclusive in starts if not inclusive), dtype=float)
+
+    def __call__(self, values: np.ndarray) -> np.ndarray:
+        interval = (np.searchsorted(self._inclusive, values, side='right')
+                    + np.searchsorted(self._exclusive, values, side='left'))
+        return np.where(np.isnan(values), 0, self.points[np.minimum(interval, len(self.points) - 1)])
+
+
+def _at(*values: float) -> List[Tuple[float, bool]]:
+    """Inclusive starts (``x >= value``)."""
+    return [(v, True) for v in values]
+
+
+# SOFA
+SOFA_PF_RATIO = PointTable([4, 3, 2, 1, 0], _at(100, 200, 300, 400))
+SOFA_PLATELETS = PointTable([4, 3, 2, 1, 0], _at(20, 50, 100, 150))
+SOFA_BILIRUBIN = PointTable([0, 1, 2, 3, 4], _at(1.2, 2.0, 6.0, 12.0))
+SOFA_GLASGOW = PointTable([4, 3, 2, 1, 0], _at(6, 10, 13, 15))
+SOFA_CREATININE = PointTable([0, 1, 2, 3, 4], _at(1.2, 2.0, 3.5, 5.0))
+SOFA_URINE_OUTPUT = PointTable([4, 3, 0], _at(200, 500))
+
+# APACHE II
+APACHE_TEMPERATURE = PointTable([4, 3, 2, 1, 0, 1, 3, 4], _at(30.0, 32.0, 34.0, 36.0, 38.5, 39.0, 41.0))
+APACHE_MAP = PointTable([4, 2, 0, 2, 3, 4], _at(50, 70, 110, 130, 160))
+APACHE_HEART_RATE = PointTable([4, 3, 2, 0, 2, 3, 4], _at(40, 55, 70, 110, 140, 180))
+APACHE_RESPIRATORY_RATE = PointTable([4, 1, 0, 1, 3, 4], _at(6, 12, 25, 35, 50))
+APACHE_AA_GRADIENT = PointTable([0, 2, 3, 4], _at(200, 350, 500))
+APACHE_PAO2 = PointTable([4, 3, 1, 0], _at(55, 60, 70))
+APACHE_PH = PointTable([4, 3, 1, 0, 1, 3, 4], _at(7.15, 7.25, 7.33, 7.5, 7.6, 7.7))
+APACHE_SODIUM = PointTable([4, 3, 1, 0, 1, 3, 4], _at(110, 120, 130, 155, 160, 180))
+APACHE_POTASSIUM = PointTable([4, 3, 1, 0, 1, 3, 4], _at(2.5, 3, 3.5, 5.5, 6, 7))
+APACHE_CREATININE = PointTable([2, 0, 2, 3, 4], _at(0.6, 1.5, 2, 3.5))
+APACHE_HEMATOCRIT = PointTable([4, 2, 0, 1, 2, 4], _at(20, 30, 46, 50, 60))
+APACHE_WBC = PointTable([4, 2, 0, 1, 2, 4], _at(1, 3, 15, 20, 40))
+APACHE_AGE = PointTable([0, 2, 3, 5, 6], _at(45, 55, 65, 75))
+APACHE_MORTALITY = np.array(
+    [0.04] * 5 + [0.06] * 4 + [0.08] * 4 + [0.10, 0.15, 0.15] + [0.20] * 4 + [0.30] * 5 + [0.40] * 5
+    + [0.50, 0.55, 0.55, 0.55, 0.60] + [0.65] * 4 + [0.70, 0.75] + [0.80] * 3 + [0.85, 0.85]
+)
+
+# NEWS2: closed integer ranges, values between two ranges score 0
+NEWS_RESPIRATORY_RATE = PointTable(
+    [3, 0, 1, 0, 0, 0, 2, 0, 3],
+    [(8, False), (9, True), (11, False), (12, True), (20, False), (21, True), (24, False), (25, True)],
+)
+NEWS_OXYGEN_SATURATION = PointTable(
+    [3, 0, 2, 0, 1, 0, 0],
+    [(91, False), (92, True), (93, False), (94, True), (95, False), (96, True)],
+)
+NEWS_TEMPERATURE = PointTable(
+    [3, 0, 1, 0, 0, 0, 1, 0, 2],
+    [(35.0, False), (35.1, True), (36.0, False), (36.1, True), (38.0, False), (38.1, True),
+     (39.0, False), (39.1, True)],
+)
+NEWS_SYSTOLIC_BP = PointTable(
+    [3, 0, 2, 0, 1, 0, 0, 0, 3],
+    [(90, False), (91, True), (100, False), (101, True), (110, False), (111, True), (219, False), (220, True)],
+)
+NEWS_HEART_RATE = PointTable(
+    [3, 0, 1, 0, 0, 0, 1, 0, 2, 0, 3],
+    [(40, False), (41, True), (50, False), (51, True), (90, False), (91, True), (110, False), (111, True),
+     (130, False), (131, True)],
+)
+
+NUMERIC_PARAMETERS = (
+    'temp', 'fc', 'fr', 'pas', 'pad', 'map', 'spo2', 'glasgow', 'fio2', 'idade',
+    'pao2', 'pco2', 'ph', 'plaquetas', 'leuco', 'ht', 'bilirrubina', 'creatinina', 'na', 'k',
+    'dopamina', 'noradrenalina', 'adrenalina', 'diurese',
+)
+FLAG_PARAMETERS = ('aminas', 'dobutamina', 'doenca_cronica', 'insuficiencia_renal_aguda')
+
+ScoreColumns = Dict[str, np.ndarray]
+
+
+def score_columns(params_list: Sequence[Mapping[str, Any]]) -> ScoreColumns:
+    """
+    Stack ``parametros`` dicts into columns: float arrays (NaN where missing)
+    for numeric parameters, bool arrays for flags, and ``cirurgica_eletiva``
+    for the admission type.
+    """
+    n = len(params_list)
+    columns: ScoreColumns = {}
+    for name in NUMERIC_PARAMETERS:
+        values = [params.get(name) for params in params_list]
+        columns[name] = np.array([np.nan if v is None else v for v in values], dtype=float).reshape(n)
+    for name in FLAG_PARAMETERS:
+        columns[name] = np.array([bool(params.get(name, False)) for params in params_list], dtype=bool).reshape(n)
+    columns['cirurgica_eletiva'] = np.array(
+        [params.get('tipo_internacao', 'clinica') not in ('clinica', 'cirurgica_urgencia') for params in params_list],
+        dtype=bool,
+    ).reshape(n)
+    return columns
+
+
+def _fio2_fraction(fio2: np.ndarray) -> np.ndarray:
+    return np.where(fio2 > 1, fio2 / 100, fio2)
+
+
+def sofa_batch(columns: ScoreColumns) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """SOFA totals and per-system points, with the rules of ``calcular_sofa``."""
+    fio2 = _fio2_fraction(columns['fio2'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(fio2 > 0, columns['pao2'] / fio2, np.nan)
+
+    adrenalina, noradrenalina, dopamina = columns['adrenalina'], columns['noradrenalina'], columns['dopamina']
+    vasopressor = np.select(
+        [adrenalina > 0, noradrenalina > 0, dopamina > 0, columns['dobutamina']],
+        [np.where(adrenalina > 0.1, 4, 3),
+         np.where(noradrenalina > 0.1, 4, 3),
+         np.select([dopamina > 15, dopamina > 5], [4, 3], 2),
+         2],
+        0,
+    )
+    cardiovascular = np.where(columns['aminas'], vasopressor, (columns['map'] < 70).astype(np.int64))
+
+    components = {
+        'respiratorio': SOFA_PF_RATIO(ratio),
+        'coagulacao': SOFA_PLATELETS(columns['plaquetas']),
+        'hepatico': SOFA_BILIRUBIN(columns['bilirrubina']),
+        'cardiovascular': cardiovascular,
+        'neurologico': SOFA_GLASGOW(columns['glasgow']),
+        'renal': np.maximum(SOFA_CREATININE(columns['creatinina']), SOFA_URINE_OUTPUT(columns['diurese'])),
+    }
+    return sum(components.values()), components
+
+
+def qsofa_batch(columns: ScoreColumns) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """qSOFA totals and criteria (0/1), rounding inputs like ``calcular_qsofa``."""
+    components = {
+        'glasgow': (np.round(columns['glasgow']) < 15).astype(np.int64),
+        'fr': (np.round(columns['fr']) >= 22).astype(np.int64),
+        'pas': (np.round(columns['pas']) < 100).astype(np.int64),
+    }
+    return sum(components.values()), components
+
+
+def news2_batch(columns: ScoreColumns) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """NEWS2 totals and parameter points, with the rules of ``calcular_news``."""
+    components = {
+        'respiratory_rate': NEWS_RESPIRATORY_RATE(columns['fr']),
+        'oxygen_saturation': NEWS_OXYGEN_SATURATION(columns['spo2']),
+        'supplemental_oxygen': np.where(columns['fio2'] > 0.21, 2, 0),
+        'temperature': NEWS_TEMPERATURE(columns['temp']),
+        'systolic_bp': NEWS_SYSTOLIC_BP(columns['pas']),
+        'heart_rate': NEWS_HEART_RATE(columns['fc']),
+        'consciousness': np.where(columns['glasgow'] < 15, 3, 0),
+    }
+    return sum(components.values()), components
+
+
+def apache2_batch(columns: ScoreColumns) -> Tuple[np.ndarray, Dict[str, np.ndarray], np.ndarray]:
+    """
+    APACHE II totals, component points and estimated mortality, with the
+    rules of ``calcular_apache2``.
+    """
+    pao2 = columns['pao2']
+    fio2 = _fio2_fraction(columns['fio2'])
+    aa_gradient = (713 * fio2 - columns['pco2'] / 0.8) - pao2
+    oxygenation = np.where(
+        np.isnan(pao2) | np.isnan(fio2), 0,
+        np.where(fio2 >= 0.5, APACHE_AA_GRADIENT(aa_gradient), APACHE_PAO2(pao2)),
+    )
+    glasgow = columns['glasgow']
+
+    components = {
+        'temperatura': APACHE_TEMPERATURE(columns['temp']),
+        'pressao_arterial_media': APACHE_MAP(columns['map']),
+        'frequencia_cardiaca': APACHE_HEART_RATE(columns['fc']),
+        'frequencia_respiratoria': APACHE_RESPIRATORY_RATE(columns['fr']),
+        'oxigenacao': oxygenation,
+        'ph_arterial': APACHE_PH(columns['ph']),
+        'sodio': APACHE_SODIUM(columns['na']),
+        'potassio': APACHE_POTASSIUM(columns['k']),
+        'creatinina': APACHE_CREATININE(columns['creatinina']) * np.where(columns['insuficiencia_renal_aguda'], 2, 1),
+        'hematocrito': APACHE_HEMATOCRIT(columns['ht']),
+        'leucocitos': APACHE_WBC(columns['leuco']),
+        'glasgow': np.where(np.isnan(glasgow), 0, np.maximum(0, 15 - glasgow)),
+        'idade': APACHE_AGE(columns['idade']),
+        'saude_cronica': np.where(columns['doenca_cronica'], np.where(columns['cirurgica_eletiva'], 2, 5), 0),
+    }
+    total = sum(components.values())
+    mortality = APACHE_MORTALITY[np.clip(total, 0, len(APACHE_MORTALITY) - 1).astype(np.int64)]
+    return total, components, mortality
+
+
+def _python_number(value: Any) -> Any:
+    value = value.item()
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def _breakdown(total: np.ndarray, components: Dict[str, np.ndarray], row: int) -> Dict[str, Any]:
+    return {
+        'score': _python_number(total[row]),
+        'components': {name: _python_number(points[row]) for name, points in components.items()},
+    }
+
+
+def score_parameters_batch(params_list: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Score a list of ``parametros`` dicts.
+
+    Returns:
+        list: One ``{"sofa", "qsofa", "news2", "apache2"}`` dict per input, each
+            holding ``score`` and ``components`` (APACHE II also ``mortality``).
+    """
+    columns = score_columns(params_list)
+    sofa = sofa_batch(columns)
+    qsofa = qsofa_batch(columns)
+    news2 = news2_batch(columns)
+    apache_total, apache_components, mortality = apache2_batch(columns)
+
+    results = []
+    for row in range(len(params_list)):
+        apache2 = _breakdown(apache_total, apache_components, row)
+        apache2['mortality'] = float(mortality[row])
+        results.append({
+            'sofa': _breakdown(*sofa, row),
+            'qsofa': _breakdown(*qsofa, row),
+            'news2': _breakdown(*news2, row),
+            'apache2': apache2,
+        })
+    return results
+
+
+def _latest_vitals_by_patient(db: "Session", patient_ids: List[int]) -> Dict[int, Any]:
+    """Latest VitalSign of each patient, in one query."""
+    from sqlalchemy import func
+    from database.models import VitalSign
+
+    if _latest_values_query_mode(db) == 'scan':
+        latest: Dict[int, Any] = {}
+        rows = (
+            db.query(VitalSign)
+            .filter(VitalSign.patient_id.in_(patient_ids))
+            .order_by(VitalSign.patient_id, VitalSign.timestamp.desc(), VitalSign.vital_id.desc())
+        )
+        for vital in rows:
+            latest.setdefault(vital.patient_id, vital)
+        return latest
+
+    rank = func.row_number().over(
+        partition_by=VitalSign.patient_id,
+        order_by=(VitalSign.timestamp.desc(), VitalSign.vital_id.desc()),
+    ).label('rank')
+    ranked = db.query(VitalSign.vital_id, rank).filter(VitalSign.patient_id.in_(patient_ids)).subquery()
+    rows = (
+        db.query(VitalSign)
+        .join(ranked, ranked.c.vital_id == VitalSign.vital_id)
+        .filter(ranked.c.rank == 1)
+    )
+    return {vital.patient_id: vital for vital in rows}
+
+
+def score_cohort(db: "Session", patient_ids: Iterable[int],
+                 max_age_days: int = SCORE_LAB_MAX_AGE_DAYS) -> Dict[int, Dict[str, Any]]:
+    """
+    SOFA, qSOFA, NEWS2 and APACHE II of every patient in ``patient_ids``.
+
+    Runs three queries whatever the cohort size: the patients, their latest
+    vital signs and their latest-lab snapshot rows (``patient_latest_lab``)
+    no older than ``max_age_days``.
+
+    Returns:
+        dict: {patient_id: per-score breakdown (see ``score_parameters_batch``)},
+            for the ids that exist.
+    """
+    from sqlalchemy.orm import lazyload
+    from database.models import Patient, PatientLatestLab
+
+    patient_ids = list(dict.fromkeys(patient_ids))
+    if not patient_ids:
+        return {}
+
+    patients = {
+        p.patient_id: p for p in db.query(Patient).options(lazyload('*')).filter(Patient.patient_id.in_(patient_ids))
+    }
+    vitals = _latest_vitals_by_patient(db, patient_ids)
+
+    test_keys = score_lab_test_keys()
+    parameter_by_key = {key: name for name, key in test_keys.items()}
+    labs: Dict[int, Dict[str, float]] = {pid: {} for pid in patients}
+    snapshot = db.query(PatientLatestLab.patient_id, PatientLatestLab.test_key, PatientLatestLab.value).filter(
+        PatientLatestLab.patient_id.in_(patient_ids),
+        PatientLatestLab.test_key.in_(list(parameter_by_key)),
+        PatientLatestLab.timestamp >= datetime.utcnow() - timedelta(days=max_age_days),
+    )
+    for patient_id, test_key, value in snapshot:
+        labs[patient_id][parameter_by_key[test_key]] = value
+
+    ordered = [pid for pid in patient_ids if pid in patients]
+    params_list = [build_score_parameters(patients[pid], vitals.get(pid), labs[pid]) for pid in ordered]
+    logger.debug(f"Scoring cohort of {len(ordered)} patients")
+    return dict(zip(ordered, score_parameters_batch(params_list)))
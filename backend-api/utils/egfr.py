@@ -0,0 +1,218 @@
+"""
+Vectorized CKD-EPI 2021 eGFR and KDIGO G staging.
+
+``calcular_tfg_ckd_epi`` / ``classificar_tfg_kdigo`` handle one creatinine.
+Renal dashboards and drug-dosing checks need eGFR for every creatinine of a
+patient's history and for every patient of a ward; the array versions here
+compute them in one pass and agree element-wise with the scalar functions
+(same validity rules, same formula without the 1.012 factor, same rounding to
+two decimals; see the unit tests).
+
+Two database entry points build on them:
+
+- ``ward_egfr``: latest creatinine of many patients from the
+  ``patient_latest_lab`` snapshot (two queries);
+- ``egfr_history``: every creatinine of one patient, staged with the age at
+  collection.
+"""
+
+import logging
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Sequence, Union
+
+import numpy as np
+
+from utils.severity_scores import KDIGO_TFG_INVALID, KDIGO_TFG_STAGES
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Stage index i is KDIGO_TFG_STAGES[i] (0 = G1 ... 5 = G5); -1 = not computable
+KDIGO_STAGE_CODES = ('G1', 'G2', 'G3a', 'G3b', 'G4', 'G5')
+_KDIGO_LOWER_BOUNDS = np.array(sorted(bound for bound, _ in KDIGO_TFG_STAGES if bound is not None), dtype=float)
+_KDIGO_LABELS = np.array([stage for _, stage in KDIGO_TFG_STAGES] + [KDIGO_TFG_INVALID], dtype=object)
+
+SexInput = Union[None, str, Sequence[Optional[str]]]
+
+
+def _float_array(values: Any) -> np.ndarray:
+    if isinstance(values, np.ndarray):
+        return values.astype(float)
+    if np.isscalar(values) or values is None:
+        values = [values]
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def _sex_arrays(sexo: SexInput, n: int) -> np.ndarray:
+    """Upper-cased sex codes; a single code applies to every row."""
+    if sexo is None or isinstance(sexo, str):
+        sexo = [sexo] * n
+    return np.array([s.upper() if isinstance(s, str) else '' for s in sexo], dtype=object)
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    """
+    ``round(x, 2)`` element-wise. ``np.round`` agrees with Python's correctly
+    rounded ``round`` except where x * 100 lands on a half; those few
+    elements are rounded in Python.
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    with np.errstate(invalid='ignore'):
+        near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_half):
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
+
+
+def calcular_tfg_ckd_epi_array(creatinina_mgdl: Any, idade: Any, sexo: SexInput) -> np.ndarray:
+    """
+    CKD-EPI 2021 eGFR for arrays of creatinine (mg/dL) and age (years).
+
+    Args:
+        creatinina_mgdl: Creatinine values (array-like; None/NaN where missing).
+        idade: Ages, same length, or one age for all rows.
+        sexo: 'M'/'F' codes, same length, or one code for all rows.
+
+    Returns:
+        np.ndarray: eGFR in mL/min/1.73 m², NaN where the scalar function returns None.
+    """
+    creat = _float_array(creatinina_mgdl)
+    ages = np.broadcast_to(_float_array(idade), creat.shape).astype(float)
+    sex = _sex_arrays(sexo, len(creat))
+    if len(sex) != len(creat):
+        raise ValueError("sexo must be one code or one code per creatinine")
+
+    male = sex == 'M'
+    valid = (creat > 0) & (ages > 0) & (male | (sex == 'F'))
+    kappa = np.where(male, 0.9, 0.7)
+    alpha = np.where(male, -0.302, -0.241)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = creat / kappa
+        tfg = 142 * np.minimum(ratio, 1.0) ** alpha * np.maximum(ratio, 1.0) ** -1.200 * 0.9938 ** ages
+    return np.where(valid, _round2(np.where(valid, tfg, 0.0)), np.nan)
+
+
+def classificar_tfg_kdigo_array(tfg: Any) -> np.ndarray:
+    """
+    KDIGO G stage index of each eGFR: i for ``KDIGO_TFG_STAGES[i]``
+    (``KDIGO_STAGE_CODES[i]``), -1 where eGFR is missing.
+    """
+    values = _float_array(tfg)
+    stage = len(_KDIGO_LOWER_BOUNDS) - np.searchsorted(_KDIGO_LOWER_BOUNDS, values, side='right')
+    return np.where(np.isnan(values), -1, stage).astype(np.int8)
+
+
+def kdigo_stage_labels(stages: np.ndarray) -> np.ndarray:
+    """Labels of ``classificar_tfg_kdigo`` for stage indexes (-1 -> invalid)."""
+    return _KDIGO_LABELS[np.asarray(stages, dtype=np.int64)]
+
+
+def _age_at(birth: Any, when: datetime) -> Optional[int]:
+    if birth is None:
+        return None
+    birth = birth.date() if isinstance(birth, datetime) else birth
+    when = when.date() if isinstance(when, datetime) else when
+    return when.year - birth.year - ((when.month, when.day) < (birth.month, birth.day))
+
+
+def _entry(creatinina: Optional[float], timestamp: Any, tfg: float, stage: int) -> Dict[str, Any]:
+    return {
+        'creatinina': creatinina,
+        'timestamp': timestamp,
+        'tfg': None if np.isnan(tfg) else float(tfg),
+        'estagio': KDIGO_STAGE_CODES[stage] if stage >= 0 else None,
+        'classificacao': _KDIGO_LABELS[stage],
+    }
+
+
+def ward_egfr(db: "Session", patient_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    eGFR and KDIGO stage of each patient's latest creatinine.
+
+    Reads the ``patient_latest_lab`` snapshot ('Creat' rows, mg/dL) and the
+    patients' demographics: two queries for any number of patients.
+
+    Returns:
+        dict: {patient_id: {'creatinina', 'timestamp', 'tfg', 'estagio',
+            'classificacao'}} for the patients that have a creatinine.
+    """
+    from sqlalchemy.orm import lazyload
+    from crud.patients import patient_demographics
+    from database.models import Patient, PatientLatestLab
+
+    patient_ids = list(dict.fromkeys(patient_ids))
+    if not patient_ids:
+        return {}
+    snapshot = (
+        db.query(PatientLatestLab.patient_id, PatientLatestLab.value, PatientLatestLab.timestamp)
+        .filter(
+            PatientLatestLab.patient_id.in_(patient_ids),
+            PatientLatestLab.test_key == 'Creat',
+            PatientLatestLab.unit == 'mg/dL',
+            PatientLatestLab.value.isnot(None),
+        )
+        .all()
+    )
+    if not snapshot:
+        return {}
+    patients = {
+        p.patient_id: patient_demographics(p)
+        for p in db.query(Patient).options(lazyload('*')).filter(Patient.patient_id.in_([r[0] for r in snapshot]))
+    }
+    demographics = [patients.get(patient_id, {}) for patient_id, _, _ in snapshot]
+    tfg = calcular_tfg_ckd_epi_array(
+        [value for _, value, _ in snapshot],
+        [d.get('idade') for d in demographics],
+        [d.get('sexo') for d in demographics],
+    )
+    stages = classificar_tfg_kdigo_array(tfg)
+    return {
+        patient_id: _entry(value, timestamp, tfg[i], stages[i])
+        for i, (patient_id, value, timestamp) in enumerate(snapshot)
+    }
+
+
+def egfr_history(db: "Session", patient_id: int, since: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+    """
+    eGFR of every creatinine (mg/dL) of a patient, oldest first, each
+    computed with the patient's age at collection.
+
+    Returns:
+        dict: 'timestamp' (datetime64[s]), 'creatinina', 'idade', 'tfg' and
+            'estagio' (stage index, see ``classificar_tfg_kdigo_array``) arrays.
+    """
+    from analyzers.panel import aliases_for_test
+    from sqlalchemy import func
+    from crud.patients import patient_demographics
+    from database.models import LabResult, Patient
+
+    patient = db.get(Patient, patient_id)
+    query = (
+        db.query(LabResult.timestamp, LabResult.value_normalized)
+        .filter(
+            LabResult.patient_id == patient_id,
+            func.lower(LabResult.test_name).in_(aliases_for_test('Creat')),
+            LabResult.unit_normalized == 'mg/dL',
+            LabResult.value_normalized.isnot(None),
+        )
+        .order_by(LabResult.timestamp, LabResult.result_id)
+    )
+    if since is not None:
+        query = query.filter(LabResult.timestamp >= since)
+    rows = query.all()
+
+    birth = patient.birthDate if patient is not None else None
+    ages = [_age_at(birth, timestamp) for timestamp, _ in rows]
+    creat = np.array([value for _, value in rows], dtype=float)
+    tfg = calcular_tfg_ckd_epi_array(creat, ages, patient_demographics(patient).get('sexo'))
+    return {
+        'timestamp': np.array([timestamp for timestamp, _ in rows], dtype='datetime64[s]'),
+        'creatinina': creat,
+        'idade': _float_array(ages),
+        'tfg': tfg,
+        'estagio': classificar_tfg_kdigo_array(tfg),
+    }
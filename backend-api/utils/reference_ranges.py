@@ -5,7 +5,14 @@ This module provides a single source of truth for laboratory test reference rang
 including gender-specific and age-specific values where applicable.
 """
 
-from typing import Dict, Tuple, Optional, Union
+import json
+import logging
+import math
+import os
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
 
 # Typing for a reference range tuple (low, high)
 Range = Tuple[Optional[float], Optional[float]]
@@ -193,30 +200,319 @@ REFERENCE_RANGES: Dict[str, Range] = {
     'Theophylline': (10, 20), # µg/mL
 }
 
-def get_reference_range(test_name: str, sex: Optional[str] = None) -> Optional[Range]:
+# Age bands for age-specific ranges: (name, lower bound inclusive, upper bound exclusive)
+AGE_BANDS: Tuple[Tuple[str, float, float], ...] = (
+    ('pediatric', 0, 18),
+    ('adult', 18, 65),
+    ('elderly', 65, math.inf),
+)
+
+# Age-banded overrides, keyed by (test, sex or None, band name). Tests without an
+# entry use their sex-specific or general range in every band.
+AGE_BANDED_RANGES: Dict[Tuple[str, Optional[str], str], Range] = {}
+
+# Physiologically plausible bounds used to reject impossible values at ingestion
+VALIDATION_RANGES_PATH = os.getenv(
+    "VALIDATION_RANGES_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "validation_ranges.json"),
+)
+
+_SEX_CODES = {'M': 1, 'F': 2}
+_NAN = float('nan')
+
+
+def _sex_code(sex: Optional[str]) -> int:
+    return _SEX_CODES.get(sex.upper(), 0) if isinstance(sex, str) else 0
+
+
+def load_validation_ranges(path: str = VALIDATION_RANGES_PATH) -> Dict[str, Range]:
     """
-    Retrieves the reference range for a given test, considering gender if applicable.
+    Load plausibility bounds from ``validation_ranges.json``.
+
+    Returns:
+        dict: {test name as written in the file: (min, max)}; empty if the file
+            is missing or unreadable.
     """
-    if sex:
-        sex_specific_key = f"{test_name}_{sex.upper()}"
-        if sex_specific_key in REFERENCE_RANGES:
-            return REFERENCE_RANGES[sex_specific_key]
-    
-    return REFERENCE_RANGES.get(test_name)
-def is_abnormal(test_name: str, value: float, sex: Optional[str] = None) -> bool:
+    try:
+        with open(path, encoding='utf-8') as f:
+            raw = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not load validation ranges from {path}: {e}")
+        return {}
+    return {name: (spec.get('min'), spec.get('max')) for name, spec in raw.items() if isinstance(spec, dict)}
+
+
+class ReferenceRangeIndex:
+    """
+    Reference ranges compiled into flat low/high arrays.
+
+    Every (test, sex, age band) combination gets a slot holding the range that
+    applies to it after fallbacks (age band -> sex-specific -> general), so a
+    lookup is a dict hit for the test plus index arithmetic. Sex is 'M', 'F'
+    or unknown; age band 0 means "age unknown". Tests are keyed by their
+    ``REFERENCE_RANGES`` name; other spellings are resolved through the
+    canonical test ids of ``analyzers.panel``.
+
+    Args:
+        ranges: Flat reference table in the ``REFERENCE_RANGES`` format.
+        age_ranges: Age-banded overrides (see ``AGE_BANDED_RANGES``).
+        plausibility: {test name: (min, max)} bounds for impossible values.
+    """
+
+    N_SEX = 3
+    N_BAND = len(AGE_BANDS) + 1
+
+    def __init__(self, ranges: Dict[str, Range], age_ranges: Optional[Dict[Tuple[str, Optional[str], str], Range]] = None,
+                 plausibility: Optional[Dict[str, Range]] = None):
+        age_ranges = age_ranges or {}
+        self._band_edges: List[float] = [band[1] for band in AGE_BANDS[1:]]
+        band_index = {band[0]: i + 1 for i, band in enumerate(AGE_BANDS)}
+
+        tests: List[str] = list(ranges)
+        by_sex: Dict[Tuple[str, int], Range] = {}
+        for key, value in ranges.items():
+            base, _, suffix = key.rpartition('_')
+            if base and suffix in _SEX_CODES:
+                by_sex[(base, _SEX_CODES[suffix])] = value
+                if base not in ranges and base not in tests:
+                    tests.append(base)
+        for test, _sex, _band in age_ranges:
+            if test not in tests:
+                tests.append(test)
+
+        self.tests: Tuple[str, ...] = tuple(tests)
+        self._slots: Dict[str, int] = {test: i for i, test in enumerate(tests)}
+        stride = self.N_SEX * self.N_BAND
+        # One extra block of NaN bounds at the end for unknown tests
+        self._lows: List[float] = [_NAN] * (stride * (len(tests) + 1))
+        self._highs: List[float] = [_NAN] * (stride * (len(tests) + 1))
+        self._ranges: List[Optional[Range]] = [None] * (stride * len(tests))
+        sex_names = {1: 'M', 2: 'F'}
+        for t, test in enumerate(tests):
+            for sex in range(self.N_SEX):
+                for band in range(self.N_BAND):
+                    rng = None
+                    if band:
+                        band_name = AGE_BANDS[band - 1][0]
+                        rng = age_ranges.get((test, sex_names.get(sex), band_name)) or age_ranges.get((test, None, band_name))
+                    if rng is None and sex:
+                        rng = by_sex.get((test, sex))
+                    if rng is None:
+                        rng = ranges.get(test)
+                    i = t * stride + sex * self.N_BAND + band
+                    self._ranges[i] = rng
+                    if rng is not None:
+                        low, high = rng
+                        self._lows[i] = _NAN if low is None else float(low)
+                        self._highs[i] = _NAN if high is None else float(high)
+
+        self._plausible: Dict[str, Range] = {}
+        for name, bounds in (plausibility or {}).items():
+            test = self._resolve(name)
+            if test is None:
+                logger.warning(f"Validation range for unknown test {name!r} ignored")
+                continue
+            self._plausible[test] = bounds
+        n_tests = len(tests) + 1
+        self._plausible_low = [_NAN] * n_tests
+        self._plausible_high = [_NAN] * n_tests
+        for test, (low, high) in self._plausible.items():
+            slot = self._slots[test]
+            self._plausible_low[slot] = _NAN if low is None else float(low)
+            self._plausible_high[slot] = _NAN if high is None else float(high)
+        self._np_tables = None
+
+    # Scalar API ---------------------------------------------------------
+    def _resolve(self, test: str) -> Optional[str]:
+        if test in self._slots:
+            return test
+        from analyzers.panel import canonical_test_id  # analyzers import this module
+
+        canonical = canonical_test_id(test)
+        return canonical if canonical in self._slots else None
+
+    def slot(self, test: str) -> int:
+        """Row of a test in the flat tables (-1 if unknown)."""
+        slot = self._slots.get(test)
+        if slot is None:
+            resolved = self._resolve(test) if isinstance(test, str) else None
+            slot = -1 if resolved is None else self._slots[resolved]
+        return slot
+
+    def age_band(self, age: Optional[float]) -> int:
+        """Band code for an age in years (0 if unknown)."""
+        if age is None or age != age or age < 0:
+            return 0
+        return bisect_right(self._band_edges, age) + 1
+
+    def lookup(self, test: str, sex: Optional[str] = None, age: Optional[float] = None) -> Optional[Range]:
+        """Reference range for a test, patient sex and age (None if unknown)."""
+        slot = self.slot(test)
+        if slot < 0:
+            return None
+        return self._ranges[(slot * self.N_SEX + _sex_code(sex)) * self.N_BAND + self.age_band(age)]
+
+    def is_abnormal(self, test: str, value: Optional[float], sex: Optional[str] = None, age: Optional[float] = None) -> bool:
+        """True if the value lies outside the applicable reference range."""
+        if value is None:
+            return False
+        rng = self.lookup(test, sex, age)
+        if rng is None:
+            return False
+        low, high = rng
+        return (low is not None and value < low) or (high is not None and value > high)
+
+    def plausibility(self, test: str) -> Optional[Range]:
+        """(min, max) plausibility bounds for a test, if configured."""
+        resolved = self._resolve(test) if isinstance(test, str) else None
+        return self._plausible.get(resolved) if resolved else None
+
+    def is_plausible(self, test: str, value: Optional[float]) -> bool:
+        """False for values outside the plausibility bounds; True if there are none."""
+        bounds = self.plausibility(test)
+        if value is None or bounds is None:
+            return True
+        low, high = bounds
+        return not ((low is not None and value < low) or (high is not None and value > high))
+
+    # Vectorised API -----------------------------------------------------
+    def _tables(self):
+        import numpy as np
+
+        if self._np_tables is None:
+            self._np_tables = (
+                np.asarray(self._lows, dtype=float),
+                np.asarray(self._highs, dtype=float),
+                np.asarray(self._plausible_low, dtype=float),
+                np.asarray(self._plausible_high, dtype=float),
+                np.asarray(self._band_edges, dtype=float),
+            )
+        return self._np_tables
+
+    def _slots_many(self, test_ids: Union[str, Sequence[str]], n: int):
+        import numpy as np
+
+        unknown = len(self.tests)
+        if isinstance(test_ids, str):
+            slot = self.slot(test_ids)
+            return np.full(n, unknown if slot < 0 else slot, dtype=np.intp)
+        names = np.asarray(test_ids, dtype=object)
+        if len(names) != n:
+            raise ValueError(f"test_ids has {len(names)} rows, expected {n}")
+        uniques, inverse = np.unique(names.astype(str), return_inverse=True)
+        slots = np.array([self.slot(name) for name in uniques.tolist()], dtype=np.intp)
+        slots[slots < 0] = unknown
+        return slots[inverse] if n else np.zeros(0, dtype=np.intp)
+
+    @staticmethod
+    def _per_row(values: Any, n: int, name: str):
+        import numpy as np
+
+        arr = np.asarray(values, dtype=object)
+        if arr.ndim == 0:
+            return np.full(n, arr.item(), dtype=object)
+        if len(arr) != n:
+            raise ValueError(f"{name} has {len(arr)} rows, expected {n}")
+        return arr
+
+    def check_many(self, test_ids: Union[str, Sequence[str]], values: Any,
+                   sexes: Union[None, str, Sequence[Optional[str]]] = None,
+                   ages: Union[None, float, Sequence[Optional[float]]] = None) -> Dict[str, Any]:
+        """
+        Classify many results against reference and plausibility bounds in one pass.
+
+        Args:
+            test_ids: One test name for all rows, or one per row.
+            values: Numeric values; NaN marks a missing value.
+            sexes: One sex for all rows, or one per row ('M'/'F'/None).
+            ages: One age in years for all rows, or one per row (None/NaN if unknown).
+
+        Returns:
+            dict: {"flags": int8 array (-1 below, 0 within/unknown, +1 above),
+                   "abnormal": bool array, "implausible": bool array}
+
+        Raises:
+            ValueError: If the per-row inputs have different lengths.
+        """
+        import numpy as np
+
+        lows, highs, p_lows, p_highs, band_edges = self._tables()
+        vals = np.asarray(values, dtype=float)
+        n = len(vals)
+        slots = self._slots_many(test_ids, n)
+
+        if sexes is None or isinstance(sexes, str):
+            sex_codes = np.full(n, _sex_code(sexes), dtype=np.intp)
+        else:
+            sex_codes = np.array([_sex_code(s) for s in self._per_row(sexes, n, "sexes").tolist()], dtype=np.intp)
+
+        if ages is None:
+            bands = np.zeros(n, dtype=np.intp)
+        else:
+            age_arr = np.asarray(self._per_row(ages, n, "ages").tolist(), dtype=float)
+            with np.errstate(invalid='ignore'):
+                bands = np.searchsorted(band_edges, age_arr, side='right') + 1
+                bands[np.isnan(age_arr) | (age_arr < 0)] = 0
+
+        idx = (slots * self.N_SEX + sex_codes) * self.N_BAND + bands
+        low, high = lows[idx], highs[idx]
+        flags = np.zeros(n, dtype=np.int8)
+        with np.errstate(invalid='ignore'):
+            flags[vals < low] = -1
+            flags[vals > high] = 1
+            implausible = (vals < p_lows[slots]) | (vals > p_highs[slots])
+        return {"flags": flags, "abnormal": flags != 0, "implausible": implausible}
+
+    def is_abnormal_many(self, test_ids: Union[str, Sequence[str]], values: Any,
+                         sexes: Union[None, str, Sequence[Optional[str]]] = None,
+                         ages: Union[None, float, Sequence[Optional[float]]] = None) -> Any:
+        """Vectorised ``is_abnormal``: bool array, False for unknown tests and NaN values."""
+        return self.check_many(test_ids, values, sexes, ages)["abnormal"]
+
+    def is_implausible_many(self, test_ids: Union[str, Sequence[str]], values: Any) -> Any:
+        """Bool array marking values outside the plausibility bounds."""
+        return self.check_many(test_ids, values)["implausible"]
+
+
+_reference_index: Optional[ReferenceRangeIndex] = None
+
+
+def get_reference_index() -> ReferenceRangeIndex:
+    """Process-wide index over ``REFERENCE_RANGES``, built on first use."""
+    global _reference_index
+    if _reference_index is None:
+        _reference_index = ReferenceRangeIndex(REFERENCE_RANGES, AGE_BANDED_RANGES, load_validation_ranges())
+    return _reference_index
+
+
+def rebuild_reference_index() -> ReferenceRangeIndex:
+    """Rebuild the shared index after ``REFERENCE_RANGES`` or ``AGE_BANDED_RANGES`` changed."""
+    global _reference_index
+    _reference_index = None
+    return get_reference_index()
+
+
+def get_reference_range(test_name: str, sex: Optional[str] = None, age: Optional[float] = None) -> Optional[Range]:
+    """
+    Retrieves the reference range for a given test, considering gender and age if applicable.
+    """
+    return get_reference_index().lookup(test_name, sex, age)
+
+
+def is_abnormal(test_name: str, value: float, sex: Optional[str] = None, age: Optional[float] = None) -> bool:
     """
     Checks if a given lab result is abnormal.
     """
-    reference_range = get_reference_range(test_name, sex)
-    if reference_range is None:
-        return False  # Cannot determine abnormality without a reference range
-    
-    low, high = reference_range
-    if low is not None and value < low:
-        return True
-    if high is not None and value > high:
-        return True
-    return False
+    return get_reference_index().is_abnormal(test_name, value, sex, age)
+
+
+def is_abnormal_many(test_ids: Union[str, Sequence[str]], values: Any,
+                     sexes: Union[None, str, Sequence[Optional[str]]] = None,
+                     ages: Union[None, float, Sequence[Optional[float]]] = None) -> Any:
+    """
+    Vectorised abnormality check over many results (see ``ReferenceRangeIndex.check_many``).
+    """
+    return get_reference_index().is_abnormal_many(test_ids, values, sexes, ages)
 
 def get_reference_range_text(test_name: str, sex: Optional[str] = None) -> str:
     """
@@ -0,0 +1,296 @@
+"""
+Event-driven maintenance of the ``clinical_scores`` series.
+
+Inserting a ``VitalSign`` or ``LabResult`` (any ORM path) records the patient
+on the session; when the transaction commits the patient is handed to
+``score_queue``. The queue coalesces a patient's bursts of writes (a full lab
+panel, a set of vitals) into one recomputation: a batch is processed once its
+oldest entry has waited ``SCORE_MAINTENANCE_DEBOUNCE_SECONDS`` or it reaches
+``SCORE_MAINTENANCE_BATCH_SIZE`` patients. Each batch is scored with
+``utils.cohort_scores.score_cohort`` (constant number of queries) and a
+``ClinicalScore`` row is appended only for the scores whose value changed, so
+trend reads (``crud.crud_clinical_score.get_score_series``) never recompute
+history. When a batch fails its patients are scored one by one, and a patient
+that still fails is queued again up to ``SCORE_MAINTENANCE_MAX_RETRIES`` times.
+
+Without a started worker (tests, scripts) entries just accumulate until
+``score_queue.flush(db)`` is called.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Mapping, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+if TYPE_CHECKING:
+    from database.models import ClinicalScore
+
+logger = logging.getLogger(__name__)
+
+SCORE_MAINTENANCE_ENABLED = os.getenv("SCORE_MAINTENANCE_ENABLED", "true").lower() in ("1", "true", "yes")
+SCORE_MAINTENANCE_DEBOUNCE_SECONDS = float(os.getenv("SCORE_MAINTENANCE_DEBOUNCE_SECONDS", "5"))
+SCORE_MAINTENANCE_BATCH_SIZE = int(os.getenv("SCORE_MAINTENANCE_BATCH_SIZE", "500"))
+SCORE_MAINTENANCE_MAX_RETRIES = int(os.getenv("SCORE_MAINTENANCE_MAX_RETRIES", "3"))
+
+# ClinicalScore.score_type (schemas.clinical_score.ScoreType values) -> score_cohort key
+MAINTAINED_SCORES = {'SOFA': 'sofa', 'qSOFA': 'qsofa', 'NEWS': 'news2'}
+
+_SESSION_PENDING_KEY = 'score_maintenance_pending'
+
+
+def recompute_scores(db: Session, patients: Mapping[int, Optional[int]],
+                     timestamp: Optional[datetime] = None) -> List["ClinicalScore"]:
+    """
+    Recompute the maintained scores of ``patients`` and append the changed ones.
+
+    Args:
+        db: Database session (committed on return).
+        patients: {patient_id: user_id recorded on new rows}; None uses the
+            patient's own user.
+        timestamp: Time of the new points (default: now, UTC).
+
+    Returns:
+        list: The appended ClinicalScore rows.
+    """
+    from crud.crud_clinical_score import latest_score_values
+    from database.models import ClinicalScore, Patient
+    from utils.cohort_scores import score_cohort
+
+    patient_ids = list(patients)
+    if not patient_ids:
+        return []
+    timestamp = timestamp or datetime.utcnow()
+    cohort = score_cohort(db, patient_ids)
+    previous = latest_score_values(db, cohort, MAINTAINED_SCORES)
+    owners = dict(db.query(Patient.patient_id, Patient.user_id).filter(Patient.patient_id.in_(list(cohort))))
+
+    appended = []
+    for patient_id, scores in cohort.items():
+        for score_type, key in MAINTAINED_SCORES.items():
+            value = float(scores[key]['score'])
+            if previous.get((patient_id, score_type)) == value:
+                continue
+            appended.append(ClinicalScore(
+                patient_id=patient_id,
+                user_id=patients[patient_id] or owners[patient_id],
+                score_type=score_type,
+                value=value,
+                timestamp=timestamp,
+            ))
+    if appended:
+        db.add_all(appended)
+        db.commit()
+    logger.debug(f"Recomputed scores of {len(cohort)} patients, {len(appended)} changed")
+    return appended
+
+
+class ScoreMaintenanceQueue:
+    """
+    Debounced set of patients whose scores need recomputing.
+
+    Args:
+        debounce_seconds: How long a batch waits for further writes.
+        batch_size: Maximum patients per recomputation (a full batch is
+            processed without waiting).
+        max_retries: How many times a patient whose recomputation failed is
+            queued again before it is dropped.
+    """
+
+    __slots__ = ('debounce_seconds', 'batch_size', 'max_retries', '_pending', '_failures', '_lock',
+                 '_session_factory', '_timer')
+
+    def __init__(self, debounce_seconds: float = SCORE_MAINTENANCE_DEBOUNCE_SECONDS,
+                 batch_size: int = SCORE_MAINTENANCE_BATCH_SIZE,
+                 max_retries: int = SCORE_MAINTENANCE_MAX_RETRIES):
+        self.debounce_seconds = debounce_seconds
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        # patient_id -> (monotonic time first enqueued, user_id)
+        self._pending: "OrderedDict[int, tuple]" = OrderedDict()
+        # patient_id -> failed recomputations so far
+        self._failures: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self._timer: Optional[threading.Timer] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def enqueue(self, patients: Mapping[int, Optional[int]]) -> None:
+        """Add patients ({patient_id: user_id or None}); already queued ones keep their place."""
+        with self._lock:
+            now = time.monotonic()
+            for patient_id, user_id in patients.items():
+                queued = self._pending.get(patient_id)
+                if queued is None:
+                    self._pending[patient_id] = (now, user_id)
+                elif user_id is not None:
+                    self._pending[patient_id] = (queued[0], user_id)
+            full = len(self._pending) >= self.batch_size
+        self._schedule(0 if full else self.debounce_seconds)
+
+    def due(self) -> bool:
+        """Whether a batch should be processed now."""
+        with self._lock:
+            if not self._pending:
+                return False
+            oldest = next(iter(self._pending.values()))[0]
+            return len(self._pending) >= self.batch_size or time.monotonic() - oldest >= self.debounce_seconds
+
+    def drain(self) -> Dict[int, Optional[int]]:
+        """Remove and return the oldest batch as {patient_id: user_id}."""
+        with self._lock:
+            batch = {}
+            while self._pending and len(batch) < self.batch_size:
+                patient_id, (_, user_id) = self._pending.popitem(last=False)
+                batch[patient_id] = user_id
+            return batch
+
+    def process(self, db: Session, batch: Mapping[int, Optional[int]]) -> int:
+        """
+        Recompute a drained batch. If that fails, the patients are scored one
+        by one so one bad patient does not cost the others their update; a
+        patient that still fails is queued again (``max_retries`` times at
+        most).
+
+        Returns:
+            int: Number of ClinicalScore rows appended.
+        """
+        try:
+            appended = len(recompute_scores(db, batch))
+        except Exception:
+            db.rollback()
+            logger.exception(f"Score recomputation failed for {len(batch)} patients")
+        else:
+            self._forget_failures(batch)
+            return appended
+        if len(batch) == 1:
+            self._retry(batch)
+            return 0
+
+        appended = 0
+        for patient_id, user_id in batch.items():
+            try:
+                appended += len(recompute_scores(db, {patient_id: user_id}))
+            except Exception:
+                db.rollback()
+                logger.exception(f"Score recomputation failed for patient {patient_id}")
+                self._retry({patient_id: user_id})
+            else:
+                self._forget_failures([patient_id])
+        return appended
+
+    def flush(self, db: Session) -> int:
+        """
+        Recompute every queued patient now, batch by batch (failed patients
+        are retried until they succeed or run out of retries).
+
+        Returns:
+            int: Number of ClinicalScore rows appended.
+        """
+        appended = 0
+        while True:
+            batch = self.drain()
+            if not batch:
+                return appended
+            appended += self.process(db, batch)
+
+    def _retry(self, patients: Mapping[int, Optional[int]]) -> None:
+        retry = {}
+        with self._lock:
+            for patient_id, user_id in patients.items():
+                failures = self._failures.get(patient_id, 0) + 1
+                if failures > self.max_retries:
+                    self._failures.pop(patient_id, None)
+                    logger.error(f"Dropping score recomputation of patient {patient_id} after {failures} failures")
+                else:
+                    self._failures[patient_id] = failures
+                    retry[patient_id] = user_id
+        if retry:
+            self.enqueue(retry)
+
+    def _forget_failures(self, patient_ids: Iterable[int]) -> None:
+        with self._lock:
+            for patient_id in patient_ids:
+                self._failures.pop(patient_id, None)
+
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        """Process batches in the background, opening sessions with ``session_factory``."""
+        self._session_factory = session_factory
+        self._schedule(self.debounce_seconds)
+
+    def stop(self, flush: bool = True) -> None:
+        """Stop the background worker, processing what is still queued if ``flush``."""
+        with self._lock:
+            timer, self._timer = self._timer, None
+            session_factory, self._session_factory = self._session_factory, None
+        if timer is not None:
+            timer.cancel()
+        if flush and session_factory is not None:
+            with session_factory() as db:
+                self.flush(db)
+
+    def _schedule(self, delay: float) -> None:
+        with self._lock:
+            if self._session_factory is None or not self._pending:
+                return
+            if self._timer is not None:
+                if delay > 0:
+                    return
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run(self) -> None:
+        with self._lock:
+            self._timer = None
+            session_factory = self._session_factory
+        if session_factory is None:
+            return
+        if self.due():
+            with session_factory() as db:
+                while self.due():
+                    self.process(db, self.drain())
+        with self._lock:
+            oldest = next(iter(self._pending.values()))[0] if self._pending else None
+        if oldest is not None:
+            self._schedule(max(0.0, self.debounce_seconds - (time.monotonic() - oldest)))
+
+
+score_queue = ScoreMaintenanceQueue()
+
+
+def track_score_input(target) -> None:
+    """
+    Record the patient of a newly inserted VitalSign/LabResult on its session;
+    the patient is queued when that transaction commits.
+    """
+    if not SCORE_MAINTENANCE_ENABLED:
+        return
+    session = object_session(target)
+    if session is None:
+        return
+    pending = session.info.setdefault(_SESSION_PENDING_KEY, {})
+    user_id = getattr(target, 'user_id', None)
+    if user_id is not None or target.patient_id not in pending:
+        pending[target.patient_id] = user_id
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_committed(session: Session) -> None:
+    pending = session.info.pop(_SESSION_PENDING_KEY, None)
+    if pending:
+        score_queue.enqueue(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    session.info.pop(_SESSION_PENDING_KEY, None)
@@ -0,0 +1,248 @@
+"""
+Per-patient cache of severity score parameters.
+
+Score pages call several calculators back to back for the same patient, and
+each used to run ``gather_score_parameters`` (patient, latest vitals, latest
+labs). ``score_parameter_cache`` keeps each patient's ``parametros`` snapshot
+so repeated requests are served without touching the database.
+
+Entries are dropped by the write paths that change the inputs
+(``create_vital_sign``, ``create_lab_result``, ``update_patient`` and the
+other vital/lab/patient writes in ``crud``), after their commit. The TTL bounds
+staleness for writes that bypass those functions and for labs ageing out of
+the 7-day window.
+
+By default the cache is an in-process LRU. Setting
+``SCORE_PARAMETER_CACHE_REDIS_URL`` shares it between workers through Redis
+instead (requires the ``redis`` package), so an invalidation in one worker is
+seen by all of them.
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SCORE_PARAMETER_CACHE_ENABLED = os.getenv("SCORE_PARAMETER_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+SCORE_PARAMETER_CACHE_MAXSIZE = int(os.getenv("SCORE_PARAMETER_CACHE_MAXSIZE", "2048"))
+SCORE_PARAMETER_CACHE_TTL_SECONDS = float(os.getenv("SCORE_PARAMETER_CACHE_TTL_SECONDS", "300"))
+SCORE_PARAMETER_CACHE_REDIS_URL = os.getenv("SCORE_PARAMETER_CACHE_REDIS_URL", "")
+
+_REDIS_KEY_PREFIX = "score_params:"
+
+
+class _LocalBackend:
+    """Bounded LRU with per-entry TTL, private to the process."""
+
+    __slots__ = ('maxsize', '_entries', '_clock', 'evictions')
+
+    def __init__(self, maxsize: int, clock: Callable[[], float]):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._clock = clock
+        self.evictions = 0
+
+    def get(self, patient_id: int) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(patient_id)
+        if entry is None:
+            return None
+        expires_at, params = entry
+        if expires_at <= self._clock():
+            del self._entries[patient_id]
+            return None
+        self._entries.move_to_end(patient_id)
+        return copy.deepcopy(params)
+
+    def set(self, patient_id: int, params: Dict[str, Any], ttl_seconds: float) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[patient_id] = (self._clock() + ttl_seconds, copy.deepcopy(params))
+        self._entries.move_to_end(patient_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, patient_id: int) -> None:
+        self._entries.pop(patient_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _RedisBackend:
+    """Shared entries in Redis, JSON-encoded, expiring with the TTL."""
+
+    __slots__ = ('client',)
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    def get(self, patient_id: int) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(f"{_REDIS_KEY_PREFIX}{patient_id}")
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, patient_id: int, params: Dict[str, Any], ttl_seconds: float) -> None:
+        self.client.set(f"{_REDIS_KEY_PREFIX}{patient_id}", json.dumps(params), px=max(1, int(ttl_seconds * 1000)))
+
+    def delete(self, patient_id: int) -> None:
+        self.client.delete(f"{_REDIS_KEY_PREFIX}{patient_id}")
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=f"{_REDIS_KEY_PREFIX}*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=f"{_REDIS_KEY_PREFIX}*"))
+
+
+class ScoreParameterCache:
+    """
+    Thread-safe per-patient ``parametros`` cache with hit/miss counters.
+
+    Args:
+        maxsize: Patients kept by the in-process backend.
+        ttl_seconds: Lifetime of an entry.
+        enabled: When False every lookup misses and nothing is stored.
+        shared_client: Redis client (or compatible, e.g. fakeredis) to use
+            instead of the in-process LRU.
+        clock: Monotonic clock for the in-process TTL.
+    """
+
+    def __init__(self, maxsize: int = SCORE_PARAMETER_CACHE_MAXSIZE,
+                 ttl_seconds: float = SCORE_PARAMETER_CACHE_TTL_SECONDS,
+                 enabled: bool = SCORE_PARAMETER_CACHE_ENABLED, shared_client: Any = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._backend = _RedisBackend(shared_client) if shared_client is not None else _LocalBackend(maxsize, clock)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+        # Bumped by every invalidation; a load that raced with one is not stored
+        self._generation = 0
+
+    @property
+    def shared(self) -> bool:
+        return isinstance(self._backend, _RedisBackend)
+
+    def _call(self, operation: Callable[..., Any], *args: Any) -> Any:
+        # The in-process LRU is guarded by the lock; Redis calls run unlocked
+        if self.shared:
+            return operation(*args)
+        with self._lock:
+            return operation(*args)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, patient_id: int) -> Optional[Dict[str, Any]]:
+        """A private copy of the patient's cached parameters, or None."""
+        if not self.enabled:
+            return None
+        try:
+            params = self._call(self._backend.get, patient_id)
+        except Exception as e:
+            self._count('errors')
+            logger.warning(f"Score parameter cache read failed for patient {patient_id}: {e}")
+            params = None
+        self._count('misses' if params is None else 'hits')
+        return params
+
+    def set(self, patient_id: int, params: Dict[str, Any]) -> None:
+        """Store a copy of the patient's parameters."""
+        if not self.enabled:
+            return
+        try:
+            self._call(self._backend.set, patient_id, params, self.ttl_seconds)
+        except Exception as e:
+            self._count('errors')
+            logger.warning(f"Score parameter cache write failed for patient {patient_id}: {e}")
+
+    def invalidate(self, patient_id: int) -> None:
+        """Drop the patient's entry (call after committing a change to its inputs)."""
+        with self._lock:
+            self.invalidations += 1
+            self._generation += 1
+        try:
+            self._call(self._backend.delete, patient_id)
+        except Exception as e:
+            self._count('errors')
+            logger.warning(f"Score parameter cache invalidation failed for patient {patient_id}: {e}")
+
+    def get_or_load(self, patient_id: int, load: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Cached parameters of the patient, calling ``load`` (and caching its result) on a miss."""
+        params = self.get(patient_id)
+        if params is None:
+            generation = self._generation
+            params = load()
+            if generation == self._generation:
+                self.set(patient_id, params)
+        return params
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._call(self._backend.clear)
+
+    def reset_stats(self) -> None:
+        """Reset the counters without touching stored entries."""
+        with self._lock:
+            self.hits = self.misses = self.invalidations = self.errors = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the cache counters."""
+        try:
+            size = self._call(len, self._backend)
+        except Exception:
+            size = None
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "backend": "redis" if self.shared else "local",
+                "size": size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": getattr(self._backend, "evictions", 0),
+                "errors": self.errors,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+def _shared_client() -> Any:
+    if not SCORE_PARAMETER_CACHE_REDIS_URL:
+        return None
+    try:
+        import redis
+    except ImportError:
+        logger.warning("SCORE_PARAMETER_CACHE_REDIS_URL is set but redis is not installed; using the in-process cache")
+        return None
+    return redis.Redis.from_url(SCORE_PARAMETER_CACHE_REDIS_URL)
+
+
+# Process-wide cache used by utils.severity_scores.gather_score_parameters
+score_parameter_cache = ScoreParameterCache(shared_client=_shared_client())
+
+
+def invalidate_score_parameters(patient_id: int) -> None:
+    """Drop a patient's cached score parameters."""
+    score_parameter_cache.invalidate(patient_id)
+
+
+def get_score_parameter_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters of the score parameter cache."""
+    return score_parameter_cache.stats()
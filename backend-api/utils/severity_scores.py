@@ -10,24 +10,40 @@ This module implements evidence-based severity scoring systems used in critical
 
 import math
 from decimal import Decimal
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, TYPE_CHECKING
 from datetime import datetime, timedelta
 import logging
 
-# Import necessary CRUD functions and models
-from sqlalchemy.orm import Session
-from database import models
-from crud.patients import get_patient
-from crud.crud_vital_sign import get_latest_vital_sign_for_patient
+# The database layer (SQLAlchemy ORM, models, CRUD) is imported inside the
+# functions that query it, so the pure score calculators load without it.
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
 # --- Helper function to get latest lab results ---
 
-def get_latest_lab_results(db: Session, patient_id: int, test_names: List[str], max_age_days: int = 7) -> Dict[str, Optional[Any]]:
+def _latest_values_query_mode(db: "Session") -> str:
+    """'distinct_on' (PostgreSQL), 'window' or 'scan' (SQLite without window functions)."""
+    dialect = db.get_bind().dialect
+    if dialect.name == 'postgresql':
+        return 'distinct_on'
+    if dialect.name == 'sqlite' and (dialect.server_version_info or (0,)) < (3, 25):
+        return 'scan'
+    return 'window'
+
+
+def get_latest_lab_results(db: "Session", patient_id: int, test_names: List[str], max_age_days: int = 7) -> Dict[str, Optional[Any]]:
     """
     Fetches the most recent non-null numeric result for specified tests within a timeframe.
-    
+
+    Test names are resolved to canonical tests (``analyzers.panel``), so a
+    stored 'Creatinina', 'creatinine' or 'Cr' all answer 'creatinina'. All
+    tests are fetched in one query that returns one row per test: DISTINCT ON
+    on PostgreSQL, ROW_NUMBER() elsewhere, and an ordered scan of the same
+    index range on SQLite builds without window functions. Values are the
+    unit-normalized ones (``LabResult.value_normalized``).
+
     Args:
         db: Database session.
         patient_id: The ID of the patient.
@@ -37,58 +53,128 @@ def get_latest_lab_results(db: Session, patient_id: int, test_names: List[str],
     Returns:
         A dictionary mapping lowercase test names to their latest value or None.
     """
+    from sqlalchemy import case, func, select
+    from database import models
+    from analyzers.panel import aliases_for_test, canonical_test_id
+
     results = {name: None for name in test_names}
     if not test_names:
         return results
 
-    cutoff_date = datetime.utcnow() - timedelta(days=max_age_days)
-    
-    # Fetch recent results relevant to the list
-    # This could be optimized further, e.g., with a window function if supported and complex
-    recent_labs = db.query(models.LabResult).filter(
-        models.LabResult.patient_id == patient_id,
-        models.LabResult.timestamp >= cutoff_date,
-        models.LabResult.test_name.ilike(test_names[0]) # Initial filter example
-        # Add more conditions if possible or filter post-query
-    ).order_by(models.LabResult.timestamp.desc()).limit(len(test_names) * 5).all() # Fetch a reasonable buffer
-
-    # Process fetched labs to find the latest for each required test name
-    processed_results = {}
-    for lab in recent_labs:
-        test_name_lower = lab.test_name.lower()
-        if test_name_lower in test_names and test_name_lower not in processed_results:
-             if lab.value_numeric is not None:
-                 processed_results[test_name_lower] = {
-                     'value': lab.value_numeric, 
-                     'timestamp': lab.timestamp,
-                     'unit': lab.unit
-                 }
-                 # Keep track of what we found
-                 if len(processed_results) == len(test_names):
-                     break # Stop if all requested tests are found
-
-    # Map found results back to the requested list format
+    requested: Dict[str, List[str]] = {}
     for name in test_names:
-        if name in processed_results:
-            results[name] = processed_results[name]['value']
-            
+        test = canonical_test_id(name)
+        if test is None:
+            logger.warning(f"Unknown lab test '{name}' requested for severity scores")
+            continue
+        requested.setdefault(test, []).append(name)
+    if not requested:
+        return results
+
+    alias_to_test = {alias: test for test in requested for alias in aliases_for_test(test)}
+    lab = models.LabResult
+    lowered = func.lower(lab.test_name)
+    test_expr = case(alias_to_test, value=lowered)
+    newest_first = (lab.timestamp.desc(), lab.result_id.desc())
+    cutoff_date = datetime.utcnow() - timedelta(days=max_age_days)
+    filters = (
+        lab.patient_id == patient_id,
+        lowered.in_(list(alias_to_test)),
+        lab.timestamp >= cutoff_date,
+        lab.value_normalized.isnot(None),
+    )
+
+    mode = _latest_values_query_mode(db)
+    if mode == 'distinct_on':
+        stmt = select(test_expr.label('test'), lab.value_normalized).where(*filters).order_by(test_expr, *newest_first)
+        try:
+            from sqlalchemy.dialects.postgresql import distinct_on  # SQLAlchemy >= 2.1
+            stmt = stmt.ext(distinct_on(test_expr))
+        except ImportError:
+            stmt = stmt.distinct(test_expr)
+        rows = db.execute(stmt).all()
+    elif mode == 'window':
+        ranked = (
+            db.query(
+                test_expr.label('test'),
+                lab.value_normalized.label('value'),
+                func.row_number().over(partition_by=test_expr, order_by=newest_first).label('rank'),
+            )
+            .filter(*filters)
+            .subquery()
+        )
+        rows = db.query(ranked.c.test, ranked.c.value).filter(ranked.c.rank == 1).all()
+    else:
+        rows = []
+        seen = set()
+        for test, value in db.query(test_expr, lab.value_normalized).filter(*filters).order_by(*newest_first):
+            if test not in seen:
+                seen.add(test)
+                rows.append((test, value))
+                if len(seen) == len(requested):
+                    break
+
+    for test, value in rows:
+        for name in requested.get(test, ()):
+            results[name] = value
     return results
 
 
 # --- Data Gathering Function ---
 
-def gather_score_parameters(db: Session, patient_id: int) -> Dict[str, Any]:
+# Stored cell counts are normalized to /mm³; the score calculators take 10^3/µL
+SCORE_LAB_SCALES = {'plaquetas': 1e-3, 'leuco': 1e-3}
+
+# Counts stored without a unit are kept as reported, so a value below these
+# limits was most likely typed in 10^3/µL and is passed to the scores as is.
+# Inside the ambiguous band both readings score the same (leukocytes < 100/mm³
+# and > 40 x10^3/µL both take the APACHE II maximum) or the limit is below any
+# platelet count a laboratory reports in /mm³.
+SCORE_LAB_THOUSANDS_BELOW = {'plaquetas': 1000.0, 'leuco': 100.0}
+
+
+def score_lab_value(test_name: str, value: Optional[float]) -> Optional[float]:
+    """A stored lab value in the unit the score calculators take (see ``SCORE_LAB_SCALES``)."""
+    if value is None or test_name not in SCORE_LAB_SCALES:
+        return value
+    if abs(value) < SCORE_LAB_THOUSANDS_BELOW.get(test_name, 0.0):
+        return value
+    return value * SCORE_LAB_SCALES[test_name]
+
+# Lab parameters used across all scores
+SCORE_REQUIRED_LABS = (
+    'pao2', 'pco2', 'ph', # Blood gas
+    'plaquetas', 'leuco', 'ht', # CBC
+    'bilirrubina', # Liver
+    'creatinina', 'na', 'k' # Renal/Electrolytes
+)
+SCORE_LAB_MAX_AGE_DAYS = 7
+
+
+def score_lab_test_keys() -> Dict[str, str]:
+    """{score parameter: canonical test id} for ``SCORE_REQUIRED_LABS``."""
+    from analyzers.panel import canonical_test_id
+    return {name: canonical_test_id(name) for name in SCORE_REQUIRED_LABS}
+
+
+def build_score_parameters(patient: Any, latest_vitals: Any, latest_labs: Dict[str, Optional[float]]) -> Dict[str, Any]:
     """
-    Gathers all necessary parameters for calculating severity scores
-    from the database for a given patient.
+    Assemble the ``parametros`` dict the calculators take from already loaded records.
+
+    Args:
+        patient: Patient row (or None).
+        latest_vitals: The patient's latest VitalSign row (or None).
+        latest_labs: {score parameter: normalized lab value or None}.
     """
+    from crud.patients import patient_demographics
+
     parametros = {}
 
-    # 1. Fetch Patient Data
-    patient = get_patient(db, patient_id)
+    # 1. Patient Data
     if patient:
-        parametros['idade'] = patient.idade
-        parametros['sexo'] = patient.sexo # Expects 'M' or 'F'
+        demographics = patient_demographics(patient)
+        parametros['idade'] = demographics.get('idade')
+        parametros['sexo'] = demographics.get('sexo') # Expects 'M' or 'F'
         # Add chronic health status if available in Patient model
         # parametros['doenca_cronica'] = patient.has_chronic_condition # Example
         parametros['doenca_cronica'] = False # Placeholder
@@ -97,8 +183,7 @@ def gather_score_parameters(db: Session, patient_id: int) -> Dict[str, Any]:
         parametros['tipo_internacao'] = 'clinica' # Placeholder
         parametros['insuficiencia_renal_aguda'] = False # Placeholder for APACHE II creatinine doubling
 
-    # 2. Fetch Latest Vital Signs
-    latest_vitals = get_latest_vital_sign_for_patient(db, patient_id)
+    # 2. Latest Vital Signs
     if latest_vitals:
         parametros['temp'] = latest_vitals.temperature_c
         parametros['fc'] = latest_vitals.heart_rate
@@ -115,19 +200,9 @@ def gather_score_parameters(db: Session, patient_id: int) -> Dict[str, Any]:
         else:
              parametros['map'] = None
 
-    # 3. Fetch Latest Relevant Lab Results
-    # Define the tests needed across all scores
-    required_labs = [
-        'pao2', 'pco2', 'ph', # Blood gas
-        'plaquetas', 'leuco', 'ht', # CBC
-        'bilirrubina', # Liver
-        'creatinina', 'na', 'k' # Renal/Electrolytes
-    ]
-    latest_labs = get_latest_lab_results(db, patient_id, required_labs, max_age_days=7)
-    
-    # Merge lab results into parameters, ensuring lowercase keys
-    for test_name, value in latest_labs.items():
-         parametros[test_name.lower()] = value # Overwrites if exists, adds if new
+    # 3. Latest Relevant Lab Results, ensuring lowercase keys
+    for test_name in SCORE_REQUIRED_LABS:
+         parametros[test_name] = score_lab_value(test_name, latest_labs.get(test_name))
 
     # 4. Placeholders for currently unmodeled data
     parametros['aminas'] = False # Placeholder for vasopressor use
@@ -136,7 +211,46 @@ def gather_score_parameters(db: Session, patient_id: int) -> Dict[str, Any]:
     parametros['noradrenalina'] = 0 # Placeholder dose
     parametros['adrenalina'] = 0  # Placeholder dose
     parametros['diurese'] = None # Placeholder urine output (mL/day)
+    return parametros
+
 
+def gather_score_parameters(db: "Session", patient_id: int, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Gathers all necessary parameters for calculating severity scores
+    from the database for a given patient.
+
+    Served from ``utils.score_parameter_cache`` when possible; the vital sign,
+    lab result and patient write paths invalidate the patient's entry. Labs
+    come from the ``patient_latest_lab`` snapshot, with
+    ``get_latest_lab_results`` as the fallback for tests it has no row for.
+    """
+    if use_cache:
+        from utils.score_parameter_cache import score_parameter_cache
+        return score_parameter_cache.get_or_load(
+            patient_id, lambda: gather_score_parameters(db, patient_id, use_cache=False)
+        )
+
+    from crud.patients import get_patient
+    from crud.crud_vital_sign import get_latest_vital_sign_for_patient
+    from crud.crud_patient_latest_lab import get_latest_labs
+
+    patient = get_patient(db, patient_id)
+    latest_vitals = get_latest_vital_sign_for_patient(db, patient_id)
+    # One primary-key range read on the maintained snapshot (crud_patient_latest_lab)
+    test_keys = score_lab_test_keys()
+    since = datetime.utcnow() - timedelta(days=SCORE_LAB_MAX_AGE_DAYS)
+    snapshot = get_latest_labs(db, patient_id, set(test_keys.values()))
+    latest_labs = {
+        name: snapshot[key].value if key in snapshot and snapshot[key].timestamp >= since else None
+        for name, key in test_keys.items()
+    }
+    # Tests with no snapshot row at all (results written around the CRUD layer)
+    # are read from lab_results
+    missing = [name for name, key in test_keys.items() if key not in snapshot]
+    if missing:
+        latest_labs.update(get_latest_lab_results(db, patient_id, missing, max_age_days=SCORE_LAB_MAX_AGE_DAYS))
+
+    parametros = build_score_parameters(patient, latest_vitals, latest_labs)
     logger.debug(f"Gathered parameters for patient {patient_id}: {parametros}")
     return parametros
 
@@ -640,7 +754,7 @@ def calcular_apache2(parametros):
         interpretacao.append(f"APACHE II score {total_apache} - Bom prognóstico (mortalidade hospitalar estimada: {mortality_rate*100:.1f}%)")
     
     # Add details about major points contributors
-    major_contributors = sorted([(k, v) for k, v in components.items() if v > 0], key=lambda x: x[1], reverse=True)[:3]
+    major_contributors = sorted([(k, v) for k, v in components.items() if v > 0 and k in contributors_map], key=lambda x: x[1], reverse=True)[:3]
     
     if major_contributors:
         contributor_text = "Principais contribuintes: " + ", ".join([f"{contributors_map[k]} ({v} pts)" for k, v in major_contributors])
@@ -661,7 +775,7 @@ def calcular_saps3(parametros):
     components = {}
     interpretation = ["Cálculo do SAPS 3 ainda não implementado."]
     # Example: Add points based on age if available
-    if 'idade' in parametros:
+    if parametros.get('idade') is not None:
         if parametros['idade'] > 80: score += 15
         elif parametros['idade'] > 60: score += 10
         components['idade'] = score # Example component tracking
@@ -834,6 +948,17 @@ def calcular_tfg_ckd_epi(creatinina_mgdl: float, idade: int, sexo: str) -> Optio
 
     return round(tfg, 2)
 
+KDIGO_TFG_INVALID = "Inválido (TFG não calculada)"
+# (lower bound, stage) from G1 down; below the last bound is G5
+KDIGO_TFG_STAGES = (
+    (90, "G1: Normal ou Alta (≥90)"),
+    (60, "G2: Levemente diminuída (60-89)"),
+    (45, "G3a: Leve a moderadamente diminuída (45-59)"),
+    (30, "G3b: Moderada a gravemente diminuída (30-44)"),
+    (15, "G4: Gravemente diminuída (15-29)"),
+    (None, "G5: Falência renal (<15)"),
+)
+
 def classificar_tfg_kdigo(tfg: Optional[float]) -> str:
     """
     Classifica a TFG de acordo com os estágios KDIGO.
@@ -845,20 +970,12 @@ def classificar_tfg_kdigo(tfg: Optional[float]) -> str:
         Estágio da Doença Renal Crônica (DRC) ou 'Normal' ou 'Inválido'.
     """
     if tfg is None:
-        return "Inválido (TFG não calculada)"
-    
-    if tfg >= 90:
-        return "G1: Normal ou Alta (≥90)"
-    elif tfg >= 60:
-        return "G2: Levemente diminuída (60-89)"
-    elif tfg >= 45:
-        return "G3a: Leve a moderadamente diminuída (45-59)"
-    elif tfg >= 30:
-        return "G3b: Moderada a gravemente diminuída (30-44)"
-    elif tfg >= 15:
-        return "G4: Gravemente diminuída (15-29)"
-    else:
-        return "G5: Falência renal (<15)"
+        return KDIGO_TFG_INVALID
+    
+    for lower_bound, stage in KDIGO_TFG_STAGES[:-1]:
+        if tfg >= lower_bound:
+            return stage
+    return KDIGO_TFG_STAGES[-1][1]
 
 # --- Placeholder for Child-Pugh --- 
 
@@ -879,7 +996,7 @@ def calcular_child_pugh(parametros):
     albumin_score = 0
     inr_score = 0
     
-    if 'bilirrubina' in parametros:
+    if parametros.get('bilirrubina') is not None:
         bili = parametros['bilirrubina']
         if bili > 3: bilirubin_score = 3
         elif bili >= 2: bilirubin_score = 2
@@ -0,0 +1,155 @@
+"""
+Unit normalization for laboratory results.
+
+``LabResult.unit`` is free text typed by users or sent by lab systems, while
+the analyzers, reference ranges and severity scores assume one unit per test
+(creatinine mg/dL, calcium mg/dL, ionized calcium mmol/L, ...). The registry
+below maps every (canonical test, unit) pair it knows to a precomputed factor
+into the canonical unit. It is applied once, when a result is written: the
+converted value is stored in ``LabResult.value_normalized`` (and the unit in
+``unit_normalized``), so the read path never parses units or converts values.
+"""
+
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from analyzers.panel import canonical_test_id
+
+logger = logging.getLogger(__name__)
+
+# Molar masses / equivalences used below (mg/dL per mmol/L)
+_UREA = 6.006
+_GLUCOSE = 18.016
+_CALCIUM = 4.008
+_MAGNESIUM = 2.431
+_PHOSPHATE = 3.097
+_URIC_ACID = 16.81
+_CHOLESTEROL = 38.67
+_TRIGLYCERIDES = 88.57
+_LACTATE = 9.008
+
+# canonical test -> (canonical unit, {unit: factor into the canonical unit})
+UNIT_CONVERSIONS: Dict[str, Tuple[str, Dict[str, float]]] = {
+    'Creat': ('mg/dL', {'µmol/L': 1 / 88.4, 'mmol/L': 1000 / 88.4}),
+    'Ur': ('mg/dL', {'mmol/L': _UREA}),
+    'Glicose': ('mg/dL', {'mmol/L': _GLUCOSE}),
+    'Ca+': ('mg/dL', {'mmol/L': _CALCIUM, 'mEq/L': _CALCIUM / 2}),
+    'iCa': ('mmol/L', {'mg/dL': 1 / _CALCIUM, 'mEq/L': 0.5}),
+    'Mg+': ('mg/dL', {'mmol/L': _MAGNESIUM, 'mEq/L': _MAGNESIUM / 2}),
+    'P': ('mg/dL', {'mmol/L': _PHOSPHATE}),
+    'BT': ('mg/dL', {'µmol/L': 1 / 17.1}),
+    'BD': ('mg/dL', {'µmol/L': 1 / 17.1}),
+    'BI': ('mg/dL', {'µmol/L': 1 / 17.1}),
+    'AcidoUrico': ('mg/dL', {'µmol/L': 1 / 59.48, 'mmol/L': _URIC_ACID}),
+    'CT': ('mg/dL', {'mmol/L': _CHOLESTEROL}),
+    'LDL': ('mg/dL', {'mmol/L': _CHOLESTEROL}),
+    'HDL': ('mg/dL', {'mmol/L': _CHOLESTEROL}),
+    'TG': ('mg/dL', {'mmol/L': _TRIGLYCERIDES}),
+    'Lactato': ('mmol/L', {'mg/dL': 1 / _LACTATE}),
+    'Albumina': ('g/dL', {'g/L': 0.1}),
+    'Hb': ('g/dL', {'g/L': 0.1, 'mmol/L': 1.611}),
+    'Na+': ('mEq/L', {'mmol/L': 1.0}),
+    'K+': ('mEq/L', {'mmol/L': 1.0}),
+    'Cl-': ('mEq/L', {'mmol/L': 1.0}),
+    'HCO3-': ('mEq/L', {'mmol/L': 1.0}),
+    'pO2': ('mmHg', {'kPa': 7.50062}),
+    'pCO2': ('mmHg', {'kPa': 7.50062}),
+    'Leuco': ('/mm³', {'/µL': 1.0, 'x10³/µL': 1000.0, '10³/µL': 1000.0, 'x10^9/L': 1000.0, '10^9/L': 1000.0,
+                       'mil/mm³': 1000.0}),
+    'Plaq': ('/mm³', {'/µL': 1.0, 'x10³/µL': 1000.0, '10³/µL': 1000.0, 'x10^9/L': 1000.0, '10^9/L': 1000.0,
+                      'mil/mm³': 1000.0}),
+    'PCR': ('mg/dL', {'mg/L': 0.1}),
+}
+
+
+@lru_cache(maxsize=512)
+def unit_key(unit: Optional[str]) -> str:
+    """
+    Spelling-insensitive form of a unit ('µmol/L', 'umol/l' and 'μmol / L'
+    all map to 'umol/l'). Empty for missing units.
+    """
+    if not unit:
+        return ''
+    key = str(unit).strip().lower().replace(' ', '')
+    for src, dst in (('μ', 'u'), ('µ', 'u'), ('mc', 'u'), ('³', '3'), ('^', ''), ('*', 'x'), ('×', 'x')):
+        key = key.replace(src, dst)
+    return key
+
+
+class UnitConversionRegistry:
+    """
+    Precomputed (canonical test, unit key) -> factor table.
+
+    Args:
+        conversions: {canonical test: (canonical unit, {unit: factor})}.
+    """
+
+    __slots__ = ('_canonical_units', '_factors')
+
+    def __init__(self, conversions: Mapping[str, Tuple[str, Mapping[str, float]]] = UNIT_CONVERSIONS):
+        self._canonical_units: Dict[str, str] = {}
+        self._factors: Dict[Tuple[str, str], float] = {}
+        for test, (canonical_unit, factors) in conversions.items():
+            self.register(test, canonical_unit, factors)
+
+    def register(self, test: str, canonical_unit: str, factors: Mapping[str, float]) -> None:
+        """Add or extend the conversions of a canonical test."""
+        self._canonical_units[test] = canonical_unit
+        self._factors[(test, unit_key(canonical_unit))] = 1.0
+        for unit, factor in factors.items():
+            self._factors[(test, unit_key(unit))] = float(factor)
+
+    def canonical_unit(self, test_name: Any) -> Optional[str]:
+        test = canonical_test_id(test_name)
+        return self._canonical_units.get(test) if test else None
+
+    def factor(self, test_name: Any, unit: Optional[str]) -> Optional[float]:
+        """
+        Factor converting ``unit`` into the test's canonical unit, or None when
+        the test or the unit is not known.
+        """
+        test = canonical_test_id(test_name)
+        if test is None:
+            return None
+        return self._factors.get((test, unit_key(unit)))
+
+    def normalize(self, test_name: Any, value: Optional[float], unit: Optional[str]) -> Tuple[Optional[float], Optional[str]]:
+        """
+        Convert a value into the canonical unit of its test.
+
+        A result without a unit is taken to be in the canonical unit, as the
+        analyzers always assumed; the value is never rescaled. Tests without a
+        canonical unit, and units the registry does not know, keep the value
+        and unit unchanged.
+
+        Returns:
+            tuple: (normalized value, unit of that value)
+        """
+        if value is None:
+            return None, unit
+        test = canonical_test_id(test_name)
+        canonical_unit = self._canonical_units.get(test) if test else None
+        if canonical_unit is None:
+            return value, unit
+        if not unit:
+            return value, canonical_unit
+        factor = self._factors.get((test, unit_key(unit)))
+        if factor is None:
+            logger.warning(f"No conversion from '{unit}' to {canonical_unit} for {test_name}; value stored as reported")
+            return value, unit
+        return value * factor, canonical_unit
+
+    def apply(self, result: Any) -> Any:
+        """
+        Set ``value_normalized``/``unit_normalized`` on a lab result object
+        from its ``test_name``, ``value_numeric`` and ``unit``.
+        """
+        result.value_normalized, result.unit_normalized = self.normalize(
+            result.test_name, result.value_numeric, result.unit
+        )
+        return result
+
+
+# Process-wide registry used by the lab result write paths
+unit_registry = UnitConversionRegistry()